@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Per-Opcode Benchmark Runner with Regression Baseline
+
+Builds opcode_bench (make), runs it, and compares each case's ns/op with a
+stored baseline. A case slower than the baseline by more than the threshold
+is a regression and makes the run fail.
+
+Timings depend on the machine, so the baseline should be recorded on the
+machine that runs the comparison (--update-baseline).
+
+Usage:
+    ./bench.py --update-baseline        # Record baseline.json
+    ./bench.py                          # Compare against baseline.json
+    ./bench.py --threshold 0.10         # Fail on >10% slowdowns
+    ./bench.py --filter add2 --output results.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+BENCH_DIR = Path(__file__).resolve().parent
+BENCH_EXE = BENCH_DIR / "opcode_bench"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+# Allowed slowdown relative to the baseline before a case counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+
+def build() -> bool:
+    result = subprocess.run(["make"], cwd=BENCH_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stdout + result.stderr, file=sys.stderr)
+        print("✗ Failed to build opcode_bench", file=sys.stderr)
+        return False
+    return True
+
+
+def run_bench(args) -> Dict:
+    """Run opcode_bench and return its parsed JSON results."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "results.json"
+        cmd = [str(BENCH_EXE), "--min-time-ms", str(args.min_time_ms),
+               "--repeat", str(args.repeat), "--output", str(output)]
+        if args.filter:
+            cmd += ["--filter", args.filter]
+
+        # The runtime's own log lines go to stdout; only the JSON file matters
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        with open(output, 'r') as f:
+            return json.load(f)
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> Dict:
+    """
+    Annotate each result with its baseline and relative change.
+
+    Returns {case: {..., "baseline_ns_per_op", "change", "regression"}};
+    cases missing from the baseline get None for both baseline fields.
+    """
+    compared = {}
+    for name, result in results["results"].items():
+        entry = dict(result)
+        base = baseline.get("results", {}).get(name)
+        if base:
+            change = result["ns_per_op"]/base["ns_per_op"] - 1
+            entry["baseline_ns_per_op"] = base["ns_per_op"]
+            entry["change"] = round(change, 4)
+            entry["regression"] = change > threshold
+        else:
+            entry["baseline_ns_per_op"] = None
+            entry["change"] = None
+            entry["regression"] = False
+        compared[name] = entry
+    return compared
+
+
+def print_table(compared: Dict, threshold: float):
+    print(f"{'case':<28} {'ns/op':>10} {'baseline':>10} {'change':>8}", file=sys.stderr)
+    for name, entry in compared.items():
+        if entry["baseline_ns_per_op"] is None:
+            base, change = "-", "new"
+        else:
+            base = f"{entry['baseline_ns_per_op']:.1f}"
+            change = f"{entry['change']*100:+.1f}%"
+        marker = "  ✗ REGRESSION" if entry["regression"] else ""
+        print(f"{name:<28} {entry['ns_per_op']:>10.1f} {base:>10} {change:>8}{marker}",
+              file=sys.stderr)
+    print(f"(regression threshold: +{threshold*100:.0f}%)", file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the per-opcode runtime benchmark")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE, metavar='FILE',
+                        help='Baseline results to compare against (default: baseline.json)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write the results to the baseline file instead of comparing')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, metavar='FRAC',
+                        help=f'Allowed slowdown before failing (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--filter', metavar='SUBSTRING',
+                        help='Only run cases whose name contains SUBSTRING')
+    parser.add_argument('--min-time-ms', type=float, default=50, metavar='N',
+                        help='Minimum duration of each timed run (default: 50)')
+    parser.add_argument('--repeat', type=int, default=5, metavar='N',
+                        help='Timed runs per case; the fastest is reported (default: 5)')
+    parser.add_argument('--output', type=Path, metavar='FILE',
+                        help='Also write the JSON report to FILE')
+    args = parser.parse_args(argv)
+
+    if not build():
+        return 1
+
+    results = run_bench(args)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline} ({len(results['results'])} cases)",
+              file=sys.stderr)
+        return 0
+
+    try:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        print(f"No baseline at {args.baseline}; record one with --update-baseline",
+              file=sys.stderr)
+        baseline = {}
+
+    compared = compare(results, baseline, args.threshold)
+    regressions = [name for name, entry in compared.items() if entry["regression"]]
+
+    report = {
+        "threshold": args.threshold,
+        "regressions": regressions,
+        "results": compared
+    }
+
+    print_table(compared, args.threshold)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
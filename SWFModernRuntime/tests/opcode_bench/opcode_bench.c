@@ -0,0 +1,488 @@
+/**
+ * Per-Opcode Runtime Microbenchmark
+ *
+ * Times action* entry points in a tight loop against a live runtime
+ * (stack, heap, variable storage), the way recompiled scripts call them.
+ * Each case pushes its operands, runs the opcode and pops the result, so
+ * the reported ns/op includes a few stack writes on top of the opcode.
+ *
+ * Results are printed as JSON on stdout, or written to --output FILE (the
+ * runtime logs its own messages to stdout):
+ *   {"min_time_ms": 50, "repeat": 5,
+ *    "results": {"add2_f32": {"opcode": "ADD2", "operands": "F32",
+ *                             "ns_per_op": 3.21}, ...}}
+ *
+ * Usage:
+ *   ./opcode_bench [--min-time-ms N] [--repeat N] [--filter SUBSTRING] [--output FILE]
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#include <recomp.h>
+#include <heap.h>
+#include <utils.h>
+#include <actionmodern/object.h>
+
+// Symbols normally provided by SWFRecomp's generated code
+typedef struct {
+	const char* label;
+	size_t frame;
+} FrameLabelEntry;
+
+FrameLabelEntry frame_label_data[] = { { NULL, 0 } };
+size_t frame_label_count = 0;
+
+void tagInit()
+{
+}
+
+// Runtime state shared by all cases
+static SWFAppContext app_context;
+static char* bench_stack;
+static u32 bench_sp;
+static char str_buffer[17];
+static char a_str[17];
+static char b_str[17];
+static ASObject* bench_object;
+
+// ==============================================================================
+// Benchmark Cases
+// ==============================================================================
+
+#define F32_BITS(f) ((union { float v; u32 bits; }) { .v = (f) }).bits
+#define F64_BITS(d) ((union { double v; u64 bits; }) { .v = (d) }).bits
+
+static void benchAdd2F32(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(1.5f));
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(2.25f));
+	actionAdd2(stack, sp, str_buffer);
+	POP();
+}
+
+static void benchAdd2F64(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_F64, F64_BITS(1.5));
+	PUSH(ACTION_STACK_VALUE_F64, F64_BITS(2.25));
+	actionAdd2(stack, sp, str_buffer);
+	POP();
+}
+
+static void benchAdd2String(char* stack, u32* sp)
+{
+	PUSH_STR("hello", 5);
+	PUSH_STR("world", 5);
+	actionAdd2(stack, sp, str_buffer);
+	POP();
+}
+
+static void benchAdd2Mixed(char* stack, u32* sp)
+{
+	PUSH_STR("n=", 2);
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(42.0f));
+	actionAdd2(stack, sp, str_buffer);
+	POP();
+}
+
+static void benchSubtractF32(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(5.0f));
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(2.0f));
+	actionSubtract(stack, sp);
+	POP();
+}
+
+static void benchMultiplyF64(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_F64, F64_BITS(3.0));
+	PUSH(ACTION_STACK_VALUE_F64, F64_BITS(7.0));
+	actionMultiply(stack, sp);
+	POP();
+}
+
+static void benchLess2F32(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(1.0f));
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(2.0f));
+	actionLess2(stack, sp);
+	POP();
+}
+
+static void benchStringAddString(char* stack, u32* sp)
+{
+	PUSH_STR("hello", 5);
+	PUSH_STR("world", 5);
+	actionStringAdd(stack, sp, a_str, b_str);
+	POP();
+}
+
+static void benchStringAddStrList(char* stack, u32* sp)
+{
+	// The first StringAdd builds the STR_LIST operand of the second
+	PUSH_STR("hello", 5);
+	PUSH_STR(" ", 1);
+	actionStringAdd(stack, sp, a_str, b_str);
+	PUSH_STR("world", 5);
+	actionStringAdd(stack, sp, a_str, b_str);
+	POP();
+}
+
+static void benchToStringF64(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_F64, F64_BITS(3.14159));
+	actionToString(stack, sp, str_buffer);
+	POP();
+}
+
+static void benchEquals2F32(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(1.0f));
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(1.0f));
+	actionEquals2(stack, sp);
+	POP();
+}
+
+static void benchEquals2F64(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_F64, F64_BITS(1.0));
+	PUSH(ACTION_STACK_VALUE_F64, F64_BITS(2.0));
+	actionEquals2(stack, sp);
+	POP();
+}
+
+static void benchEquals2String(char* stack, u32* sp)
+{
+	PUSH_STR("hello", 5);
+	PUSH_STR("hello", 5);
+	actionEquals2(stack, sp);
+	POP();
+}
+
+static void benchEquals2Mixed(char* stack, u32* sp)
+{
+	PUSH_STR("42", 2);
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(42.0f));
+	actionEquals2(stack, sp);
+	POP();
+}
+
+static void benchEquals2Object(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_OBJECT, (u64) bench_object);
+	PUSH(ACTION_STACK_VALUE_OBJECT, (u64) bench_object);
+	actionEquals2(stack, sp);
+	POP();
+}
+
+static void benchGetMemberObject(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_OBJECT, (u64) bench_object);
+	PUSH_STR("p3", 2);
+	actionGetMember(stack, sp);
+	POP();
+}
+
+static void benchGetMemberMissing(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_OBJECT, (u64) bench_object);
+	PUSH_STR("missing", 7);
+	actionGetMember(stack, sp);
+	POP();
+}
+
+static void benchGetMemberStringLength(char* stack, u32* sp)
+{
+	PUSH_STR("hello world", 11);
+	PUSH_STR("length", 6);
+	actionGetMember(stack, sp);
+	POP();
+}
+
+static void benchSetMemberF32(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_OBJECT, (u64) bench_object);
+	PUSH_STR("p1", 2);
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(7.0f));
+	actionSetMember(stack, sp);
+}
+
+static void benchSetMemberString(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_OBJECT, (u64) bench_object);
+	PUSH_STR("p2", 2);
+	PUSH_STR("value", 5);
+	actionSetMember(stack, sp);
+}
+
+static void benchGetVariable(char* stack, u32* sp)
+{
+	PUSH_STR("bench_var", 9);
+	actionGetVariable(stack, sp);
+	POP();
+}
+
+static void benchSetVariable(char* stack, u32* sp)
+{
+	PUSH_STR("bench_var", 9);
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(1.0f));
+	actionSetVariable(stack, sp);
+}
+
+static void benchEnumerateObject(char* stack, u32* sp)
+{
+	PUSH_STR("bench_obj", 9);
+	actionEnumerate(stack, sp, str_buffer);
+
+	// Pop the property names and the undefined terminator
+	while (STACK_TOP_TYPE != ACTION_STACK_VALUE_UNDEFINED)
+	{
+		POP();
+	}
+	POP();
+}
+
+static ActionVar benchFunction(char* stack, u32* sp, ActionVar* args, u32 arg_count, ActionVar* registers, void* this_obj)
+{
+	ActionVar result;
+	result.type = ACTION_STACK_VALUE_F32;
+	result.str_size = 0;
+	result.data.numeric_value = arg_count > 0 ? args[0].data.numeric_value : 0;
+	return result;
+}
+
+static void benchCallFunctionBuiltin(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(1.0f));
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(1.0f));
+	PUSH_STR("isNaN", 5);
+	actionCallFunction(stack, sp, str_buffer);
+	POP();
+}
+
+static void benchCallFunctionUser(char* stack, u32* sp)
+{
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(1.0f));
+	PUSH(ACTION_STACK_VALUE_F32, F32_BITS(1.0f));
+	PUSH_STR("benchFn", 7);
+	actionCallFunction(stack, sp, str_buffer);
+	POP();
+}
+
+typedef struct
+{
+	const char* name;
+	const char* opcode;
+	const char* operands;
+	void (*run)(char* stack, u32* sp);
+} BenchCase;
+
+static const BenchCase cases[] = {
+	{ "add2_f32", "ADD2", "F32", benchAdd2F32 },
+	{ "add2_f64", "ADD2", "F64", benchAdd2F64 },
+	{ "add2_string", "ADD2", "STRING", benchAdd2String },
+	{ "add2_string_f32", "ADD2", "STRING,F32", benchAdd2Mixed },
+	{ "subtract_f32", "SUBTRACT", "F32", benchSubtractF32 },
+	{ "multiply_f64", "MULTIPLY", "F64", benchMultiplyF64 },
+	{ "less2_f32", "LESS2", "F32", benchLess2F32 },
+	{ "string_add_string", "STRING_ADD", "STRING", benchStringAddString },
+	{ "string_add_str_list", "STRING_ADD", "STR_LIST,STRING", benchStringAddStrList },
+	{ "to_string_f64", "TO_STRING", "F64", benchToStringF64 },
+	{ "equals2_f32", "EQUALS2", "F32", benchEquals2F32 },
+	{ "equals2_f64", "EQUALS2", "F64", benchEquals2F64 },
+	{ "equals2_string", "EQUALS2", "STRING", benchEquals2String },
+	{ "equals2_string_f32", "EQUALS2", "STRING,F32", benchEquals2Mixed },
+	{ "equals2_object", "EQUALS2", "OBJECT", benchEquals2Object },
+	{ "get_member_object", "GET_MEMBER", "OBJECT", benchGetMemberObject },
+	{ "get_member_object_missing", "GET_MEMBER", "OBJECT", benchGetMemberMissing },
+	{ "get_member_string_length", "GET_MEMBER", "STRING", benchGetMemberStringLength },
+	{ "set_member_f32", "SET_MEMBER", "OBJECT,F32", benchSetMemberF32 },
+	{ "set_member_string", "SET_MEMBER", "OBJECT,STRING", benchSetMemberString },
+	{ "get_variable", "GET_VARIABLE", "STRING", benchGetVariable },
+	{ "set_variable", "SET_VARIABLE", "STRING,F32", benchSetVariable },
+	{ "enumerate_object", "ENUMERATE", "OBJECT", benchEnumerateObject },
+	{ "call_function_builtin", "CALL_FUNCTION", "F32", benchCallFunctionBuiltin },
+	{ "call_function_user", "CALL_FUNCTION", "F32", benchCallFunctionUser },
+};
+
+#define NUM_CASES (sizeof(cases)/sizeof(cases[0]))
+
+// ==============================================================================
+// Harness
+// ==============================================================================
+
+static void setupRuntime()
+{
+	bench_stack = (char*) aligned_alloc(8, INITIAL_STACK_SIZE);
+	bench_sp = INITIAL_SP;
+
+	initTime();
+	initMap();
+
+	if (!heap_init(&app_context, 0))
+	{
+		fprintf(stderr, "Failed to initialize heap allocator\n");
+		exit(1);
+	}
+
+	// An object with a few properties, reachable as the variable bench_obj
+	bench_object = allocObject(8);
+	char name[4];
+	for (int i = 0; i < 6; i++)
+	{
+		snprintf(name, sizeof(name), "p%d", i);
+
+		ActionVar value;
+		value.type = ACTION_STACK_VALUE_F32;
+		value.str_size = 0;
+		value.data.numeric_value = F32_BITS((float) i);
+		setProperty(bench_object, name, (u32) strlen(name), &value);
+	}
+
+	ActionVar object_var;
+	object_var.type = ACTION_STACK_VALUE_OBJECT;
+	object_var.str_size = 0;
+	object_var.data.numeric_value = (u64) bench_object;
+	setVariableByName("bench_obj", &object_var);
+
+	ActionVar number_var;
+	number_var.type = ACTION_STACK_VALUE_F32;
+	number_var.str_size = 0;
+	number_var.data.numeric_value = F32_BITS(1.0f);
+	setVariableByName("bench_var", &number_var);
+
+	actionDefineFunction2(bench_stack, &bench_sp, "benchFn", benchFunction, 1, 0, 0);
+}
+
+static double nowNs()
+{
+	struct timespec ts;
+	clock_gettime(CLOCK_MONOTONIC, &ts);
+	return (double) ts.tv_sec*1e9 + (double) ts.tv_nsec;
+}
+
+static double timeIterations(void (*run)(char* stack, u32* sp), u64 iterations)
+{
+	double start = nowNs();
+	for (u64 i = 0; i < iterations; i++)
+	{
+		run(bench_stack, &bench_sp);
+	}
+	return nowNs() - start;
+}
+
+/**
+ * Best ns/op over repeat runs, each of at least min_time_ms.
+ * The iteration count is doubled until one run takes long enough.
+ */
+static double benchmark(const BenchCase* c, double min_time_ms, int repeat)
+{
+	u32 sp_start = bench_sp;
+	u64 iterations = 1;
+
+	while (timeIterations(c->run, iterations) < min_time_ms*1e6)
+	{
+		iterations *= 2;
+	}
+
+	double best = 0;
+	for (int r = 0; r < repeat; r++)
+	{
+		double ns = timeIterations(c->run, iterations)/(double) iterations;
+		if (r == 0 || ns < best)
+		{
+			best = ns;
+		}
+	}
+
+	if (bench_sp != sp_start)
+	{
+		fprintf(stderr, "%s: stack pointer not restored (%u != %u)\n", c->name, bench_sp, sp_start);
+		exit(1);
+	}
+
+	return best;
+}
+
+int main(int argc, char** argv)
+{
+	double min_time_ms = 50;
+	int repeat = 5;
+	const char* filter = NULL;
+	const char* output = NULL;
+
+	for (int i = 1; i < argc; i++)
+	{
+		if (strcmp(argv[i], "--min-time-ms") == 0 && i + 1 < argc)
+		{
+			min_time_ms = atof(argv[++i]);
+		}
+		else if (strcmp(argv[i], "--repeat") == 0 && i + 1 < argc)
+		{
+			repeat = atoi(argv[++i]);
+		}
+		else if (strcmp(argv[i], "--filter") == 0 && i + 1 < argc)
+		{
+			filter = argv[++i];
+		}
+		else if (strcmp(argv[i], "--output") == 0 && i + 1 < argc)
+		{
+			output = argv[++i];
+		}
+		else
+		{
+			fprintf(stderr, "Usage: %s [--min-time-ms N] [--repeat N] [--filter SUBSTRING] [--output FILE]\n", argv[0]);
+			return 2;
+		}
+	}
+
+	if (repeat < 1)
+	{
+		repeat = 1;
+	}
+
+	FILE* out = stdout;
+	if (output != NULL)
+	{
+		out = fopen(output, "w");
+		if (out == NULL)
+		{
+			fprintf(stderr, "Cannot open %s for writing\n", output);
+			return 1;
+		}
+	}
+
+	setupRuntime();
+
+	fprintf(out, "{\n  \"min_time_ms\": %g,\n  \"repeat\": %d,\n  \"results\": {", min_time_ms, repeat);
+
+	int first = 1;
+	for (size_t i = 0; i < NUM_CASES; i++)
+	{
+		const BenchCase* c = &cases[i];
+		if (filter != NULL && strstr(c->name, filter) == NULL)
+		{
+			continue;
+		}
+
+		double ns = benchmark(c, min_time_ms, repeat);
+		fprintf(out, "%s\n    \"%s\": {\"opcode\": \"%s\", \"operands\": \"%s\", \"ns_per_op\": %.3f}",
+		       first ? "" : ",", c->name, c->opcode, c->operands, ns);
+		fflush(out);
+		first = 0;
+	}
+
+	fprintf(out, "\n  }\n}\n");
+	if (out != stdout)
+	{
+		fclose(out);
+	}
+
+	heap_shutdown();
+	freeMap();
+	aligned_free(bench_stack);
+
+	return 0;
+}
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Synthetic Shape SWF Generator
+
+Generates SWFs whose DefineShape tags stress the shape triangulation in
+SWFRecomp, in particular how filled paths are joined into closed outlines:
+
+    --squares N        filled squares per shape
+    --shapes S         DefineShape tags, each placed on the single frame
+    --grid W           squares per row (default: ceil(sqrt(N)))
+    --touching         squares share their sides
+
+Each square is drawn as four separate paths, one per side, each starting
+with its own MoveTo. None of them is closed on its own, so the recompiler
+has to connect every path to the ones that share its endpoints before it
+can find the square. By default squares don't touch, so the outlines stay small while
+the number of paths grows with N; a matcher that compares every path with
+every other one shows up as quadratic recompile time.
+
+With --touching the squares form one filled block whose inner sides are
+each drawn twice, once by each square. The paths then form a grid with a
+huge number of cycles, which is slow for anything that enumerates them.
+
+Usage:
+    ./generate_shapes.py --squares 10000 -o shapes.swf
+    ./generate_shapes.py --squares 1000 --shapes 8 --config -o work/test.swf
+    ./generate_shapes.py --squares 400 --touching -o grid.swf
+
+    from generate_shapes import ShapeWorkload
+    swf_bytes = ShapeWorkload(squares=5000).build()
+"""
+
+import argparse
+import math
+import struct
+import sys
+from pathlib import Path
+from typing import List
+
+from generate_workload import CONFIG_TOML, rect, tag
+
+# Tag codes
+TAG_END = 0
+TAG_SHOW_FRAME = 1
+TAG_DEFINE_SHAPE = 2
+TAG_SET_BACKGROUND_COLOR = 9
+TAG_PLACE_OBJECT_2 = 26
+
+# Square size and spacing, in twips
+SQUARE_SIZE = 40
+SQUARE_PITCH = 60
+
+# Signed field width for every delta and MoveTo coordinate
+COORD_BITS = 16
+
+
+class BitWriter:
+    """Packs SWF bit fields, most significant bit first."""
+
+    def __init__(self):
+        self.bits: List[str] = []
+
+    def ub(self, value: int, nbits: int):
+        self.bits.append(format(value, f'0{nbits}b'))
+
+    def sb(self, value: int, nbits: int):
+        self.ub(value & ((1 << nbits) - 1), nbits)
+
+    def to_bytes(self) -> bytes:
+        bits = ''.join(self.bits)
+        bits += '0'*(-len(bits) % 8)
+        return bytes(int(bits[i:i + 8], 2) for i in range(0, len(bits), 8))
+
+
+# ==============================================================================
+# Shapes
+# ==============================================================================
+
+class ShapeWorkload:
+    """Parameters of a synthetic shape SWF, and the code to build it."""
+
+    def __init__(self, squares: int = 1000, shapes: int = 1, grid: int = 0,
+                 touching: bool = False, version: int = 6):
+        if squares < 1:
+            raise ValueError("at least one square is required")
+        if shapes < 1:
+            raise ValueError("at least one shape is required")
+
+        self.squares = squares
+        self.shapes = shapes
+        self.grid = grid if grid > 0 else math.ceil(math.sqrt(squares))
+        self.pitch = SQUARE_SIZE if touching else SQUARE_PITCH
+        self.version = version
+
+        rows = math.ceil(squares / self.grid)
+        self.width = self.grid*self.pitch
+        self.height = rows*self.pitch
+        if max(self.width, self.height) >= 1 << (COORD_BITS - 1):
+            raise ValueError(f"{squares} squares in rows of {self.grid} don't fit in "
+                             f"{COORD_BITS}-bit coordinates; use fewer squares or --grid")
+
+    def shape_records(self) -> bytes:
+        """SHAPE records: one MoveTo plus one straight edge per square side."""
+        bits = BitWriter()
+        bits.ub(1, 4)  # NumFillBits
+        bits.ub(0, 4)  # NumLineBits
+
+        sides = ((SQUARE_SIZE, 0), (0, SQUARE_SIZE), (-SQUARE_SIZE, 0), (0, -SQUARE_SIZE))
+
+        for i in range(self.squares):
+            x = (i % self.grid)*self.pitch
+            y = (i // self.grid)*self.pitch
+
+            for dx, dy in sides:
+                # StyleChangeRecord: MoveTo, and FillStyle1 on the first one
+                first = i == 0 and dx > 0
+                bits.ub(0, 1)
+                bits.ub(0b00101 if first else 0b00001, 5)
+                bits.ub(COORD_BITS, 5)
+                bits.sb(x, COORD_BITS)
+                bits.sb(y, COORD_BITS)
+                if first:
+                    bits.ub(1, 1)
+
+                # StraightEdgeRecord, general line
+                bits.ub(0b11, 2)
+                bits.ub(COORD_BITS - 2, 4)
+                bits.ub(1, 1)
+                bits.sb(dx, COORD_BITS)
+                bits.sb(dy, COORD_BITS)
+
+                x += dx
+                y += dy
+
+        bits.ub(0, 6)  # EndShapeRecord
+        return bits.to_bytes()
+
+    def define_shape(self, shape_id: int, records: bytes) -> bytes:
+        body = struct.pack('<H', shape_id) + rect(self.width, self.height)
+        # One solid fill, no line styles
+        body += bytes([1, 0x00, 0x30, 0x60, 0xC0])
+        body += bytes([0])
+        return tag(TAG_DEFINE_SHAPE, body + records)
+
+    def place_object(self, shape_id: int, depth: int) -> bytes:
+        # PlaceFlagHasCharacter, no matrix
+        return tag(TAG_PLACE_OBJECT_2, bytes([0x02]) + struct.pack('<HH', depth, shape_id))
+
+    def build(self) -> bytes:
+        """Return the complete (uncompressed) SWF file."""
+        records = self.shape_records()
+
+        tags = tag(TAG_SET_BACKGROUND_COLOR, bytes([255, 255, 255]))
+        for i in range(self.shapes):
+            tags += self.define_shape(i + 1, records)
+        for i in range(self.shapes):
+            tags += self.place_object(i + 1, i + 1)
+        tags += tag(TAG_SHOW_FRAME)
+        tags += tag(TAG_END)
+
+        body = rect(550*20, 400*20) + struct.pack('<HH', 30 << 8, 1) + tags
+        return b'FWS' + struct.pack('<BI', self.version, 8 + len(body)) + body
+
+
+def write_shapes(workload: ShapeWorkload, directory: Path, swf_name: str = "test.swf") -> Path:
+    """Write the SWF and a SWFRecomp config.toml into directory; return the SWF path."""
+    directory.mkdir(parents=True, exist_ok=True)
+    swf_path = directory / swf_name
+    swf_path.write_bytes(workload.build())
+    (directory / "config.toml").write_text(CONFIG_TOML.format(swf=swf_name))
+    return swf_path
+
+
+def add_shape_arguments(parser: argparse.ArgumentParser):
+    """Add the shape parameters shared by the generator and the benchmark."""
+    parser.add_argument('--shapes', type=int, default=1, metavar='S',
+                        help='Number of DefineShape tags (default: 1)')
+    parser.add_argument('--grid', type=int, default=0, metavar='W',
+                        help='Squares per row (default: square layout)')
+    parser.add_argument('--touching', action='store_true',
+                        help='Let neighboring squares share their sides')
+    parser.add_argument('--swf-version', type=int, default=6, metavar='V',
+                        help='SWF version (default: 6)')
+
+
+def shapes_from_args(args, squares: int) -> ShapeWorkload:
+    return ShapeWorkload(squares=squares, shapes=args.shapes, grid=args.grid,
+                         touching=args.touching, version=args.swf_version)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic shape stress SWF")
+    parser.add_argument('--squares', type=int, default=1000, metavar='N',
+                        help='Filled squares per shape (default: 1000)')
+    add_shape_arguments(parser)
+    parser.add_argument('-o', '--output', type=Path, default=Path("test.swf"),
+                        help='Output SWF path (default: test.swf)')
+    parser.add_argument('--config', action='store_true',
+                        help='Also write a config.toml next to the SWF')
+    args = parser.parse_args(argv)
+
+    try:
+        workload = shapes_from_args(args, args.squares)
+        if args.config:
+            write_shapes(workload, args.output.parent, args.output.name)
+        else:
+            args.output.write_bytes(workload.build())
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Created {args.output} ({args.output.stat().st_size} bytes)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Synthetic Workload SWF Generator
+
+Generates speed_test-style stress SWFs whose shape is controlled by a few
+parameters, for measuring how recompilation and the recompiled code scale:
+
+    --actions N        total number of actions (approximate, >= N)
+    --strings M        constant pool size (function and variable names)
+    --functions K      DefineFunction bodies, each called from the frames
+    --nesting D        depth of nested If blocks
+    --push-batch B     values per Push record (summed with Add2)
+    --frames F         frames, each with its own DoAction
+
+Every frame is built from stack-balanced blocks, cycled in order:
+
+- arithmetic: Push var, B floats; Add2 x (B-1); SetVariable
+- concat:     Push var, str, str; StringAdd; SetVariable
+- call:       Push x, 1, fn; CallFunction; Pop
+- nested:     D levels of Push 0; If (never taken) around an arithmetic block,
+              each level closed by Push 0; Pop
+
+The last frame traces the first variable and stops, so the recompiled
+program runs each frame once and prints exactly one line. Output is deterministic for a given set of parameters.
+
+Usage:
+    ./generate_workload.py --actions 100000 -o workload.swf
+    ./generate_workload.py --actions 1000 --frames 10 --nesting 8 -o test.swf
+
+    from generate_workload import Workload
+    swf_bytes = Workload(actions=10000, functions=16).build()
+"""
+
+import argparse
+import struct
+import sys
+from pathlib import Path
+from typing import Tuple
+
+# Action codes
+ACTION_END = 0x00
+ACTION_STOP = 0x07
+ACTION_POP = 0x17
+ACTION_GET_VARIABLE = 0x1C
+ACTION_SET_VARIABLE = 0x1D
+ACTION_STRING_ADD = 0x21
+ACTION_TRACE = 0x26
+ACTION_CALL_FUNCTION = 0x3D
+ACTION_ADD2 = 0x47
+ACTION_CONSTANT_POOL = 0x88
+ACTION_PUSH = 0x96
+ACTION_DEFINE_FUNCTION = 0x9B
+ACTION_IF = 0x9D
+
+# Push value types
+PUSH_STRING = 0
+PUSH_FLOAT = 1
+PUSH_CONSTANT8 = 8
+PUSH_CONSTANT16 = 9
+
+# Tag codes
+TAG_END = 0
+TAG_SHOW_FRAME = 1
+TAG_SET_BACKGROUND_COLOR = 9
+TAG_DO_ACTION = 12
+
+
+# ==============================================================================
+# Encoding
+# ==============================================================================
+
+def action(code: int, payload: bytes = b'') -> bytes:
+    """Encode one action record (actions >= 0x80 carry a length)."""
+    if code < 0x80:
+        return bytes([code])
+    if len(payload) > 0xFFFF:
+        raise ValueError(f"action 0x{code:02X} payload too large ({len(payload)} bytes)")
+    return struct.pack('<BH', code, len(payload)) + payload
+
+
+def push(*values: Tuple[str, object]) -> bytes:
+    """
+    Encode a Push of several values.
+
+    Values are ('f', float), ('c', constant pool index) or ('s', str).
+    """
+    payload = b''
+    for kind, value in values:
+        if kind == 'f':
+            payload += struct.pack('<Bf', PUSH_FLOAT, value)
+        elif kind == 'c':
+            if value < 256:
+                payload += struct.pack('<BB', PUSH_CONSTANT8, value)
+            else:
+                payload += struct.pack('<BH', PUSH_CONSTANT16, value)
+        else:
+            payload += bytes([PUSH_STRING]) + value.encode('ascii') + b'\0'
+    return action(ACTION_PUSH, payload)
+
+
+def tag(code: int, body: bytes = b'') -> bytes:
+    """Encode a tag, using the long header form when needed."""
+    if len(body) < 0x3F:
+        return struct.pack('<H', (code << 6) | len(body)) + body
+    return struct.pack('<HI', (code << 6) | 0x3F, len(body)) + body
+
+
+def rect(xmax: int, ymax: int) -> bytes:
+    """Encode a RECT from (0, 0) to (xmax, ymax) twips with 16-bit fields."""
+    bits = format(16, '05b') + ''.join(format(v, '016b') for v in (0, xmax, 0, ymax))
+    bits += '0'*(-len(bits) % 8)
+    return bytes(int(bits[i:i + 8], 2) for i in range(0, len(bits), 8))
+
+
+# ==============================================================================
+# Workload
+# ==============================================================================
+
+class Workload:
+    """Parameters of a synthetic SWF, and the code to build it."""
+
+    def __init__(self, actions: int = 1000, strings: int = 64, functions: int = 4,
+                 nesting: int = 4, push_batch: int = 4, frames: int = 1,
+                 version: int = 5):
+        if push_batch < 2:
+            raise ValueError("push batch must be at least 2")
+        if frames < 1:
+            raise ValueError("at least one frame is required")
+        if strings < functions + 3:
+            raise ValueError(f"need at least {functions + 3} strings for {functions} functions")
+
+        self.actions = actions
+        self.strings = strings
+        self.functions = functions
+        self.nesting = nesting
+        self.push_batch = push_batch
+        self.frames = frames
+        self.version = version
+
+        # Pool layout: function names first, then variable names / string data
+        self.pool = [f"fn{i}" for i in range(functions)]
+        self.pool += [f"s{i}" for i in range(strings - functions)]
+        self.first_var = functions
+        self.counter = 0
+
+    def next_string(self) -> int:
+        """Cycle through the non-function pool entries."""
+        index = self.first_var + self.counter % (self.strings - self.functions)
+        self.counter += 1
+        return index
+
+    # Blocks return (bytecode, number of actions)
+
+    def arithmetic_block(self) -> Tuple[bytes, int]:
+        values = [('c', self.next_string())]
+        values += [('f', float(i + 1)) for i in range(self.push_batch)]
+        code = push(*values)
+        code += action(ACTION_ADD2)*(self.push_batch - 1)
+        code += action(ACTION_SET_VARIABLE)
+        return code, self.push_batch + 1
+
+    def concat_block(self) -> Tuple[bytes, int]:
+        code = push(('c', self.next_string()), ('c', self.next_string()), ('c', self.next_string()))
+        code += action(ACTION_STRING_ADD) + action(ACTION_SET_VARIABLE)
+        return code, 3
+
+    def call_block(self) -> Tuple[bytes, int]:
+        fn = self.counter % self.functions
+        self.counter += 1
+        code = push(('f', 2.0), ('f', 1.0), ('c', fn))
+        code += action(ACTION_CALL_FUNCTION) + action(ACTION_POP)
+        return code, 3
+
+    def nested_block(self, depth: int) -> Tuple[bytes, int]:
+        """depth levels of `if (0) skip` wrapped around an arithmetic block."""
+        body, count = self.arithmetic_block()
+        for _ in range(depth):
+            # Each level ends with its own Push/Pop, so no two Ifs share a target
+            body += push(('f', 0.0)) + action(ACTION_POP)
+            skip = action(ACTION_IF, struct.pack('<h', len(body)))
+            body = push(('f', 0.0)) + skip + body
+            count += 4
+        return body, count
+
+    def function_definitions(self) -> Tuple[bytes, int]:
+        """fn0..fnK-1(x) = x + i, written as simple DefineFunctions."""
+        code = b''
+        for i in range(self.functions):
+            # Arguments arrive on the stack; leaving the sum there returns it
+            body = push(('f', float(i))) + action(ACTION_ADD2) + action(ACTION_END)
+            payload = self.pool[i].encode('ascii') + b'\0'
+            payload += struct.pack('<H', 1) + b'x\0'
+            payload += struct.pack('<H', len(body)) + body
+            code += action(ACTION_DEFINE_FUNCTION, payload)
+        return code, 3*self.functions
+
+    def constant_pool(self) -> bytes:
+        payload = struct.pack('<H', len(self.pool))
+        payload += b''.join(s.encode('ascii') + b'\0' for s in self.pool)
+        if len(payload) > 0xFFFF:
+            raise ValueError(f"constant pool of {len(self.pool)} strings exceeds 64KB")
+        return action(ACTION_CONSTANT_POOL, payload)
+
+    def frame_actions(self, frame: int, budget: int) -> bytes:
+        code = self.constant_pool()
+        count = 1
+
+        if frame == 0:
+            definitions, n = self.function_definitions()
+            code += definitions
+            count += n
+
+        block_kinds = ['arithmetic', 'concat']
+        if self.functions:
+            block_kinds.append('call')
+        if self.nesting:
+            block_kinds.append('nested')
+
+        i = 0
+        while count < budget:
+            kind = block_kinds[i % len(block_kinds)]
+            i += 1
+            if kind == 'arithmetic':
+                block, n = self.arithmetic_block()
+            elif kind == 'concat':
+                block, n = self.concat_block()
+            elif kind == 'call':
+                block, n = self.call_block()
+            else:
+                block, n = self.nested_block(self.nesting)
+            code += block
+            count += n
+
+        if frame == self.frames - 1:
+            code += push(('c', self.first_var)) + action(ACTION_GET_VARIABLE) + action(ACTION_TRACE)
+            # Stop so the recompiled movie runs once instead of looping
+            code += action(ACTION_STOP)
+
+        return code + action(ACTION_END)
+
+    def build(self) -> bytes:
+        """Return the complete (uncompressed) SWF file."""
+        self.counter = 0
+        per_frame = max(1, self.actions // self.frames)
+
+        tags = tag(TAG_SET_BACKGROUND_COLOR, bytes([255, 255, 255]))
+        for frame in range(self.frames):
+            tags += tag(TAG_DO_ACTION, self.frame_actions(frame, per_frame))
+            tags += tag(TAG_SHOW_FRAME)
+        tags += tag(TAG_END)
+
+        body = rect(550*20, 400*20) + struct.pack('<HH', 30 << 8, self.frames) + tags
+        return b'FWS' + struct.pack('<BI', self.version, 8 + len(body)) + body
+
+
+CONFIG_TOML = """[input]
+path_to_swf = "{swf}"
+output_tags_folder = "RecompiledTags"
+output_scripts_folder = "RecompiledScripts"
+"""
+
+
+def write_workload(workload: Workload, directory: Path, swf_name: str = "test.swf") -> Path:
+    """Write the SWF and a SWFRecomp config.toml into directory; return the SWF path."""
+    directory.mkdir(parents=True, exist_ok=True)
+    swf_path = directory / swf_name
+    swf_path.write_bytes(workload.build())
+    (directory / "config.toml").write_text(CONFIG_TOML.format(swf=swf_name))
+    return swf_path
+
+
+def add_workload_arguments(parser: argparse.ArgumentParser):
+    """Add the shape parameters shared by the generator and the benchmark."""
+    parser.add_argument('--strings', type=int, default=64, metavar='M',
+                        help='Constant pool size (default: 64)')
+    parser.add_argument('--functions', type=int, default=4, metavar='K',
+                        help='Number of defined functions (default: 4)')
+    parser.add_argument('--nesting', type=int, default=4, metavar='D',
+                        help='Depth of nested If blocks (default: 4)')
+    parser.add_argument('--push-batch', type=int, default=4, metavar='B',
+                        help='Values per Push record (default: 4)')
+    parser.add_argument('--frames', type=int, default=1, metavar='F',
+                        help='Number of frames (default: 1)')
+    parser.add_argument('--swf-version', type=int, default=5, metavar='V',
+                        help='SWF version (default: 5)')
+
+
+def workload_from_args(args, actions: int) -> Workload:
+    return Workload(actions=actions, strings=args.strings, functions=args.functions,
+                    nesting=args.nesting, push_batch=args.push_batch,
+                    frames=args.frames, version=args.swf_version)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic stress SWF")
+    parser.add_argument('--actions', type=int, default=1000, metavar='N',
+                        help='Approximate number of actions (default: 1000)')
+    add_workload_arguments(parser)
+    parser.add_argument('-o', '--output', type=Path, default=Path("test.swf"),
+                        help='Output SWF path (default: test.swf)')
+    parser.add_argument('--config', action='store_true',
+                        help='Also write a config.toml next to the SWF')
+    args = parser.parse_args(argv)
+
+    try:
+        workload = workload_from_args(args, args.actions)
+        if args.config:
+            write_workload(workload, args.output.parent, args.output.name)
+        else:
+            args.output.write_bytes(workload.build())
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Created {args.output} ({args.output.stat().st_size} bytes)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
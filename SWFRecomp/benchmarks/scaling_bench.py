@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Recompiler and Runtime Scaling Benchmark
+
+Generates synthetic workloads of increasing size (generate_workload.py) and
+measures, for each size:
+
+- recompile_ms:       SWFRecomp wall time
+- generated_bytes:    size of RecompiledScripts/ + RecompiledTags/
+- compile_ms:         gcc time for the generated code and main.c, linked
+                      against a runtime library built once per run. With
+                      --jobs N, the files are compiled N at a time and then
+                      linked, as make -j would.
+- execution_ms:       run time of the native binary
+
+The native build uses the same NO_GRAPHICS sources and flags as
+scripts/build_test.sh. Results are printed as JSON, and optionally written
+as CSV for plotting.
+
+Usage:
+    ./scaling_bench.py                              # 1k, 10k, 100k actions
+    ./scaling_bench.py --sizes 1000,10000,100000,1000000 --csv scaling.csv
+    ./scaling_bench.py --stages recompile --sizes 1000000 --nesting 16
+    ./scaling_bench.py --sizes 100000 --max-file-size 65536 --jobs 8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from generate_workload import add_workload_arguments, workload_from_args, write_workload
+
+BENCH_DIR = Path(__file__).resolve().parent
+SWFRECOMP_ROOT = BENCH_DIR.parent
+SWFRECOMP_EXE = SWFRECOMP_ROOT / "build/SWFRecomp"
+SWFMODERN_ROOT = SWFRECOMP_ROOT.parent / "SWFModernRuntime"
+MAIN_WRAPPER = SWFRECOMP_ROOT / "wasm_wrappers/main.c"
+DEFAULT_WORK_DIR = SWFRECOMP_ROOT / "build/workloads"
+
+STAGES = ("recompile", "compile", "run")
+DEFAULT_SIZES = "1000,10000,100000"
+
+# Mirrors RUNTIME_SOURCES, INCLUDE_FLAGS and NATIVE_CFLAGS in build_test.sh
+RUNTIME_SOURCES = [
+    SWFMODERN_ROOT / "src/actionmodern/action.c",
+    SWFMODERN_ROOT / "src/actionmodern/variables.c",
+    SWFMODERN_ROOT / "src/actionmodern/object.c",
+    SWFMODERN_ROOT / "src/utils.c",
+    SWFMODERN_ROOT / "src/libswf/swf_core.c",
+    SWFMODERN_ROOT / "src/libswf/tag_stubs.c",
+    SWFMODERN_ROOT / "lib/c-hashmap/map.c",
+    SWFMODERN_ROOT / "lib/o1heap/o1heap.c",
+    SWFMODERN_ROOT / "src/memory/heap.c",
+]
+
+INCLUDE_FLAGS = [
+    f"-I{SWFMODERN_ROOT / 'include'}",
+    f"-I{SWFMODERN_ROOT / 'include/actionmodern'}",
+    f"-I{SWFMODERN_ROOT / 'include/libswf'}",
+    f"-I{SWFMODERN_ROOT / 'include/memory'}",
+    f"-I{SWFMODERN_ROOT / 'lib/c-hashmap'}",
+]
+
+NATIVE_CFLAGS = [
+    "-DNO_GRAPHICS",
+    "-D_POSIX_C_SOURCE=199309L",
+    "-Wall",
+    "-Wno-unused-variable",
+    "-std=c17",
+]
+
+
+def timed(cmd: List[str], cwd: Path, timeout: int) -> float:
+    """Run a command and return its wall time in milliseconds."""
+    start = time.monotonic()
+    result = subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, timeout=timeout)
+    elapsed = (time.monotonic() - start)*1000
+    if result.returncode != 0:
+        error = result.stderr.decode(errors='replace').strip().splitlines()[-5:]
+        raise RuntimeError(f"{Path(cmd[0]).name} failed: " + " / ".join(error))
+    return elapsed
+
+
+def compile_parallel(sources: List[str], args, build_dir: Path, runtime_lib: Path) -> float:
+    """Compile each source to an object, args.jobs at a time, then link. Returns wall ms."""
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        # list() re-raises the first compile error
+        list(pool.map(
+            lambda source: timed(["gcc", "-c", source, *args.cflags, "-I.", *INCLUDE_FLAGS],
+                                 build_dir, args.timeout),
+            sources
+        ))
+    objects = [Path(source).with_suffix(".o").name for source in sources]
+    timed(["gcc", *objects, str(runtime_lib), "-o", "workload", "-lm"], build_dir, args.timeout)
+    return (time.monotonic() - start)*1000
+
+
+def build_runtime(work_dir: Path, cflags: List[str]) -> Path:
+    """Compile the NO_GRAPHICS runtime into a static library (not timed)."""
+    runtime_dir = work_dir / "runtime"
+    shutil.rmtree(runtime_dir, ignore_errors=True)
+    runtime_dir.mkdir(parents=True)
+
+    subprocess.run(
+        ["gcc", "-c", *map(str, RUNTIME_SOURCES), *cflags, *INCLUDE_FLAGS,
+         f"-I{SWFMODERN_ROOT / 'lib/o1heap'}"],
+        cwd=runtime_dir, check=True, stderr=subprocess.DEVNULL
+    )
+    library = runtime_dir / "libswfmodernruntime.a"
+    subprocess.run(["ar", "rcs", str(library), *sorted(p.name for p in runtime_dir.glob("*.o"))],
+                   cwd=runtime_dir, check=True)
+    return library
+
+
+def generated_size(directory: Path) -> int:
+    return sum(
+        path.stat().st_size
+        for folder in ("RecompiledScripts", "RecompiledTags")
+        for path in (directory / folder).glob("*")
+        if path.is_file()
+    )
+
+
+def bench_size(actions: int, args, work_dir: Path, runtime_lib: Optional[Path]) -> Dict:
+    """Generate, recompile, build and run one workload size."""
+    directory = work_dir / f"actions_{actions}"
+    shutil.rmtree(directory, ignore_errors=True)
+
+    workload = workload_from_args(args, actions)
+    swf_path = write_workload(workload, directory)
+    if args.max_file_size is not None:
+        with open(directory / "config.toml", "a") as f:
+            f.write(f"\n[output]\nmax_file_size = {args.max_file_size}\n")
+
+    row = {
+        "actions": actions,
+        "swf_bytes": swf_path.stat().st_size,
+        "recompile_ms": None,
+        "generated_bytes": None,
+        "c_files": None,
+        "compile_ms": None,
+        "execution_ms": None,
+    }
+
+    row["recompile_ms"] = round(timed([str(SWFRECOMP_EXE), "config.toml"], directory, args.timeout), 1)
+    row["generated_bytes"] = generated_size(directory)
+
+    if "compile" not in args.stages:
+        return row
+
+    build_dir = directory / "build"
+    build_dir.mkdir()
+    shutil.copy(MAIN_WRAPPER, build_dir)
+    for folder in ("RecompiledScripts", "RecompiledTags"):
+        for path in (directory / folder).glob("*.[ch]"):
+            shutil.copy(path, build_dir)
+
+    sources = sorted(p.name for p in build_dir.glob("*.c"))
+    row["c_files"] = len(sources)
+    if args.jobs > 1:
+        row["compile_ms"] = round(compile_parallel(sources, args, build_dir, runtime_lib), 1)
+    else:
+        row["compile_ms"] = round(timed(
+            ["gcc", *sources, *args.cflags, "-I.", *INCLUDE_FLAGS, str(runtime_lib),
+             "-o", "workload", "-lm"],
+            build_dir, args.timeout
+        ), 1)
+
+    if "run" in args.stages:
+        row["execution_ms"] = round(timed([str(build_dir / "workload")], build_dir, args.timeout), 1)
+
+    return row
+
+
+def write_csv(rows: List[Dict], path: Path):
+    columns = list(rows[0].keys())
+    with open(path, 'w') as f:
+        f.write(",".join(columns) + "\n")
+        for row in rows:
+            f.write(",".join("" if row[c] is None else str(row[c]) for c in columns) + "\n")
+
+
+def parse_stages(value: str) -> List[str]:
+    stages = [s.strip() for s in value.split(',') if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    # Later stages need the earlier ones
+    return list(STAGES[:max(STAGES.index(s) for s in stages) + 1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure how recompilation and execution scale")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, metavar='N,N,...',
+                        help=f'Action counts to benchmark (default: {DEFAULT_SIZES})')
+    add_workload_arguments(parser)
+    parser.add_argument('--stages', type=parse_stages, default=list(STAGES), metavar='LIST',
+                        help='Stages to run: recompile, compile, run (default: all)')
+    parser.add_argument('--opt', default='', metavar='FLAGS',
+                        help='Extra compiler flags for the runtime and generated code, e.g. -O2')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help=f'Compile the generated files N at a time (default: 1, one gcc call; '
+                             f'this machine has {os.cpu_count()} cores)')
+    parser.add_argument('--max-file-size', type=int, metavar='BYTES',
+                        help='Set [output] max_file_size in the workload config.toml '
+                             '(default: the recompiler default)')
+    parser.add_argument('--work-dir', type=Path, default=DEFAULT_WORK_DIR, metavar='DIR',
+                        help='Where workloads are generated and built (default: build/workloads)')
+    parser.add_argument('--timeout', type=int, default=1800, metavar='SEC',
+                        help='Timeout for each step (default: 1800)')
+    parser.add_argument('--csv', type=Path, metavar='FILE',
+                        help='Also write the results as CSV')
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [int(n) for n in args.sizes.split(',')]
+    except ValueError:
+        parser.error(f"invalid --sizes: {args.sizes}")
+
+    if not SWFRECOMP_EXE.is_file():
+        print(f"Error: SWFRecomp not built: {SWFRECOMP_EXE}", file=sys.stderr)
+        return 1
+
+    args.cflags = NATIVE_CFLAGS + args.opt.split()
+    args.work_dir.mkdir(parents=True, exist_ok=True)
+
+    runtime_lib = None
+    if "compile" in args.stages:
+        print("Building runtime library...", file=sys.stderr)
+        runtime_lib = build_runtime(args.work_dir, args.cflags)
+
+    rows = []
+    for actions in sizes:
+        print(f"Benchmarking {actions} actions...", file=sys.stderr)
+        try:
+            rows.append(bench_size(actions, args, args.work_dir, runtime_lib))
+        except (RuntimeError, subprocess.TimeoutExpired, ValueError) as e:
+            print(f"  {actions} actions: {e}", file=sys.stderr)
+            rows.append({"actions": actions, "error": str(e)})
+            break
+
+    print(json.dumps({"parameters": {
+        "strings": args.strings,
+        "functions": args.functions,
+        "nesting": args.nesting,
+        "push_batch": args.push_batch,
+        "frames": args.frames,
+        "max_file_size": args.max_file_size,
+        "jobs": args.jobs,
+        "cflags": args.cflags,
+    }, "results": rows}, indent=2))
+
+    completed = [row for row in rows if "error" not in row]
+    if args.csv and completed:
+        write_csv(completed, args.csv)
+
+    return 0 if len(completed) == len(rows) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
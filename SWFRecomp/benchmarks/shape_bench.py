@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Shape Triangulation Benchmark
+
+Generates shape workloads of increasing size (generate_shapes.py) and
+measures, for each size and each SWFRecomp binary:
+
+- recompile_ms:       SWFRecomp wall time
+- generated_bytes:    size of RecompiledTags/
+
+Passing --swfrecomp more than once runs every size with each binary, so an
+older build can be compared with the current one on the same SWFs; their
+RecompiledTags/ are also compared, and `identical` records whether they
+matched the first binary's. A binary that fails or times out is skipped
+for the larger sizes. Results are printed as JSON, and optionally written
+as CSV for plotting.
+
+Usage:
+    ./shape_bench.py                                # 1k, 2k, 4k, 8k squares
+    ./shape_bench.py --sizes 1000,10000,50000 --csv shapes.csv
+    ./shape_bench.py --swfrecomp old/SWFRecomp --swfrecomp ../build/SWFRecomp
+    ./shape_bench.py --touching --sizes 4,9,16,25 --timeout 60
+"""
+
+import argparse
+import filecmp
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+from generate_shapes import add_shape_arguments, shapes_from_args, write_shapes
+from scaling_bench import SWFRECOMP_EXE, DEFAULT_WORK_DIR, timed, write_csv
+
+DEFAULT_SIZES = "1000,2000,4000,8000"
+
+
+def same_tree(a: Path, b: Path) -> bool:
+    """True if both directories hold the same files with the same contents."""
+    comparison = filecmp.dircmp(a, b)
+    if comparison.left_only or comparison.right_only:
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(a, b, comparison.common_files, shallow=False)
+    return not mismatch and not errors
+
+
+def bench_size(squares: int, args, work_dir: Path) -> List[Dict]:
+    """Generate one workload and recompile it with each binary."""
+    directory = work_dir / f"squares_{squares}"
+    shutil.rmtree(directory, ignore_errors=True)
+
+    swf_path = write_shapes(shapes_from_args(args, squares), directory)
+
+    rows = []
+    reference = None
+    for i, exe in enumerate(args.swfrecomp):
+        if exe in args.failed:
+            continue
+
+        output = directory / "RecompiledTags"
+        shutil.rmtree(output, ignore_errors=True)
+
+        row = {
+            "squares": squares,
+            "shapes": args.shapes,
+            "swfrecomp": str(exe),
+            "swf_bytes": swf_path.stat().st_size,
+        }
+
+        try:
+            row["recompile_ms"] = round(timed([str(exe), "config.toml"], directory, args.timeout), 1)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            # Larger sizes won't do better, so stop timing this binary
+            print(f"  {exe}: {e}", file=sys.stderr)
+            args.failed.add(exe)
+            row["error"] = str(e)
+            rows.append(row)
+            continue
+
+        row["generated_bytes"] = sum(p.stat().st_size for p in output.glob("*") if p.is_file())
+        row["identical"] = None
+
+        # Keep each binary's output to compare against the first one
+        kept = directory / f"RecompiledTags_{i}"
+        output.rename(kept)
+        if reference is None:
+            reference = kept
+        else:
+            row["identical"] = same_tree(reference, kept)
+
+        rows.append(row)
+
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure how shape recompilation scales")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, metavar='N,N,...',
+                        help=f'Square counts to benchmark (default: {DEFAULT_SIZES})')
+    add_shape_arguments(parser)
+    parser.add_argument('--swfrecomp', type=Path, action='append', metavar='PATH',
+                        help='SWFRecomp binary to time; repeat to compare builds '
+                             '(default: build/SWFRecomp)')
+    parser.add_argument('--work-dir', type=Path, default=DEFAULT_WORK_DIR, metavar='DIR',
+                        help='Where workloads are generated (default: build/workloads)')
+    parser.add_argument('--timeout', type=int, default=1800, metavar='SEC',
+                        help='Timeout for each recompile (default: 1800)')
+    parser.add_argument('--csv', type=Path, metavar='FILE',
+                        help='Also write the results as CSV')
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [int(n) for n in args.sizes.split(',')]
+    except ValueError:
+        parser.error(f"invalid --sizes: {args.sizes}")
+
+    args.swfrecomp = [exe.resolve() for exe in (args.swfrecomp or [SWFRECOMP_EXE])]
+    for exe in args.swfrecomp:
+        if not exe.is_file():
+            print(f"Error: SWFRecomp not found: {exe}", file=sys.stderr)
+            return 1
+
+    args.work_dir.mkdir(parents=True, exist_ok=True)
+
+    args.failed = set()
+
+    rows = []
+    for squares in sizes:
+        if len(args.failed) == len(args.swfrecomp):
+            break
+        print(f"Benchmarking {squares} squares...", file=sys.stderr)
+        try:
+            rows.extend(bench_size(squares, args, args.work_dir))
+        except ValueError as e:
+            print(f"  {squares} squares: {e}", file=sys.stderr)
+            rows.append({"squares": squares, "error": str(e)})
+            break
+
+    print(json.dumps({"parameters": {
+        "shapes": args.shapes,
+        "grid": args.grid,
+        "touching": args.touching,
+        "swfrecomp": [str(exe) for exe in args.swfrecomp],
+    }, "results": rows}, indent=2))
+
+    completed = [row for row in rows if "error" not in row]
+    if args.csv and completed:
+        write_csv(completed, args.csv)
+
+    return 0 if len(completed) == len(rows) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
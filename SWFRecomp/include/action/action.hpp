@@ -2,6 +2,7 @@
 
 #include <fstream>
 #include <map>
+#include <vector>
 
 #include <common.h>
 #include <stackvalue.hpp>
@@ -116,24 +117,50 @@ namespace SWFRecomp
 		SWF_ACTION_CALL_METHOD = 0x52
 	};
 	
+	class ActionList;
+	struct ActionRecord;
+	
+	// Where the top-level actions of a DoAction are split into functions
+	// script_N, script_N_1, ... so each part can go to its own file
+	struct ScriptSplit
+	{
+		const ActionList* actions;  // The list to split, or nullptr for none
+		string name;  // script_N
+		size_t max_size;
+		std::vector<bool> allowed;  // Records a new part may start at
+		std::vector<size_t> offsets;  // Start of each part in the output
+	};
+
+	// A Try or With block being emitted, and the list holding its record
+	struct InlineBlock
+	{
+		const ActionList* actions;
+		SWFActionType code;
+	};
+
 	class SWFAction
 	{
 	public:
 		size_t next_str_i;
-		size_t func_counter;
+		size_t next_slot_i;  // Counter for the C locals of stack slots
+		size_t func_counter;  // Counters for unique DefineFunction and DefineFunction2 names
+		size_t func2_counter;
 		size_t try_counter;  // Counter for jmp_buf variables in try-catch blocks
 		bool needs_setjmp;  // Flag to track if script uses try-catch
 		std::map<std::string, size_t> string_to_id;  // Track declared strings for deduplication
 		std::vector<size_t> constant_pool;  // Maps constant pool index to string ID
+		ScriptSplit split;
+		std::vector<InlineBlock> inline_blocks;  // Try and With blocks being emitted, innermost last
 
 		SWFAction();
 
-		void parseActions(Context& context, char*& action_buffer, ofstream& out_script);
+		void parseActions(Context& context, char*& action_buffer, const string& script_name, std::vector<string>& parts);
+		void emitActions(Context& context, const ActionList& actions, ostream& out_script);
+		std::vector<bool> findSplitPoints(const ActionList& actions);
+		void leaveBlocks(const ActionRecord& record, ostream& out_script, const string& indent);
 		void declareVariable(Context& context, char* var_name);
 		void declareString(Context& context, char* str);
 		void declareEmptyString(Context& context, size_t size);
 		size_t getStringId(const char* str);  // Get ID for a previously declared string
-		char actionCodeLookAhead(char* action_buffer, int lookAhead);
-		size_t actionCodeLookAheadIndex(char* action_buffer, int lookAhead);
 	};
 };
\ No newline at end of file
@@ -0,0 +1,118 @@
+#pragma once
+
+#include <string>
+#include <vector>
+
+#include <common.h>
+#include <action.hpp>
+
+namespace SWFRecomp
+{
+	// Index value for "no record/block"
+	const size_t ACTION_NONE = (size_t) -1;
+
+	// Push value types beyond ActionStackValueType
+	const u8 ACTION_PUSH_CONSTANT8 = 8;
+	const u8 ACTION_PUSH_CONSTANT16 = 9;
+
+	// Type of a value the type inference pass couldn't prove
+	const u8 ACTION_TYPE_UNKNOWN = 0xFF;
+
+	// One value of a Push record
+	struct ActionPushValue
+	{
+		u8 type;  // ActionStackValueType or ACTION_PUSH_CONSTANT8/16
+		u64 value;  // F32/F64 bits, register, boolean or constant pool index
+		std::string str;  // String value
+
+		// Computed by the recompiler rather than read from the SWF. Folded
+		// strings are pushed without a string ID, like runtime results.
+		bool folded;
+
+		// Registers only: the register's type here, if inferred
+		u8 known_type;
+	};
+
+	// One decoded action record
+	struct ActionRecord
+	{
+		SWFActionType code;
+		u32 offset;  // Offset of the action code, relative to the script start
+		u16 length;  // Length of the payload (0 for codes below 0x80)
+		char* data;  // Payload (points past the code and length fields)
+
+		// Jump, If, WaitForFrame and WaitForFrame2 only
+		bool has_target;
+		s64 target;  // Offset of the branch target
+		size_t target_index;  // Record at target, or ACTION_NONE if outside this list
+
+		bool is_jump_target;  // Needs a label
+		size_t block;  // Basic block containing this record
+
+		// Nested action lists (DefineFunction/DefineFunction2 body,
+		// Try try/catch/finally blocks, With block) in ActionList::bodies
+		size_t first_body;
+		u8 body_count;
+
+		std::vector<ActionPushValue> push_values;  // Push only
+
+		// Type of the value this action pushes, if inferred
+		u8 result_type;
+
+		bool removed;  // Dropped by an optimization pass; emits nothing
+	};
+
+	// A straight-line run of records [first, last]
+	struct ActionBlock
+	{
+		size_t first;
+		size_t last;
+		std::vector<size_t> successors;
+	};
+
+	// The decoded form of one action stream, with resolved jump targets
+	// and its control-flow graph. Every list ends with an END record.
+	class ActionList
+	{
+	public:
+		std::vector<ActionRecord> records;
+		std::vector<ActionBlock> blocks;
+		std::vector<ActionList> bodies;
+
+		// Decode actions up to and including the END action. Returns a
+		// pointer past the END action.
+		char* decode(char* action_buffer);
+
+		// Decode the size bytes at action_buffer (a nested block), stopping
+		// early at an END action. Offsets are reported relative to base.
+		void decode(char* action_buffer, size_t size, u32 base);
+
+		// Resolve jump targets and rebuild the blocks, ignoring removed
+		// records. Passes that add, remove or retarget branches call this.
+		void buildGraph();
+
+		// Index of the record at offset, or ACTION_NONE
+		size_t find(s64 offset) const;
+
+		// Add the targets of branches in this list, or in the Try and With
+		// bodies emitted inline with it, that leave the list
+		void findEscapes(std::vector<s64>& targets) const;
+
+		// Records of this list that branches in the Try or With bodies of
+		// record jump to, with ACTION_NONE for targets outside the list
+		std::vector<size_t> findBodyTargets(const ActionRecord& record) const;
+
+	private:
+		char* decodeRecords(char* action_buffer, char* limit, u32 base);
+		char* decodeBodies(ActionRecord& record, u32 base, char* action_buffer_start);
+		size_t payloadSize(const ActionRecord& record);
+		size_t decodePush(ActionRecord& record);
+		void resolveTargets();
+		void resolveBodyTargets();
+		void buildBlocks();
+	};
+
+	bool isBranch(SWFActionType code);
+	bool isInlineBody(SWFActionType code);
+	bool endsBlock(SWFActionType code);
+};
@@ -0,0 +1,21 @@
+#pragma once
+
+#include <string>
+#include <vector>
+
+#include <action_ir.hpp>
+
+namespace SWFRecomp
+{
+	// Fold arithmetic, comparisons and string concatenation of pushed
+	// constants into a single Push, and drop constants that are pushed only
+	// to be popped. pool is the constant pool in effect at the start of the
+	// list; ConstantPool actions in the list (and nested bodies) update it.
+	void foldConstants(ActionList& actions, std::vector<std::string>& pool);
+
+	// Turn Ifs on pushed constants into Jumps (or nothing) and drop the
+	// records no path from the entry reaches, with the labels only they
+	// jumped to. Lists that branch into or out of a nested block are left
+	// as they are. Nested bodies are processed too.
+	void eliminateDeadCode(ActionList& actions);
+};
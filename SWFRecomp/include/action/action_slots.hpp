@@ -0,0 +1,73 @@
+#pragma once
+
+#include <string>
+#include <vector>
+
+#include <action_ir.hpp>
+
+namespace SWFRecomp
+{
+	enum StackSlotKind
+	{
+		SLOT_CONSTANT,  // A literal, in value
+		SLOT_LOCAL,  // The C local s_<index>
+		SLOT_REGISTER,  // regs[index], read when used
+		SLOT_STACK  // Already on top of the real stack, with a known type
+	};
+
+	// A number the generated code keeps in a C local (or as a literal)
+	// instead of writing it to the runtime's operand stack
+	struct StackSlot
+	{
+		StackSlotKind kind;
+		u8 type;  // ACTION_STACK_VALUE_F32 or ACTION_STACK_VALUE_F64
+		ActionPushValue value;
+		size_t index;
+	};
+
+	// The top of the operand stack within one basic block, for the values
+	// whose depth and type the recompiler knows. Pushed numbers stay in
+	// slots until an action consumes them; actions that can't use slots
+	// directly, labels and the end of the block write them to the real
+	// stack first (materialize).
+	class StackSlots
+	{
+	public:
+		StackSlots(bool enabled, bool registers, size_t& next_local);
+
+		// Keep a pushed value in a slot. Returns false if it has to go
+		// on the real stack.
+		bool push(const ActionPushValue& value);
+
+		// Emit an action using only slots. Returns false if the action
+		// needs the real stack.
+		bool emit(const ActionRecord& record, ostream& out_script);
+
+		// Note the type of the value a runtime call left on the stack
+		void pushResult(const ActionRecord& record);
+
+		// Push all slots to the real stack, bottom first
+		void materialize(ostream& out_script);
+
+	private:
+		bool enabled;
+		bool registers;  // Inside a DefineFunction2 body, with local registers
+		std::vector<StackSlot> slots;
+		size_t& next_local;
+
+		bool emitBinary(SWFActionType code, ostream& out_script);
+		bool emitBitwise(SWFActionType code, ostream& out_script);
+		bool emitIncrement(SWFActionType code, ostream& out_script);
+		bool emitIf(const ActionRecord& record, ostream& out_script);
+		bool emitStoreRegister(const ActionRecord& record, ostream& out_script);
+
+		void load(ostream& out_script);
+		void loadRegister(u8 register_num, ostream& out_script);
+		StackSlot declare(u8 type, ostream& out_script);
+		std::string expression(const StackSlot& slot);
+		std::string bits(const StackSlot& slot);
+	};
+
+	// The Push of a F32 or F64 literal
+	void emitNumberPush(const ActionPushValue& value, ostream& out_script);
+};
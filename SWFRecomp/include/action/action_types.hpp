@@ -0,0 +1,13 @@
+#pragma once
+
+#include <action_ir.hpp>
+
+namespace SWFRecomp
+{
+	// Infer which values are F32 or F64 at recompile time: literals,
+	// results of numeric actions, and (with registers, for DefineFunction2
+	// bodies) the local registers they are stored into, across the
+	// control-flow graph. Sets ActionRecord::result_type and
+	// ActionPushValue::known_type; nested bodies are inferred too.
+	void inferTypes(ActionList& actions, bool registers);
+};
@@ -0,0 +1,33 @@
+#pragma once
+
+#include <string>
+#include <vector>
+
+#include <common.h>
+#include <config.hpp>
+
+using std::string;
+
+namespace SWFRecomp
+{
+	// Command line options, the same for every movie in a batch
+	struct Options
+	{
+		bool constant_folding;
+		bool stack_slots;
+		bool dead_code_elimination;
+
+		Options() : constant_folding(true), stack_slots(true), dead_code_elimination(true) {}
+	};
+
+	// Set up context to recompile the movie config describes, with its
+	// paths relative to folder ("" for the working directory)
+	void configureContext(Context& context, const Config& config, const Options& options, const string& folder);
+
+	// Recompile each config file in inputs, and each config.toml found
+	// under the directories in inputs, on jobs worker threads in this
+	// process. Every movie gets its own Context and SWF, and its messages
+	// are only printed (whole) with verbose. Prints a status line with the
+	// time of each movie. Returns the number that failed.
+	size_t recompileBatch(const std::vector<string>& inputs, const Options& options, size_t jobs, bool verbose);
+};
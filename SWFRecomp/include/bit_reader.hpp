@@ -0,0 +1,136 @@
+#pragma once
+
+#include <common.h>
+
+namespace SWFRecomp
+{
+	// Reads the bit fields of SWF records (RECT, MATRIX, CXFORM, shape
+	// records), most significant bit first. Bits are loaded into a 64-bit
+	// buffer up to 8 bytes at a time, so each field is a shift and a mask.
+	// Never reads at or past end.
+	class BitReader
+	{
+	public:
+		// buffer must be at a byte boundary
+		BitReader(const char* buffer, const char* end);
+
+		u32 readUB(u32 nbits);
+		s32 readSB(u32 nbits);
+
+		// 16.16 fixed point
+		float readFB(u32 nbits);
+
+		bool readFlag();
+
+		// Skip the rest of the current byte, returning the position of
+		// the first byte not read. Byte-aligned data follows a bit record.
+		char* align();
+
+	private:
+		const u8* next;  // Next byte to load
+		const u8* end;
+		u64 bits;  // Loaded bits, the next one in bit 63; the rest are 0
+		u32 count;  // Number of loaded bits
+
+		void refill();
+	};
+
+	inline BitReader::BitReader(const char* buffer, const char* end) : next((const u8*) buffer),
+																	   end((const u8*) end),
+																	   bits(0),
+																	   count(0)
+	{
+
+	}
+
+	inline void BitReader::refill()
+	{
+		if (end - next >= 8)
+		{
+			// Load 8 bytes big-endian and keep the whole bytes that fit
+			u64 word = 0;
+
+			for (int i = 0; i < 8; ++i)
+			{
+				word = (word << 8) | next[i];
+			}
+
+			u32 bytes = (64 - count)/8;
+
+			bits |= word >> count;
+			count += 8*bytes;
+			next += bytes;
+
+			if (count < 64)
+			{
+				bits &= ~(~0ull >> count);
+			}
+
+			return;
+		}
+
+		while (count <= 56 && next < end)
+		{
+			bits |= (u64) *next << (56 - count);
+			count += 8;
+			next += 1;
+		}
+	}
+
+	inline u32 BitReader::readUB(u32 nbits)
+	{
+		if (nbits == 0)
+		{
+			return 0;
+		}
+
+		if (count < nbits)
+		{
+			refill();
+
+			if (count < nbits)
+			{
+				EXC("Bit field runs past the end of the SWF\n");
+			}
+		}
+
+		u32 value = (u32) (bits >> (64 - nbits));
+
+		bits <<= nbits;
+		count -= nbits;
+
+		return value;
+	}
+
+	inline s32 BitReader::readSB(u32 nbits)
+	{
+		if (nbits == 0)
+		{
+			return 0;
+		}
+
+		u32 shift = 32 - nbits;
+
+		return ((s32) (readUB(nbits) << shift)) >> shift;
+	}
+
+	inline float BitReader::readFB(u32 nbits)
+	{
+		return (float) (readSB(nbits)/65536.0);
+	}
+
+	inline bool BitReader::readFlag()
+	{
+		return readUB(1) != 0;
+	}
+
+	inline char* BitReader::align()
+	{
+		u32 partial = count%8;
+
+		bits <<= partial;
+		count -= partial;
+
+		return (char*) (next - count/8);
+	}
+};
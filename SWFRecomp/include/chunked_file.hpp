@@ -0,0 +1,45 @@
+#pragma once
+
+#include <string>
+
+#include <output_file.hpp>
+
+using std::string;
+
+namespace SWFRecomp
+{
+	// A generated C file split into parts name.c, name_1.c, name_2.c, ...
+	// of at most max_size bytes each (where units allow), so a large movie
+	// compiles in parallel. (Scripts are split by SWFAction instead, see
+	// ScriptSplit.) Every part starts with the same preamble.
+	// Units (a whole function, a declaration, a data table) are never
+	// split: a new part starts before a unit that would overflow the
+	// current one. A max_size of 0 writes a single file.
+	class ChunkedFile
+	{
+	public:
+		ChunkedFile();
+
+		void open(const string& folder, const string& name, const string& preamble, size_t max_size, OutputReport& report);
+
+		// Append one unit
+		void write(const string& unit);
+
+		void close();
+
+		size_t partCount() const;
+
+	private:
+		string folder;
+		string name;
+		string preamble;
+		size_t max_size;
+		OutputReport* report;
+
+		OutputFile out;
+		size_t part;
+		size_t size;
+
+		void openPart();
+	};
+};
@@ -14,6 +14,16 @@ namespace SWFRecomp
 		std::string output_tags_folder;
 		std::string output_scripts_folder;
 		
+		// [output] max_file_size: bytes per generated .c part, 0 for one file
+		size_t max_file_size;
+		
+		// [output] asset_pack: embed the draw data from a binary file
+		bool asset_pack;
+		
+		// [output] curve_tolerance: how far flattened curves may stray
+		// from the real ones, in twips, 0 for a fixed subdivision
+		double curve_tolerance;
+		
 		Config();
 		void parseFile(std::string path);
 		std::string_view parseStringView(std::string key);
@@ -1,9 +1,11 @@
 #pragma once
 
-#include <fstream>
+#include <cstdio>
+
+#include <chunked_file.hpp>
+#include <output_file.hpp>
 
 using std::string;
-using std::ofstream;
 
 namespace SWFRecomp
 {
@@ -13,18 +15,41 @@ namespace SWFRecomp
 		string output_tags_folder;
 		string output_scripts_folder;
 
-		ofstream tag_main;
-		ofstream constants;
-		ofstream constants_header;
-		ofstream out_script_header;
-		ofstream out_script_defs;
-		ofstream out_script_decls;
-		ofstream out_draws;
-		ofstream out_draws_header;
+		OutputFile tag_main;
+		OutputFile constants;
+		OutputFile constants_header;
+		OutputFile out_script_header;
+		ChunkedFile out_script_defs;
+		OutputFile out_script_decls;
+		ChunkedFile out_draws;
+		OutputFile out_draws_header;
+
+		// Progress messages. Batch recompilation gives each movie its own.
+		FILE* log;
+
+		// Which outputs were written, left alone or removed
+		OutputReport outputs;
+
+		// Size limit of each part of script_defs.c and draws.c, 0 for none
+		size_t max_file_size;
+
+		// Write the draw data to assets.bin instead of C arrays
+		bool asset_pack;
+
+		// Threads that triangulate shapes and decode JPEGs, 0 for one per core
+		size_t tag_threads;
+
+		// How far flattened curves may stray, in twips, 0 for a fixed subdivision
+		double curve_tolerance;
 
 		// Track if we're inside a DefineFunction2 (for local register handling)
 		bool inside_function2;
 
-		Context() : inside_function2(false) {}
+		// Optimization passes (disabled from the command line for differential testing)
+		bool constant_folding;
+		bool stack_slots;
+		bool dead_code_elimination;
+
+		Context() : log(stdout), max_file_size(0), asset_pack(false), tag_threads(0), curve_tolerance(0), inside_function2(false), constant_folding(true), stack_slots(true), dead_code_elimination(true) {}
 	};
 };
\ No newline at end of file
@@ -0,0 +1,65 @@
+#pragma once
+
+#include <string>
+#include <vector>
+
+#include <common.h>
+#include <context.hpp>
+
+using std::string;
+
+namespace SWFRecomp
+{
+	enum DataTableType
+	{
+		DATA_U8,
+		DATA_U32,
+		DATA_F32
+	};
+
+	// One of the draw data tables (shape_data, color_data, ...), kept as
+	// the little-endian bytes the runtime reads. It's written out either
+	// as a C array in draws.c or as a range of the asset pack.
+	class DataTable
+	{
+	public:
+		DataTable(const string& name, DataTableType type, size_t row_size);
+
+		void pushU8(u8 value);
+		void pushU32(u32 value);
+		void pushFloat(float value);
+
+		// Zero-fill up to rows rows
+		void padRows(size_t rows);
+
+		const string& name() const;
+		const string& bytes() const;
+
+		// Size of the C array, which has at least one row
+		size_t size() const;
+
+		// "u32 shape_data[6][4]"
+		string declaration() const;
+
+		// "u32 (*)[4]", the type of a pointer to the table
+		string pointerType() const;
+
+		// The rows of the C initializer
+		string initializer() const;
+
+	private:
+		string table_name;
+		DataTableType type;
+		size_t row_size;  // Elements per row, 1 for a flat array
+		string data;
+
+		string cType() const;
+		size_t elementSize() const;
+		size_t elementCount() const;
+		size_t rowCount() const;
+	};
+
+	// Write the tables to draws.c and draws.h, or to assets.bin when
+	// context.asset_pack is set
+	void writeDataTables(Context& context, const std::vector<const DataTable*>& tables);
+};
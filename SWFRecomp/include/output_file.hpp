@@ -0,0 +1,38 @@
+#pragma once
+
+#include <sstream>
+#include <string>
+#include <vector>
+
+using std::string;
+
+namespace SWFRecomp
+{
+	// What a recompilation did to its output files
+	struct OutputReport
+	{
+		std::vector<string> changed;  // New, or different from the file on disk
+		std::vector<string> unchanged;  // Same as the file on disk, not rewritten
+		std::vector<string> removed;  // Left over from an earlier recompilation
+	};
+	
+	// A generated file, buffered in memory. close() only writes it if the
+	// contents differ from the file on disk, so unchanged outputs keep
+	// their timestamps and incremental C builds skip them.
+	class OutputFile : public std::ostringstream
+	{
+	public:
+		OutputFile();
+		
+		void open(const string& path, OutputReport& report);
+		void close();
+		
+	private:
+		string path;
+		OutputReport* report;
+	};
+	
+	// Delete the .c and .h files in folder that this recompilation didn't
+	// write, e.g. parts of a split file that is smaller now
+	void removeStaleOutputs(const string& folder, OutputReport& report);
+};
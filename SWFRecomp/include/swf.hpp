@@ -1,5 +1,6 @@
 #pragma once
 
+#include <exception>
 #include <fstream>
 #include <sstream>
 #include <string>
@@ -7,8 +8,10 @@
 #include <vector>
 
 #include <common.h>
+#include <bit_reader.hpp>
 #include <tag.hpp>
 #include <action.hpp>
+#include <data_table.hpp>
 
 namespace SWFRecomp
 {
@@ -31,6 +34,14 @@ namespace SWFRecomp
 		s32 translate_y;
 	};
 	
+	// CXFORM, or CXFORMWITHALPHA with the alpha terms
+	// Terms are red, green, blue, alpha; multiply terms are 8.8 fixed point
+	struct CXFORM
+	{
+		s16 mult_terms[4];
+		s16 add_terms[4];
+	};
+	
 	struct Vertex
 	{
 		s32 x;
@@ -42,8 +53,6 @@ namespace SWFRecomp
 		Vertex verts[3];
 	};
 	
-	struct Node;
-	
 	struct Path
 	{
 		std::vector<Vertex> verts;
@@ -51,16 +60,15 @@ namespace SWFRecomp
 		u32 line_style_list;
 		u32 fill_styles[2];
 		u32 line_style;
-		bool self_closed;
-		bool backward;
-		Node* front;
-		Node* back;
 	};
 	
-	struct Node
+	// One segment of a path, as a border of one of its two fills,
+	// pointing so that fill is on its left
+	struct HalfEdge
 	{
-		Path* path;
-		std::vector<Node*> neighbors;
+		u32 from;  // Indices of the shape's distinct vertices
+		u32 to;
+		u32 fill;  // Index of the (fill style list, fill style) pair
 		bool used;
 	};
 	
@@ -117,6 +125,8 @@ namespace SWFRecomp
 		u8 g;
 		u8 b;
 		Gradient gradient;
+		MATRIX matrix;  // Gradient and bitmap fills
+		u16 bitmap_id;  // Character ID of a bitmap fill
 	};
 	
 	struct LineStyle
@@ -128,6 +138,60 @@ namespace SWFRecomp
 		u8 b;
 	};
 	
+	// A triangle of a shape, and the style it's drawn with
+	struct StyledTri
+	{
+		Tri tri;
+		u32 style_list;
+		u32 style;  // 1-based, in the fill or line style list
+		bool is_line;
+	};
+	
+	// A DefineShape or font glyph, parsed and triangulated. It only
+	// depends on its own tag, so it can be built on a worker thread;
+	// the styles get their table indices when the tag is interpreted.
+	struct ShapeMesh
+	{
+		u16 shape_id;
+		std::vector<std::vector<FillStyle>> fill_styles;  // The shape's list, then one per StateNewStyles
+		std::vector<std::vector<LineStyle>> line_styles;
+		std::vector<StyledTri> tris;
+		bool empty;  // No shape records to draw
+		size_t verts;  // In all paths, after flattening curves
+		size_t curves;
+		size_t curve_verts;  // Added by flattening curves
+	};
+	
+	// A DefineBits JPEG, decoded
+	struct JpegImage
+	{
+		int w;
+		int h;
+		std::vector<u8> rgb;
+	};
+	
+	// Where a tag is, from the first pass over the tags
+	struct TagIndexEntry
+	{
+		TagType code;
+		u32 length;
+		char* header;
+		char* data;
+	};
+	
+	// Work on an expensive tag (shape triangulation or JPEG decoding),
+	// done ahead of time on a worker thread and used when the tag is
+	// interpreted, in tag order
+	struct TagJob
+	{
+		const TagIndexEntry* tag;
+		const TagIndexEntry* jpeg_tables;
+		std::vector<ShapeMesh> shapes;  // The shape, or each glyph of a font
+		JpegImage image;
+		std::exception_ptr error;
+		bool done;
+	};
+	
 	class SWFHeader
 	{
 	public:
@@ -144,7 +208,7 @@ namespace SWFRecomp
 		SWFHeader();
 		SWFHeader(char* swf_buffer);
 		
-		void loadOtherData(char*& swf_buffer);
+		void loadOtherData(char*& swf_buffer, char* swf_end, FILE* log);
 	};
 	
 	class SWF
@@ -152,6 +216,7 @@ namespace SWFRecomp
 	public:
 		SWFHeader header;
 		char* swf_buffer;
+		char* swf_end;
 		char* cur_pos;
 		size_t num_finished_tags;
 		size_t next_frame_i;
@@ -161,20 +226,28 @@ namespace SWFRecomp
 		
 		std::stringstream tag_init;
 		
-		std::stringstream shape_data;
+		DataTable shape_data = DataTable("shape_data", DATA_U32, 4);
 		size_t current_tri;
-		std::stringstream transform_data;
+		DataTable transform_data = DataTable("transform_data", DATA_F32, 16);
 		size_t current_transform;
-		std::stringstream color_data;
+		DataTable color_data = DataTable("color_data", DATA_F32, 4);
 		size_t current_color;
-		std::stringstream uninv_mat_data;
+		DataTable uninv_mat_data = DataTable("uninv_mat_data", DATA_F32, 1);
 		size_t current_uninv;
-		std::stringstream gradient_data;
+		DataTable gradient_data = DataTable("gradient_data", DATA_U8, 4);
 		size_t current_gradient;
-		std::stringstream bitmap_data;
+		DataTable bitmap_data = DataTable("bitmap_data", DATA_U8, 1);
 		size_t current_bitmap_pixel;
 		size_t current_bitmap;
 		
+		double curve_tolerance;
+		
+		// Shape statistics, with what the fixed curve subdivision would give
+		size_t num_shapes;
+		size_t num_shape_verts;
+		size_t num_fixed_shape_verts;
+		size_t num_curves;
+		
 		u8* jpeg_tables;
 		size_t jpeg_tables_size;
 		
@@ -191,18 +264,27 @@ namespace SWFRecomp
 		SWF();
 		SWF(Context& context);
 		
-		void parseMatrix(MATRIX& matrix_out);
+		void parseMatrix(char*& pos, MATRIX& matrix_out);
+		void parseColorTransform(char*& pos, CXFORM& cxform_out, bool has_alpha);
+		void parseRect(char*& pos, RECT& rect_out);
+		void indexTags(std::vector<TagIndexEntry>& tags);
 		void parseAllTags(Context& context);
-		void interpretTag(Context& context, SWFTag& tag);
-		void recompileMatrix(MATRIX matrix, std::stringstream& out);
-		FillStyle* parseFillStyles(u16 fill_style_count);
-		LineStyle* parseLineStyles(u16 line_style_count);
-		void interpretShape(Context& context, SWFTag& shape_tag);
+		void runTagJob(TagJob& job);
+		void interpretTag(Context& context, SWFTag& tag, TagJob* job);
+		void recompileMatrix(MATRIX matrix, DataTable& out);
+		std::vector<FillStyle> parseFillStyles(char*& pos, u16 fill_style_count);
+		std::vector<LineStyle> parseLineStyles(char*& pos, u16 line_style_count);
+		void defineFillStyles(std::vector<FillStyle>& fill_styles);
+		void defineLineStyles(std::vector<LineStyle>& line_styles);
+		void buildFont(char* pos, std::vector<ShapeMesh>& glyphs);
+		void buildShape(char*& pos, bool is_font, ShapeMesh& mesh);
+		void defineShape(Context& context, ShapeMesh& mesh);
+		void decodeJpeg(TagJob& job);
 		bool isInShape(const Vertex& v, const Shape* shape);
+		u32 curveSegments(const Vertex& current, const Vertex& control, const Vertex& anchor);
 		void addCurvedEdge(Path* path, Vertex current, Vertex control, Vertex anchor, u32 passes);
 		void processShape(Shape& shape, u32* fill_styles);
-		void constructEdges(std::vector<Path>& paths, std::vector<Node>& nodes);
-		void johnson(std::vector<Node>& nodes, std::vector<Path>& path_stack, std::unordered_map<Node*, bool>& blocked, std::unordered_map<Node*, std::vector<Node*>>& blocked_map, std::vector<std::vector<Path>>& closed_paths);
+		void traceFaces(const std::vector<Path>& paths, std::vector<Shape>& shapes);
 		void fillShape(Shape& shape, std::vector<Tri>& tris);
 		void drawLines(const Path& path, u16 width, std::vector<Tri>& tris);
 	};
@@ -2,6 +2,13 @@
 # Usage: ./scripts/build_test.sh <test_name> [native|wasm] [--clean]
 # Example: ./scripts/build_test.sh trace_swf_4 wasm
 # Example: ./scripts/build_test.sh trace_swf_4 native --clean
+#
+# Caches (both content-addressed, safe to delete at any time):
+#   build/recomp_cache/   SWFRecomp output, keyed on test.swf, config.toml
+#                         and the SWFRecomp binary (SWFRECOMP_RECOMP_CACHE)
+#   build/runtime_cache/  precompiled native runtime objects and library,
+#                         keyed on the runtime sources, headers and flags
+#                         (SWFRECOMP_RUNTIME_CACHE)
 
 set -e
 
@@ -28,6 +35,19 @@ SWFRECOMP_ROOT="$(cd "${SCRIPT_DIR}/.." && pwd)"
 TEST_DIR="${SWFRECOMP_ROOT}/tests/${TEST_NAME}"
 BUILD_DIR="${TEST_DIR}/build/${TARGET}"
 
+# Hash stdin into a hex digest (sha256sum on Linux, shasum on macOS)
+hash_stdin() {
+    if command -v sha256sum &> /dev/null; then
+        sha256sum | cut -d' ' -f1
+    else
+        shasum -a 256 | cut -d' ' -f1
+    fi
+}
+
+# Temporary directories removed on exit (used to populate caches atomically)
+TMP_DIRS=()
+trap 'rm -rf "${TMP_DIRS[@]}"' EXIT
+
 # Validate inputs
 if [ -z "$TEST_NAME" ]; then
     echo "Error: Test name required"
@@ -89,18 +109,82 @@ if [ ! -f "${TEST_DIR}/test.swf" ]; then
     fi
 fi
 
+GENERATED_DIRS=(RecompiledScripts RecompiledTags)
+RECOMP_STAMP="${TEST_DIR}/build/recomp_hash"
+
 # Clean generated files if --clean flag is set
 if [ "$CLEAN_FLAG" = true ]; then
     echo "Cleaning generated files..."
     rm -rf "${TEST_DIR}/RecompiledScripts"
     rm -rf "${TEST_DIR}/RecompiledTags"
+    rm -f "${RECOMP_STAMP}"
 fi
 
-# Run SWFRecomp if needed
-if [ ! -d "${TEST_DIR}/RecompiledScripts" ]; then
-    echo "Running SWFRecomp..."
-    cd "${TEST_DIR}"
-    "${SWFRECOMP_ROOT}/build/SWFRecomp" config.toml
+# Recompile through a content-addressed cache. The key covers everything
+# that determines SWFRecomp's output: the SWF, its config, the recompiler
+# binary itself and its flags, so runtime-only changes never trigger a
+# recompile and a rebuilt recompiler always does.
+#
+# SWFRECOMP_FLAGS passes extra recompiler options, e.g.
+# SWFRECOMP_FLAGS=--no-constant-folding for differential testing.
+SWFRECOMP_EXE="${SWFRECOMP_ROOT}/build/SWFRecomp"
+read -r -a SWFRECOMP_ARGS <<< "${SWFRECOMP_FLAGS:-}"
+
+if [ ! -f "${SWFRECOMP_EXE}" ]; then
+    if [ ! -d "${TEST_DIR}/RecompiledScripts" ]; then
+        echo "Error: SWFRecomp not built: ${SWFRECOMP_EXE}"
+        exit 1
+    fi
+    echo "⚠️  Warning: SWFRecomp not built, using existing generated files"
+else
+    RECOMP_HASH=$( (
+        for file in "${TEST_DIR}/test.swf" "${TEST_DIR}/config.toml" "${SWFRECOMP_EXE}"; do
+            echo "$(basename "$file")"
+            cat "$file"
+        done
+        if [ ${#SWFRECOMP_ARGS[@]} -gt 0 ]; then
+            echo "flags: ${SWFRECOMP_ARGS[*]}"
+        fi
+        ) | hash_stdin
+    )
+    RECOMP_CACHE_DIR="${SWFRECOMP_RECOMP_CACHE:-${SWFRECOMP_ROOT}/build/recomp_cache}"
+    RECOMP_ENTRY="${RECOMP_CACHE_DIR}/${RECOMP_HASH:0:16}"
+
+    if [ -d "${TEST_DIR}/RecompiledScripts" ] && [ -f "${RECOMP_STAMP}" ] && \
+       [ "$(cat "${RECOMP_STAMP}")" = "${RECOMP_HASH}" ]; then
+        echo "Generated files are up to date"
+    elif [ -d "${RECOMP_ENTRY}" ]; then
+        echo "Restoring generated files from recompilation cache..."
+        for dir in "${GENERATED_DIRS[@]}"; do
+            rm -rf "${TEST_DIR:?}/${dir}"
+            if [ -d "${RECOMP_ENTRY}/${dir}" ]; then
+                cp -R "${RECOMP_ENTRY}/${dir}" "${TEST_DIR}/${dir}"
+            fi
+        done
+    else
+        # SWFRecomp only rewrites outputs whose contents changed and
+        # removes stale ones, so unchanged files keep their timestamps
+        echo "Running SWFRecomp..."
+        cd "${TEST_DIR}"
+        "${SWFRECOMP_EXE}" "${SWFRECOMP_ARGS[@]}" config.toml
+
+        # Store in a private directory and rename into place, so concurrent
+        # test builds never restore a partially written entry
+        mkdir -p "${RECOMP_CACHE_DIR}"
+        RECOMP_TMP=$(mktemp -d "${RECOMP_CACHE_DIR}/tmp.XXXXXX")
+        TMP_DIRS+=("${RECOMP_TMP}")
+        for dir in "${GENERATED_DIRS[@]}"; do
+            if [ -d "${TEST_DIR}/${dir}" ]; then
+                cp -R "${TEST_DIR}/${dir}" "${RECOMP_TMP}/${dir}"
+            fi
+        done
+        if [ ! -d "${RECOMP_ENTRY}" ]; then
+            mv "${RECOMP_TMP}" "${RECOMP_ENTRY}" 2>/dev/null || true
+        fi
+    fi
+
+    mkdir -p "$(dirname "${RECOMP_STAMP}")"
+    echo "${RECOMP_HASH}" > "${RECOMP_STAMP}"
 fi
 
 # Setup build directory
@@ -132,30 +216,110 @@ if [ "$TARGET" == "wasm" ]; then
     sed -i "s/{{TEST_NAME}}/${TEST_NAME}/g" "${BUILD_DIR}/index.html"
 fi
 
-# Copy SWFModernRuntime source files
-echo "Copying SWFModernRuntime sources..."
-cp "${SWFMODERN_SRC}/actionmodern/action.c" "${BUILD_DIR}/"
-cp "${SWFMODERN_SRC}/actionmodern/variables.c" "${BUILD_DIR}/"
-cp "${SWFMODERN_SRC}/actionmodern/object.c" "${BUILD_DIR}/"
-cp "${SWFMODERN_SRC}/utils.c" "${BUILD_DIR}/"
-
-# For both WASM and native builds, use NO_GRAPHICS mode (console-only)
+# SWFModernRuntime sources for NO_GRAPHICS mode (console-only)
 # Graphics mode requires SDL3 linking which needs proper build system setup
-echo "Using NO_GRAPHICS mode for ${TARGET} build..."
-cp "${SWFMODERN_SRC}/libswf/swf_core.c" "${BUILD_DIR}/"
-cp "${SWFMODERN_SRC}/libswf/tag_stubs.c" "${BUILD_DIR}/"
+RUNTIME_SOURCES=(
+    "${SWFMODERN_SRC}/actionmodern/action.c"
+    "${SWFMODERN_SRC}/actionmodern/variables.c"
+    "${SWFMODERN_SRC}/actionmodern/object.c"
+    "${SWFMODERN_SRC}/utils.c"
+    "${SWFMODERN_SRC}/libswf/swf_core.c"
+    "${SWFMODERN_SRC}/libswf/tag_stubs.c"
+    "${SWFMODERN_ROOT}/lib/c-hashmap/map.c"
+    "${SWFMODERN_ROOT}/lib/o1heap/o1heap.c"
+    "${SWFMODERN_SRC}/memory/heap.c"
+)
+
+INCLUDE_FLAGS=(
+    -I"${SWFMODERN_INC}"
+    -I"${SWFMODERN_INC}/actionmodern"
+    -I"${SWFMODERN_INC}/libswf"
+    -I"${SWFMODERN_INC}/memory"
+    -I"${SWFMODERN_ROOT}/lib/c-hashmap"
+)
+
+NATIVE_CFLAGS=(
+    -DNO_GRAPHICS
+    -D_POSIX_C_SOURCE=199309L
+    -Wall
+    -Wno-unused-variable
+    -std=c17
+)
 
-# Copy hashmap library (required for variable storage)
-cp "${SWFMODERN_ROOT}/lib/c-hashmap/map.c" "${BUILD_DIR}/"
+if [ "$TARGET" == "wasm" ]; then
+    # Copy SWFModernRuntime source files
+    echo "Copying SWFModernRuntime sources..."
+    cp "${RUNTIME_SOURCES[@]}" "${BUILD_DIR}/"
+    cp "${SWFMODERN_ROOT}/lib/o1heap/o1heap.h" "${BUILD_DIR}/"
+    mkdir -p "${BUILD_DIR}/memory"
+    cp "${SWFMODERN_INC}/memory/heap.h" "${BUILD_DIR}/memory/"
+else
+    # Native builds link against a precompiled runtime library shared by all
+    # tests. Each runtime source is compiled to an object keyed on a hash of
+    # that source, every runtime header, the compile flags and the compiler
+    # version; the library is keyed on the set of objects. Editing one
+    # runtime source therefore recompiles only that object.
+    RUNTIME_CACHE_DIR="${SWFRECOMP_RUNTIME_CACHE:-${SWFRECOMP_ROOT}/build/runtime_cache}"
+    RUNTIME_OBJECT_DIR="${RUNTIME_CACHE_DIR}/objects"
+    mkdir -p "${RUNTIME_OBJECT_DIR}"
+
+    RUNTIME_COMMON_HASH=$(
+        {
+            gcc --version | head -n 1
+            echo "${NATIVE_CFLAGS[@]}"
+            while IFS= read -r file; do
+                echo "${file#${SWFMODERN_ROOT}/}"
+                cat "$file"
+            done < <(
+                find "${SWFMODERN_INC}" "${SWFMODERN_ROOT}/lib/c-hashmap" "${SWFMODERN_ROOT}/lib/o1heap" -name '*.h' | LC_ALL=C sort
+            )
+        } | hash_stdin
+    )
+
+    RUNTIME_OBJECTS=()
+    for src in "${RUNTIME_SOURCES[@]}"; do
+        OBJECT_HASH=$(
+            {
+                echo "${RUNTIME_COMMON_HASH}"
+                echo "${src#${SWFMODERN_ROOT}/}"
+                cat "$src"
+            } | hash_stdin
+        )
+        RUNTIME_OBJECTS+=("${RUNTIME_OBJECT_DIR}/$(basename "$src" .c)-${OBJECT_HASH:0:16}.o")
+    done
 
-# Copy o1heap library (required for memory management)
-cp "${SWFMODERN_ROOT}/lib/o1heap/o1heap.c" "${BUILD_DIR}/"
-cp "${SWFMODERN_ROOT}/lib/o1heap/o1heap.h" "${BUILD_DIR}/"
+    RUNTIME_HASH=$(printf '%s\n' "${RUNTIME_OBJECTS[@]##*/}" | hash_stdin)
+    RUNTIME_LIB="${RUNTIME_CACHE_DIR}/libswfmodernruntime-${RUNTIME_HASH:0:16}.a"
+
+    if [ -f "${RUNTIME_LIB}" ]; then
+        echo "Using cached SWFModernRuntime: ${RUNTIME_LIB}"
+    else
+        echo "Building SWFModernRuntime cache: ${RUNTIME_LIB}"
+
+        # Build in a private directory and rename into place, so concurrent
+        # test builds never see a partially written object or library
+        RUNTIME_TMP=$(mktemp -d "${RUNTIME_CACHE_DIR}/tmp.XXXXXX")
+        TMP_DIRS+=("${RUNTIME_TMP}")
+
+        for i in "${!RUNTIME_SOURCES[@]}"; do
+            OBJECT="${RUNTIME_OBJECTS[$i]}"
+            if [ ! -f "${OBJECT}" ]; then
+                echo "Compiling $(basename "${RUNTIME_SOURCES[$i]}")..."
+                gcc \
+                    -c \
+                    "${RUNTIME_SOURCES[$i]}" \
+                    "${NATIVE_CFLAGS[@]}" \
+                    "${INCLUDE_FLAGS[@]}" \
+                    -I"${SWFMODERN_ROOT}/lib/o1heap" \
+                    -o "${RUNTIME_TMP}/$(basename "${OBJECT}")"
+                mv "${RUNTIME_TMP}/$(basename "${OBJECT}")" "${OBJECT}"
+            fi
+        done
 
-# Copy heap memory manager
-cp "${SWFMODERN_SRC}/memory/heap.c" "${BUILD_DIR}/"
-mkdir -p "${BUILD_DIR}/memory"
-cp "${SWFMODERN_INC}/memory/heap.h" "${BUILD_DIR}/memory/"
+        ar rcs "${RUNTIME_TMP}/libswfmodernruntime.a" "${RUNTIME_OBJECTS[@]}"
+        mv "${RUNTIME_TMP}/libswfmodernruntime.a" "${RUNTIME_LIB}"
+    fi
+fi
 
 # Copy generated files from SWFRecomp
 echo "Copying generated files..."
@@ -180,11 +344,7 @@ if [ "$TARGET" == "wasm" ]; then
         *.c \
         -DNO_GRAPHICS \
         -I. \
-        -I"${SWFMODERN_INC}" \
-        -I"${SWFMODERN_INC}/actionmodern" \
-        -I"${SWFMODERN_INC}/libswf" \
-        -I"${SWFMODERN_INC}/memory" \
-        -I"${SWFMODERN_ROOT}/lib/c-hashmap" \
+        "${INCLUDE_FLAGS[@]}" \
         -o "${TEST_NAME}.js" \
         -s WASM=1 \
         -s EXPORTED_FUNCTIONS='["_main","_runSWF"]' \
@@ -206,20 +366,15 @@ else
     echo "Building native with SWFModernRuntime..."
     cd "${BUILD_DIR}"
 
-    # Compile SWFModernRuntime from source in NO_GRAPHICS mode
+    # Compile only the generated code and link the cached runtime. With
+    # asset_pack = true, draws.c embeds assets.bin, found through -Wa,-I.
     gcc \
         *.c \
-        -DNO_GRAPHICS \
-        -D_POSIX_C_SOURCE=199309L \
+        "${NATIVE_CFLAGS[@]}" \
         -I. \
-        -I"${SWFMODERN_INC}" \
-        -I"${SWFMODERN_INC}/actionmodern" \
-        -I"${SWFMODERN_INC}/libswf" \
-        -I"${SWFMODERN_INC}/memory" \
-        -I"${SWFMODERN_ROOT}/lib/c-hashmap" \
-        -Wall \
-        -Wno-unused-variable \
-        -std=c17 \
+        -Wa,-I"${TEST_DIR}/RecompiledTags" \
+        "${INCLUDE_FLAGS[@]}" \
+        "${RUNTIME_LIB}" \
         -o "${TEST_NAME}" \
         -lm
 
@@ -1,3 +1,4 @@
+#include <algorithm>
 #include <cstring>
 #include <string>
 #include <sstream>
@@ -5,6 +6,10 @@
 #include <vector>
 
 #include <action.hpp>
+#include <action_ir.hpp>
+#include <action_opt.hpp>
+#include <action_slots.hpp>
+#include <action_types.hpp>
 
 #define VAL(type, x) *((type*) x)
 
@@ -14,126 +19,192 @@ using std::endl;
 
 namespace SWFRecomp
 {
-	SWFAction::SWFAction() : next_str_i(0)
+	SWFAction::SWFAction() : next_str_i(0), next_slot_i(0), func_counter(0), func2_counter(0), try_counter(0), needs_setjmp(false)
 	{
-		
+		split.actions = nullptr;
 	}
 	
-	void SWFAction::parseActions(Context& context, char*& action_buffer, ofstream& out_script)
+	void SWFAction::parseActions(Context& context, char*& action_buffer, const string& script_name, std::vector<string>& parts)
 	{
 		// Clear constant pool at script boundary (per SWF spec)
 		constant_pool.clear();
 
-		SWFActionType code = SWF_ACTION_CONSTANT_POOL;
-		u16 length;
+		ActionList actions;
+		action_buffer = actions.decode(action_buffer);
+
+		if (context.constant_folding)
+		{
+			std::vector<std::string> pool;
+			foldConstants(actions, pool);
+		}
+
+		if (context.dead_code_elimination)
+		{
+			eliminateDeadCode(actions);
+		}
+
+		if (context.stack_slots)
+		{
+			inferTypes(actions, false);
+		}
+
+		split.actions = (context.max_file_size != 0) ? &actions : nullptr;
+		split.name = script_name;
+		split.max_size = context.max_file_size;
+		split.allowed = findSplitPoints(actions);
+		split.offsets = {0};
 
-		char* action_buffer_start = action_buffer;
+		std::ostringstream out_script;
+		emitActions(context, actions, out_script);
 
-		std::vector<char*> labels;
+		split.actions = nullptr;
+		split.offsets.push_back(out_script.tellp());
 
-		// Parse action bytes once to mark labels
-		while (code != SWF_ACTION_END_OF_ACTIONS)
+		string script = out_script.str();
+		parts.clear();
+
+		for (size_t part = 0; part + 1 < split.offsets.size(); part++)
 		{
-			code = (SWFActionType) (u8) action_buffer[0];
-			action_buffer += 1;
-			length = 0;
-			
-			if ((code & 0b10000000) != 0)
+			parts.push_back(script.substr(split.offsets[part], split.offsets[part + 1] - split.offsets[part]));
+		}
+
+		// Generate MAX_STRING_ID constant for runtime initialization
+		context.out_script_defs.write("\n\n// Maximum string ID for variable array allocation\n"
+		                              "#define MAX_STRING_ID " + to_string(next_str_i) + "\n");
+		context.out_script_decls << endl
+		                         << "#define MAX_STRING_ID " << next_str_i << endl;
+	}
+
+	std::vector<bool> SWFAction::findSplitPoints(const ActionList& actions)
+	{
+		size_t count = actions.records.size();
+		std::vector<bool> allowed(count, false);
+
+		// Branches crossing the boundary before each record: a goto can't
+		// leave its function
+		std::vector<int> crossing(count + 1, 0);
+
+		for (size_t i = 0; i < count; i++)
+		{
+			const ActionRecord& record = actions.records[i];
+
+			if (record.removed)
 			{
-				length = VAL(u16, action_buffer);
-				action_buffer += 2;
+				continue;
 			}
-			
-			switch (code)
+
+			// Branches in Try and With bodies are emitted with this record
+			std::vector<size_t> target_indices = actions.findBodyTargets(record);
+
+			if (record.has_target)
 			{
-				case SWF_ACTION_JUMP:
-				case SWF_ACTION_IF:
+				target_indices.push_back(record.target_index);
+			}
+
+			for (size_t target_index : target_indices)
+			{
+				if (target_index == ACTION_NONE)
 				{
-					s16 offset = VAL(s16, action_buffer);
-					labels.push_back(action_buffer + length + ((s64) offset));
-					break;
+					// Target unknown
+					return allowed;
 				}
 
-				case SWF_ACTION_WAIT_FOR_FRAME:
-				{
-					// Skip past frame (u16) and skip_count (u8)
-					u16 frame = VAL(u16, action_buffer);
-					u8 skip_count = VAL(u8, action_buffer + 2);
+				size_t low = std::min(i, target_index);
+				size_t high = std::max(i, target_index);
 
-					// Calculate skip target by parsing ahead through skip_count actions
-					char* skip_ptr = action_buffer + length;
-					for (u8 i = 0; i < skip_count && *skip_ptr != SWF_ACTION_END_OF_ACTIONS; i++)
-					{
-						u8 next_code = *skip_ptr;
-						skip_ptr += 1;
+				crossing[low + 1] += 1;
+				crossing[high + 1] -= 1;
+			}
+		}
 
-						if ((next_code & 0b10000000) != 0)
-						{
-							u16 next_length = VAL(u16, skip_ptr);
-							skip_ptr += 2;
-							skip_ptr += next_length;
-						}
-					}
+		int open = 0;
 
-					// Add skip target as a label
-					labels.push_back(skip_ptr);
-					break;
-				}
+		for (size_t i = 0; i < count; i++)
+		{
+			open += crossing[i];
+			allowed[i] = (i > 0 && open == 0);
+		}
 
-			case SWF_ACTION_WAIT_FOR_FRAME2:
-			{
-				// Calculate skip target by parsing ahead skip_count actions
-				u8 skip_count = (u8) action_buffer[0];
+		return allowed;
+	}
 
-				// Parse ahead to find where we'd land after skipping
-				char* skip_ptr = action_buffer + length;
-				for (u8 i = 0; i < skip_count && skip_ptr < action_buffer_start + 65536; i++)
-				{
-					SWFActionType skip_code = (SWFActionType) (u8) skip_ptr[0];
-					skip_ptr += 1;
+	void SWFAction::leaveBlocks(const ActionRecord& record, ostream& out_script, const string& indent)
+	{
+		if (record.target_index != ACTION_NONE)
+		{
+			return;
+		}
 
-					u16 skip_length = 0;
-					if ((skip_code & 0b10000000) != 0)
-					{
-						skip_length = VAL(u16, skip_ptr);
-						skip_ptr += 2;
-					}
+		// A branch out of Try and With blocks skips their ends, so end
+		// each block it leaves, innermost first
+		for (size_t i = inline_blocks.size(); i-- > 0;)
+		{
+			const InlineBlock& block = inline_blocks[i];
 
-					skip_ptr += skip_length;
-				}
+			out_script << indent << (block.code == SWF_ACTION_TRY ? "actionTryEnd(stack, sp);" : "actionWithEnd(stack, sp);") << endl;
 
-				// Mark the skip target as a label
-				labels.push_back(skip_ptr);
+			if (block.actions->find(record.target) != ACTION_NONE)
+			{
 				break;
 			}
-			}
-			
-			action_buffer += length;
 		}
-		
-		action_buffer = action_buffer_start;
-		code = SWF_ACTION_CONSTANT_POOL;
-		
-		while (code != SWF_ACTION_END_OF_ACTIONS)
+	}
+
+	void SWFAction::emitActions(Context& context, const ActionList& actions, ostream& out_script)
+	{
+		StackSlots slots(context.stack_slots, context.inside_function2, next_slot_i);
+
+		for (const ActionRecord& record : actions.records)
 		{
-			for (const char* ptr : labels)
+			size_t i = &record - actions.records.data();
+
+			if (&actions == split.actions && split.allowed[i] &&
+				(size_t) out_script.tellp() - split.offsets.back() >= split.max_size)
 			{
-				if (action_buffer == ptr)
-				{
-					out_script << "label_" << to_string((s16) (ptr - action_buffer_start)) << ":" << endl;
-				}
+				// Continue in a new function, with the values on the real stack
+				slots.materialize(out_script);
+
+				string part_name = split.name + "_" + to_string(split.offsets.size());
+
+				out_script << "\t" << "// Continued in " << part_name << endl
+						   << "\t" << part_name << "(stack, sp);" << endl;
+
+				split.offsets.push_back(out_script.tellp());
+
+				context.out_script_decls << endl << "void " << part_name << "(char* stack, u32* sp);";
 			}
-			
-			code = (SWFActionType) (u8) action_buffer[0];
-			action_buffer += 1;
-			length = 0;
-			
-			if ((code & 0b10000000) != 0)
+
+			if (record.is_jump_target)
 			{
-				length = VAL(u16, action_buffer);
-				action_buffer += 2;
+				// Other paths arrive with their values on the real stack
+				slots.materialize(out_script);
+
+				out_script << "label_" << to_string((s16) record.offset) << ": ;" << endl;
 			}
-			
+
+			if (record.removed)
+			{
+				continue;
+			}
+
+			// Slots emit branches without ending the Try and With blocks
+			// they leave
+			bool leaves_block = record.has_target && record.target_index == ACTION_NONE;
+
+			if (!leaves_block && slots.emit(record, out_script))
+			{
+				continue;
+			}
+
+			if (record.code != SWF_ACTION_PUSH)
+			{
+				slots.materialize(out_script);
+			}
+
+			SWFActionType code = record.code;
+			u16 length = record.length;
+			char* action_buffer = record.data;
+
 			switch (code)
 			{
 				case SWF_ACTION_END_OF_ACTIONS:
@@ -919,22 +990,8 @@ namespace SWFRecomp
 					u16 frame = VAL(u16, action_buffer);
 					u8 skip_count = VAL(u8, action_buffer + 2);
 
-					// Calculate skip target (same logic as first pass)
-					char* skip_ptr = action_buffer + length;
-					for (u8 i = 0; i < skip_count && *skip_ptr != SWF_ACTION_END_OF_ACTIONS; i++)
-					{
-						u8 next_code = *skip_ptr;
-						skip_ptr += 1;
-
-						if ((next_code & 0b10000000) != 0)
-						{
-							u16 next_length = VAL(u16, skip_ptr);
-							skip_ptr += 2;
-							skip_ptr += next_length;
-						}
-					}
-
-					s16 skip_label = (s16)(skip_ptr - action_buffer_start);
+					// Skip target was resolved when decoding
+					s16 skip_label = (s16) record.target;
 
 					out_script << "\t" << "// WaitForFrame: frame=" << frame
 							   << ", skip=" << (int)skip_count << " actions" << endl
@@ -994,27 +1051,10 @@ namespace SWFRecomp
 				// Read skip count parameter
 				u8 skip_count = (u8) action_buffer[0];
 
-				// Calculate skip target by parsing ahead skip_count actions
-				char* skip_ptr = action_buffer + length;
-				for (u8 i = 0; i < skip_count && skip_ptr < action_buffer_start + 65536; i++)
-				{
-					SWFActionType skip_code = (SWFActionType) (u8) skip_ptr[0];
-					skip_ptr += 1;
-
-					u16 skip_length = 0;
-					if ((skip_code & 0b10000000) != 0)
-					{
-						skip_length = VAL(u16, skip_ptr);
-						skip_ptr += 2;
-					}
-
-					skip_ptr += skip_length;
-				}
-
 				out_script << "\t" << "// WaitForFrame2: skip=" << (int)skip_count << endl
 						   << "\t" << "if (!actionWaitForFrame2(stack, sp)) {" << endl
 						   << "\t\t" << "// Frame not loaded, skip next " << (int)skip_count << " action(s)" << endl
-						   << "\t\t" << "goto label_" << to_string((s16) (skip_ptr - action_buffer_start)) << ";" << endl
+						   << "\t\t" << "goto label_" << to_string((s16) record.target) << ";" << endl
 						   << "\t" << "}" << endl;
 
 				action_buffer += length;
@@ -1055,13 +1095,14 @@ namespace SWFRecomp
 				action_buffer += 2;
 
 				// Generate unique function ID
-				static int func2_counter = 0;
 				std::string func_id = std::string("func2_") + (name_len > 0 ? std::string(func_name) : "anonymous") + "_" + std::to_string(func2_counter++);
 
 			// Add function declaration to header
 			context.out_script_decls << endl << "ActionVar " << func_id << "(char* stack, u32* sp, ActionVar* args, u32 arg_count, ActionVar* registers, void* this_obj);" << endl;
-				// Generate function definition in out_script_defs
-				context.out_script_defs << endl << endl
+				// Generate the function definition, written to out_script_defs
+				// whole once nested functions and strings are declared
+				std::ostringstream out_function;
+				out_function << endl << endl
 					<< "// DefineFunction2: " << (name_len > 0 ? func_name : "(anonymous)") << endl
 					<< "ActionVar " << func_id << "(char* stack, u32* sp, ActionVar* args, u32 arg_count, ActionVar* registers, void* this_obj)" << endl
 					<< "{" << endl;
@@ -1069,8 +1110,8 @@ namespace SWFRecomp
 				// Initialize local registers
 				if (register_count > 0)
 				{
-					context.out_script_defs << "\tActionVar regs[" << (int)register_count << "];" << endl;
-					context.out_script_defs << "\tmemset(regs, 0, sizeof(regs));" << endl;
+					out_function << "\tActionVar regs[" << (int)register_count << "];" << endl;
+					out_function << "\tmemset(regs, 0, sizeof(regs));" << endl;
 				}
 
 				// Parse flags
@@ -1089,59 +1130,59 @@ namespace SWFRecomp
 
 				if (preload_this && !suppress_this)
 				{
-					context.out_script_defs << "\t// Preload 'this' into register " << next_reg << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_OBJECT;" << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].data.numeric_value = (u64)this_obj;" << endl;
+					out_function << "\t// Preload 'this' into register " << next_reg << endl;
+					out_function << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_OBJECT;" << endl;
+					out_function << "\tregs[" << next_reg << "].data.numeric_value = (u64)this_obj;" << endl;
 					next_reg++;
 				}
 
 				if (preload_arguments && !suppress_arguments)
 				{
-					context.out_script_defs << "\t// Preload 'arguments' into register " << next_reg << endl;
-					context.out_script_defs << "\t// Create arguments array object" << endl;
-					context.out_script_defs << "\tASArray* arguments_array = allocArray(arg_count);" << endl;
-					context.out_script_defs << "\tfor (u32 i = 0; i < arg_count; i++) {" << endl;
-					context.out_script_defs << "\t\tsetArrayElement(arguments_array, i, &args[i]);" << endl;
-					context.out_script_defs << "\t}" << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_ARRAY;" << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].data.numeric_value = (u64)arguments_array;" << endl;
+					out_function << "\t// Preload 'arguments' into register " << next_reg << endl;
+					out_function << "\t// Create arguments array object" << endl;
+					out_function << "\tASArray* arguments_array = allocArray(arg_count);" << endl;
+					out_function << "\tfor (u32 i = 0; i < arg_count; i++) {" << endl;
+					out_function << "\t\tsetArrayElement(arguments_array, i, &args[i]);" << endl;
+					out_function << "\t}" << endl;
+					out_function << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_ARRAY;" << endl;
+					out_function << "\tregs[" << next_reg << "].data.numeric_value = (u64)arguments_array;" << endl;
 					next_reg++;
 				}
 
 				if (preload_super && !suppress_super)
 				{
-					context.out_script_defs << "\t// Preload 'super' into register " << next_reg << endl;
-					context.out_script_defs << "\t// TODO: Create super reference (requires prototype chain support)" << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_UNDEFINED;" << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].data.numeric_value = 0;" << endl;
+					out_function << "\t// Preload 'super' into register " << next_reg << endl;
+					out_function << "\t// TODO: Create super reference (requires prototype chain support)" << endl;
+					out_function << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_UNDEFINED;" << endl;
+					out_function << "\tregs[" << next_reg << "].data.numeric_value = 0;" << endl;
 					next_reg++;
 				}
 
 				if (preload_root)
 				{
-					context.out_script_defs << "\t// Preload '_root' into register " << next_reg << endl;
-					context.out_script_defs << "\textern MovieClip root_movieclip;" << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_MOVIECLIP;" << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].data.numeric_value = (u64)&root_movieclip;" << endl;
+					out_function << "\t// Preload '_root' into register " << next_reg << endl;
+					out_function << "\textern MovieClip root_movieclip;" << endl;
+					out_function << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_MOVIECLIP;" << endl;
+					out_function << "\tregs[" << next_reg << "].data.numeric_value = (u64)&root_movieclip;" << endl;
 					next_reg++;
 				}
 
 				if (preload_parent)
 				{
-					context.out_script_defs << "\t// Preload '_parent' into register " << next_reg << endl;
-					context.out_script_defs << "\t// For now, _parent points to _root (no clip hierarchy in NO_GRAPHICS mode)" << endl;
-					context.out_script_defs << "\textern MovieClip root_movieclip;" << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_MOVIECLIP;" << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].data.numeric_value = (u64)&root_movieclip;" << endl;
+					out_function << "\t// Preload '_parent' into register " << next_reg << endl;
+					out_function << "\t// For now, _parent points to _root (no clip hierarchy in NO_GRAPHICS mode)" << endl;
+					out_function << "\textern MovieClip root_movieclip;" << endl;
+					out_function << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_MOVIECLIP;" << endl;
+					out_function << "\tregs[" << next_reg << "].data.numeric_value = (u64)&root_movieclip;" << endl;
 					next_reg++;
 				}
 
 				if (preload_global)
 				{
-					context.out_script_defs << "\t// Preload '_global' into register " << next_reg << endl;
-					context.out_script_defs << "\textern ASObject* global_object;" << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_OBJECT;" << endl;
-					context.out_script_defs << "\tregs[" << next_reg << "].data.numeric_value = (u64)global_object;" << endl;
+					out_function << "\t// Preload '_global' into register " << next_reg << endl;
+					out_function << "\textern ASObject* global_object;" << endl;
+					out_function << "\tregs[" << next_reg << "].type = ACTION_STACK_VALUE_OBJECT;" << endl;
+					out_function << "\tregs[" << next_reg << "].data.numeric_value = (u64)global_object;" << endl;
 					next_reg++;
 				}
 
@@ -1151,59 +1192,50 @@ namespace SWFRecomp
 					if (params[i].first == 0)
 					{
 						// Variable parameter
-						context.out_script_defs << "\tif (" << i << " < arg_count) {" << endl;
-						context.out_script_defs << "\t\tsetVariableByName(\"" << params[i].second << "\", &args[" << i << "]);" << endl;
-						context.out_script_defs << "\t}" << endl;
+						out_function << "\tif (" << i << " < arg_count) {" << endl;
+						out_function << "\t\tsetVariableByName(\"" << params[i].second << "\", &args[" << i << "]);" << endl;
+						out_function << "\t}" << endl;
 					}
 					else
 					{
 						// Register parameter
-						context.out_script_defs << "\tif (" << i << " < arg_count) {" << endl;
-						context.out_script_defs << "\t\tregs[" << (int)params[i].first << "] = args[" << i << "];" << endl;
-						context.out_script_defs << "\t}" << endl;
+						out_function << "\tif (" << i << " < arg_count) {" << endl;
+						out_function << "\t\tregs[" << (int)params[i].first << "] = args[" << i << "];" << endl;
+						out_function << "\t}" << endl;
 					}
 				}
 
-				// Parse function body recursively
-				context.out_script_defs << endl << "\t// Function body (" << code_size << " bytes)" << endl;
-
-				// Save the function body boundaries
-				char* func_body_start = action_buffer;
-				char* func_body_end = action_buffer + code_size;
-
-				// Create a temporary buffer for the function body that ends with END_OF_ACTIONS
-				// This ensures parseActions stops at the right place
-				char* temp_buffer = (char*)malloc(code_size + 1);
-				memcpy(temp_buffer, func_body_start, code_size);
-				temp_buffer[code_size] = 0x00; // Add END_OF_ACTIONS marker
+				// Emit the function body (decoded with this record)
+				out_function << endl << "\t// Function body (" << code_size << " bytes)" << endl;
 
 				// Set flag to indicate we're inside a DefineFunction2 (for local register handling)
 				bool prev_inside_function2 = context.inside_function2;
 				context.inside_function2 = true;
 
-				char* temp_ptr = temp_buffer;
-				parseActions(context, temp_ptr, context.out_script_defs);
-				free(temp_buffer);
+				// The body is its own C function, outside any Try or With block
+				std::vector<InlineBlock> prev_inline_blocks;
+				prev_inline_blocks.swap(inline_blocks);
+
+				emitActions(context, actions.bodies[record.first_body], out_function);
 
 				// Restore previous state
 				context.inside_function2 = prev_inside_function2;
+				inline_blocks.swap(prev_inline_blocks);
 
-				// Advance the actual buffer past the function body
-				action_buffer = func_body_end;
+				out_function << endl << "\t// Return undefined if no explicit return" << endl;
+				out_function << "\tActionVar ret;" << endl;
+				out_function << "\tret.type = ACTION_STACK_VALUE_UNDEFINED;" << endl;
+				out_function << "\tret.data.numeric_value = 0;" << endl;
+				out_function << "\treturn ret;" << endl;
+				out_function << "}" << endl;
 
-				context.out_script_defs << endl << "\t// Return undefined if no explicit return" << endl;
-				context.out_script_defs << "\tActionVar ret;" << endl;
-				context.out_script_defs << "\tret.type = ACTION_STACK_VALUE_UNDEFINED;" << endl;
-				context.out_script_defs << "\tret.data.numeric_value = 0;" << endl;
-				context.out_script_defs << "\treturn ret;" << endl;
-				context.out_script_defs << "}" << endl;
+				context.out_script_defs.write(out_function.str());
 
 				// Generate runtime call to register function
 				out_script << "\t// DefineFunction2: " << (name_len > 0 ? func_name : "(anonymous)") << endl;
 				out_script << "\tactionDefineFunction2(stack, sp, \"" << (name_len > 0 ? func_name : "") << "\", "
 						   << func_id << ", " << num_params << ", " << (int)register_count << ", " << flags << ");" << endl;
 
-				// action_buffer has already been advanced by parseActions
 				break;
 			}
 
@@ -1242,30 +1274,23 @@ namespace SWFRecomp
 					}
 				}
 
-				// Store positions for each block
-				char* try_body = action_buffer;
-				char* catch_body = try_body + try_size;
-				char* finally_body = catch_body + catch_size;
-				char* after_try = finally_body + finally_size;
+				// The try, catch and finally blocks were decoded with this record
+				const ActionList& try_body = actions.bodies[record.first_body];
+				const ActionList& catch_body = actions.bodies[record.first_body + 1];
+				const ActionList& finally_body = actions.bodies[record.first_body + 2];
 
 				// Generate try-catch-finally structure
 				out_script << "\t" << "// Try-Catch-Finally" << endl;
 				out_script << "\t" << "actionTryBegin(stack, sp);" << endl;
 				out_script << "\t" << "if (ACTION_TRY_SETJMP(stack, sp) == 0) {" << endl;
 
+				inline_blocks.push_back({&actions, SWF_ACTION_TRY});
+
 				// Translate try block
 				out_script << "\t\t" << "// Try block" << endl;
 				if (try_size > 0)
 				{
-					char* temp_buffer = (char*)malloc(try_size + 1);
-					memcpy(temp_buffer, try_body, try_size);
-					temp_buffer[try_size] = 0x00; // Add END_OF_ACTIONS marker
-					char* temp_ptr = temp_buffer;
-
-					// Temporarily increase indentation for nested block
-					std::string indent_backup = "\t";
-					parseActions(context, temp_ptr, out_script);
-					free(temp_buffer);
+					emitActions(context, try_body, out_script);
 				}
 
 				if (has_catch)
@@ -1285,12 +1310,7 @@ namespace SWFRecomp
 					// Translate catch block
 					if (catch_size > 0)
 					{
-						char* temp_buffer = (char*)malloc(catch_size + 1);
-						memcpy(temp_buffer, catch_body, catch_size);
-						temp_buffer[catch_size] = 0x00; // Add END_OF_ACTIONS marker
-						char* temp_ptr = temp_buffer;
-						parseActions(context, temp_ptr, out_script);
-						free(temp_buffer);
+						emitActions(context, catch_body, out_script);
 					}
 				}
 
@@ -1303,19 +1323,13 @@ namespace SWFRecomp
 					// Translate finally block
 					if (finally_size > 0)
 					{
-						char* temp_buffer = (char*)malloc(finally_size + 1);
-						memcpy(temp_buffer, finally_body, finally_size);
-						temp_buffer[finally_size] = 0x00; // Add END_OF_ACTIONS marker
-						char* temp_ptr = temp_buffer;
-						parseActions(context, temp_ptr, out_script);
-						free(temp_buffer);
+						emitActions(context, finally_body, out_script);
 					}
 				}
 
-				out_script << "\t" << "actionTryEnd(stack, sp);" << endl;
+				inline_blocks.pop_back();
 
-				// Advance action_buffer past all try-catch-finally blocks
-				action_buffer = after_try;
+				out_script << "\t" << "actionTryEnd(stack, sp);" << endl;
 
 				break;
 			}
@@ -1325,214 +1339,164 @@ namespace SWFRecomp
 					// Read block size from bytecode
 					u16 block_size = VAL(u16, action_buffer);
 
-					// Calculate where the WITH block ends
-					// block_end = current position + 2 (block_size field) + block_size (actions)
-					// But we need to account for the fact that 'length' already includes everything
-					// So block_end should just be: action_buffer + length
-					char* block_end = action_buffer + length;
-
-					// Now advance past the block_size field to the start of the actions
-					action_buffer += 2;
-
 					// Emit actionWithStart to push object onto scope chain
 					out_script << "\t" << "// WITH block (size=" << block_size << ")" << endl;
 					out_script << "\t" << "actionWithStart(stack, sp);" << endl;
 					out_script << "\t" << "{" << endl; // C scope for clarity
 
-					// Copy the WITH block content and add END marker for parseActions
-					// This is necessary because parseActions parses until it hits END (0x00)
-					char* temp_buffer = (char*) malloc(block_size + 1);
-					memcpy(temp_buffer, action_buffer, block_size);
-					temp_buffer[block_size] = 0x00; // Add END_OF_ACTIONS marker
-
-					char* temp_ptr = temp_buffer;
-					parseActions(context, temp_ptr, out_script);
-					free(temp_buffer);
+					// The block's actions were decoded with this record
+					inline_blocks.push_back({&actions, SWF_ACTION_WITH});
+					emitActions(context, actions.bodies[record.first_body], out_script);
+					inline_blocks.pop_back();
 
 					// Emit actionWithEnd to pop object from scope chain
 					out_script << "\t" << "}" << endl;
 					out_script << "\t" << "actionWithEnd(stack, sp);" << endl;
 
-					// Move action_buffer to the end of the block
-					action_buffer = block_end;
-
 					break;
 				}
 
 				case SWF_ACTION_PUSH:
 				{
-					u64 push_value;
-					size_t push_length = 0;
-					
-					while (push_length < length)
+					for (const ActionPushValue& value : record.push_values)
 					{
-						ActionStackValueType push_type = (ActionStackValueType) action_buffer[push_length];
-						push_length += 1;
-						
+						if (slots.push(value))
+						{
+							continue;
+						}
+
+						slots.materialize(out_script);
+
+						if (value.type == ACTION_STACK_VALUE_F32 || value.type == ACTION_STACK_VALUE_F64)
+						{
+							emitNumberPush(value, out_script);
+							continue;
+						}
+
 						out_script << "\t" << "// Push ";
 						
-						switch (push_type)
+						switch (value.type)
 						{
 							case ACTION_STACK_VALUE_STRING:
 							{
-								out_script << "(String)" << endl;
-
-								push_value = (u64) &action_buffer[push_length];
-								declareString(context, (char*) push_value);
-								size_t push_str_len = strlen((char*) push_value);
-								push_length += push_str_len + 1;
-
+								declareString(context, (char*) value.str.c_str());
+								
 								// Get the actual string ID (handles deduplication)
-								size_t str_id = getStringId((char*) push_value);
-
+								size_t str_id = getStringId(value.str.c_str());
+								
+								if (value.folded)
+								{
+									// Computed strings carry no ID, like the runtime's results
+									out_script << "(String, folded)" << endl;
+									out_script << "\t" << "PUSH_STR(str_" << to_string(str_id) << ", "
+											   << value.str.size() << ");" << endl;
+									
+									break;
+								}
+								
+								out_script << "(String)" << endl;
 								out_script << "\t" << "PUSH_STR_ID(str_" << to_string(str_id) << ", "
-								           << push_str_len << ", " << str_id << ");" << endl;
-
+										   << value.str.size() << ", " << str_id << ");" << endl;
+								
 								break;
 							}
 							
-							case ACTION_STACK_VALUE_F32:
+							case ACTION_STACK_VALUE_REGISTER:
 							{
-								out_script << "(float)" << endl;
-								
-								push_value = (u64) VAL(u32, &action_buffer[push_length]);
-								push_length += 4;
+								u8 register_num = (u8) value.value;
 								
-								char hex_float[11];
-								snprintf(hex_float, 11, "0x%08X", (u32) push_value);
+								out_script << "(Register " << (int)register_num << ")" << endl;
 								
-								out_script << "\t" << "PUSH(ACTION_STACK_VALUE_F32, " << hex_float << ");" << endl;
+								if (context.inside_function2)
+								{
+									// Inside DefineFunction2: use local registers array
+									out_script << "\t" << "pushVar(stack, sp, &regs[" << (int)register_num << "]);" << endl;
+								}
+								else
+								{
+									// Outside functions: use global registers
+									out_script << "\t" << "actionPushRegister(stack, sp, " << (int)register_num << ");" << endl;
+								}
 								
 								break;
 							}
 							
-
-						case ACTION_STACK_VALUE_REGISTER:
-						{
-							u8 register_num = (u8) action_buffer[push_length];
-							push_length += 1;
-
-							out_script << "(Register " << (int)register_num << ")" << endl;
-
-							if (context.inside_function2)
+							case ACTION_STACK_VALUE_NULL:
 							{
-								// Inside DefineFunction2: use local registers array
-								out_script << "\t" << "pushVar(stack, sp, &regs[" << (int)register_num << "]);" << endl;
+								out_script << "(null)" << endl;
+								out_script << "\t" << "PUSH(ACTION_STACK_VALUE_NULL, 0);" << endl;
+								
+								break;
 							}
-							else
+							
+							case ACTION_STACK_VALUE_UNDEFINED:
 							{
-								// Outside functions: use global registers
-								out_script << "\t" << "actionPushRegister(stack, sp, " << (int)register_num << ");" << endl;
+								out_script << "(undefined)" << endl;
+								out_script << "\t" << "PUSH(ACTION_STACK_VALUE_UNDEFINED, 0);" << endl;
+								
+								break;
 							}
-
-							break;
-						}
-
-						case ACTION_STACK_VALUE_NULL:
-						{
-							out_script << "(null)" << endl;
-							out_script << "\t" << "PUSH(ACTION_STACK_VALUE_NULL, 0);" << endl;
-
-							break;
-						}
-
-						case ACTION_STACK_VALUE_UNDEFINED:
-						{
-							out_script << "(undefined)" << endl;
-							out_script << "\t" << "PUSH(ACTION_STACK_VALUE_UNDEFINED, 0);" << endl;
-
-							break;
-						}
-
-						case ACTION_STACK_VALUE_BOOLEAN:
-						{
-							u8 bool_value = (u8) action_buffer[push_length];
-							push_length += 1;
-
-							out_script << "(boolean: " << (bool_value ? "true" : "false") << ")" << endl;
-							out_script << "\t" << "PUSH(ACTION_STACK_VALUE_BOOLEAN, " << (int)bool_value << ");" << endl;
-
-							break;
-						}
-
-						case 8:  // Constant pool index (8-bit)
-						{
-							u8 pool_index = (u8) action_buffer[push_length];
-							push_length += 1;
-
-							if (pool_index >= constant_pool.size())
+							
+							case ACTION_STACK_VALUE_BOOLEAN:
 							{
-								fprintf(stderr, "Constant pool index %d out of range (pool size: %zu)\n",
-									pool_index, constant_pool.size());
-								throw std::exception();
+								u8 bool_value = (u8) value.value;
+								
+								out_script << "(boolean: " << (bool_value ? "true" : "false") << ")" << endl;
+								out_script << "\t" << "PUSH(ACTION_STACK_VALUE_BOOLEAN, " << (int)bool_value << ");" << endl;
+								
+								break;
 							}
-
-							size_t str_id = constant_pool[pool_index];
-
-							out_script << "(ConstantPool8[" << (int)pool_index << "])" << endl;
-							out_script << "\t" << "PUSH_STR_ID(str_" << to_string(str_id) << ", "
-									   << "strlen(str_" << to_string(str_id) << "), " << str_id << ");" << endl;
-
-							break;
-						}
-
-						case 9:  // Constant pool index (16-bit)
-						{
-							u16 pool_index = VAL(u16, &action_buffer[push_length]);
-							push_length += 2;
-
-							if (pool_index >= constant_pool.size())
+							
+							case ACTION_PUSH_CONSTANT8:
+							case ACTION_PUSH_CONSTANT16:
 							{
-								fprintf(stderr, "Constant pool index %d out of range (pool size: %zu)\n",
-									pool_index, constant_pool.size());
-								throw std::exception();
+								size_t pool_index = (size_t) value.value;
+								
+								if (pool_index >= constant_pool.size())
+								{
+									fprintf(stderr, "Constant pool index %zu out of range (pool size: %zu)\n",
+										pool_index, constant_pool.size());
+									throw std::exception();
+								}
+								
+								size_t str_id = constant_pool[pool_index];
+								
+								out_script << (value.type == ACTION_PUSH_CONSTANT8 ? "(ConstantPool8[" : "(ConstantPool16[")
+										   << pool_index << "])" << endl;
+								out_script << "\t" << "PUSH_STR_ID(str_" << to_string(str_id) << ", "
+										   << "strlen(str_" << to_string(str_id) << "), " << str_id << ");" << endl;
+								
+								break;
 							}
-
-							size_t str_id = constant_pool[pool_index];
-
-							out_script << "(ConstantPool16[" << (int)pool_index << "])" << endl;
-							out_script << "\t" << "PUSH_STR_ID(str_" << to_string(str_id) << ", "
-									   << "strlen(str_" << to_string(str_id) << "), " << str_id << ");" << endl;
-
-							break;
-						}
-
+							
 							default:
 							{
-								EXC_ARG("Undefined push type: %d\n", push_type);
+								EXC_ARG("Undefined push type: %d\n", value.type);
 							}
 						}
 					}
 					
-					action_buffer += push_length;
-					
 					break;
 				}
 				
 				case SWF_ACTION_JUMP:
 				{
-					s16 offset = VAL(s16, action_buffer);
-					
-					out_script << "\t" << "// Jump" << endl
-							   << "\t" << "goto label_" << to_string((s16) (action_buffer + length - action_buffer_start + offset)) << ";" << endl;
-					
-					action_buffer += length;
+					out_script << "\t" << "// Jump" << endl;
+					leaveBlocks(record, out_script, "\t");
+					out_script << "\t" << "goto label_" << to_string((s16) record.target) << ";" << endl;
 					
 					break;
 				}
 				
 				case SWF_ACTION_IF:
 				{
-					s16 offset = VAL(s16, action_buffer);
-
 					out_script << "\t" << "// If" << endl
 							   << "\t" << "if (evaluateCondition(stack, sp))" << endl
-							   << "\t" << "{" << endl
-							   << "\t" << "\t" << "goto label_" << to_string((s16) (action_buffer + length - action_buffer_start + offset)) << ";" << endl
+							   << "\t" << "{" << endl;
+					leaveBlocks(record, out_script, "\t\t");
+					out_script << "\t" << "\t" << "goto label_" << to_string((s16) record.target) << ";" << endl
 							   << "\t" << "}" << endl;
 
-					action_buffer += length;
-
 					break;
 				}
 
@@ -1617,14 +1581,15 @@ namespace SWFRecomp
 				action_buffer += 2;
 
 				// Generate unique function ID
-				static int func_counter = 0;
 				std::string func_id = std::string("func_") + (name_len > 0 ? std::string(func_name) : "anonymous") + "_" + std::to_string(func_counter++);
 
 				// Add function declaration to header
 				context.out_script_decls << endl << "void " << func_id << "(char* stack, u32* sp);" << endl;
 
-				// Generate function definition
-				context.out_script_defs << endl << endl
+				// Generate function definition, written to out_script_defs
+				// whole once nested functions and strings are declared
+				std::ostringstream out_function;
+				out_function << endl << endl
 					<< "// DefineFunction: " << (name_len > 0 ? func_name : "(anonymous)") << endl
 					<< "void " << func_id << "(char* stack, u32* sp)" << endl
 					<< "{" << endl;
@@ -1632,27 +1597,23 @@ namespace SWFRecomp
 				// Bind parameters (simple DefineFunction uses variables, not registers)
 				for (size_t i = 0; i < params.size(); i++)
 				{
-					context.out_script_defs << "\t// TODO: Bind parameter '" << params[i] << "' from arguments" << endl;
+					out_function << "\t// TODO: Bind parameter '" << params[i] << "' from arguments" << endl;
 				}
 
-				// Parse function body recursively
-				context.out_script_defs << endl << "\t// Function body (" << code_size << " bytes)" << endl;
+				// Emit the function body (decoded with this record)
+				out_function << endl << "\t// Function body (" << code_size << " bytes)" << endl;
 
-				char* func_body_start = action_buffer;
-				char* func_body_end = action_buffer + code_size;
+				// The body is its own C function, outside any Try or With block
+				std::vector<InlineBlock> prev_inline_blocks;
+				prev_inline_blocks.swap(inline_blocks);
 
-				// Create temporary buffer with END_OF_ACTIONS marker
-				char* temp_buffer = (char*)malloc(code_size + 1);
-				memcpy(temp_buffer, func_body_start, code_size);
-				temp_buffer[code_size] = 0x00;
+				emitActions(context, actions.bodies[record.first_body], out_function);
 
-				char* temp_ptr = temp_buffer;
-				parseActions(context, temp_ptr, context.out_script_defs);
-				free(temp_buffer);
+				inline_blocks.swap(prev_inline_blocks);
 
-				action_buffer = func_body_end;
+				out_function << "}" << endl;
 
-				context.out_script_defs << "}" << endl;
+				context.out_script_defs.write(out_function.str());
 
 				// Generate runtime call to register function
 				out_script << "\t// DefineFunction: " << (name_len > 0 ? func_name : "(anonymous)") << endl;
@@ -1685,22 +1646,17 @@ namespace SWFRecomp
 					break;
 				}
 			}
-		}
 
-		// Generate MAX_STRING_ID constant for runtime initialization
-		context.out_script_defs << endl << endl
-		                        << "// Maximum string ID for variable array allocation" << endl
-		                        << "#define MAX_STRING_ID " << next_str_i << endl;
-		context.out_script_decls << endl
-		                         << "#define MAX_STRING_ID " << next_str_i << endl;
+			slots.pushResult(record);
+		}
 	}
 
 	void SWFAction::declareVariable(Context& context, char* var_name)
 	{
-		context.out_script_defs << endl << "#ifndef DEF_VAR_" << var_name << endl
-								<< "#define DEF_VAR_" << var_name << endl
-								<< "var " << var_name << ";" << endl
-								<< "#endif";
+		context.out_script_defs.write(string("\n#ifndef DEF_VAR_") + var_name + "\n"
+									  "#define DEF_VAR_" + var_name + "\n"
+									  "var " + var_name + ";\n"
+									  "#endif");
 		
 		context.out_script_decls << endl << "extern var " << var_name << ";";
 	}
@@ -1717,14 +1673,14 @@ namespace SWFRecomp
 
 		// New string - assign ID and declare
 		string_to_id[str] = next_str_i;
-		context.out_script_defs << endl << "char* str_" << next_str_i << " = \"" << str << "\";";
+		context.out_script_defs.write("\nchar* str_" + to_string(next_str_i) + " = \"" + str + "\";");
 		context.out_script_decls << endl << "extern char* str_" << next_str_i << ";";
 		next_str_i += 1;
 	}
 	
 	void SWFAction::declareEmptyString(Context& context, size_t size)
 	{
-		context.out_script_defs << endl << "char str_" << next_str_i << "[" << to_string(size) << "];";
+		context.out_script_defs.write("\nchar str_" + to_string(next_str_i) + "[" + to_string(size) + "];");
 		context.out_script_decls << endl << "extern char str_" << next_str_i << "[];";
 		next_str_i += 1;
 	}
@@ -1741,31 +1697,4 @@ namespace SWFRecomp
 		// Return 0 for "no ID" (dynamic strings)
 		return 0;
 	}
-
-	char SWFAction::actionCodeLookAhead(char* action_buffer, int lookAhead)
-	{
-		return action_buffer[actionCodeLookAheadIndex(action_buffer, lookAhead)];
-	}
-	
-	size_t SWFAction::actionCodeLookAheadIndex(char* action_buffer, int lookAhead)
-	{
-		size_t action_buffer_i = 0;
-		
-		for (int i = 0; i < lookAhead; ++i)
-		{
-			if ((action_buffer[action_buffer_i] & 0b10000000) != 0)
-			{
-				action_buffer_i += 1;
-				action_buffer_i += VAL(u16, &action_buffer[action_buffer_i]);
-				action_buffer_i += 2;
-			}
-			
-			else
-			{
-				action_buffer_i += 1;
-			}
-		}
-		
-		return action_buffer_i;
-	}
 };
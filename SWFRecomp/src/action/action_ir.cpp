@@ -0,0 +1,591 @@
+#include <algorithm>
+#include <cstring>
+
+#include <action_ir.hpp>
+
+#define VAL(type, x) *((type*) x)
+
+namespace SWFRecomp
+{
+	char* ActionList::decode(char* action_buffer)
+	{
+		records.clear();
+		bodies.clear();
+
+		char* end = decodeRecords(action_buffer, nullptr, 0);
+
+		buildGraph();
+
+		return end;
+	}
+
+	void ActionList::decode(char* action_buffer, size_t size, u32 base)
+	{
+		records.clear();
+		bodies.clear();
+
+		decodeRecords(action_buffer, action_buffer + size, base);
+
+		buildGraph();
+	}
+
+	char* ActionList::decodeRecords(char* action_buffer, char* limit, u32 base)
+	{
+		char* action_buffer_start = action_buffer;
+		SWFActionType code = SWF_ACTION_CONSTANT_POOL;
+
+		while (code != SWF_ACTION_END_OF_ACTIONS)
+		{
+			ActionRecord record = {};
+			record.target_index = ACTION_NONE;
+			record.first_body = ACTION_NONE;
+			record.result_type = ACTION_TYPE_UNKNOWN;
+			record.offset = base + (u32) (action_buffer - action_buffer_start);
+
+			if (limit != nullptr && action_buffer >= limit)
+			{
+				// Nested blocks don't carry their own END, so end the list here
+				record.code = SWF_ACTION_END_OF_ACTIONS;
+				record.data = action_buffer;
+				records.push_back(record);
+
+				return action_buffer;
+			}
+
+			code = (SWFActionType) (u8) action_buffer[0];
+			action_buffer += 1;
+
+			if ((code & 0b10000000) != 0)
+			{
+				record.length = VAL(u16, action_buffer);
+				action_buffer += 2;
+			}
+
+			record.code = code;
+			record.data = action_buffer;
+
+			switch (code)
+			{
+				case SWF_ACTION_JUMP:
+				case SWF_ACTION_IF:
+				{
+					s16 offset = VAL(s16, record.data);
+					record.has_target = true;
+					record.target = (s64) record.offset + 3 + record.length + offset;
+					action_buffer += record.length;
+					break;
+				}
+
+				case SWF_ACTION_PUSH:
+				{
+					action_buffer += decodePush(record);
+					break;
+				}
+
+				case SWF_ACTION_DEFINE_FUNCTION:
+				case SWF_ACTION_DEFINE_FUNCTION2:
+				case SWF_ACTION_TRY:
+				case SWF_ACTION_WITH:
+				{
+					action_buffer = decodeBodies(record, base, action_buffer_start);
+					break;
+				}
+
+				default:
+				{
+					action_buffer += payloadSize(record);
+					break;
+				}
+			}
+
+			records.push_back(record);
+		}
+
+		return action_buffer;
+	}
+
+	char* ActionList::decodeBodies(ActionRecord& record, u32 base, char* action_buffer_start)
+	{
+		char* action_buffer = record.data;
+
+		record.first_body = bodies.size();
+
+		switch (record.code)
+		{
+			case SWF_ACTION_DEFINE_FUNCTION:
+			case SWF_ACTION_DEFINE_FUNCTION2:
+			{
+				// Skip the name, parameters and flags to reach codeSize
+				action_buffer += strlen(action_buffer) + 1;
+
+				u16 num_params = VAL(u16, action_buffer);
+				action_buffer += 2;
+
+				if (record.code == SWF_ACTION_DEFINE_FUNCTION2)
+				{
+					// RegisterCount (u8) and flags (u16)
+					action_buffer += 3;
+				}
+
+				for (u16 i = 0; i < num_params; i++)
+				{
+					if (record.code == SWF_ACTION_DEFINE_FUNCTION2)
+					{
+						// Register number
+						action_buffer += 1;
+					}
+
+					action_buffer += strlen(action_buffer) + 1;
+				}
+
+				u16 code_size = VAL(u16, action_buffer);
+				action_buffer += 2;
+
+				// Function bodies become their own C functions, so their
+				// labels are numbered from the start of the body
+				record.body_count = 1;
+				bodies.emplace_back();
+				bodies.back().decode(action_buffer, code_size, 0);
+
+				return action_buffer + code_size;
+			}
+
+			case SWF_ACTION_TRY:
+			{
+				u8 flags = VAL(u8, action_buffer);
+				action_buffer += 1;
+
+				u16 sizes[3];
+
+				for (int i = 0; i < 3; i++)
+				{
+					sizes[i] = VAL(u16, action_buffer);
+					action_buffer += 2;
+				}
+
+				// Catch name or register
+				if ((flags & 0x01) != 0)
+				{
+					if ((flags & 0x04) != 0)
+					{
+						action_buffer += 1;
+					}
+
+					else
+					{
+						action_buffer += strlen(action_buffer) + 1;
+					}
+				}
+
+				// Try, catch and finally blocks follow the record, and are
+				// emitted inline, so their offsets continue the script's
+				record.body_count = 3;
+
+				for (int i = 0; i < 3; i++)
+				{
+					bodies.emplace_back();
+					bodies.back().decode(action_buffer, sizes[i], base + (u32) (action_buffer - action_buffer_start));
+					action_buffer += sizes[i];
+				}
+
+				return action_buffer;
+			}
+
+			case SWF_ACTION_WITH:
+			{
+				// The record length covers BlockSize and the block itself
+				u16 block_size = VAL(u16, action_buffer);
+				action_buffer += 2;
+
+				record.body_count = 1;
+				bodies.emplace_back();
+				bodies.back().decode(action_buffer, block_size, base + (u32) (action_buffer - action_buffer_start));
+
+				return record.data + record.length;
+			}
+
+			default:
+			{
+				record.first_body = ACTION_NONE;
+				return action_buffer + record.length;
+			}
+		}
+	}
+
+	size_t ActionList::payloadSize(const ActionRecord& record)
+	{
+		// Records whose contents are parsed are advanced past what was
+		// parsed rather than by their length, like the code generator did
+		// before decoding existed, so SWFs with inexact lengths still work
+		// (see also decodePush)
+		char* action_buffer = record.data;
+
+		switch (record.code)
+		{
+			case SWF_ACTION_CONSTANT_POOL:
+			{
+				u16 count = VAL(u16, action_buffer);
+				size_t size = 2;
+
+				for (u16 i = 0; i < count; i++)
+				{
+					size += strlen(action_buffer + size) + 1;
+				}
+
+				return size;
+			}
+
+			case SWF_ACTION_GET_URL:
+			{
+				// UrlString and TargetString
+				size_t size = strlen(action_buffer) + 1;
+				size += strlen(action_buffer + size) + 1;
+
+				return size;
+			}
+
+			case SWF_ACTION_SET_TARGET:
+			{
+				return strlen(action_buffer) + 1;
+			}
+
+			case SWF_ACTION_CALL:
+			{
+				// Call carries a length but no data
+				return 0;
+			}
+
+			default:
+			{
+				return record.length;
+			}
+		}
+	}
+
+	size_t ActionList::decodePush(ActionRecord& record)
+	{
+		char* action_buffer = record.data;
+		size_t push_length = 0;
+
+		while (push_length < record.length)
+		{
+			ActionPushValue value = {};
+			value.type = (u8) action_buffer[push_length];
+			value.known_type = ACTION_TYPE_UNKNOWN;
+			push_length += 1;
+
+			switch (value.type)
+			{
+				case ACTION_STACK_VALUE_STRING:
+				{
+					value.str = &action_buffer[push_length];
+					push_length += value.str.size() + 1;
+					break;
+				}
+
+				case ACTION_STACK_VALUE_F32:
+				{
+					value.value = VAL(u32, &action_buffer[push_length]);
+					push_length += 4;
+					break;
+				}
+
+				case ACTION_STACK_VALUE_F64:
+				{
+					// Stored as two little-endian words, high word first
+					u64 high = VAL(u32, &action_buffer[push_length]);
+					u64 low = VAL(u32, &action_buffer[push_length + 4]);
+					value.value = (high << 32) | low;
+					push_length += 8;
+					break;
+				}
+
+				case ACTION_STACK_VALUE_I32:
+				{
+					value.value = VAL(u32, &action_buffer[push_length]);
+					push_length += 4;
+					break;
+				}
+
+				case ACTION_STACK_VALUE_REGISTER:
+				case ACTION_STACK_VALUE_BOOLEAN:
+				case ACTION_PUSH_CONSTANT8:
+				{
+					value.value = (u8) action_buffer[push_length];
+					push_length += 1;
+					break;
+				}
+
+				case ACTION_PUSH_CONSTANT16:
+				{
+					value.value = VAL(u16, &action_buffer[push_length]);
+					push_length += 2;
+					break;
+				}
+
+				case ACTION_STACK_VALUE_NULL:
+				case ACTION_STACK_VALUE_UNDEFINED:
+				{
+					break;
+				}
+
+				default:
+				{
+					// Unknown type, rejected when the Push is emitted
+					record.push_values.push_back(value);
+					return record.length;
+				}
+			}
+
+			record.push_values.push_back(value);
+		}
+
+		return push_length;
+	}
+
+	void ActionList::buildGraph()
+	{
+		for (ActionRecord& record : records)
+		{
+			record.target_index = ACTION_NONE;
+			record.is_jump_target = false;
+		}
+
+		resolveTargets();
+		resolveBodyTargets();
+		buildBlocks();
+	}
+
+	size_t ActionList::find(s64 offset) const
+	{
+		auto it = std::lower_bound(records.begin(), records.end(), offset,
+			[](const ActionRecord& r, s64 target) { return (s64) r.offset < target; });
+
+		if (it != records.end() && (s64) it->offset == offset)
+		{
+			return it - records.begin();
+		}
+
+		return ACTION_NONE;
+	}
+
+	void ActionList::findEscapes(std::vector<s64>& targets) const
+	{
+		for (const ActionRecord& record : records)
+		{
+			if (record.removed)
+			{
+				continue;
+			}
+
+			if (record.has_target && record.target_index == ACTION_NONE)
+			{
+				targets.push_back(record.target);
+			}
+
+			if (!isInlineBody(record.code))
+			{
+				continue;
+			}
+
+			for (u8 body = 0; body < record.body_count; body++)
+			{
+				std::vector<s64> nested;
+				bodies[record.first_body + body].findEscapes(nested);
+
+				for (s64 target : nested)
+				{
+					if (find(target) == ACTION_NONE)
+					{
+						targets.push_back(target);
+					}
+				}
+			}
+		}
+	}
+
+	void ActionList::resolveTargets()
+	{
+		size_t end_index = records.size() - 1;
+
+		for (size_t i = 0; i < records.size(); i++)
+		{
+			ActionRecord& record = records[i];
+
+			if (record.removed)
+			{
+				continue;
+			}
+
+			switch (record.code)
+			{
+				case SWF_ACTION_WAIT_FOR_FRAME:
+				case SWF_ACTION_WAIT_FOR_FRAME2:
+				{
+					// Skip the given number of actions, stopping at the END action
+					u8 skip_count = (record.code == SWF_ACTION_WAIT_FOR_FRAME) ?
+						VAL(u8, record.data + 2) : VAL(u8, record.data);
+
+					record.has_target = true;
+					record.target_index = std::min(i + 1 + skip_count, end_index);
+					record.target = records[record.target_index].offset;
+
+					break;
+				}
+
+				case SWF_ACTION_JUMP:
+				case SWF_ACTION_IF:
+				{
+					record.target_index = find(record.target);
+					break;
+				}
+
+				default:
+				{
+					break;
+				}
+			}
+
+			if (record.target_index != ACTION_NONE)
+			{
+				records[record.target_index].is_jump_target = true;
+			}
+		}
+	}
+
+	std::vector<size_t> ActionList::findBodyTargets(const ActionRecord& record) const
+	{
+		std::vector<size_t> indices;
+
+		if (record.removed || !isInlineBody(record.code))
+		{
+			return indices;
+		}
+
+		std::vector<s64> targets;
+
+		for (u8 body = 0; body < record.body_count; body++)
+		{
+			bodies[record.first_body + body].findEscapes(targets);
+		}
+
+		for (s64 target : targets)
+		{
+			indices.push_back(find(target));
+		}
+
+		return indices;
+	}
+
+	void ActionList::resolveBodyTargets()
+	{
+		// Try and With bodies keep the script's offsets and are emitted
+		// inline, so their branches may land on records of this list
+		for (const ActionRecord& record : records)
+		{
+			for (size_t index : findBodyTargets(record))
+			{
+				if (index != ACTION_NONE)
+				{
+					records[index].is_jump_target = true;
+				}
+			}
+		}
+	}
+
+	void ActionList::buildBlocks()
+	{
+		blocks.clear();
+
+		std::vector<bool> leader(records.size(), false);
+		leader[0] = true;
+
+		for (size_t i = 0; i < records.size(); i++)
+		{
+			if (records[i].is_jump_target)
+			{
+				leader[i] = true;
+			}
+
+			// A Try or With record whose bodies branch out of them is a
+			// branch too
+			bool branches = endsBlock(records[i].code) || !findBodyTargets(records[i]).empty();
+
+			if (branches && !records[i].removed && i + 1 < records.size())
+			{
+				leader[i + 1] = true;
+			}
+		}
+
+		for (size_t i = 0; i < records.size(); i++)
+		{
+			if (leader[i])
+			{
+				blocks.push_back({i, i, {}});
+			}
+
+			blocks.back().last = i;
+			records[i].block = blocks.size() - 1;
+		}
+
+		for (size_t b = 0; b < blocks.size(); b++)
+		{
+			const ActionRecord& last = records[blocks[b].last];
+
+			bool falls_through = last.removed ||
+								 (last.code != SWF_ACTION_JUMP &&
+								  last.code != SWF_ACTION_RETURN &&
+								  last.code != SWF_ACTION_THROW &&
+								  last.code != SWF_ACTION_END_OF_ACTIONS);
+
+			if (falls_through && b + 1 < blocks.size())
+			{
+				blocks[b].successors.push_back(b + 1);
+			}
+
+			std::vector<size_t> targets = findBodyTargets(last);
+
+			if (last.target_index != ACTION_NONE)
+			{
+				targets.push_back(last.target_index);
+			}
+
+			for (size_t target : targets)
+			{
+				if (target == ACTION_NONE)
+				{
+					continue;
+				}
+
+				size_t target_block = records[target].block;
+
+				if (std::find(blocks[b].successors.begin(), blocks[b].successors.end(), target_block) == blocks[b].successors.end())
+				{
+					blocks[b].successors.push_back(target_block);
+				}
+			}
+		}
+	}
+
+	bool isBranch(SWFActionType code)
+	{
+		return code == SWF_ACTION_JUMP ||
+			   code == SWF_ACTION_IF ||
+			   code == SWF_ACTION_WAIT_FOR_FRAME ||
+			   code == SWF_ACTION_WAIT_FOR_FRAME2;
+	}
+
+	bool isInlineBody(SWFActionType code)
+	{
+		// Try and With bodies are emitted into the enclosing function
+		return code == SWF_ACTION_TRY || code == SWF_ACTION_WITH;
+	}
+
+	bool endsBlock(SWFActionType code)
+	{
+		return isBranch(code) ||
+			   code == SWF_ACTION_RETURN ||
+			   code == SWF_ACTION_THROW ||
+			   code == SWF_ACTION_END_OF_ACTIONS;
+	}
+};
@@ -0,0 +1,597 @@
+#include <cmath>
+#include <cstdlib>
+#include <cstring>
+
+#include <action_opt.hpp>
+
+#define VAL(type, x) *((type*) x)
+
+namespace SWFRecomp
+{
+	namespace
+	{
+		// A constant on top of the operand stack. record is the Push holding
+		// it, where it is always the last value.
+		struct StackConstant
+		{
+			size_t record;
+			u8 type;  // F32, F64 or STRING
+			u64 bits;
+			std::string str;
+		};
+
+		float asFloat(u64 bits)
+		{
+			u32 low = (u32) bits;
+			float f;
+			memcpy(&f, &low, sizeof(f));
+			return f;
+		}
+
+		double asDouble(u64 bits)
+		{
+			double d;
+			memcpy(&d, &bits, sizeof(d));
+			return d;
+		}
+
+		u64 floatBits(float f)
+		{
+			u32 bits;
+			memcpy(&bits, &f, sizeof(bits));
+			return bits;
+		}
+
+		u64 doubleBits(double d)
+		{
+			u64 bits;
+			memcpy(&bits, &d, sizeof(bits));
+			return bits;
+		}
+
+		bool resolveConstant(const ActionPushValue& value, const std::vector<std::string>& pool, StackConstant& constant)
+		{
+			switch (value.type)
+			{
+				case ACTION_STACK_VALUE_F32:
+				case ACTION_STACK_VALUE_F64:
+				{
+					constant.type = value.type;
+					constant.bits = value.value;
+					return true;
+				}
+
+				case ACTION_STACK_VALUE_STRING:
+				{
+					constant.type = ACTION_STACK_VALUE_STRING;
+					constant.str = value.str;
+					return true;
+				}
+
+				case ACTION_PUSH_CONSTANT8:
+				case ACTION_PUSH_CONSTANT16:
+				{
+					if (value.value >= pool.size())
+					{
+						return false;
+					}
+
+					constant.type = ACTION_STACK_VALUE_STRING;
+					constant.str = pool[value.value];
+					return true;
+				}
+
+				default:
+				{
+					return false;
+				}
+			}
+		}
+
+		// The runtime's convertFloat: strings become doubles through atof
+		void toNumber(StackConstant& constant)
+		{
+			if (constant.type == ACTION_STACK_VALUE_STRING)
+			{
+				constant.type = ACTION_STACK_VALUE_F64;
+				constant.bits = doubleBits(atof(constant.str.c_str()));
+			}
+		}
+
+		// The runtime's convertString, which only converts floats
+		bool toString(const StackConstant& constant, std::string& str)
+		{
+			if (constant.type == ACTION_STACK_VALUE_STRING)
+			{
+				str = constant.str;
+				return true;
+			}
+
+			if (constant.type == ACTION_STACK_VALUE_F32)
+			{
+				char buffer[17];
+				snprintf(buffer, 17, "%.15g", asFloat(constant.bits));
+				str = buffer;
+				return true;
+			}
+
+			return false;
+		}
+
+		double applyDouble(SWFActionType code, double b, double a)
+		{
+			switch (code)
+			{
+				case SWF_ACTION_SUBTRACT: return b - a;
+				case SWF_ACTION_MULTIPLY: return b*a;
+				case SWF_ACTION_DIVIDE: return b/a;
+				case SWF_ACTION_MODULO: return fmod(b, a);
+				case SWF_ACTION_EQUALS: return b == a ? 1.0f : 0.0f;
+				default: return b + a;
+			}
+		}
+
+		float applyFloat(SWFActionType code, float b, float a)
+		{
+			switch (code)
+			{
+				case SWF_ACTION_SUBTRACT: return b - a;
+				case SWF_ACTION_MULTIPLY: return b*a;
+				case SWF_ACTION_DIVIDE: return b/a;
+				case SWF_ACTION_MODULO: return fmodf(b, a);
+				case SWF_ACTION_EQUALS: return b == a ? 1.0f : 0.0f;
+				case SWF_ACTION_LESS:
+				case SWF_ACTION_LESS2: return b < a ? 1.0f : 0.0f;
+				case SWF_ACTION_GREATER: return b > a ? 1.0f : 0.0f;
+				default: return b + a;
+			}
+		}
+
+		// Numeric operations, following the F32/F64 promotion of actionAdd
+		// and friends: F64 if either operand is F64, F32 otherwise
+		bool foldNumeric(SWFActionType code, StackConstant b, StackConstant a, StackConstant& result)
+		{
+			toNumber(a);
+			toNumber(b);
+
+			bool a_f32 = a.type == ACTION_STACK_VALUE_F32;
+			bool b_f32 = b.type == ACTION_STACK_VALUE_F32;
+
+			switch (code)
+			{
+				case SWF_ACTION_DIVIDE:
+				case SWF_ACTION_MODULO:
+				{
+					// The runtime tests the divisor's low word as a float and
+					// produces "#ERROR#" for zero; only fold plain divisions
+					if (!a_f32 || asFloat(a.bits) == 0.0f)
+					{
+						return false;
+					}
+
+					break;
+				}
+
+				case SWF_ACTION_LESS:
+				case SWF_ACTION_LESS2:
+				case SWF_ACTION_GREATER:
+				{
+					// The F64 paths push a float result tagged as F64
+					if (!a_f32 || !b_f32)
+					{
+						return false;
+					}
+
+					break;
+				}
+
+				default:
+				{
+					break;
+				}
+			}
+
+			if (a_f32 && b_f32)
+			{
+				result.type = ACTION_STACK_VALUE_F32;
+				result.bits = floatBits(applyFloat(code, asFloat(b.bits), asFloat(a.bits)));
+				return true;
+			}
+
+			double a_val = a_f32 ? (double) asFloat(a.bits) : asDouble(a.bits);
+			double b_val = b_f32 ? (double) asFloat(b.bits) : asDouble(b.bits);
+			double c = applyDouble(code, b_val, a_val);
+
+			if (code == SWF_ACTION_EQUALS)
+			{
+				// Equals always pushes an F32
+				result.type = ACTION_STACK_VALUE_F32;
+				result.bits = floatBits((float) c);
+				return true;
+			}
+
+			result.type = ACTION_STACK_VALUE_F64;
+			result.bits = doubleBits(c);
+			return true;
+		}
+
+		bool foldBinary(SWFActionType code, const StackConstant& b, const StackConstant& a, StackConstant& result)
+		{
+			switch (code)
+			{
+				case SWF_ACTION_ADD2:
+				{
+					if (a.type != ACTION_STACK_VALUE_STRING && b.type != ACTION_STACK_VALUE_STRING)
+					{
+						return foldNumeric(code, b, a, result);
+					}
+
+					// Concatenation into a 17-byte buffer
+					std::string a_str;
+					std::string b_str;
+
+					if (!toString(a, a_str) || !toString(b, b_str))
+					{
+						return false;
+					}
+
+					result.type = ACTION_STACK_VALUE_STRING;
+					result.str = (b_str + a_str).substr(0, 16);
+					return true;
+				}
+
+				case SWF_ACTION_STRING_ADD:
+				{
+					// Converted floats carry no string length, so only fold strings
+					if (a.type != ACTION_STACK_VALUE_STRING || b.type != ACTION_STACK_VALUE_STRING)
+					{
+						return false;
+					}
+
+					result.type = ACTION_STACK_VALUE_STRING;
+					result.str = b.str + a.str;
+					return true;
+				}
+
+				case SWF_ACTION_ADD:
+				case SWF_ACTION_SUBTRACT:
+				case SWF_ACTION_MULTIPLY:
+				case SWF_ACTION_DIVIDE:
+				case SWF_ACTION_MODULO:
+				case SWF_ACTION_EQUALS:
+				case SWF_ACTION_LESS:
+				case SWF_ACTION_LESS2:
+				case SWF_ACTION_GREATER:
+				{
+					return foldNumeric(code, b, a, result);
+				}
+
+				default:
+				{
+					return false;
+				}
+			}
+		}
+
+		void readConstantPool(const ActionRecord& record, std::vector<std::string>& pool)
+		{
+			char* action_buffer = record.data;
+
+			u16 count = VAL(u16, action_buffer);
+			action_buffer += 2;
+
+			pool.clear();
+
+			for (u16 i = 0; i < count; i++)
+			{
+				pool.push_back(action_buffer);
+				action_buffer += pool.back().size() + 1;
+			}
+		}
+	}
+
+	void foldConstants(ActionList& actions, std::vector<std::string>& pool)
+	{
+		// Constants known to be on top of the stack within the current block
+		std::vector<StackConstant> stack;
+
+		for (size_t i = 0; i < actions.records.size(); i++)
+		{
+			ActionRecord& record = actions.records[i];
+
+			// Other paths may reach a label with a different stack
+			if (record.is_jump_target)
+			{
+				stack.clear();
+			}
+
+			switch (record.code)
+			{
+				case SWF_ACTION_PUSH:
+				{
+					for (const ActionPushValue& value : record.push_values)
+					{
+						StackConstant constant = {};
+						constant.record = i;
+
+						if (resolveConstant(value, pool, constant))
+						{
+							stack.push_back(constant);
+						}
+
+						else
+						{
+							stack.clear();
+						}
+					}
+
+					break;
+				}
+
+				case SWF_ACTION_POP:
+				{
+					if (stack.empty())
+					{
+						break;
+					}
+
+					actions.records[stack.back().record].push_values.pop_back();
+					stack.pop_back();
+					record.removed = true;
+
+					break;
+				}
+
+				case SWF_ACTION_CONSTANT_POOL:
+				{
+					readConstantPool(record, pool);
+
+					break;
+				}
+
+				default:
+				{
+					StackConstant result = {};
+
+					if (stack.size() >= 2 &&
+						foldBinary(record.code, stack[stack.size() - 2], stack.back(), result))
+					{
+						// Remove both operands and turn the operation into a Push
+						for (int operand = 0; operand < 2; operand++)
+						{
+							actions.records[stack.back().record].push_values.pop_back();
+							stack.pop_back();
+						}
+
+						ActionPushValue value = {};
+						value.type = result.type;
+						value.value = result.bits;
+						value.str = result.str;
+						value.folded = true;
+						value.known_type = ACTION_TYPE_UNKNOWN;
+
+						record.code = SWF_ACTION_PUSH;
+						record.push_values.push_back(value);
+
+						result.record = i;
+						stack.push_back(result);
+
+						break;
+					}
+
+					stack.clear();
+
+					// Nested bodies share the constant pool, in emission order
+					for (u8 body = 0; body < record.body_count; body++)
+					{
+						foldConstants(actions.bodies[record.first_body + body], pool);
+					}
+
+					break;
+				}
+			}
+		}
+	}
+
+	namespace
+	{
+		// No branch in the list, or in the bodies emitted inline with it,
+		// leaves its list
+		bool isClosed(const ActionList& actions)
+		{
+			for (const ActionRecord& record : actions.records)
+			{
+				if (record.has_target && !record.removed && record.target_index == ACTION_NONE)
+				{
+					return false;
+				}
+
+				if (!isInlineBody(record.code))
+				{
+					continue;
+				}
+
+				for (u8 body = 0; body < record.body_count; body++)
+				{
+					if (!isClosed(actions.bodies[record.first_body + body]))
+					{
+						return false;
+					}
+				}
+			}
+
+			return true;
+		}
+
+		// Push <number>; If -> Jump when the number is nonzero, else nothing.
+		// Returns true if any If changed.
+		bool foldConstantIfs(ActionList& actions)
+		{
+			bool changed = false;
+
+			for (size_t i = 1; i < actions.records.size(); i++)
+			{
+				ActionRecord& record = actions.records[i];
+				ActionRecord& push = actions.records[i - 1];
+
+				// Other paths may reach a label with a different condition
+				if (record.code != SWF_ACTION_IF || record.removed || record.is_jump_target ||
+					push.code != SWF_ACTION_PUSH || push.removed || push.push_values.empty())
+				{
+					continue;
+				}
+
+				const ActionPushValue& condition = push.push_values.back();
+
+				if (condition.type != ACTION_STACK_VALUE_F32 && condition.type != ACTION_STACK_VALUE_F64)
+				{
+					continue;
+				}
+
+				// evaluateCondition is true for any nonzero bit pattern
+				if (condition.value != 0)
+				{
+					record.code = SWF_ACTION_JUMP;
+				}
+
+				else
+				{
+					record.removed = true;
+				}
+
+				push.push_values.pop_back();
+
+				if (push.push_values.empty())
+				{
+					push.removed = true;
+				}
+
+				changed = true;
+			}
+
+			return changed;
+		}
+
+		// Drop Jumps over nothing but removed records. Returns true if any
+		// Jump was dropped.
+		bool removeEmptyJumps(ActionList& actions)
+		{
+			bool changed = false;
+
+			for (size_t i = 0; i < actions.records.size(); i++)
+			{
+				ActionRecord& record = actions.records[i];
+
+				if (record.code != SWF_ACTION_JUMP || record.removed || record.target_index <= i)
+				{
+					continue;
+				}
+
+				size_t next = i + 1;
+
+				while (next < record.target_index && actions.records[next].removed)
+				{
+					next++;
+				}
+
+				if (next == record.target_index)
+				{
+					record.removed = true;
+					changed = true;
+				}
+			}
+
+			return changed;
+		}
+
+		// Mark the records of blocks unreachable from the entry as removed.
+		// Returns true if any record was removed.
+		bool removeUnreachable(ActionList& actions)
+		{
+			std::vector<bool> reachable(actions.blocks.size(), false);
+			std::vector<size_t> worklist = {0};
+			reachable[0] = true;
+
+			while (!worklist.empty())
+			{
+				size_t block = worklist.back();
+				worklist.pop_back();
+
+				for (size_t successor : actions.blocks[block].successors)
+				{
+					if (!reachable[successor])
+					{
+						reachable[successor] = true;
+						worklist.push_back(successor);
+					}
+				}
+			}
+
+			bool changed = false;
+
+			for (ActionRecord& record : actions.records)
+			{
+				if (!reachable[record.block] && !record.removed)
+				{
+					record.removed = true;
+					changed = true;
+				}
+			}
+
+			return changed;
+		}
+	}
+
+	void eliminateDeadCode(ActionList& actions)
+	{
+		bool closed = isClosed(actions);
+
+		while (closed)
+		{
+			bool changed = foldConstantIfs(actions);
+
+			if (changed)
+			{
+				actions.buildGraph();
+			}
+
+			// Removed branches drop their labels, which may expose more
+			if (removeUnreachable(actions))
+			{
+				actions.buildGraph();
+				changed = true;
+			}
+
+			if (removeEmptyJumps(actions))
+			{
+				actions.buildGraph();
+				changed = true;
+			}
+
+			if (!changed)
+			{
+				break;
+			}
+		}
+
+		for (ActionRecord& record : actions.records)
+		{
+			if (record.removed)
+			{
+				continue;
+			}
+
+			for (u8 body = 0; body < record.body_count; body++)
+			{
+				ActionList& nested = actions.bodies[record.first_body + body];
+
+				// Function bodies stand alone; inline bodies are only closed
+				// if this list is
+				if (!isInlineBody(record.code) || closed)
+				{
+					eliminateDeadCode(nested);
+				}
+			}
+		}
+	}
+};
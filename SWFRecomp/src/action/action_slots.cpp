@@ -0,0 +1,670 @@
+#include <cmath>
+#include <cstring>
+
+#include <action_slots.hpp>
+
+using std::endl;
+using std::to_string;
+
+namespace SWFRecomp
+{
+	namespace
+	{
+		float asFloat(u64 bits)
+		{
+			u32 low = (u32) bits;
+			float f;
+			memcpy(&f, &low, sizeof(f));
+			return f;
+		}
+
+		double asDouble(u64 bits)
+		{
+			double d;
+			memcpy(&d, &bits, sizeof(d));
+			return d;
+		}
+
+		// Constants the bit operations can convert to int32_t without
+		// relying on gcc folding an out-of-range conversion
+		bool fitsInt32(const StackSlot& slot)
+		{
+			if (slot.kind != SLOT_CONSTANT)
+			{
+				return true;
+			}
+
+			double value = asFloat(slot.value.value);
+
+			return value >= -2147483648.0 && value < 2147483648.0;
+		}
+	}
+
+	StackSlots::StackSlots(bool enabled, bool registers, size_t& next_local) :
+		enabled(enabled), registers(registers), next_local(next_local)
+	{
+
+	}
+
+	bool StackSlots::push(const ActionPushValue& value)
+	{
+		if (!enabled)
+		{
+			return false;
+		}
+
+		StackSlot slot = {};
+		slot.kind = SLOT_CONSTANT;
+		slot.type = value.type;
+		slot.value = value;
+
+		switch (value.type)
+		{
+			case ACTION_STACK_VALUE_F32:
+			{
+				// Literals are emitted as C hex floats, which can't express inf/nan
+				if (!std::isfinite(asFloat(value.value)))
+				{
+					return false;
+				}
+
+				break;
+			}
+
+			case ACTION_STACK_VALUE_F64:
+			{
+				if (!std::isfinite(asDouble(value.value)))
+				{
+					return false;
+				}
+
+				break;
+			}
+
+			case ACTION_STACK_VALUE_REGISTER:
+			{
+				if (!registers ||
+					(value.known_type != ACTION_STACK_VALUE_F32 && value.known_type != ACTION_STACK_VALUE_F64))
+				{
+					return false;
+				}
+
+				slot.kind = SLOT_REGISTER;
+				slot.type = value.known_type;
+				slot.index = (u8) value.value;
+
+				break;
+			}
+
+			default:
+			{
+				return false;
+			}
+		}
+
+		slots.push_back(slot);
+
+		return true;
+	}
+
+	bool StackSlots::emit(const ActionRecord& record, ostream& out_script)
+	{
+		if (!enabled)
+		{
+			return false;
+		}
+
+		switch (record.code)
+		{
+			case SWF_ACTION_POP:
+			{
+				if (slots.empty())
+				{
+					return false;
+				}
+
+				if (slots.back().kind == SLOT_STACK)
+				{
+					out_script << "\t" << "// Pop" << endl
+							   << "\t" << "POP();" << endl;
+				}
+
+				slots.pop_back();
+
+				return true;
+			}
+
+			case SWF_ACTION_DUPLICATE:
+			{
+				if (slots.empty())
+				{
+					return false;
+				}
+
+				load(out_script);
+
+				StackSlot top = slots.back();
+				slots.push_back(top);
+
+				return true;
+			}
+
+			case SWF_ACTION_STACK_SWAP:
+			{
+				if (slots.size() < 2)
+				{
+					return false;
+				}
+
+				load(out_script);
+
+				std::swap(slots[slots.size() - 1], slots[slots.size() - 2]);
+
+				return true;
+			}
+
+			case SWF_ACTION_ADD:
+			case SWF_ACTION_ADD2:
+			case SWF_ACTION_SUBTRACT:
+			case SWF_ACTION_MULTIPLY:
+			case SWF_ACTION_DIVIDE:
+			case SWF_ACTION_EQUALS:
+			case SWF_ACTION_LESS:
+			case SWF_ACTION_LESS2:
+			case SWF_ACTION_GREATER:
+			{
+				return emitBinary(record.code, out_script);
+			}
+
+			case SWF_ACTION_BIT_AND:
+			case SWF_ACTION_BIT_OR:
+			case SWF_ACTION_BIT_XOR:
+			case SWF_ACTION_BIT_LSHIFT:
+			case SWF_ACTION_BIT_RSHIFT:
+			case SWF_ACTION_BIT_URSHIFT:
+			{
+				return emitBitwise(record.code, out_script);
+			}
+
+			case SWF_ACTION_INCREMENT:
+			case SWF_ACTION_DECREMENT:
+			{
+				return emitIncrement(record.code, out_script);
+			}
+
+			case SWF_ACTION_IF:
+			{
+				return emitIf(record, out_script);
+			}
+
+			case SWF_ACTION_STORE_REGISTER:
+			{
+				return emitStoreRegister(record, out_script);
+			}
+
+			default:
+			{
+				return false;
+			}
+		}
+	}
+
+	void StackSlots::pushResult(const ActionRecord& record)
+	{
+		if (!enabled || record.code == SWF_ACTION_PUSH)
+		{
+			return;
+		}
+
+		if (record.result_type == ACTION_STACK_VALUE_F32 || record.result_type == ACTION_STACK_VALUE_F64)
+		{
+			StackSlot slot = {};
+			slot.kind = SLOT_STACK;
+			slot.type = record.result_type;
+
+			slots.push_back(slot);
+		}
+	}
+
+	void StackSlots::materialize(ostream& out_script)
+	{
+		for (const StackSlot& slot : slots)
+		{
+			switch (slot.kind)
+			{
+				case SLOT_CONSTANT:
+				{
+					emitNumberPush(slot.value, out_script);
+
+					break;
+				}
+
+				case SLOT_LOCAL:
+				{
+					bool f32 = slot.type == ACTION_STACK_VALUE_F32;
+
+					out_script << "\t" << "// Push (stack slot)" << endl
+							   << "\t" << "PUSH(" << (f32 ? "ACTION_STACK_VALUE_F32" : "ACTION_STACK_VALUE_F64")
+							   << ", " << bits(slot) << ");" << endl;
+
+					break;
+				}
+
+				case SLOT_REGISTER:
+				{
+					out_script << "\t" << "// Push (Register " << slot.index << ")" << endl
+							   << "\t" << "pushVar(stack, sp, &regs[" << slot.index << "]);" << endl;
+
+					break;
+				}
+
+				case SLOT_STACK:
+				{
+					// Already there
+					break;
+				}
+			}
+		}
+
+		slots.clear();
+	}
+
+	bool StackSlots::emitBinary(SWFActionType code, ostream& out_script)
+	{
+		if (slots.size() < 2)
+		{
+			return false;
+		}
+
+		const StackSlot& a = slots[slots.size() - 1];
+		const StackSlot& b = slots[slots.size() - 2];
+
+		// Same promotion as actionAdd and friends: F64 if either operand
+		// is F64, F32 otherwise
+		bool f32 = a.type == ACTION_STACK_VALUE_F32 && b.type == ACTION_STACK_VALUE_F32;
+
+		const char* name;
+		const char* op;
+		bool comparison = false;
+
+		switch (code)
+		{
+			case SWF_ACTION_ADD: name = "Add"; op = "+"; break;
+			case SWF_ACTION_ADD2: name = "Add2 (Type-Aware Addition)"; op = "+"; break;
+			case SWF_ACTION_SUBTRACT: name = "Subtract"; op = "-"; break;
+			case SWF_ACTION_MULTIPLY: name = "Multiply"; op = "*"; break;
+			case SWF_ACTION_DIVIDE: name = "Divide"; op = "/"; break;
+			case SWF_ACTION_EQUALS: name = "Equals"; op = "=="; comparison = true; break;
+			case SWF_ACTION_LESS: name = "Less"; op = "<"; comparison = true; break;
+			case SWF_ACTION_LESS2: name = "Less2"; op = "<"; comparison = true; break;
+			default: name = "Greater"; op = ">"; comparison = true; break;
+		}
+
+		if (code == SWF_ACTION_DIVIDE)
+		{
+			// actionDivide tests the divisor's low word as a float and
+			// pushes "#ERROR#" for zero, so only divide by known divisors
+			if (a.kind != SLOT_CONSTANT || asFloat(a.value.value) == 0.0f)
+			{
+				return false;
+			}
+		}
+
+		if (comparison && code != SWF_ACTION_EQUALS && !f32)
+		{
+			// The runtime's F64 paths push a float tagged as F64
+			return false;
+		}
+
+		load(out_script);
+
+		const StackSlot& a_loaded = slots[slots.size() - 1];
+		const StackSlot& b_loaded = slots[slots.size() - 2];
+
+		std::string a_expr = expression(a_loaded);
+		std::string b_expr = expression(b_loaded);
+
+		if (!f32)
+		{
+			if (a_loaded.type == ACTION_STACK_VALUE_F32)
+			{
+				a_expr = "(double) " + a_expr;
+			}
+
+			if (b_loaded.type == ACTION_STACK_VALUE_F32)
+			{
+				b_expr = "(double) " + b_expr;
+			}
+		}
+
+		std::string value = b_expr + " " + op + " " + a_expr;
+
+		if (comparison)
+		{
+			value += " ? 1.0f : 0.0f";
+		}
+
+		slots.pop_back();
+		slots.pop_back();
+
+		out_script << "\t" << "// " << name << endl;
+
+		StackSlot result = declare((f32 || comparison) ? ACTION_STACK_VALUE_F32 : ACTION_STACK_VALUE_F64, out_script);
+		out_script << value << ";" << endl;
+
+		slots.push_back(result);
+
+		return true;
+	}
+
+	bool StackSlots::emitBitwise(SWFActionType code, ostream& out_script)
+	{
+		if (slots.size() < 2)
+		{
+			return false;
+		}
+
+		const StackSlot& a = slots[slots.size() - 1];
+		const StackSlot& b = slots[slots.size() - 2];
+
+		// The runtime reads the low word of either operand as a float
+		if (a.type != ACTION_STACK_VALUE_F32 || b.type != ACTION_STACK_VALUE_F32 ||
+			!fitsInt32(a) || !fitsInt32(b))
+		{
+			return false;
+		}
+
+		load(out_script);
+
+		std::string a_int = "(int32_t) " + expression(slots[slots.size() - 1]);
+		std::string b_int = "(int32_t) " + expression(slots[slots.size() - 2]);
+
+		const char* name;
+		std::string value;
+
+		switch (code)
+		{
+			case SWF_ACTION_BIT_AND:
+			{
+				name = "Bit And";
+				value = "(float) (" + b_int + " & " + a_int + ")";
+				break;
+			}
+
+			case SWF_ACTION_BIT_OR:
+			{
+				name = "Bit Or";
+				value = "(float) (" + b_int + " | " + a_int + ")";
+				break;
+			}
+
+			case SWF_ACTION_BIT_XOR:
+			{
+				name = "BitXor";
+				value = "(float) (" + b_int + " ^ " + a_int + ")";
+				break;
+			}
+
+			case SWF_ACTION_BIT_LSHIFT:
+			{
+				name = "BitLShift";
+				value = "(float) (" + b_int + " << (" + a_int + " & 0x1F))";
+				break;
+			}
+
+			case SWF_ACTION_BIT_RSHIFT:
+			{
+				name = "BitRShift";
+				value = "(float) (" + b_int + " >> (" + a_int + " & 0x1F))";
+				break;
+			}
+
+			default:
+			{
+				name = "BitURShift";
+				value = "(float) (double) ((uint32_t) " + b_int + " >> (" + a_int + " & 0x1F))";
+				break;
+			}
+		}
+
+		slots.pop_back();
+		slots.pop_back();
+
+		out_script << "\t" << "// " << name << endl;
+
+		StackSlot result = declare(ACTION_STACK_VALUE_F32, out_script);
+		out_script << value << ";" << endl;
+
+		slots.push_back(result);
+
+		return true;
+	}
+
+	bool StackSlots::emitIncrement(SWFActionType code, ostream& out_script)
+	{
+		if (slots.empty())
+		{
+			return false;
+		}
+
+		load(out_script);
+
+		StackSlot operand = slots.back();
+		slots.pop_back();
+
+		bool f32 = operand.type == ACTION_STACK_VALUE_F32;
+		bool increment = code == SWF_ACTION_INCREMENT;
+
+		out_script << "\t" << "// " << (increment ? "Increment" : "Decrement") << endl;
+
+		StackSlot result = declare(operand.type, out_script);
+		out_script << expression(operand) << (increment ? " + " : " - ") << (f32 ? "1.0f" : "1.0") << ";" << endl;
+
+		slots.push_back(result);
+
+		return true;
+	}
+
+	bool StackSlots::emitIf(const ActionRecord& record, ostream& out_script)
+	{
+		if (slots.empty() || slots.back().kind == SLOT_STACK)
+		{
+			return false;
+		}
+
+		StackSlot condition = slots.back();
+		slots.pop_back();
+
+		// The branch target expects everything else on the real stack
+		materialize(out_script);
+
+		std::string label = "label_" + to_string((s16) record.target);
+
+		out_script << "\t" << "// If" << endl;
+
+		if (condition.kind == SLOT_CONSTANT)
+		{
+			// evaluateCondition is true for any nonzero bit pattern
+			if (condition.value.value != 0)
+			{
+				out_script << "\t" << "goto " << label << ";" << endl;
+			}
+
+			return true;
+		}
+
+		out_script << "\t" << "if (" << bits(condition) << " != 0)" << endl
+				   << "\t" << "{" << endl
+				   << "\t" << "\t" << "goto " << label << ";" << endl
+				   << "\t" << "}" << endl;
+
+		return true;
+	}
+
+	bool StackSlots::emitStoreRegister(const ActionRecord& record, ostream& out_script)
+	{
+		if (!registers || slots.empty() || slots.back().kind == SLOT_STACK)
+		{
+			return false;
+		}
+
+		u8 register_num = (u8) record.data[0];
+
+		// Slots still to read the register's old value
+		loadRegister(register_num, out_script);
+
+		const StackSlot& top = slots.back();
+		std::string reg = "regs[" + to_string(register_num) + "]";
+
+		out_script << "\t" << "// StoreRegister " << (int) register_num << endl
+				   << "\t" << reg << ".type = "
+				   << (top.type == ACTION_STACK_VALUE_F32 ? "ACTION_STACK_VALUE_F32" : "ACTION_STACK_VALUE_F64") << ";" << endl
+				   << "\t" << reg << ".str_size = 0;" << endl
+				   << "\t" << reg << ".string_id = 0;" << endl
+				   << "\t" << reg << ".data.numeric_value = " << bits(top) << ";" << endl;
+
+		return true;
+	}
+
+	void StackSlots::load(ostream& out_script)
+	{
+		// Only the bottom slot can be on the real stack, and nothing
+		// has been pushed over it
+		if (slots.empty() || slots[0].kind != SLOT_STACK)
+		{
+			return;
+		}
+
+		bool f32 = slots[0].type == ACTION_STACK_VALUE_F32;
+
+		StackSlot loaded = declare(slots[0].type, out_script);
+		out_script << "VAL(" << (f32 ? "float" : "double") << ", &STACK_TOP_VALUE);" << endl
+				   << "\t" << "POP();" << endl;
+
+		slots[0] = loaded;
+	}
+
+	void StackSlots::loadRegister(u8 register_num, ostream& out_script)
+	{
+		for (StackSlot& slot : slots)
+		{
+			if (slot.kind == SLOT_REGISTER && slot.index == register_num)
+			{
+				StackSlot loaded = declare(slot.type, out_script);
+				out_script << expression(slot) << ";" << endl;
+
+				slot = loaded;
+			}
+		}
+	}
+
+	StackSlot StackSlots::declare(u8 type, ostream& out_script)
+	{
+		StackSlot slot = {};
+		slot.kind = SLOT_LOCAL;
+		slot.type = type;
+		slot.index = next_local++;
+
+		out_script << "\t" << (type == ACTION_STACK_VALUE_F32 ? "float" : "double") << " s_" << slot.index << " = ";
+
+		return slot;
+	}
+
+	std::string StackSlots::expression(const StackSlot& slot)
+	{
+		bool f32 = slot.type == ACTION_STACK_VALUE_F32;
+
+		switch (slot.kind)
+		{
+			case SLOT_LOCAL:
+			{
+				return "s_" + to_string(slot.index);
+			}
+
+			case SLOT_REGISTER:
+			{
+				return std::string("VAL(") + (f32 ? "float" : "double") + ", &regs[" + to_string(slot.index) + "].data.numeric_value)";
+			}
+
+			default:
+			{
+				break;
+			}
+		}
+
+		// Hex float literals are exact
+		char literal[40];
+
+		if (f32)
+		{
+			snprintf(literal, sizeof(literal), "%af", (double) asFloat(slot.value.value));
+		}
+
+		else
+		{
+			snprintf(literal, sizeof(literal), "%a", asDouble(slot.value.value));
+		}
+
+		if (literal[0] == '-')
+		{
+			return "(" + std::string(literal) + ")";
+		}
+
+		return literal;
+	}
+
+	std::string StackSlots::bits(const StackSlot& slot)
+	{
+		bool f32 = slot.type == ACTION_STACK_VALUE_F32;
+
+		switch (slot.kind)
+		{
+			case SLOT_LOCAL:
+			{
+				return std::string("VAL(") + (f32 ? "u32" : "u64") + ", &s_" + to_string(slot.index) + ")";
+			}
+
+			case SLOT_REGISTER:
+			{
+				return "regs[" + to_string(slot.index) + "].data.numeric_value";
+			}
+
+			default:
+			{
+				char literal[22];
+
+				if (f32)
+				{
+					snprintf(literal, sizeof(literal), "0x%08X", (u32) slot.value.value);
+				}
+
+				else
+				{
+					snprintf(literal, sizeof(literal), "0x%016llXULL", (unsigned long long) slot.value.value);
+				}
+
+				return literal;
+			}
+		}
+	}
+
+	void emitNumberPush(const ActionPushValue& value, ostream& out_script)
+	{
+		if (value.type == ACTION_STACK_VALUE_F32)
+		{
+			char hex_float[11];
+			snprintf(hex_float, 11, "0x%08X", (u32) value.value);
+
+			out_script << "\t" << "// Push " << (value.folded ? "(float, folded)" : "(float)") << endl
+					   << "\t" << "PUSH(ACTION_STACK_VALUE_F32, " << hex_float << ");" << endl;
+
+			return;
+		}
+
+		char hex_double[22];
+		snprintf(hex_double, 22, "0x%016llXULL", (unsigned long long) value.value);
+
+		out_script << "\t" << "// Push " << (value.folded ? "(double, folded)" : "(double)") << endl
+				   << "\t" << "PUSH(ACTION_STACK_VALUE_F64, " << hex_double << ");" << endl;
+	}
+};
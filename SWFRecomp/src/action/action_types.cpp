@@ -0,0 +1,331 @@
+#include <cstring>
+
+#include <action_types.hpp>
+
+namespace SWFRecomp
+{
+	namespace
+	{
+		// DefineFunction2 has at most 255 registers
+		const size_t REGISTER_COUNT = 256;
+
+		typedef std::vector<u8> RegisterTypes;
+
+		// A value on the operand stack. nonzero marks constants that are
+		// safe divisors (see actionDivide).
+		struct TypedValue
+		{
+			u8 type;
+			bool nonzero;
+		};
+
+		const TypedValue UNKNOWN_VALUE = {ACTION_TYPE_UNKNOWN, false};
+
+		bool isNumber(u8 type)
+		{
+			return type == ACTION_STACK_VALUE_F32 || type == ACTION_STACK_VALUE_F64;
+		}
+
+		// The F32/F64 promotion of actionAdd and friends
+		u8 promote(u8 a, u8 b)
+		{
+			if (!isNumber(a) || !isNumber(b))
+			{
+				return ACTION_TYPE_UNKNOWN;
+			}
+
+			if (a == ACTION_STACK_VALUE_F32 && b == ACTION_STACK_VALUE_F32)
+			{
+				return ACTION_STACK_VALUE_F32;
+			}
+
+			return ACTION_STACK_VALUE_F64;
+		}
+
+		// Abstract stack of one basic block. Values below the block's
+		// entry are unknown.
+		class TypedStack
+		{
+		public:
+			std::vector<TypedValue> values;
+
+			TypedValue pop()
+			{
+				if (values.empty())
+				{
+					return UNKNOWN_VALUE;
+				}
+
+				TypedValue value = values.back();
+				values.pop_back();
+
+				return value;
+			}
+
+			TypedValue top()
+			{
+				return values.empty() ? UNKNOWN_VALUE : values.back();
+			}
+
+			void push(u8 type)
+			{
+				values.push_back({type, false});
+			}
+		};
+
+		void inferRecord(ActionRecord& record, TypedStack& stack, RegisterTypes& regs, bool registers)
+		{
+			u8 result = ACTION_TYPE_UNKNOWN;
+
+			switch (record.code)
+			{
+				case SWF_ACTION_PUSH:
+				{
+					for (ActionPushValue& value : record.push_values)
+					{
+						switch (value.type)
+						{
+							case ACTION_STACK_VALUE_F32:
+							case ACTION_STACK_VALUE_F64:
+							{
+								float low;
+								u32 low_bits = (u32) value.value;
+								memcpy(&low, &low_bits, sizeof(low));
+
+								stack.values.push_back({value.type, low != 0.0f});
+
+								break;
+							}
+
+							case ACTION_STACK_VALUE_REGISTER:
+							{
+								value.known_type = registers ? regs[(u8) value.value] : ACTION_TYPE_UNKNOWN;
+								stack.push(value.known_type);
+
+								break;
+							}
+
+							default:
+							{
+								stack.push(ACTION_TYPE_UNKNOWN);
+
+								break;
+							}
+						}
+					}
+
+					return;
+				}
+
+				case SWF_ACTION_POP:
+				case SWF_ACTION_IF:
+				{
+					stack.pop();
+
+					return;
+				}
+
+				case SWF_ACTION_DUPLICATE:
+				{
+					TypedValue top = stack.pop();
+					stack.values.push_back(top);
+					stack.values.push_back(top);
+
+					return;
+				}
+
+				case SWF_ACTION_STACK_SWAP:
+				{
+					TypedValue a = stack.pop();
+					TypedValue b = stack.pop();
+					stack.values.push_back(a);
+					stack.values.push_back(b);
+
+					return;
+				}
+
+				case SWF_ACTION_STORE_REGISTER:
+				{
+					if (registers)
+					{
+						regs[(u8) record.data[0]] = stack.top().type;
+					}
+
+					return;
+				}
+
+				case SWF_ACTION_ADD:
+				case SWF_ACTION_ADD2:
+				case SWF_ACTION_SUBTRACT:
+				case SWF_ACTION_MULTIPLY:
+				{
+					TypedValue a = stack.pop();
+					TypedValue b = stack.pop();
+					result = promote(a.type, b.type);
+
+					break;
+				}
+
+				case SWF_ACTION_DIVIDE:
+				case SWF_ACTION_MODULO:
+				{
+					// A zero divisor pushes "#ERROR#"
+					TypedValue a = stack.pop();
+					TypedValue b = stack.pop();
+					result = a.nonzero ? promote(a.type, b.type) : ACTION_TYPE_UNKNOWN;
+
+					break;
+				}
+
+				case SWF_ACTION_LESS:
+				case SWF_ACTION_LESS2:
+				case SWF_ACTION_GREATER:
+				{
+					// The F64 paths push a float tagged as F64
+					TypedValue a = stack.pop();
+					TypedValue b = stack.pop();
+					result = promote(a.type, b.type) == ACTION_STACK_VALUE_F32 ?
+						ACTION_STACK_VALUE_F32 : ACTION_TYPE_UNKNOWN;
+
+					break;
+				}
+
+				case SWF_ACTION_EQUALS:
+				case SWF_ACTION_BIT_AND:
+				case SWF_ACTION_BIT_OR:
+				case SWF_ACTION_BIT_XOR:
+				case SWF_ACTION_BIT_LSHIFT:
+				case SWF_ACTION_BIT_RSHIFT:
+				case SWF_ACTION_BIT_URSHIFT:
+				{
+					// Always F32, whatever the operands
+					stack.pop();
+					stack.pop();
+					result = ACTION_STACK_VALUE_F32;
+
+					break;
+				}
+
+				case SWF_ACTION_INCREMENT:
+				case SWF_ACTION_DECREMENT:
+				{
+					u8 type = stack.pop().type;
+					result = isNumber(type) ? type : ACTION_TYPE_UNKNOWN;
+
+					break;
+				}
+
+				default:
+				{
+					// Unknown stack effect
+					stack.values.clear();
+
+					if (record.body_count > 0 && registers)
+					{
+						// Nested blocks (e.g. Try, With) share the registers
+						regs.assign(REGISTER_COUNT, ACTION_TYPE_UNKNOWN);
+					}
+
+					return;
+				}
+			}
+
+			record.result_type = result;
+			stack.push(result);
+		}
+
+		void inferBlock(ActionList& actions, size_t block, RegisterTypes& regs, bool registers)
+		{
+			TypedStack stack;
+
+			for (size_t i = actions.blocks[block].first; i <= actions.blocks[block].last; i++)
+			{
+				if (!actions.records[i].removed)
+				{
+					inferRecord(actions.records[i], stack, regs, registers);
+				}
+			}
+		}
+	}
+
+	void inferTypes(ActionList& actions, bool registers)
+	{
+		size_t num_blocks = actions.blocks.size();
+
+		// Register types on entry to each block. Registers start out as
+		// parameters, preloaded objects or zeroed, so as unknown.
+		std::vector<RegisterTypes> entry(num_blocks);
+		std::vector<bool> visited(num_blocks, false);
+
+		entry[0].assign(REGISTER_COUNT, ACTION_TYPE_UNKNOWN);
+		visited[0] = true;
+
+		if (registers)
+		{
+			std::vector<size_t> worklist = {0};
+
+			while (!worklist.empty())
+			{
+				size_t block = worklist.back();
+				worklist.pop_back();
+
+				RegisterTypes regs = entry[block];
+				inferBlock(actions, block, regs, true);
+
+				for (size_t successor : actions.blocks[block].successors)
+				{
+					bool changed = false;
+
+					if (!visited[successor])
+					{
+						entry[successor] = regs;
+						visited[successor] = true;
+						changed = true;
+					}
+
+					else
+					{
+						for (size_t r = 0; r < REGISTER_COUNT; r++)
+						{
+							if (entry[successor][r] != regs[r] && entry[successor][r] != ACTION_TYPE_UNKNOWN)
+							{
+								entry[successor][r] = ACTION_TYPE_UNKNOWN;
+								changed = true;
+							}
+						}
+					}
+
+					if (changed)
+					{
+						worklist.push_back(successor);
+					}
+				}
+			}
+		}
+
+		// Annotate with the final entry states. Blocks the analysis never
+		// reached are still emitted, so they get unknown registers.
+		for (size_t block = 0; block < num_blocks; block++)
+		{
+			RegisterTypes regs = visited[block] ? entry[block] : RegisterTypes(REGISTER_COUNT, ACTION_TYPE_UNKNOWN);
+			inferBlock(actions, block, regs, registers);
+		}
+
+		for (ActionRecord& record : actions.records)
+		{
+			for (u8 body = 0; body < record.body_count; body++)
+			{
+				bool body_registers;
+
+				switch (record.code)
+				{
+					case SWF_ACTION_DEFINE_FUNCTION2: body_registers = true; break;
+					case SWF_ACTION_DEFINE_FUNCTION: body_registers = false; break;
+					default: body_registers = registers; break;
+				}
+
+				inferTypes(actions.bodies[record.first_body + body], body_registers);
+			}
+		}
+	}
+};
@@ -0,0 +1,192 @@
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <filesystem>
+#include <mutex>
+#include <thread>
+#include <typeinfo>
+
+#include <batch.hpp>
+#include <recompilation.hpp>
+
+namespace fs = std::filesystem;
+
+namespace SWFRecomp
+{
+	namespace
+	{
+		struct BatchResult
+		{
+			bool ok;
+			double seconds;
+		};
+
+		// The config files to recompile, in a stable order
+		std::vector<string> findConfigs(const std::vector<string>& inputs)
+		{
+			std::vector<string> configs;
+
+			for (const string& input : inputs)
+			{
+				if (!fs::is_directory(input))
+				{
+					configs.push_back(input);
+
+					continue;
+				}
+
+				std::vector<string> found;
+
+				for (const fs::directory_entry& entry : fs::recursive_directory_iterator(input))
+				{
+					if (entry.is_regular_file() && entry.path().filename() == "config.toml")
+					{
+						found.push_back(entry.path().string());
+					}
+				}
+
+				std::sort(found.begin(), found.end());
+				configs.insert(configs.end(), found.begin(), found.end());
+			}
+
+			return configs;
+		}
+
+		bool recompileConfig(const string& config_path, const Options& options, FILE* log)
+		{
+			try
+			{
+				Config config;
+				config.parseFile(config_path);
+
+				Context context;
+				configureContext(context, config, options, fs::path(config_path).parent_path().string());
+				context.log = log;
+				
+				// The movies already keep every core busy
+				context.tag_threads = 1;
+
+				recompile(context);
+			}
+
+			catch (const std::exception& e)
+			{
+				// EXC has already printed its message to stderr
+				if (typeid(e) != typeid(std::exception))
+				{
+					fprintf(log, "Error: %s\n", e.what());
+				}
+
+				return false;
+			}
+
+			return true;
+		}
+
+		// Copy a movie's messages to stdout
+		void printLog(FILE* log)
+		{
+			char buffer[4096];
+			size_t read;
+
+			rewind(log);
+
+			while ((read = fread(buffer, 1, sizeof(buffer), log)) > 0)
+			{
+				fwrite(buffer, 1, read, stdout);
+			}
+		}
+	}
+
+	void configureContext(Context& context, const Config& config, const Options& options, const string& folder)
+	{
+		fs::path base = folder;
+
+		context.swf_path = (base/config.swf_path).string();
+		context.output_tags_folder = (base/"RecompiledTags").string();
+		context.output_scripts_folder = (base/"RecompiledScripts").string();
+		context.max_file_size = config.max_file_size;
+		context.asset_pack = config.asset_pack;
+		context.curve_tolerance = config.curve_tolerance;
+		context.constant_folding = options.constant_folding;
+		context.stack_slots = options.stack_slots;
+		context.dead_code_elimination = options.dead_code_elimination;
+	}
+
+	size_t recompileBatch(const std::vector<string>& inputs, const Options& options, size_t jobs, bool verbose)
+	{
+		std::vector<string> configs = findConfigs(inputs);
+		std::vector<BatchResult> results(configs.size());
+
+		if (jobs == 0)
+		{
+			jobs = std::max(1u, std::thread::hardware_concurrency());
+		}
+
+		jobs = std::max((size_t) 1, std::min(jobs, configs.size()));
+
+		std::atomic<size_t> next_config(0);
+		std::mutex print_mutex;
+
+		auto start = std::chrono::steady_clock::now();
+
+		auto worker = [&]()
+		{
+			for (size_t i = next_config++; i < configs.size(); i = next_config++)
+			{
+				// Messages go to a file of their own, so movies recompiling
+				// at the same time don't interleave
+				FILE* log = tmpfile();
+
+				auto movie_start = std::chrono::steady_clock::now();
+
+				results[i].ok = recompileConfig(configs[i], options, log != nullptr ? log : stdout);
+				results[i].seconds = std::chrono::duration<double>(std::chrono::steady_clock::now() - movie_start).count();
+
+				std::lock_guard<std::mutex> lock(print_mutex);
+
+				if (log != nullptr && (verbose || !results[i].ok))
+				{
+					printLog(log);
+				}
+
+				printf("[%s] %s (%.3fs)\n", results[i].ok ? "ok" : "FAILED", configs[i].c_str(), results[i].seconds);
+				fflush(stdout);
+
+				if (log != nullptr)
+				{
+					fclose(log);
+				}
+			}
+		};
+
+		std::vector<std::thread> threads;
+
+		for (size_t i = 1; i < jobs; ++i)
+		{
+			threads.emplace_back(worker);
+		}
+
+		worker();
+
+		for (std::thread& thread : threads)
+		{
+			thread.join();
+		}
+
+		size_t failed = std::count_if(results.begin(), results.end(), [](const BatchResult& result) { return !result.ok; });
+		double seconds = std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+
+		printf("\nRecompiled %zu of %zu movies in %.2fs on %zu threads\n", configs.size() - failed, configs.size(), seconds, jobs);
+
+		for (size_t i = 0; i < configs.size(); ++i)
+		{
+			if (!results[i].ok)
+			{
+				printf("  failed: %s\n", configs[i].c_str());
+			}
+		}
+
+		return failed;
+	}
+};
@@ -0,0 +1,56 @@
+#include <chunked_file.hpp>
+
+using std::to_string;
+
+namespace SWFRecomp
+{
+	ChunkedFile::ChunkedFile() : max_size(0), report(nullptr), part(0), size(0)
+	{
+		
+	}
+	
+	void ChunkedFile::open(const string& folder, const string& name, const string& preamble, size_t max_size, OutputReport& report)
+	{
+		this->report = &report;
+		this->folder = folder;
+		this->name = name;
+		this->preamble = preamble;
+		this->max_size = max_size;
+		
+		part = 0;
+		openPart();
+	}
+	
+	void ChunkedFile::write(const string& unit)
+	{
+		// Start a new part unless this one only holds the preamble
+		if (max_size != 0 && size > preamble.size() && size + unit.size() > max_size)
+		{
+			out.close();
+			part += 1;
+			openPart();
+		}
+		
+		out << unit;
+		size += unit.size();
+	}
+	
+	void ChunkedFile::close()
+	{
+		out.close();
+	}
+	
+	size_t ChunkedFile::partCount() const
+	{
+		return part + 1;
+	}
+	
+	void ChunkedFile::openPart()
+	{
+		string path = folder + name + (part == 0 ? "" : "_" + to_string(part)) + ".c";
+		
+		out.open(path, *report);
+		out << preamble;
+		size = preamble.size();
+	}
+};
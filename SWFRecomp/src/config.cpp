@@ -9,7 +9,7 @@ using namespace std::string_view_literals;
 
 namespace SWFRecomp
 {
-	Config::Config()
+	Config::Config() : max_file_size(1024*1024), asset_pack(false), curve_tolerance(5.0)
 	{
 		
 	}
@@ -25,6 +25,24 @@ namespace SWFRecomp
 		swf_path = string(swf_path_view);
 		output_tags_folder = string(output_tags_folder_view);
 		output_scripts_folder = string(output_scripts_folder_view);
+		
+		int64_t max_file_size_value = tbl["output"]["max_file_size"].value_or((int64_t) max_file_size);
+		
+		if (max_file_size_value < 0)
+		{
+			EXC("Error: field max_file_size in toml must not be negative\n");
+		}
+		
+		max_file_size = (size_t) max_file_size_value;
+		
+		asset_pack = tbl["output"]["asset_pack"].value_or(asset_pack);
+		
+		curve_tolerance = tbl["output"]["curve_tolerance"].value_or(curve_tolerance);
+		
+		if (curve_tolerance < 0)
+		{
+			EXC("Error: field curve_tolerance in toml must not be negative\n");
+		}
 	}
 	
 	string_view Config::parseStringView(string key)
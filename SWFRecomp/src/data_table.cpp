@@ -0,0 +1,372 @@
+#include <cctype>
+#include <cstdio>
+#include <cstring>
+
+#include <data_table.hpp>
+
+using std::to_string;
+using std::endl;
+
+namespace SWFRecomp
+{
+	namespace
+	{
+		// assets.bin layout, all little-endian:
+		//   char magic[4] = "SWFA", u32 version, u32 table_count, u32 file_size
+		//   table_count entries of { char name[24], u32 offset, u32 size }
+		//   the tables, each at a multiple of ASSET_PACK_ALIGN
+		const char ASSET_PACK_MAGIC[4] = {'S', 'W', 'F', 'A'};
+		const u32 ASSET_PACK_VERSION = 1;
+		const size_t ASSET_PACK_HEADER_SIZE = 16;
+		const size_t ASSET_PACK_ENTRY_SIZE = 32;
+		const size_t ASSET_PACK_NAME_SIZE = 24;
+		const size_t ASSET_PACK_ALIGN = 16;
+
+		// Elements per line of a flat array
+		const size_t FLAT_LINE_LENGTH = 16;
+
+		void appendU32(string& out, u32 value)
+		{
+			for (int i = 0; i < 4; ++i)
+			{
+				out += (char) ((value >> 8*i) & 0xFF);
+			}
+		}
+
+		void pad(string& out, size_t align)
+		{
+			out.append((align - out.size()%align)%align, '\0');
+		}
+
+		// FNV-1a, so draws.c changes (and gets rebuilt) whenever the pack does
+		u32 checksum(const string& data)
+		{
+			u32 hash = 2166136261u;
+
+			for (char c : data)
+			{
+				hash = (hash ^ (u8) c)*16777619u;
+			}
+
+			return hash;
+		}
+
+		string upper(const string& name)
+		{
+			string result = name;
+
+			for (char& c : result)
+			{
+				c = (char) toupper((unsigned char) c);
+			}
+
+			return result;
+		}
+
+		// A float literal that reads back as exactly the same value
+		void formatFloat(char* buffer, size_t size, float value)
+		{
+			snprintf(buffer, size - 3, "%.9g", value);
+
+			if (strpbrk(buffer, ".eni") == nullptr)
+			{
+				strcat(buffer, ".0");
+			}
+
+			strcat(buffer, "f");
+		}
+
+		void writeTextTables(Context& context, const std::vector<const DataTable*>& tables)
+		{
+			for (const DataTable* table : tables)
+			{
+				// One unit per table, so parts can split between tables
+				context.out_draws.write("\n\n" + table->declaration() + " =\n{\n" + table->initializer() + "};");
+
+				context.out_draws_header << endl
+										 << "extern " << table->declaration() << ";";
+			}
+
+			context.out_draws_header << endl;
+
+			for (const DataTable* table : tables)
+			{
+				context.out_draws_header << endl
+										 << "#define " << upper(table->name()) << "_SIZE " << to_string(table->size());
+			}
+		}
+
+		void writeAssetPack(Context& context, const std::vector<const DataTable*>& tables)
+		{
+			string pack(ASSET_PACK_MAGIC, sizeof(ASSET_PACK_MAGIC));
+			appendU32(pack, ASSET_PACK_VERSION);
+			appendU32(pack, (u32) tables.size());
+			appendU32(pack, 0);  // file_size, filled in below
+
+			std::vector<size_t> offsets;
+			size_t offset = ASSET_PACK_HEADER_SIZE + ASSET_PACK_ENTRY_SIZE*tables.size();
+
+			for (const DataTable* table : tables)
+			{
+				offset += (ASSET_PACK_ALIGN - offset%ASSET_PACK_ALIGN)%ASSET_PACK_ALIGN;
+				offsets.push_back(offset);
+
+				string name = table->name();
+				name.resize(ASSET_PACK_NAME_SIZE, '\0');
+
+				pack += name;
+				appendU32(pack, (u32) offset);
+				appendU32(pack, (u32) table->size());
+
+				offset += table->size();
+			}
+
+			for (const DataTable* table : tables)
+			{
+				pad(pack, ASSET_PACK_ALIGN);
+				pack += table->bytes();
+				pack.append(table->size() - table->bytes().size(), '\0');
+			}
+
+			if (pack.size() > 0xFFFFFFFFu)
+			{
+				EXC("Error: draw data is too large for an asset pack\n");
+			}
+
+			string file_size;
+			appendU32(file_size, (u32) pack.size());
+			pack.replace(12, 4, file_size);
+
+			string pack_path = context.output_tags_folder + "assets.bin";
+
+			OutputFile out_pack;
+			out_pack.open(pack_path, context.outputs);
+			out_pack.write(pack.data(), pack.size());
+			out_pack.close();
+
+			char hash[11];
+			snprintf(hash, sizeof(hash), "0x%08X", checksum(pack));
+
+			// .incbin looks for relative paths in the assembler's working
+			// directory and -I directories. Naming the pack by where it was
+			// written would make draws.c depend on the output folder's path.
+			context.out_draws.write("\n\n"
+									"// assets.bin: " + to_string(pack.size()) + " bytes, checksum " + hash + "\n"
+									"#ifndef ASSET_PACK_PATH\n"
+									"#define ASSET_PACK_PATH \"assets.bin\"\n"
+									"#endif\n"
+									"\n"
+									"#ifdef __APPLE__\n"
+									"#define ASSET_PACK_BEGIN \".const\\n\"\n"
+									"#define ASSET_PACK_SYMBOL \"_asset_pack\"\n"
+									"#define ASSET_PACK_END \".text\\n\"\n"
+									"#else\n"
+									"#define ASSET_PACK_BEGIN \".pushsection .rodata\\n\"\n"
+									"#define ASSET_PACK_SYMBOL \"asset_pack\"\n"
+									"#define ASSET_PACK_END \".popsection\\n\"\n"
+									"#endif\n"
+									"\n"
+									"__asm__(ASSET_PACK_BEGIN\n"
+									"\t\".balign " + to_string(ASSET_PACK_ALIGN) + "\\n\"\n"
+									"\t\".globl \" ASSET_PACK_SYMBOL \"\\n\"\n"
+									"\tASSET_PACK_SYMBOL \":\\n\"\n"
+									"\t\".incbin \\\"\" ASSET_PACK_PATH \"\\\"\\n\"\n"
+									"\tASSET_PACK_END);");
+
+			context.out_draws_header << endl
+									 << "// Draw data, embedded from assets.bin by draws.c" << endl
+									 << "extern const u8 asset_pack[];" << endl;
+
+			for (size_t i = 0; i < tables.size(); ++i)
+			{
+				context.out_draws_header << endl
+										 << "#define " << tables[i]->name() << " ((" << tables[i]->pointerType() << ") (asset_pack + " << to_string(offsets[i]) << "))" << endl
+										 << "#define " << upper(tables[i]->name()) << "_SIZE " << to_string(tables[i]->size());
+			}
+		}
+	}
+
+	DataTable::DataTable(const string& name, DataTableType type, size_t row_size) : table_name(name),
+																				   type(type),
+																				   row_size(row_size)
+	{
+
+	}
+
+	void DataTable::pushU8(u8 value)
+	{
+		data += (char) value;
+	}
+
+	void DataTable::pushU32(u32 value)
+	{
+		appendU32(data, value);
+	}
+
+	void DataTable::pushFloat(float value)
+	{
+		u32 bits;
+		memcpy(&bits, &value, sizeof(bits));
+
+		appendU32(data, bits);
+	}
+
+	void DataTable::padRows(size_t rows)
+	{
+		size_t size = rows*row_size*elementSize();
+
+		if (data.size() < size)
+		{
+			data.resize(size, '\0');
+		}
+	}
+
+	const string& DataTable::name() const
+	{
+		return table_name;
+	}
+
+	const string& DataTable::bytes() const
+	{
+		return data;
+	}
+
+	size_t DataTable::size() const
+	{
+		return rowCount()*row_size*elementSize();
+	}
+
+	string DataTable::declaration() const
+	{
+		string c_type = cType();
+
+		if (row_size == 1)
+		{
+			return c_type + " " + table_name + "[" + to_string(rowCount()) + "]";
+		}
+
+		return c_type + " " + table_name + "[" + to_string(rowCount()) + "][" + to_string(row_size) + "]";
+	}
+
+	string DataTable::pointerType() const
+	{
+		if (row_size == 1)
+		{
+			return cType() + "*";
+		}
+
+		return cType() + " (*)[" + to_string(row_size) + "]";
+	}
+
+	string DataTable::initializer() const
+	{
+		size_t count = elementCount();
+
+		if (count == 0)
+		{
+			return "\t0\n";
+		}
+
+		size_t line_length = row_size == 1 ? FLAT_LINE_LENGTH : row_size;
+
+		string out;
+		out.reserve(count*12);
+
+		char buffer[32];
+
+		for (size_t i = 0; i < count; ++i)
+		{
+			const u8* element = (const u8*) data.data() + i*elementSize();
+
+			if (i%line_length == 0)
+			{
+				out += row_size == 1 ? "\t" : "\t{ ";
+			}
+
+			switch (type)
+			{
+				case DATA_U8:
+				{
+					snprintf(buffer, sizeof(buffer), "0x%02X", element[0]);
+
+					break;
+				}
+
+				case DATA_U32:
+				case DATA_F32:
+				{
+					u32 bits = (u32) element[0] | ((u32) element[1] << 8) | ((u32) element[2] << 16) | ((u32) element[3] << 24);
+
+					if (type == DATA_U32)
+					{
+						snprintf(buffer, sizeof(buffer), "0x%08X", bits);
+					}
+
+					else
+					{
+						float value;
+						memcpy(&value, &bits, sizeof(value));
+						formatFloat(buffer, sizeof(buffer), value);
+					}
+
+					break;
+				}
+			}
+
+			out += buffer;
+
+			if (i%line_length == line_length - 1 || i == count - 1)
+			{
+				out += row_size == 1 ? ",\n" : " },\n";
+			}
+
+			else
+			{
+				out += ", ";
+			}
+		}
+
+		return out;
+	}
+
+	string DataTable::cType() const
+	{
+		switch (type)
+		{
+			case DATA_U8: return "u8";
+			case DATA_U32: return "u32";
+			default: return "float";
+		}
+	}
+
+	size_t DataTable::elementSize() const
+	{
+		return type == DATA_U8 ? 1 : 4;
+	}
+
+	size_t DataTable::elementCount() const
+	{
+		return data.size()/elementSize();
+	}
+
+	size_t DataTable::rowCount() const
+	{
+		// An empty table still needs one row
+		size_t rows = elementCount()/row_size;
+
+		return rows ? rows : 1;
+	}
+
+	void writeDataTables(Context& context, const std::vector<const DataTable*>& tables)
+	{
+		if (context.asset_pack)
+		{
+			writeAssetPack(context, tables);
+		}
+
+		else
+		{
+			writeTextTables(context, tables);
+		}
+	}
+};
@@ -124,31 +124,11 @@ namespace SWFRecomp
 				
 				parseBitField(field_buffer, length, cur_byte_bits_left);
 				
-				float f = 0.0f;
-				float bit_float = 0.0000152587890625f;
-				
-				bool negative = false;
-				
-				if (((u32) value) & (1 << (length - 1)))
-				{
-					value = (~value) + 1;
-					negative = true;
-				}
-				
-				for (u32 i = 0; i < length; ++i)
-				{
-					if (((u32) value) & (1 << i))
-					{
-						f += bit_float;
-					}
-					
-					bit_float *= 2.0f;
-				}
+				// 16.16 fixed point
+				int shiftAmount = 64 - length;
 				
-				if (negative)
-				{
-					f *= -1;
-				}
+				s64 fixed = ((s64) (value << shiftAmount)) >> shiftAmount;
+				float f = (float) (fixed/65536.0);
 				
 				value = VAL(u32, &f);
 				
@@ -1,24 +1,97 @@
+#include <cstdlib>
+#include <cstring>
 #include <iostream>
+#include <string>
+#include <vector>
 
 #include <common.h>
+#include <batch.hpp>
 #include <config.hpp>
 #include <recompilation.hpp>
 
 int main(int argc, char** argv)
 {
-	if (argc < 2)
+	std::vector<std::string> config_paths;
+	SWFRecomp::Options options;
+	bool batch = false;
+	bool verbose = false;
+	size_t jobs = 0;
+	
+	for (int i = 1; i < argc; ++i)
+	{
+		if (strcmp(argv[i], "--no-constant-folding") == 0)
+		{
+			options.constant_folding = false;
+		}
+		
+		else if (strcmp(argv[i], "--no-stack-slots") == 0)
+		{
+			options.stack_slots = false;
+		}
+		
+		else if (strcmp(argv[i], "--no-dead-code-elimination") == 0)
+		{
+			options.dead_code_elimination = false;
+		}
+		
+		else if (strcmp(argv[i], "--batch") == 0)
+		{
+			batch = true;
+		}
+		
+		else if (strcmp(argv[i], "--verbose") == 0)
+		{
+			verbose = true;
+		}
+		
+		else if (strcmp(argv[i], "--jobs") == 0 && i + 1 < argc)
+		{
+			jobs = (size_t) strtoul(argv[++i], nullptr, 10);
+		}
+		
+		else if (argv[i][0] == '-')
+		{
+			printf("Unknown option: %s\n", argv[i]);
+			return -1;
+		}
+		
+		else
+		{
+			config_paths.push_back(argv[i]);
+		}
+	}
+	
+	if (!batch && config_paths.size() > 1)
 	{
-		printf("Not enough arguments.\nusage: %s <config-file>\n", argv[0]);
+		printf("Too many arguments, use --batch to recompile more than one config file.\n");
 		return -1;
 	}
 	
+	if (config_paths.empty())
+	{
+		printf("Not enough arguments.\n"
+			   "usage: %s [--jobs N] [--no-constant-folding] [--no-stack-slots] [--no-dead-code-elimination] <config-file>\n"
+			   "       %s --batch [--jobs N] [--verbose] [options] <config-file or directory>...\n", argv[0], argv[0]);
+		return -1;
+	}
+	
+	if (batch)
+	{
+		// Each movie's paths are relative to its config file
+		size_t failed = SWFRecomp::recompileBatch(config_paths, options, jobs, verbose);
+		
+		fflush(stdout);
+		
+		return failed == 0 ? 0 : 1;
+	}
+	
 	SWFRecomp::Config config;
-	config.parseFile(argv[1]);
+	config.parseFile(config_paths[0]);
 	
+	// Paths are relative to the working directory
 	SWFRecomp::Context context;
-	context.swf_path = config.swf_path;
-	context.output_tags_folder = "RecompiledTags";
-	context.output_scripts_folder = "RecompiledScripts";
+	SWFRecomp::configureContext(context, config, options, "");
+	context.tag_threads = jobs;
 	
 	SWFRecomp::recompile(context);
 	
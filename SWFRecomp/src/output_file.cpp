@@ -0,0 +1,89 @@
+#include <algorithm>
+#include <filesystem>
+#include <fstream>
+#include <iterator>
+#include <set>
+
+#include <output_file.hpp>
+
+using std::ifstream;
+using std::ofstream;
+using std::ios_base;
+
+namespace fs = std::filesystem;
+
+namespace SWFRecomp
+{
+	OutputFile::OutputFile() : report(nullptr)
+	{
+		
+	}
+	
+	void OutputFile::open(const string& path, OutputReport& report)
+	{
+		this->path = path;
+		this->report = &report;
+		
+		str("");
+		clear();
+	}
+	
+	void OutputFile::close()
+	{
+		if (report == nullptr)
+		{
+			return;
+		}
+		
+		string contents = str();
+		
+		ifstream existing(path, ios_base::in | ios_base::binary);
+		
+		if (existing.is_open() &&
+			fs::file_size(path) == contents.size() &&
+			std::equal(contents.begin(), contents.end(), std::istreambuf_iterator<char>(existing)))
+		{
+			report->unchanged.push_back(path);
+		}
+		
+		else
+		{
+			existing.close();
+			
+			ofstream out(path, ios_base::out | ios_base::binary);
+			out << contents;
+			
+			report->changed.push_back(path);
+		}
+		
+		str("");
+		report = nullptr;
+	}
+	
+	void removeStaleOutputs(const string& folder, OutputReport& report)
+	{
+		std::set<string> written;
+		
+		for (const std::vector<string>* paths : {&report.changed, &report.unchanged})
+		{
+			for (const string& path : *paths)
+			{
+				written.insert(fs::path(path).lexically_normal().string());
+			}
+		}
+		
+		for (const fs::directory_entry& entry : fs::directory_iterator(folder))
+		{
+			string extension = entry.path().extension().string();
+			
+			if (!entry.is_regular_file() || (extension != ".c" && extension != ".h") ||
+				written.count(entry.path().lexically_normal().string()) != 0)
+			{
+				continue;
+			}
+			
+			fs::remove(entry.path());
+			report.removed.push_back(entry.path().string());
+		}
+	}
+};
@@ -1,6 +1,5 @@
 #include <string>
 #include <filesystem>
-#include <fstream>
 
 #include <common.h>
 #include <swf.hpp>
@@ -8,8 +7,6 @@
 using std::string;
 using std::to_string;
 
-using std::ofstream;
-using std::ios_base;
 using std::endl;
 
 namespace fs = std::filesystem;
@@ -18,7 +15,7 @@ namespace SWFRecomp
 {
 	void recompile(Context& context)
 	{
-		printf("\n");
+		fprintf(context.log, "\n");
 		
 		if (!fs::exists(context.output_tags_folder))
 		{
@@ -33,28 +30,53 @@ namespace SWFRecomp
 		context.output_tags_folder = string("") + context.output_tags_folder + ((char) fs::path::preferred_separator);
 		context.output_scripts_folder = string("") + context.output_scripts_folder + ((char) fs::path::preferred_separator);
 		
-		context.tag_main = ofstream(string("") + context.output_tags_folder + "tagMain.c", ios_base::out);
+		context.tag_main.open(string("") + context.output_tags_folder + "tagMain.c", context.outputs);
 		
-		context.constants = ofstream(string("") + context.output_tags_folder + "constants.c", ios_base::out);
+		context.constants.open(string("") + context.output_tags_folder + "constants.c", context.outputs);
 		
-		context.constants_header = ofstream(string("") + context.output_tags_folder + "constants.h", ios_base::out);
+		context.constants_header.open(string("") + context.output_tags_folder + "constants.h", context.outputs);
 		context.constants_header << "#pragma once" << endl << endl;
 		
-		context.out_draws = ofstream(string("") + context.output_tags_folder + "draws.c", ios_base::out);
-		context.out_draws << "#include \"recomp.h\"" << endl
-						  << "#include \"draws.h\"";
+		context.out_draws.open(context.output_tags_folder, "draws",
+							   "#include \"recomp.h\"\n"
+							   "#include \"draws.h\"",
+							   context.max_file_size, context.outputs);
 		
-		context.out_draws_header = ofstream(string("") + context.output_tags_folder + "draws.h", ios_base::out);
+		context.out_draws_header.open(string("") + context.output_tags_folder + "draws.h", context.outputs);
 		context.out_draws_header << "#pragma once" << endl;
 		
 		SWF swf = SWF(context);
 		
 		swf.parseAllTags(context);
 		
+		// Curve flattening decides most of the shape data's size
+		fprintf(context.log, "Shapes: %zu, %zu curves, %zu vertices (%zu with fixed curve subdivision), %zu triangles\n",
+				swf.num_shapes, swf.num_curves, swf.num_shape_verts, swf.num_fixed_shape_verts, swf.current_tri);
+		
+		// A batch recompiles many movies in one process
+		delete[] swf.swf_buffer;
+		
 		context.tag_main.close();
 		context.constants.close();
 		context.constants_header.close();
 		context.out_draws.close();
 		context.out_draws_header.close();
+		
+		removeStaleOutputs(context.output_tags_folder, context.outputs);
+		removeStaleOutputs(context.output_scripts_folder, context.outputs);
+		
+		// Builds only need to recompile what changed
+		fprintf(context.log, "Outputs: %zu changed, %zu unchanged, %zu removed\n",
+				context.outputs.changed.size(), context.outputs.unchanged.size(), context.outputs.removed.size());
+		
+		for (const string& path : context.outputs.changed)
+		{
+			fprintf(context.log, "  changed: %s\n", path.c_str());
+		}
+		
+		for (const string& path : context.outputs.removed)
+		{
+			fprintf(context.log, "  removed: %s\n", path.c_str());
+		}
 	}
 };
\ No newline at end of file
@@ -1,8 +1,12 @@
 #define _USE_MATH_DEFINES
 #include <algorithm>
 #include <array>
+#include <atomic>
 #include <cmath>
+#include <condition_variable>
 #include <iomanip>
+#include <mutex>
+#include <thread>
 
 #include <zlib.h>
 #include <lzma.h>
@@ -20,6 +24,10 @@
 
 #define CROSS(v1, v2) (v1.x*v2.y - v2.x*v1.y)
 
+// Segments per curve without a curve tolerance, and at most with one
+#define FIXED_CURVE_SEGMENTS 6
+#define MAX_CURVE_SEGMENTS 64
+
 #define NOT_SHARED_LINKS(path1, path2) (std::find(path1.next_neighbors_forward.begin(), path1.next_neighbors_forward.end(), &path2) == path1.next_neighbors_forward.end() && \
 										std::find(path2.next_neighbors_forward.begin(), path2.next_neighbors_forward.end(), &path1) == path2.next_neighbors_forward.end() && \
 										std::find(path1.next_neighbors_backward.begin(), path1.next_neighbors_backward.end(), &path2) == path1.next_neighbors_backward.end() && \
@@ -53,25 +61,17 @@ namespace SWFRecomp
 		memcpy(this, swf_buffer, 8);
 	}
 	
-	void SWFHeader::loadOtherData(char*& swf_buffer)
+	void SWFHeader::loadOtherData(char*& swf_buffer, char* swf_end, FILE* log)
 	{
-		SWFTag rect;
-		
-		rect.setFieldCount(5);
+		BitReader rect(swf_buffer, swf_end);
 		
-		rect.configureNextField(SWF_FIELD_UB, 5, true);
-		rect.configureNextField(SWF_FIELD_SB, 0);
-		rect.configureNextField(SWF_FIELD_SB, 0);
-		rect.configureNextField(SWF_FIELD_SB, 0);
-		rect.configureNextField(SWF_FIELD_SB, 0);
+		frame_size.nbits = (u8) rect.readUB(5);
+		frame_size.xmin = rect.readSB(frame_size.nbits);
+		frame_size.xmax = rect.readSB(frame_size.nbits);
+		frame_size.ymin = rect.readSB(frame_size.nbits);
+		frame_size.ymax = rect.readSB(frame_size.nbits);
 		
-		rect.parseFields(swf_buffer);
-		
-		frame_size.nbits = (u8) rect.fields[0].value;
-		frame_size.xmin = (s32) rect.fields[1].value;
-		frame_size.xmax = (s32) rect.fields[2].value;
-		frame_size.ymin = (s32) rect.fields[3].value;
-		frame_size.ymax = (s32) rect.fields[4].value;
+		swf_buffer = rect.align();
 		
 		framerate = *((u16*) swf_buffer);
 		swf_buffer += 2;
@@ -79,27 +79,27 @@ namespace SWFRecomp
 		frame_count = *((u16*) swf_buffer);
 		swf_buffer += 2;
 		
-		printf("\n");
+		fprintf(log, "\n");
 		
-		printf("SWF version: %d\n", version);
-		printf("Decompressed file length: %d\n", file_length);
+		fprintf(log, "SWF version: %d\n", version);
+		fprintf(log, "Decompressed file length: %d\n", file_length);
 		
-		printf("\n");
+		fprintf(log, "\n");
 		
-		printf("Window dimensions:\n");
-		printf("xmin: %d twips\n", frame_size.xmin);
-		printf("xmax: %d twips\n", frame_size.xmax);
-		printf("ymin: %d twips\n", frame_size.ymin);
-		printf("ymax: %d twips\n", frame_size.ymax);
+		fprintf(log, "Window dimensions:\n");
+		fprintf(log, "xmin: %d twips\n", frame_size.xmin);
+		fprintf(log, "xmax: %d twips\n", frame_size.xmax);
+		fprintf(log, "ymin: %d twips\n", frame_size.ymin);
+		fprintf(log, "ymax: %d twips\n", frame_size.ymax);
 		
-		printf("\n");
+		fprintf(log, "\n");
 		
-		printf("Which means resolution is %dx%d\n", (frame_size.xmax - frame_size.xmin)/20, (frame_size.ymax - frame_size.ymin)/20);
+		fprintf(log, "Which means resolution is %dx%d\n", (frame_size.xmax - frame_size.xmin)/20, (frame_size.ymax - frame_size.ymin)/20);
 		
-		printf("\n");
+		fprintf(log, "\n");
 		
-		printf("FPS: %d\n", framerate >> 8);
-		printf("SWF frame count: %d\n", frame_count);
+		fprintf(log, "FPS: %d\n", framerate >> 8);
+		fprintf(log, "SWF frame count: %d\n", frame_count);
 	}
 	
 	
@@ -121,6 +121,11 @@ namespace SWFRecomp
 								 current_gradient(0),
 								 current_bitmap_pixel(0),
 								 current_bitmap(0),
+								 curve_tolerance(context.curve_tolerance),
+								 num_shapes(0),
+								 num_shape_verts(0),
+								 num_fixed_shape_verts(0),
+								 num_curves(0),
 								 jpeg_tables(nullptr)
 	{
 		// Configure reusable struct records
@@ -132,7 +137,7 @@ namespace SWFRecomp
 		RGB.configureNextField(SWF_FIELD_UI8);  // Green
 		RGB.configureNextField(SWF_FIELD_UI8);  // Blue
 		
-		printf("Reading %s...\n", context.swf_path.c_str());
+		fprintf(context.log, "Reading %s...\n", context.swf_path.c_str());
 		
 		ifstream swf_file(context.swf_path, ios_base::in | ios_base::binary);
 		if (!swf_file.good())
@@ -156,7 +161,7 @@ namespace SWFRecomp
 			{
 				// uncompressed
 				
-				printf("SWF is uncompressed.\n");
+				fprintf(context.log, "SWF is uncompressed.\n");
 				
 				break;
 			}
@@ -165,7 +170,7 @@ namespace SWFRecomp
 			{
 				// zlib
 				
-				printf("SWF is compressed with zlib. Decompressing...\n");
+				fprintf(context.log, "SWF is compressed with zlib. Decompressing...\n");
 				
 				char* swf_buffer_uncompressed = new char[header.file_length];
 				memcpy(swf_buffer_uncompressed, swf_buffer, 8);
@@ -185,7 +190,7 @@ namespace SWFRecomp
 				// I'm not sure if they just didn't get it, or what...
 				// Whatever this mangled garbage is, it's NOT REAL LZMA.
 				
-				printf("SWF is compressed with LZMA. Decompressing...\n");
+				fprintf(context.log, "SWF is compressed with LZMA. Decompressing...\n");
 				
 				char* swf_buffer_uncompressed = new char[header.file_length];
 				memcpy(swf_buffer_uncompressed, swf_buffer, 8);
@@ -230,9 +235,16 @@ namespace SWFRecomp
 			}
 		}
 		
+		swf_end = swf_buffer + MIN(swf_size, (size_t) header.file_length);
+		
+		if (header.compression != 'F')
+		{
+			swf_end = swf_buffer + header.file_length;
+		}
+		
 		cur_pos = swf_buffer + 8;
 		
-		header.loadOtherData(cur_pos);
+		header.loadOtherData(cur_pos, swf_end, context.log);
 		
 		std::string width = to_string(FRAME_WIDTH/20);
 		std::string height = to_string(FRAME_HEIGHT/20);
@@ -269,81 +281,119 @@ namespace SWFRecomp
 						  << "};";
 	}
 	
-	void SWF::parseMatrix(MATRIX& matrix_out)
+	void SWF::parseMatrix(char*& pos, MATRIX& matrix_out)
 	{
-		u32 cur_byte_bits_left = 8;
-		
-		SWFTag matrix_tag;
-		
-		matrix_tag.clearFields();
-		matrix_tag.setFieldCount(1);
-		
-		matrix_tag.configureNextField(SWF_FIELD_UB, 1);
-		
-		matrix_tag.parseFieldsContinue(cur_pos, cur_byte_bits_left);
-		
-		bool has_scale = matrix_tag.fields[0].value & 1;
+		BitReader matrix(pos, swf_end);
 		
 		matrix_out.scale_x = 1;
 		matrix_out.scale_y = 1;
 		
-		if (has_scale)
+		if (matrix.readFlag())
 		{
-			matrix_tag.clearFields();
-			matrix_tag.setFieldCount(3);
+			u32 nbits = matrix.readUB(5);
 			
-			matrix_tag.configureNextField(SWF_FIELD_UB, 5, true);
-			matrix_tag.configureNextField(SWF_FIELD_FB, 0);
-			matrix_tag.configureNextField(SWF_FIELD_FB, 0);
-			
-			matrix_tag.parseFieldsContinue(cur_pos, cur_byte_bits_left);
+			matrix_out.scale_x = matrix.readFB(nbits);
+			matrix_out.scale_y = matrix.readFB(nbits);
+		}
+		
+		matrix_out.rotateskew_0 = 0;
+		matrix_out.rotateskew_1 = 0;
+		
+		if (matrix.readFlag())
+		{
+			u32 nbits = matrix.readUB(5);
 			
-			matrix_out.scale_x = VAL(float, &matrix_tag.fields[1].value);
-			matrix_out.scale_y = VAL(float, &matrix_tag.fields[2].value);
+			matrix_out.rotateskew_0 = matrix.readFB(nbits);
+			matrix_out.rotateskew_1 = matrix.readFB(nbits);
 		}
 		
-		matrix_tag.clearFields();
-		matrix_tag.setFieldCount(1);
+		u32 nbits = matrix.readUB(5);
 		
-		matrix_tag.configureNextField(SWF_FIELD_UB, 1);
+		matrix_out.translate_x = matrix.readSB(nbits);
+		matrix_out.translate_y = matrix.readSB(nbits);
 		
-		matrix_tag.parseFieldsContinue(cur_pos, cur_byte_bits_left);
+		pos = matrix.align();
+	}
+	
+	void SWF::parseColorTransform(char*& pos, CXFORM& cxform_out, bool has_alpha)
+	{
+		BitReader cxform(pos, swf_end);
 		
-		bool has_rotate = matrix_tag.fields[0].value & 1;
+		bool has_add_terms = cxform.readFlag();
+		bool has_mult_terms = cxform.readFlag();
+		u32 nbits = cxform.readUB(4);
 		
-		matrix_out.rotateskew_0 = 0;
-		matrix_out.rotateskew_1 = 0;
+		u32 num_terms = has_alpha ? 4 : 3;
 		
-		if (has_rotate)
+		for (u32 i = 0; i < 4; ++i)
 		{
-			matrix_tag.clearFields();
-			matrix_tag.setFieldCount(3);
-			
-			matrix_tag.configureNextField(SWF_FIELD_UB, 5, true);
-			matrix_tag.configureNextField(SWF_FIELD_FB, 0);
-			matrix_tag.configureNextField(SWF_FIELD_FB, 0);
-			
-			matrix_tag.parseFieldsContinue(cur_pos, cur_byte_bits_left);
-			
-			matrix_out.rotateskew_0 = VAL(float, &matrix_tag.fields[1].value);
-			matrix_out.rotateskew_1 = VAL(float, &matrix_tag.fields[2].value);
+			cxform_out.mult_terms[i] = 256;
+			cxform_out.add_terms[i] = 0;
+		}
+		
+		if (has_mult_terms)
+		{
+			for (u32 i = 0; i < num_terms; ++i)
+			{
+				cxform_out.mult_terms[i] = (s16) cxform.readSB(nbits);
+			}
 		}
 		
-		matrix_tag.clearFields();
-		matrix_tag.setFieldCount(3);
+		if (has_add_terms)
+		{
+			for (u32 i = 0; i < num_terms; ++i)
+			{
+				cxform_out.add_terms[i] = (s16) cxform.readSB(nbits);
+			}
+		}
+		
+		pos = cxform.align();
+	}
+	
+	void SWF::parseRect(char*& pos, RECT& rect_out)
+	{
+		BitReader rect(pos, swf_end);
 		
-		matrix_tag.configureNextField(SWF_FIELD_UB, 5, true);
-		matrix_tag.configureNextField(SWF_FIELD_SB, 0);
-		matrix_tag.configureNextField(SWF_FIELD_SB, 0);
+		rect_out.nbits = (u8) rect.readUB(5);
+		rect_out.xmin = rect.readSB(rect_out.nbits);
+		rect_out.xmax = rect.readSB(rect_out.nbits);
+		rect_out.ymin = rect.readSB(rect_out.nbits);
+		rect_out.ymax = rect.readSB(rect_out.nbits);
 		
-		matrix_tag.parseFieldsContinue(cur_pos, cur_byte_bits_left);
+		pos = rect.align();
+	}
+	
+	void SWF::indexTags(std::vector<TagIndexEntry>& tags)
+	{
+		char* pos = cur_pos;
 		
-		matrix_out.translate_x = (s32) matrix_tag.fields[1].value;
-		matrix_out.translate_y = (s32) matrix_tag.fields[2].value;
+		SWFTag tag;
+		tag.code = (TagType) 1;
 		
-		if (cur_byte_bits_left != 8)
+		while (tag.code != SWF_TAG_END_TAG)
 		{
-			cur_pos += 1;
+			if (swf_end - pos < 2)
+			{
+				EXC("SWF ends without an End tag\n");
+			}
+			
+			TagIndexEntry entry;
+			entry.header = pos;
+			
+			tag.parseHeader(pos);
+			
+			entry.code = tag.code;
+			entry.length = tag.length;
+			entry.data = pos;
+			
+			if (tag.length > (size_t) (swf_end - pos))
+			{
+				EXC_ARG("Tag type %d runs past the end of the SWF\n", tag.code);
+			}
+			
+			pos += tag.length;
+			
+			tags.push_back(entry);
 		}
 	}
 	
@@ -359,50 +409,171 @@ namespace SWFRecomp
 				 << "{" << endl;
 		next_frame_i += 1;
 		
-		context.out_script_header = ofstream(context.output_scripts_folder + "out.h", ios_base::out);
+		context.out_script_header.open(context.output_scripts_folder + "out.h", context.outputs);
 		context.out_script_header << "#pragma once" << endl;
 		
-		context.out_script_defs = ofstream(context.output_scripts_folder + "script_defs.c", ios_base::out);
-		context.out_script_defs << "#include \"script_decls.h\"" << endl;
-		context.out_script_defs << "#include <string.h>" << endl;  // For memset
+		context.out_script_defs.open(context.output_scripts_folder, "script_defs",
+									 "#include \"script_decls.h\"\n"
+									 "#include <string.h>\n",  // For memset
+									 context.max_file_size, context.outputs);
 		
-		context.out_script_decls = ofstream(context.output_scripts_folder + "script_decls.h", ios_base::out);
+		context.out_script_decls.open(context.output_scripts_folder + "script_decls.h", context.outputs);
 		context.out_script_decls << "#pragma once" << endl << endl
 								 << "#include <stackvalue.h>" << endl
 								 << "#include <variables.h>" << endl
 								 << "#include <actionmodern/action.h>" << endl;
 		
 		// output identity matrix at transform id 0
-		transform_data << "\t" << "1.0f," << endl
-					   << "\t" << "0.0f," << endl
-					   << "\t" << "0.0f," << endl
-					   << "\t" << "0.0f," << endl
-					   
-					   << "\t" << "0.0f," << endl
-					   << "\t" << "1.0f," << endl
-					   << "\t" << "0.0f," << endl
-					   << "\t" << "0.0f," << endl
-					   
-					   << "\t" << "0.0f," << endl
-					   << "\t" << "0.0f," << endl
-					   << "\t" << "1.0f," << endl
-					   << "\t" << "0.0f," << endl
-					   
-					   << "\t" << "0.0f," << endl
-					   << "\t" << "0.0f," << endl
-					   << "\t" << "0.0f," << endl
-					   << "\t" << "1.0f," << endl;
+		for (int i = 0; i < 16; ++i)
+		{
+			transform_data.pushFloat(i%5 == 0 ? 1.0f : 0.0f);
+		}
 		
 		current_transform += 1;
 		
-		// prime the loop
-		tag.code = (TagType) 1;
+		std::vector<TagIndexEntry> tags;
+		indexTags(tags);
+		
+		// Triangulate shapes and decode JPEGs ahead of time on worker
+		// threads, then interpret every tag in order with their results
+		std::vector<TagJob> jobs;
+		std::vector<size_t> tag_jobs(tags.size(), SIZE_MAX);
+		
+		const TagIndexEntry* jpeg_tables_tag = nullptr;
+		
+		for (size_t i = 0; i < tags.size(); ++i)
+		{
+			switch (tags[i].code)
+			{
+				case SWF_TAG_JPEG_TABLES:
+				{
+					if (jpeg_tables_tag == nullptr)
+					{
+						jpeg_tables_tag = &tags[i];
+					}
+					
+					continue;
+				}
+				
+				case SWF_TAG_DEFINE_BITS:
+				{
+					if (jpeg_tables_tag == nullptr)
+					{
+						continue;
+					}
+					
+					break;
+				}
+				
+				case SWF_TAG_DEFINE_SHAPE:
+				case SWF_TAG_DEFINE_SHAPE_2:
+				case SWF_TAG_DEFINE_FONT:
+				{
+					break;
+				}
+				
+				default:
+				{
+					continue;
+				}
+			}
+			
+			tag_jobs[i] = jobs.size();
+			
+			jobs.push_back(TagJob());
+			jobs.back().tag = &tags[i];
+			jobs.back().jpeg_tables = jpeg_tables_tag;
+			jobs.back().done = false;
+		}
+		
+		size_t num_threads = context.tag_threads;
+		
+		if (num_threads == 0)
+		{
+			num_threads = std::max(1u, std::thread::hardware_concurrency());
+		}
+		
+		num_threads = std::min(num_threads, jobs.size());
+		
+		std::atomic<size_t> next_job(0);
+		std::atomic<bool> stop(false);
+		std::mutex job_mutex;
+		std::condition_variable job_done;
+		
+		auto worker = [&]()
+		{
+			for (size_t i = next_job++; i < jobs.size() && !stop; i = next_job++)
+			{
+				runTagJob(jobs[i]);
+				
+				std::lock_guard<std::mutex> lock(job_mutex);
+				jobs[i].done = true;
+				job_done.notify_all();
+			}
+		};
+		
+		// Stops and joins the workers, also when a tag throws
+		struct Workers
+		{
+			std::vector<std::thread> threads;
+			std::atomic<bool>& stop;
+			
+			~Workers()
+			{
+				stop = true;
+				
+				for (std::thread& thread : threads)
+				{
+					thread.join();
+				}
+			}
+		} workers{{}, stop};
+		
+		// With one thread, each job runs when its tag is interpreted
+		if (num_threads > 1)
+		{
+			for (size_t i = 0; i < num_threads; ++i)
+			{
+				workers.threads.emplace_back(worker);
+			}
+		}
 		
-		while (tag.code != 0)
+		for (size_t i = 0; i < tags.size(); ++i)
 		{
+			TagJob* job = nullptr;
+			
+			if (tag_jobs[i] != SIZE_MAX)
+			{
+				job = &jobs[tag_jobs[i]];
+				
+				if (workers.threads.empty())
+				{
+					runTagJob(*job);
+				}
+				
+				else
+				{
+					std::unique_lock<std::mutex> lock(job_mutex);
+					job_done.wait(lock, [job]() { return job->done; });
+				}
+				
+				if (job->error)
+				{
+					std::rethrow_exception(job->error);
+				}
+			}
+			
+			cur_pos = tags[i].header;
+			
 			tag.parseHeader(cur_pos);
-			interpretTag(context, tag);
+			interpretTag(context, tag, job);
 			tag.clearFields();
+			
+			if (job != nullptr)
+			{
+				// Done with the triangles and pixels
+				*job = TagJob();
+			}
 		}
 		
 		context.tag_main << endl << endl
@@ -466,45 +637,16 @@ namespace SWFRecomp
 						 << tag_init.str() << endl
 						 << "}";
 		
-		context.out_draws << endl << endl;
-		
-		context.out_draws << "u32 shape_data[" << to_string(current_tri ? 3*current_tri : 1) << "][4] =" << endl
-						  << "{" << endl
-						  << (current_tri ? shape_data.str() : "\t0\n")
-						  << "};" << endl
-						  << endl
-						  << "float transform_data[" << to_string(current_transform ? current_transform : 1) << "][16] =" << endl
-						  << "{" << endl
-						  << (current_transform ? transform_data.str() : "\t0\n")
-						  << "};" << endl
-						  << endl
-						  << "float color_data[" << to_string(current_color ? current_color : 1) << "][4] =" << endl
-						  << "{" << endl
-						  << (current_color ? color_data.str() : "\t0\n")
-						  << "};" << endl
-						  << endl
-						  << "float uninv_mat_data[" << to_string(current_uninv ? 16*current_uninv : 1) << "] =" << endl
-						  << "{" << endl
-						  << (current_uninv ? uninv_mat_data.str() : "\t0\n")
-						  << "};" << endl
-						  << endl
-						  << "u8 gradient_data[" << to_string(current_gradient ? 256*current_gradient : 1) << "][4] =" << endl
-						  << "{" << endl
-						  << (current_gradient ? gradient_data.str() : "\t0\n")
-						  << "};" << endl
-						  << endl
-						  << "u8 bitmap_data[" << to_string(current_bitmap_pixel ? 4*current_bitmap_pixel : 1) << "] =" << endl
-						  << "{" << endl
-						  << (current_bitmap_pixel ? bitmap_data.str() : "\t0\n")
-						  << "};";
+		// Size the tables by their counters, as the runtime indexes them
+		// (e.g. gradients are 256 rows apart, whatever their ratios cover)
+		shape_data.padRows(3*current_tri);
+		transform_data.padRows(current_transform);
+		color_data.padRows(current_color);
+		uninv_mat_data.padRows(16*current_uninv);
+		gradient_data.padRows(256*current_gradient);
+		bitmap_data.padRows(4*current_bitmap_pixel);
 		
-		context.out_draws_header << endl
-								 << "extern u32 shape_data[" << to_string(current_tri ? 3*current_tri : 1) << "][4];" << endl
-								 << "extern float transform_data[" << to_string(current_transform ? current_transform : 1) << "][16];" << endl
-								 << "extern float color_data[" << to_string(current_color ? current_color : 1) << "][4];" << endl
-								 << "extern float uninv_mat_data[" << to_string(current_uninv ? 16*current_uninv : 1) << "];" << endl
-								 << "extern u8 gradient_data[" << to_string(current_gradient ? 256*current_gradient : 1) << "][4];" << endl
-								 << "extern u8 bitmap_data[" << to_string(current_bitmap_pixel ? 4*current_bitmap_pixel : 1) << "];";
+		writeDataTables(context, {&shape_data, &transform_data, &color_data, &uninv_mat_data, &gradient_data, &bitmap_data});
 		
 		size_t highest_w = 0;
 		size_t highest_h = 0;
@@ -536,9 +678,60 @@ namespace SWFRecomp
 		context.out_script_decls.close();
 	}
 	
-	void SWF::interpretTag(Context& context, SWFTag& tag)
+	// The count of a FILLSTYLEARRAY or LINESTYLEARRAY
+	u16 parseStyleCount(char*& pos)
+	{
+		u16 count = (u8) *pos;
+		pos += 1;
+		
+		if (count == 0xFF)
+		{
+			count = VAL(u16, pos);
+			pos += 2;
+		}
+		
+		return count;
+	}
+	
+	// Skip the markers in front of JPEGTables data
+	void trimJpegTables(char*& data, size_t& length)
+	{
+		if ((u8) data[0] == 0xFF &&
+			(u8) data[1] == 0xD9 &&
+			(u8) data[2] == 0xFF &&
+			(u8) data[3] == 0xD8)
+		{
+			data += 2;
+			length -= 2;
+		}
+		
+		length -= 2;
+	}
+	
+	// Skip the markers in front of DefineBits data
+	void trimJpegData(char*& data, size_t& length)
+	{
+		// stupid swf edge cases are stupid
+		if ((u8) data[0] == 0xFF &&
+			(u8) data[1] == 0xD9 &&
+			(u8) data[2] == 0xFF &&
+			(u8) data[3] == 0xD8)
+		{
+			data += 4;
+			length -= 4;
+		}
+		
+		else if ((u8) data[0] == 0xFF &&
+				 (u8) data[1] == 0xD8)
+		{
+			data += 2;
+			length -= 2;
+		}
+	}
+	
+	void SWF::interpretTag(Context& context, SWFTag& tag, TagJob* job)
 	{
-		printf("tag code: %d, tag length: %d\n", tag.code, tag.length);
+		fprintf(context.log, "tag code: %d, tag length: %d\n", tag.code, tag.length);
 		
 		if (another_frame && tag.code != SWF_TAG_END_TAG)
 		{
@@ -603,8 +796,6 @@ namespace SWFRecomp
 					EXC("JPEG bitmap tag encountered before JPEGTables!\n");
 				}
 				
-				size_t new_length = tag.length;
-				
 				tag.clearFields();
 				tag.setFieldCount(1);
 				
@@ -613,47 +804,11 @@ namespace SWFRecomp
 				tag.parseFields(cur_pos);
 				
 				u16 char_id = (u16) tag.fields[0].value;
-				new_length -= 2;
-				
-				// stupid swf edge cases are stupid
-				if ((u8) cur_pos[0] == 0xFF &&
-					(u8) cur_pos[1] == 0xD9 &&
-					(u8) cur_pos[2] == 0xFF &&
-					(u8) cur_pos[3] == 0xD8)
-				{
-					cur_pos += 4;
-					new_length -= 4;
-				}
-				
-				else if ((u8) cur_pos[0] == 0xFF &&
-						 (u8) cur_pos[1] == 0xD8)
-				{
-					cur_pos += 2;
-					new_length -= 2;
-				}
-				
-				size_t jpeg_data_size = new_length + jpeg_tables_size;
-				u8* jpeg_data = new u8[jpeg_data_size];
 				
-				for (size_t i = 0; i < jpeg_tables_size; ++i)
-				{
-					jpeg_data[i] = jpeg_tables[i];
-				}
-				
-				for (size_t i = jpeg_tables_size; i < jpeg_data_size; ++i)
-				{
-					jpeg_data[i] = cur_pos[i - jpeg_tables_size];
-				}
-				
-				int w;
-				int h;
-				int comp;
-				u8* decompressed = stbi_load_from_memory(jpeg_data, (int) jpeg_data_size, &w, &h, &comp, 3);
+				JpegImage& image = job->image;
 				
-				if (decompressed == nullptr)
-				{
-					EXC("JPEG data returned NULL.\n");
-				}
+				int w = image.w;
+				int h = image.h;
 				
 				Vertex v;
 				v.x = w;
@@ -665,15 +820,16 @@ namespace SWFRecomp
 				
 				for (size_t i = 0; i < 3*w*h; i += 3)
 				{
-					bitmap_data << std::hex << std::uppercase << std::setw(2)
-								<< "\t0x" << (u32) decompressed[i] << "," << endl
-								<< "\t0x" << (u32) decompressed[i + 1] << "," << endl
-								<< "\t0x" << (u32) decompressed[i + 2] << "," << endl
-								<< "\t0xFF," << endl;
+					bitmap_data.pushU8(image.rgb[i]);
+					bitmap_data.pushU8(image.rgb[i + 1]);
+					bitmap_data.pushU8(image.rgb[i + 2]);
+					bitmap_data.pushU8(0xFF);
 					
 					current_bitmap_pixel += 1;
 				}
 				
+				image.rgb = std::vector<u8>();
+				
 				char_id_to_bitmap_id[char_id] = current_bitmap;
 				
 				tag_init << endl
@@ -686,8 +842,6 @@ namespace SWFRecomp
 				
 				current_bitmap += 1;
 				
-				cur_pos += new_length;
-				
 				break;
 			}
 			
@@ -698,26 +852,15 @@ namespace SWFRecomp
 					EXC("More than one JPEGTables tag detected.\n");
 				}
 				
-				size_t new_length = tag.length;
-				
-				if ((u8) cur_pos[0] == 0xFF &&
-					(u8) cur_pos[1] == 0xD9 &&
-					(u8) cur_pos[2] == 0xFF &&
-					(u8) cur_pos[3] == 0xD8)
-				{
-					cur_pos += 2;
-					new_length -= 2;
-				}
+				char* tables = cur_pos;
+				size_t tables_size = tag.length;
 				
-				jpeg_tables = new u8[new_length - 2];
-				jpeg_tables_size = new_length - 2;
+				trimJpegTables(tables, tables_size);
 				
-				for (size_t i = 0; i < new_length - 2; ++i)
-				{
-					jpeg_tables[i] = cur_pos[i];
-				}
+				jpeg_tables = new u8[tables_size];
+				jpeg_tables_size = tables_size;
 				
-				cur_pos += new_length;
+				memcpy(jpeg_tables, tables, tables_size);
 				
 				break;
 			}
@@ -725,7 +868,7 @@ namespace SWFRecomp
 			case SWF_TAG_DEFINE_SHAPE:
 			case SWF_TAG_DEFINE_SHAPE_2:
 			{
-				interpretShape(context, tag);
+				defineShape(context, job->shapes[0]);
 				
 				break;
 			}
@@ -744,48 +887,10 @@ namespace SWFRecomp
 			
 			case SWF_TAG_DEFINE_FONT:
 			{
-				tag.clearFields();
-				tag.setFieldCount(1);
-				
-				tag.configureNextField(SWF_FIELD_UI16);
-				
-				tag.parseFields(cur_pos);
-				
-				u16 font_id = (u16) tag.fields[0].value;
-				
-				char* offset_table = cur_pos;
-				
-				tag.clearFields();
-				tag.setFieldCount(1);
-				
-				tag.configureNextField(SWF_FIELD_UI16);
-				
-				tag.parseFields(cur_pos);
-				
-				std::vector<u16> entry_offsets;
-				entry_offsets.push_back((u16) tag.fields[0].value);
-				
-				u16 num_entries = entry_offsets.back()/2;
-				
-				tag.clearFields();
-				tag.setFieldCount(num_entries - 1);
-				
-				for (u16 i = 0; i < num_entries - 1; ++i)
-				{
-					tag.configureNextField(SWF_FIELD_UI16);
-				}
-				
-				tag.parseFields(cur_pos);
-				
-				for (u16 i = 0; i < num_entries - 1; ++i)
-				{
-					entry_offsets.push_back((u16) tag.fields[i].value);
-				}
-				
-				for (u16 i = 0; i < num_entries; ++i)
+				// TODO: glyphs are defined with shape ID 0
+				for (ShapeMesh& glyph : job->shapes)
 				{
-					cur_pos = offset_table + entry_offsets[i];
-					interpretShape(context, tag);
+					defineShape(context, glyph);
 				}
 				
 				break;
@@ -795,19 +900,30 @@ namespace SWFRecomp
 			{
 				context.out_script_header << endl << "void script_" << to_string(next_script_i) << "(char* stack, u32* sp);";
 
-				ofstream out_script(context.output_scripts_folder + "script_" + to_string(next_script_i) + ".c", ios_base::out);
-				out_script << "#include <recomp.h>" << endl
-						   << "#include <setjmp.h>" << endl
-						   << "#include \"script_decls.h\"" << endl << endl
-						   << "void script_" << next_script_i << "(char* stack, u32* sp)" << endl
-						   << "{" << endl;
-				out_script << "\t" << "char str_buffer[17];" << endl << endl;
+				string script_name = "script_" + to_string(next_script_i);
+				std::vector<string> parts;
 				
 				next_script_i += 1;
 				
-				action.parseActions(context, cur_pos, out_script);
+				action.parseActions(context, cur_pos, script_name, parts);
 				
-				out_script << "}";
+				// Large scripts continue in script_N_1.c, script_N_2.c, ...
+				for (size_t part = 0; part < parts.size(); part++)
+				{
+					string part_name = script_name + (part == 0 ? "" : "_" + to_string(part));
+					
+					OutputFile out_script;
+					out_script.open(context.output_scripts_folder + part_name + ".c", context.outputs);
+					out_script << "#include <recomp.h>" << endl
+							   << "#include <setjmp.h>" << endl
+							   << "#include \"script_decls.h\"" << endl << endl
+							   << "void " << part_name << "(char* stack, u32* sp)" << endl
+							   << "{" << endl;
+					out_script << "\t" << "char str_buffer[17];" << endl << endl;
+					out_script << parts[part];
+					out_script << "}";
+					out_script.close();
+				}
 				
 				break;
 			}
@@ -821,6 +937,8 @@ namespace SWFRecomp
 			
 			case SWF_TAG_PLACE_OBJECT_2:
 			{
+				char* tag_end = cur_pos + tag.length;
+				
 				tag.setFieldCount(2);
 				
 				tag.configureNextField(SWF_FIELD_UI8);
@@ -863,7 +981,7 @@ namespace SWFRecomp
 				if (has_matrix)
 				{
 					MATRIX matrix;
-					parseMatrix(matrix);
+					parseMatrix(cur_pos, matrix);
 					
 					recompileMatrix(matrix, transform_data);
 					current_transform += 1;
@@ -874,6 +992,16 @@ namespace SWFRecomp
 					transform_id = 0;
 				}
 				
+				if (has_color)
+				{
+					// TODO: pass the color transform to the runtime
+					CXFORM cxform;
+					parseColorTransform(cur_pos, cxform, true);
+				}
+				
+				// TODO: ratio, name, clip depth and clip actions
+				cur_pos = tag_end;
+				
 				context.tag_main << "\t" << "tagPlaceObject2(" << to_string(depth) << ", " << to_string(char_id) << ", " << to_string(transform_id) << ");" << endl;
 				
 				current_transform += 1;
@@ -967,35 +1095,27 @@ namespace SWFRecomp
 		return (u8) (start + t*diff);
 	}
 	
-	void SWF::recompileMatrix(MATRIX matrix, std::stringstream& out)
+	void SWF::recompileMatrix(MATRIX matrix, DataTable& out)
 	{
-		out << std::fixed << std::setprecision(15)
-			<< "\t" << matrix.scale_x << "f," << endl
-			<< "\t" << matrix.rotateskew_0 << "f," << endl
-			<< "\t" << "0.0f," << endl
-			<< "\t" << "0.0f," << endl
-			
-			<< "\t" << matrix.rotateskew_1 << "f," << endl
-			<< "\t" << matrix.scale_y << "f," << endl
-			<< "\t" << "0.0f," << endl
-			<< "\t" << "0.0f," << endl
-			
-			<< "\t" << "0.0f," << endl
-			<< "\t" << "0.0f," << endl
-			<< "\t" << "1.0f," << endl
-			<< "\t" << "0.0f," << endl
-			
-			<< "\t" << (float) matrix.translate_x << "f," << endl
-			<< "\t" << (float) matrix.translate_y << "f," << endl
-			<< "\t" << "0.0f," << endl
-			<< "\t" << "1.0f," << endl;
+		float values[16] =
+		{
+			matrix.scale_x, matrix.rotateskew_0, 0.0f, 0.0f,
+			matrix.rotateskew_1, matrix.scale_y, 0.0f, 0.0f,
+			0.0f, 0.0f, 1.0f, 0.0f,
+			(float) matrix.translate_x, (float) matrix.translate_y, 0.0f, 1.0f
+		};
+		
+		for (float value : values)
+		{
+			out.pushFloat(value);
+		}
 	}
 	
-	FillStyle* SWF::parseFillStyles(u16 fill_style_count)
+	std::vector<FillStyle> SWF::parseFillStyles(char*& pos, u16 fill_style_count)
 	{
 		SWFTag fill_data;
 		
-		FillStyle* fill_styles = new FillStyle[fill_style_count];
+		std::vector<FillStyle> fill_styles(fill_style_count);
 		
 		for (u16 i = 0; i < fill_style_count; ++i)
 		{
@@ -1004,9 +1124,10 @@ namespace SWFRecomp
 			
 			fill_data.configureNextField(SWF_FIELD_UI8, 8);
 			
-			fill_data.parseFields(cur_pos);
+			fill_data.parseFields(pos);
 			
 			fill_styles[i].type = (u8) fill_data.fields[0].value;
+			fill_styles[i].index = 0;
 			
 			switch (fill_styles[i].type)
 			{
@@ -1019,40 +1140,26 @@ namespace SWFRecomp
 					fill_data.configureNextField(SWF_FIELD_UI8, 8);
 					fill_data.configureNextField(SWF_FIELD_UI8, 8);
 					
-					fill_data.parseFields(cur_pos);
+					fill_data.parseFields(pos);
 					
 					fill_styles[i].r = (u8) fill_data.fields[0].value;
 					fill_styles[i].g = (u8) fill_data.fields[1].value;
 					fill_styles[i].b = (u8) fill_data.fields[2].value;
 					
-					fill_styles[i].index = current_color;
-					
-					color_data << "\t" << "{ "
-							   << to_string(fill_styles[i].r) << "/255.0f, "
-							   << to_string(fill_styles[i].g) << "/255.0f, "
-							   << to_string(fill_styles[i].b) << "/255.0f, "
-							   << "255/255.0f }," << endl;
-					
-					current_color += 1;
-					
 					break;
 				}
 				
 				case FILL_GRAD_LINEAR:
 				case FILL_GRAD_RADIAL:
 				{
-					MATRIX matrix;
-					parseMatrix(matrix);
-					
-					recompileMatrix(matrix, uninv_mat_data);
-					current_uninv += 1;
+					parseMatrix(pos, fill_styles[i].matrix);
 					
 					fill_data.clearFields();
 					fill_data.setFieldCount(1);
 					
 					fill_data.configureNextField(SWF_FIELD_UI8);
 					
-					fill_data.parseFields(cur_pos);
+					fill_data.parseFields(pos);
 					
 					// TODO: implement other spread and interpolation modes
 					
@@ -1063,67 +1170,21 @@ namespace SWFRecomp
 					for (int j = 0; j < fill_styles[i].gradient.num_grads; ++j)
 					{
 						fill_data.clearFields();
-						fill_data.setFieldCount(1);
+						fill_data.setFieldCount(4);
 						
+						fill_data.configureNextField(SWF_FIELD_UI8);
+						fill_data.configureNextField(SWF_FIELD_UI8);
+						fill_data.configureNextField(SWF_FIELD_UI8);
 						fill_data.configureNextField(SWF_FIELD_UI8);
 						
-						fill_data.parseFields(cur_pos);
+						fill_data.parseFields(pos);
 						
 						fill_styles[i].gradient.records[j].ratio = (u8) fill_data.fields[0].value;
-						
-						RGB.parseFields(cur_pos);
-						
-						fill_styles[i].gradient.records[j].r = (u8) RGB.fields[0].value;
-						fill_styles[i].gradient.records[j].g = (u8) RGB.fields[1].value;
-						fill_styles[i].gradient.records[j].b = (u8) RGB.fields[2].value;
-						
-						if (j == 0)
-						{
-							continue;
-						}
-						
-						GradientRecord& last_grad = fill_styles[i].gradient.records[j - 1];
-						GradientRecord& grad = fill_styles[i].gradient.records[j];
-						
-						for (u8 ratio = last_grad.ratio; ratio < grad.ratio; ++ratio)
-						{
-							float ratio_diff = (float) (grad.ratio - last_grad.ratio);
-							float t = (ratio - last_grad.ratio)/ratio_diff;
-							
-							u8 r = rgbLerp(last_grad.r, grad.r, t);
-							u8 g = rgbLerp(last_grad.g, grad.g, t);
-							u8 b = rgbLerp(last_grad.b, grad.b, t);
-							
-							gradient_data << "\t" << "{ "
-										  << to_string(r) << ", "
-										  << to_string(g) << ", "
-										  << to_string(b) << ", "
-										  << "255 },"
-										  << endl;
-						}
-						
-						if (grad.ratio == 255)
-						{
-							float ratio_diff = (float) (grad.ratio - last_grad.ratio);
-							float t = (255 - last_grad.ratio)/ratio_diff;
-							
-							u8 r = rgbLerp(last_grad.r, grad.r, t);
-							u8 g = rgbLerp(last_grad.g, grad.g, t);
-							u8 b = rgbLerp(last_grad.b, grad.b, t);
-							
-							gradient_data << "\t" << "{ "
-										  << to_string(r) << ", "
-										  << to_string(g) << ", "
-										  << to_string(b) << ", "
-										  << "255 },"
-										  << endl;
-						}
+						fill_styles[i].gradient.records[j].r = (u8) fill_data.fields[1].value;
+						fill_styles[i].gradient.records[j].g = (u8) fill_data.fields[2].value;
+						fill_styles[i].gradient.records[j].b = (u8) fill_data.fields[3].value;
 					}
 					
-					fill_styles[i].index = current_gradient;
-					
-					current_gradient += 1;
-					
 					break;
 				}
 				
@@ -1134,31 +1195,107 @@ namespace SWFRecomp
 					
 					fill_data.configureNextField(SWF_FIELD_UI16);
 					
-					fill_data.parseFields(cur_pos);
+					fill_data.parseFields(pos);
 					
-					u16 char_id = (u16) fill_data.fields[0].value;
+					fill_styles[i].bitmap_id = (u16) fill_data.fields[0].value;
 					
-					fill_styles[i].index = ((current_uninv & 0xFFFF) << 16) | char_id_to_bitmap_id[char_id];
+					parseMatrix(pos, fill_styles[i].matrix);
 					
-					MATRIX matrix;
-					parseMatrix(matrix);
+					break;
+				}
+			}
+		}
+		
+		return fill_styles;
+	}
+	
+	void SWF::defineFillStyles(std::vector<FillStyle>& fill_styles)
+	{
+		for (FillStyle& fill_style : fill_styles)
+		{
+			switch (fill_style.type)
+			{
+				case FILL_SOLID:
+				{
+					fill_style.index = current_color;
+					
+					color_data.pushFloat(fill_style.r/255.0f);
+					color_data.pushFloat(fill_style.g/255.0f);
+					color_data.pushFloat(fill_style.b/255.0f);
+					color_data.pushFloat(255/255.0f);
+					
+					current_color += 1;
+					
+					break;
+				}
+				
+				case FILL_GRAD_LINEAR:
+				case FILL_GRAD_RADIAL:
+				{
+					recompileMatrix(fill_style.matrix, uninv_mat_data);
+					current_uninv += 1;
+					
+					for (int j = 1; j < fill_style.gradient.num_grads; ++j)
+					{
+						GradientRecord& last_grad = fill_style.gradient.records[j - 1];
+						GradientRecord& grad = fill_style.gradient.records[j];
+						
+						for (u8 ratio = last_grad.ratio; ratio < grad.ratio; ++ratio)
+						{
+							float ratio_diff = (float) (grad.ratio - last_grad.ratio);
+							float t = (ratio - last_grad.ratio)/ratio_diff;
+							
+							u8 r = rgbLerp(last_grad.r, grad.r, t);
+							u8 g = rgbLerp(last_grad.g, grad.g, t);
+							u8 b = rgbLerp(last_grad.b, grad.b, t);
+							
+							gradient_data.pushU8(r);
+							gradient_data.pushU8(g);
+							gradient_data.pushU8(b);
+							gradient_data.pushU8(255);
+						}
+						
+						if (grad.ratio == 255)
+						{
+							float ratio_diff = (float) (grad.ratio - last_grad.ratio);
+							float t = (255 - last_grad.ratio)/ratio_diff;
+							
+							u8 r = rgbLerp(last_grad.r, grad.r, t);
+							u8 g = rgbLerp(last_grad.g, grad.g, t);
+							u8 b = rgbLerp(last_grad.b, grad.b, t);
+							
+							gradient_data.pushU8(r);
+							gradient_data.pushU8(g);
+							gradient_data.pushU8(b);
+							gradient_data.pushU8(255);
+						}
+					}
+					
+					fill_style.index = current_gradient;
+					
+					current_gradient += 1;
 					
-					recompileMatrix(matrix, uninv_mat_data);
+					break;
+				}
+				
+				case FILL_BITMAP_CLIPPED:
+				{
+					fill_style.index = ((current_uninv & 0xFFFF) << 16) | char_id_to_bitmap_id[fill_style.bitmap_id];
+					
+					recompileMatrix(fill_style.matrix, uninv_mat_data);
 					current_uninv += 1;
 					
 					break;
 				}
 			}
 		}
-		
-		return fill_styles;
 	}
 	
-	LineStyle* SWF::parseLineStyles(u16 line_style_count)
+	std::vector<LineStyle> SWF::parseLineStyles(char*& pos, u16 line_style_count)
 	{
 		SWFTag line_data;
 		
-		LineStyle* line_styles = new LineStyle[line_style_count];
+		std::vector<LineStyle> line_styles(line_style_count);
 		
 		for (u16 i = 0; i < line_style_count; ++i)
 		{
@@ -1170,7 +1307,7 @@ namespace SWFRecomp
 			line_data.configureNextField(SWF_FIELD_UI8, 8);
 			line_data.configureNextField(SWF_FIELD_UI8, 8);
 			
-			line_data.parseFields(cur_pos);
+			line_data.parseFields(pos);
 			
 			line_styles[i].width = (u16) line_data.fields[0].value;
 			
@@ -1178,754 +1315,589 @@ namespace SWFRecomp
 			line_styles[i].g = (u8) line_data.fields[2].value;
 			line_styles[i].b = (u8) line_data.fields[3].value;
 			
-			line_styles[i].index = current_color;
+			line_styles[i].index = 0;
+		}
+		
+		return line_styles;
+	}
+	
+	void SWF::defineLineStyles(std::vector<LineStyle>& line_styles)
+	{
+		for (LineStyle& line_style : line_styles)
+		{
+			line_style.index = current_color;
 			
-			color_data << "\t" << "{ "
-					   << to_string(line_styles[i].r) << "/255.0f, "
-					   << to_string(line_styles[i].g) << "/255.0f, "
-					   << to_string(line_styles[i].b) << "/255.0f, "
-					   << "255/255.0f }," << endl;
+			color_data.pushFloat(line_style.r/255.0f);
+			color_data.pushFloat(line_style.g/255.0f);
+			color_data.pushFloat(line_style.b/255.0f);
+			color_data.pushFloat(255/255.0f);
 			
 			current_color += 1;
 		}
+	}
+	
+	void SWF::buildFont(char* pos, std::vector<ShapeMesh>& glyphs)
+	{
+		// Skip the font ID
+		char* offset_table = pos + 2;
 		
-		return line_styles;
+		u16 num_entries = VAL(u16, offset_table)/2;
+		
+		glyphs.resize(num_entries);
+		
+		for (u16 i = 0; i < num_entries; ++i)
+		{
+			char* glyph_pos = offset_table + VAL(u16, &offset_table[2*i]);
+			buildShape(glyph_pos, true, glyphs[i]);
+		}
 	}
 	
-	void SWF::interpretShape(Context& context, SWFTag& shape_tag)
+	void SWF::defineShape(Context& context, ShapeMesh& mesh)
 	{
-		// TODO: DefineShape3
-		// TODO: DefineShape4
+		// Styles get their table indices in the order the shape lists them
+		for (size_t i = 0; i < mesh.fill_styles.size() || i < mesh.line_styles.size(); ++i)
+		{
+			if (i < mesh.fill_styles.size())
+			{
+				defineFillStyles(mesh.fill_styles[i]);
+			}
+			
+			if (i < mesh.line_styles.size())
+			{
+				defineLineStyles(mesh.line_styles[i]);
+			}
+		}
+		
+		if (mesh.empty)
+		{
+			return;
+		}
 		
-		bool is_font = shape_tag.code == SWF_TAG_DEFINE_FONT;
+		num_shapes += 1;
+		num_shape_verts += mesh.verts;
+		num_fixed_shape_verts += mesh.verts - mesh.curve_verts + FIXED_CURVE_SEGMENTS*mesh.curves;
+		num_curves += mesh.curves;
 		
-		switch (shape_tag.code)
+		for (const StyledTri& t : mesh.tris)
 		{
-			case SWF_TAG_DEFINE_SHAPE:
-			case SWF_TAG_DEFINE_SHAPE_2:
-			case SWF_TAG_DEFINE_FONT:
+			u32 type = 0x00;
+			size_t index;
+			
+			if (t.is_line)
 			{
-				u16 shape_id;
-				u16 fill_style_count;
-				std::vector<FillStyle*> all_fill_styles;
-				u16 line_style_count;
-				std::vector<LineStyle*> all_line_styles;
+				index = mesh.line_styles[t.style_list][t.style - 1].index;
+			}
+			
+			else
+			{
+				type = mesh.fill_styles[t.style_list][t.style - 1].type;
+				index = mesh.fill_styles[t.style_list][t.style - 1].index;
+			}
+			
+			for (int j = 0; j < 3; ++j)
+			{
+				float x_f = (float) t.tri.verts[j].x;
+				float y_f = (float) (FRAME_HEIGHT - t.tri.verts[j].y);
 				
-				if (!is_font)
+				shape_data.pushU32(VAL(u32, &x_f));
+				shape_data.pushU32(VAL(u32, &y_f));
+				shape_data.pushU32(type);
+				shape_data.pushU32((u32) index);
+			}
+		}
+		
+		context.tag_main << "\t" << "tagDefineShape(" << to_string(mesh.shape_id) << ", " << to_string(3*current_tri) << ", " << to_string(3*mesh.tris.size()) << ");" << endl;
+		
+		current_tri += mesh.tris.size();
+	}
+	
+	void SWF::decodeJpeg(TagJob& job)
+	{
+		char* tables = job.jpeg_tables->data;
+		size_t tables_size = job.jpeg_tables->length;
+		
+		trimJpegTables(tables, tables_size);
+		
+		// Skip the character ID
+		char* data = job.tag->data + 2;
+		size_t data_size = job.tag->length - 2;
+		
+		trimJpegData(data, data_size);
+		
+		std::vector<u8> jpeg_data;
+		jpeg_data.reserve(tables_size + data_size);
+		jpeg_data.insert(jpeg_data.end(), tables, tables + tables_size);
+		jpeg_data.insert(jpeg_data.end(), data, data + data_size);
+		
+		int comp;
+		u8* decompressed = stbi_load_from_memory(jpeg_data.data(), (int) jpeg_data.size(), &job.image.w, &job.image.h, &comp, 3);
+		
+		if (decompressed == nullptr)
+		{
+			EXC("JPEG data returned NULL.\n");
+		}
+		
+		job.image.rgb.assign(decompressed, decompressed + 3*job.image.w*job.image.h);
+		
+		stbi_image_free(decompressed);
+	}
+	
+	void SWF::runTagJob(TagJob& job)
+	{
+		try
+		{
+			switch (job.tag->code)
+			{
+				case SWF_TAG_DEFINE_SHAPE:
+				case SWF_TAG_DEFINE_SHAPE_2:
 				{
-					shape_tag.clearFields();
-					shape_tag.setFieldCount(6);
-					
-					shape_tag.configureNextField(SWF_FIELD_UI16, 16);
-					shape_tag.configureNextField(SWF_FIELD_UB, 5, true);
-					shape_tag.configureNextField(SWF_FIELD_SB, 0);
-					shape_tag.configureNextField(SWF_FIELD_SB, 0);
-					shape_tag.configureNextField(SWF_FIELD_SB, 0);
-					shape_tag.configureNextField(SWF_FIELD_SB, 0);
-					
-					shape_tag.parseFields(cur_pos);
+					char* pos = job.tag->data;
 					
-					shape_id = (u16) shape_tag.fields[0].value;
+					job.shapes.resize(1);
+					buildShape(pos, false, job.shapes[0]);
 					
-					// FILLSTYLEARRAY
-					shape_tag.clearFields();
-					shape_tag.setFieldCount(1);
+					break;
+				}
+				
+				case SWF_TAG_DEFINE_FONT:
+				{
+					buildFont(job.tag->data, job.shapes);
 					
-					shape_tag.configureNextField(SWF_FIELD_UI8, 8);
+					break;
+				}
+				
+				case SWF_TAG_DEFINE_BITS:
+				{
+					decodeJpeg(job);
 					
-					shape_tag.parseFields(cur_pos);
+					break;
+				}
+				
+				default:
+				{
+					break;
+				}
+			}
+		}
+		
+		catch (...)
+		{
+			job.error = std::current_exception();
+		}
+	}
+	
+	void SWF::buildShape(char*& pos, bool is_font, ShapeMesh& mesh)
+	{
+		// TODO: DefineShape3
+		// TODO: DefineShape4
+		
+		mesh.shape_id = 0;
+		mesh.empty = false;
+		mesh.verts = 0;
+		mesh.curves = 0;
+		mesh.curve_verts = 0;
+		
+		if (!is_font)
+		{
+			mesh.shape_id = VAL(u16, pos);
+			pos += 2;
+			
+			RECT shape_bounds;
+			parseRect(pos, shape_bounds);
+			
+			u16 fill_style_count = parseStyleCount(pos);
+			mesh.fill_styles.push_back(parseFillStyles(pos, fill_style_count));
+			
+			u16 line_style_count = parseStyleCount(pos);
+			mesh.line_styles.push_back(parseLineStyles(pos, line_style_count));
+		}
+		
+		else
+		{
+			// Glyphs are filled white
+			FillStyle fill_style;
+			
+			fill_style.type = FILL_SOLID;
+			fill_style.index = 0;
+			fill_style.r = 0xFF;
+			fill_style.g = 0xFF;
+			fill_style.b = 0xFF;
+			
+			mesh.fill_styles.push_back({fill_style});
+			mesh.line_styles.push_back({});
+		}
+		
+		BitReader records(pos, swf_end);
+		
+		u8 fill_bits = (u8) records.readUB(4);
+		u8 line_bits = (u8) records.readUB(4);
+		
+		u32 current_fill_style_list = 0;
+		u32 current_line_style_list = 0;
+		
+		u32 last_fill_style_0 = 0;
+		u32 last_fill_style_1 = 0;
+		
+		u32 last_line_style = 0;
+		
+		std::vector<Path> paths;
+		paths.reserve(512);
+		
+		Path* current_path = nullptr;
+		
+		s32 last_x = 0;
+		s32 last_y = FRAME_HEIGHT;
+		
+		while (true)
+		{
+			bool is_edge_record = records.readFlag();
+			u8 state_flags = (u8) records.readUB(5);
+			
+			if (is_edge_record)
+			{
+				bool is_straight_edge = (state_flags & 0b10000) != 0;
+				u8 num_bits = (u8) state_flags & 0xF;
+				
+				if (is_straight_edge)
+				{
+					// StraightEdgeRecord
 					
-					fill_style_count = (u8) shape_tag.fields[0].value;
+					bool is_general_line = records.readFlag();
 					
-					if (fill_style_count == 0xFF)
+					if (is_general_line)
 					{
-						shape_tag.clearFields();
+						s16 delta_x = (s16) records.readSB(num_bits + 2);
+						s16 delta_y = (s16) records.readSB(num_bits + 2);
+						
+						Vertex v;
+						v.x = last_x + (s32) delta_x;
+						v.y = last_y - (s32) delta_y;
 						
-						shape_tag.configureNextField(SWF_FIELD_UI16, 16);
+						current_path->verts.push_back(v);
 						
-						shape_tag.parseFields(cur_pos);
+						last_x = v.x;
+						last_y = v.y;
 						
-						fill_style_count = (u16) shape_tag.fields[0].value;
+						continue;
 					}
 					
-					all_fill_styles.push_back(parseFillStyles(fill_style_count));
+					bool is_vertical_line = records.readFlag();
+					s16 delta = (s16) records.readSB(num_bits + 2);
 					
-					// LINESTYLEARRAY
-					shape_tag.clearFields();
-					shape_tag.setFieldCount(1);
+					Vertex v;
 					
-					shape_tag.configureNextField(SWF_FIELD_UI8, 8);
+					v.x = last_x;
+					v.y = last_y;
 					
-					shape_tag.parseFields(cur_pos);
-					
-					line_style_count = (u8) shape_tag.fields[0].value;
-					
-					if (line_style_count == 0xFF)
+					if (is_vertical_line)
 					{
-						shape_tag.clearFields();
-						
-						shape_tag.configureNextField(SWF_FIELD_UI16, 16);
-						
-						shape_tag.parseFields(cur_pos);
-						
-						line_style_count = (u16) shape_tag.fields[0].value;
+						v.y -= (s32) delta;
 					}
 					
-					all_line_styles.push_back(parseLineStyles(line_style_count));
-				}
-				
-				else
-				{
-					fill_style_count = 1;
-					line_style_count = 0;
-					
-					FillStyle* fill_style = new FillStyle[fill_style_count];
-					
-					all_fill_styles.push_back(fill_style);
-					
-					fill_style->r = 0xFF;
-					fill_style->g = 0xFF;
-					fill_style->b = 0xFF;
+					else
+					{
+						v.x += (s32) delta;
+					}
 					
-					fill_style->type = 0x00;
-					fill_style->index = current_color;
+					current_path->verts.push_back(v);
 					
-					color_data << "\t" << "{ "
-							   << to_string(fill_style->r) << "/255.0f, "
-							   << to_string(fill_style->g) << "/255.0f, "
-							   << to_string(fill_style->b) << "/255.0f, "
-							   << "255/255.0f }," << endl;
+					last_x = v.x;
+					last_y = v.y;
 					
-					current_color += 1;
+					continue;
 				}
 				
-				shape_tag.clearFields();
-				shape_tag.setFieldCount(2);
+				// CurvedEdgeRecord
 				
-				shape_tag.configureNextField(SWF_FIELD_UB, 4);
-				shape_tag.configureNextField(SWF_FIELD_UB, 4);
+				s16 control_delta_x = (s16) records.readSB(num_bits + 2);
+				s16 control_delta_y = (s16) records.readSB(num_bits + 2);
+				s16 anchor_delta_x = (s16) records.readSB(num_bits + 2);
+				s16 anchor_delta_y = (s16) records.readSB(num_bits + 2);
 				
-				shape_tag.parseFields(cur_pos);
+				Vertex current;
+				current.x = last_x;
+				current.y = last_y;
 				
-				u8 fill_bits = (u8) shape_tag.fields[0].value;
-				u8 line_bits = (u8) shape_tag.fields[1].value;
+				Vertex control;
+				control.x = last_x + control_delta_x;
+				control.y = last_y - control_delta_y;
 				
-				u32 current_fill_style_list = 0;
-				u32 current_line_style_list = 0;
+				Vertex anchor;
+				anchor.x = control.x + anchor_delta_x;
+				anchor.y = control.y - anchor_delta_y;
 				
-				u32 last_fill_style_0 = 0;
-				u32 last_fill_style_1 = 0;
+				u32 num_passes = curveSegments(current, control, anchor);
 				
-				u32 last_line_style = 0;
+				addCurvedEdge(current_path, current, control, anchor, num_passes);
 				
-				std::vector<Path> paths;
-				paths.reserve(512);
+				mesh.curves += 1;
+				mesh.curve_verts += num_passes;
 				
-				Path* current_path = nullptr;
+				last_x = anchor.x;
+				last_y = anchor.y;
 				
-				s32 last_x = 0;
-				s32 last_y = FRAME_HEIGHT;
+				continue;
+			}
+			
+			if (state_flags == 0)
+			{
+				// EndShapeRecord
+				break;
+			}
+			
+			// StyleChangeRecord
+			
+			// StateNewStyles is only used by DefineShape2 and DefineShape3
+			bool state_new_styles = (state_flags & 0b10000) != 0;
+			bool state_line_style = !is_font && (state_flags & 0b01000) != 0;
+			bool state_fill_style_1 = (state_flags & 0b00100) != 0;
+			bool state_fill_style_0 = (state_flags & 0b00010) != 0;
+			bool state_move_to = (state_flags & 0b00001) != 0;
+			
+			u32 fill_style_0 = last_fill_style_0;
+			u32 fill_style_1 = last_fill_style_1;
+			
+			u32 line_style = last_line_style;
+			
+			bool fill_style_0_change = false;
+			bool fill_style_1_change = false;
+			
+			bool line_style_change = false;
+			
+			if (state_move_to)
+			{
+				u32 move_bits = records.readUB(5);
+				s32 move_delta_x = records.readSB(move_bits);
+				s32 move_delta_y = records.readSB(move_bits);
 				
-				u32 cur_byte_bits_left = 8;
+				last_x = move_delta_x;
+				last_y = FRAME_HEIGHT - move_delta_y;
+			}
+			
+			if (state_fill_style_0)
+			{
+				fill_style_0 = records.readUB(fill_bits);
 				
-				while (true)
-				{
-					shape_tag.clearFields();
-					shape_tag.setFieldCount(2);
-					
-					shape_tag.configureNextField(SWF_FIELD_UB, 1);
-					shape_tag.configureNextField(SWF_FIELD_UB, 5);
-					
-					shape_tag.parseFieldsContinue(cur_pos, cur_byte_bits_left);
-					
-					bool is_edge_record = (u8) shape_tag.fields[0].value;
-					u8 state_flags = (u8) shape_tag.fields[1].value;
-					
-					if (is_edge_record)
-					{
-						bool is_straight_edge = (state_flags & 0b10000) != 0;
-						u8 num_bits = (u8) state_flags & 0xF;
-						
-						if (is_straight_edge)
-						{
-							// StraightEdgeRecord
-							
-							shape_tag.clearFields();
-							shape_tag.setFieldCount(1);
-							
-							shape_tag.configureNextField(SWF_FIELD_UB, 1);
-							
-							shape_tag.parseFieldsContinue(cur_pos, cur_byte_bits_left);
-							
-							bool is_general_line = (shape_tag.fields[0].value & 1) != 0;
-							
-							if (is_general_line)
-							{
-								shape_tag.clearFields();
-								shape_tag.setFieldCount(2);
-								
-								shape_tag.configureNextField(SWF_FIELD_SB, num_bits + 2);
-								shape_tag.configureNextField(SWF_FIELD_SB, num_bits + 2);
-								
-								shape_tag.parseFieldsContinue(cur_pos, cur_byte_bits_left);
-								
-								s16 delta_x = (s16) shape_tag.fields[0].value;
-								s16 delta_y = (s16) shape_tag.fields[1].value;
-								
-								Vertex v;
-								v.x = last_x + (s32) delta_x;
-								v.y = last_y - (s32) delta_y;
-								
-								current_path->verts.push_back(v);
-								
-								last_x = v.x;
-								last_y = v.y;
-								
-								continue;
-							}
-							
-							shape_tag.clearFields();
-							shape_tag.setFieldCount(2);
-							
-							shape_tag.configureNextField(SWF_FIELD_UB, 1);
-							shape_tag.configureNextField(SWF_FIELD_SB, num_bits + 2);
-							
-							shape_tag.parseFieldsContinue(cur_pos, cur_byte_bits_left);
-							
-							bool is_vertical_line = (shape_tag.fields[0].value & 1) != 0;
-							s16 delta = (s16) shape_tag.fields[1].value;
-							
-							Vertex v;
-							
-							v.x = last_x;
-							v.y = last_y;
-							
-							if (is_vertical_line)
-							{
-								v.y -= (s32) delta;
-							}
-							
-							else
-							{
-								v.x += (s32) delta;
-							}
-							
-							current_path->verts.push_back(v);
-							
-							last_x = v.x;
-							last_y = v.y;
-							
-							continue;
-						}
-						
-						// CurvedEdgeRecord
-						
-						shape_tag.clearFields();
-						shape_tag.setFieldCount(4);
-						
-						shape_tag.configureNextField(SWF_FIELD_SB, num_bits + 2);
-						shape_tag.configureNextField(SWF_FIELD_SB, num_bits + 2);
-						shape_tag.configureNextField(SWF_FIELD_SB, num_bits + 2);
-						shape_tag.configureNextField(SWF_FIELD_SB, num_bits + 2);
-						
-						shape_tag.parseFieldsContinue(cur_pos, cur_byte_bits_left);
-						
-						s16 control_delta_x = (s16) shape_tag.fields[0].value;
-						s16 control_delta_y = (s16) shape_tag.fields[1].value;
-						s16 anchor_delta_x = (s16) shape_tag.fields[2].value;
-						s16 anchor_delta_y = (s16) shape_tag.fields[3].value;
-						
-						Vertex current;
-						current.x = last_x;
-						current.y = last_y;
-						
-						Vertex control;
-						control.x = last_x + control_delta_x;
-						control.y = last_y - control_delta_y;
-						
-						Vertex anchor;
-						anchor.x = control.x + anchor_delta_x;
-						anchor.y = control.y - anchor_delta_y;
-						
-						u32 num_passes = 6;
-						
-						addCurvedEdge(current_path, current, control, anchor, num_passes);
-						
-						last_x = anchor.x;
-						last_y = anchor.y;
-						
-						continue;
-					}
-					
-					if (state_flags == 0)
-					{
-						// EndShapeRecord
-						break;
-					}
-					
-					// StyleChangeRecord
-					
-					// StateNewStyles is only used by DefineShape2 and DefineShape3
-					bool state_new_styles = (state_flags & 0b10000) != 0;
-					bool state_line_style = !is_font && (state_flags & 0b01000) != 0;
-					bool state_fill_style_1 = (state_flags & 0b00100) != 0;
-					bool state_fill_style_0 = (state_flags & 0b00010) != 0;
-					bool state_move_to = (state_flags & 0b00001) != 0;
-					
-					shape_tag.clearFields();
-					shape_tag.setFieldCount(3*state_move_to + state_fill_style_0 + state_fill_style_1 + state_line_style);
-					
-					if (state_move_to)
-					{
-						shape_tag.configureNextField(SWF_FIELD_UB, 5, true);
-						shape_tag.configureNextField(SWF_FIELD_SB, 0);
-						shape_tag.configureNextField(SWF_FIELD_SB, 0);
-					}
-					
-					if (state_fill_style_0)
-					{
-						shape_tag.configureNextField(SWF_FIELD_UB, fill_bits);
-					}
-					
-					if (state_fill_style_1)
-					{
-						shape_tag.configureNextField(SWF_FIELD_UB, fill_bits);
-					}
-					
-					if (state_line_style)
-					{
-						shape_tag.configureNextField(SWF_FIELD_UB, line_bits);
-					}
-					
-					shape_tag.parseFieldsContinue(cur_pos, cur_byte_bits_left);
-					
-					u8 move_bits;
-					u32 move_delta_x;
-					u32 move_delta_y;
-					
-					u32 fill_style_0 = last_fill_style_0;
-					u32 fill_style_1 = last_fill_style_1;
-					
-					u32 line_style = last_line_style;
-					
-					bool fill_style_0_change = false;
-					bool fill_style_1_change = false;
-					
-					bool line_style_change = false;
-					
-					size_t current_field = 0;
-					
-					if (state_move_to)
-					{
-						move_bits = (u8) shape_tag.fields[current_field++].value;
-						move_delta_x = (u32) shape_tag.fields[current_field++].value;
-						move_delta_y = (u32) shape_tag.fields[current_field++].value;
-						
-						last_x = move_delta_x;
-						last_y = FRAME_HEIGHT - move_delta_y;
-					}
-					
-					if (state_fill_style_0)
-					{
-						fill_style_0 = (u32) shape_tag.fields[current_field++].value;
-						
-						fill_style_0_change = fill_style_0 != last_fill_style_0;
-					}
-					
-					if (state_fill_style_1)
-					{
-						fill_style_1 = (u32) shape_tag.fields[current_field++].value;
-						
-						fill_style_1_change = fill_style_1 != last_fill_style_1;
-					}
-					
-					if (state_line_style)
-					{
-						line_style = (u32) shape_tag.fields[current_field++].value;
-						
-						line_style_change = line_style != last_line_style;
-					}
-					
-					if (state_new_styles)
-					{
-						if (cur_byte_bits_left != 8)
-						{
-							cur_pos += 1;
-							cur_byte_bits_left = 8;
-						}
-						
-						// FILLSTYLEARRAY
-						shape_tag.clearFields();
-						shape_tag.setFieldCount(1);
-						
-						shape_tag.configureNextField(SWF_FIELD_UI8, 8);
-						
-						shape_tag.parseFields(cur_pos);
-						
-						u16 fill_style_count = (u8) shape_tag.fields[0].value;
-						
-						if (fill_style_count == 0xFF)
-						{
-							shape_tag.clearFields();
-							
-							shape_tag.configureNextField(SWF_FIELD_UI16, 16);
-							
-							shape_tag.parseFields(cur_pos);
-							
-							fill_style_count = (u16) shape_tag.fields[0].value;
-						}
-						
-						all_fill_styles.push_back(parseFillStyles(fill_style_count));
-						
-						current_fill_style_list += 1;
-						
-						// LINESTYLEARRAY
-						shape_tag.clearFields();
-						shape_tag.setFieldCount(1);
-						
-						shape_tag.configureNextField(SWF_FIELD_UI8, 8);
-						
-						shape_tag.parseFields(cur_pos);
-						
-						u16 line_style_count = (u8) shape_tag.fields[0].value;
-						
-						if (line_style_count == 0xFF)
-						{
-							shape_tag.clearFields();
-							
-							shape_tag.configureNextField(SWF_FIELD_UI16, 16);
-							
-							shape_tag.parseFields(cur_pos);
-							
-							line_style_count = (u16) shape_tag.fields[0].value;
-						}
-						
-						all_line_styles.push_back(parseLineStyles(line_style_count));
-						
-						current_line_style_list += 1;
-						
-						shape_tag.clearFields();
-						shape_tag.setFieldCount(2);
-						
-						shape_tag.configureNextField(SWF_FIELD_UB, 4);
-						shape_tag.configureNextField(SWF_FIELD_UB, 4);
-						
-						shape_tag.parseFields(cur_pos);
-						
-						fill_bits = (u8) shape_tag.fields[0].value;
-						line_bits = (u8) shape_tag.fields[1].value;
-					}
-					
-					if (state_new_styles || state_move_to || fill_style_0_change || fill_style_1_change || line_style_change)
-					{
-						if (paths.size() > 0 && paths.back().verts.size() == 1)
-						{
-							paths.pop_back();
-						}
-						
-						paths.push_back(Path());
-						current_path = &paths.back();
-						
-						current_path->verts.reserve(512);
-						current_path->fill_style_list = current_fill_style_list;
-						current_path->line_style_list = current_line_style_list;
-						current_path->fill_styles[0] = fill_style_0;
-						current_path->fill_styles[1] = fill_style_1;
-						current_path->line_style = line_style;
-						current_path->self_closed = false;
-						
-						Vertex v;
-						v.x = last_x;
-						v.y = last_y;
-						
-						current_path->verts.push_back(v);
-					}
-					
-					last_fill_style_0 = fill_style_0;
-					last_fill_style_1 = fill_style_1;
-					
-					last_line_style = line_style;
-				}
+				fill_style_0_change = fill_style_0 != last_fill_style_0;
+			}
+			
+			if (state_fill_style_1)
+			{
+				fill_style_1 = records.readUB(fill_bits);
 				
-				if (cur_byte_bits_left != 8)
-				{
-					cur_pos += 1;
-				}
+				fill_style_1_change = fill_style_1 != last_fill_style_1;
+			}
+			
+			if (state_line_style)
+			{
+				line_style = records.readUB(line_bits);
+				
+				line_style_change = line_style != last_line_style;
+			}
+			
+			if (state_new_styles)
+			{
+				pos = records.align();
+				
+				u16 new_fill_style_count = parseStyleCount(pos);
+				mesh.fill_styles.push_back(parseFillStyles(pos, new_fill_style_count));
+				
+				current_fill_style_list += 1;
 				
-				if (current_path == nullptr)
+				u16 new_line_style_count = parseStyleCount(pos);
+				mesh.line_styles.push_back(parseLineStyles(pos, new_line_style_count));
+				
+				current_line_style_list += 1;
+				
+				records = BitReader(pos, swf_end);
+				
+				fill_bits = (u8) records.readUB(4);
+				line_bits = (u8) records.readUB(4);
+			}
+			
+			if (state_new_styles || state_move_to || fill_style_0_change || fill_style_1_change || line_style_change)
+			{
+				if (paths.size() > 0 && paths.back().verts.size() == 1)
 				{
-					return;
+					paths.pop_back();
 				}
 				
-				std::vector<Shape> shapes;
+				paths.push_back(Path());
+				current_path = &paths.back();
 				
-				std::vector<Node> nodes;
+				current_path->verts.reserve(512);
+				current_path->fill_style_list = current_fill_style_list;
+				current_path->line_style_list = current_line_style_list;
+				current_path->fill_styles[0] = fill_style_0;
+				current_path->fill_styles[1] = fill_style_1;
+				current_path->line_style = line_style;
+				
+				Vertex v;
+				v.x = last_x;
+				v.y = last_y;
+				
+				current_path->verts.push_back(v);
+			}
+			
+			last_fill_style_0 = fill_style_0;
+			last_fill_style_1 = fill_style_1;
+			
+			last_line_style = line_style;
+		}
+		
+		pos = records.align();
+		
+		if (current_path == nullptr)
+		{
+			mesh.empty = true;
+			
+			return;
+		}
+		
+		for (const Path& path : paths)
+		{
+			mesh.verts += path.verts.size();
+		}
+		
+		std::vector<Shape> shapes;
+		
+		traceFaces(paths, shapes);
+		
+		for (size_t i = 0; i < shapes.size(); ++i)
+		{
+			if (shapes[i].verts.size() < 3)
+			{
+				shapes[i].invalid = true;
+			}
+		}
+		
+		auto compareArea = [](const Shape& a, const Shape& b)
+		{
+			u64 width = a.max.x - a.min.x;
+			u64 height = a.max.y - a.min.y;
+			
+			u64 area_a = width*height;
+			
+			width = b.max.x - b.min.x;
+			height = b.max.y - b.min.y;
+			
+			u64 area_b = width*height;
+			
+			return area_a > area_b;
+		};
+		
+		auto compareAreaPtr = [](const Shape* a, const Shape* b)
+		{
+			u64 width = a->max.x - a->min.x;
+			u64 height = a->max.y - a->min.y;
+			
+			u64 area_a = width*height;
+			
+			width = b->max.x - b->min.x;
+			height = b->max.y - b->min.y;
+			
+			u64 area_b = width*height;
+			
+			return area_a > area_b;
+		};
+		
+		// Sort shapes by area of bounding box
+		std::sort(shapes.begin(), shapes.end(), compareArea);
+		
+		for (size_t i = 0; i < shapes.size(); ++i)
+		{
+			if (shapes[i].hole)
+			{
+				Shape& hole = shapes[i];
 				
-				constructEdges(paths, nodes);
+				std::vector<Shape*> outer_candidates;
 				
-				for (size_t i = 0; i < paths.size(); ++i)
+				for (size_t j = 0; j < shapes.size(); ++j)
 				{
-					if (paths[i].self_closed)
+					// A hole belongs to an outline of the fill around it
+					if (shapes[j].invalid || shapes[j].hole ||
+						shapes[j].fill_style_list != hole.fill_style_list ||
+						shapes[j].inner_fill != hole.outer_fill)
 					{
-						shapes.push_back(Shape());
-						shapes.back().closed = true;
-						shapes.back().hole = false;
-						shapes.back().invalid = false;
-						
-						for (size_t k = 0; k < paths[i].verts.size(); ++k)
-						{
-							if (k >= 1 &&
-								shapes.back().verts.back().x == paths[i].verts[k].x &&
-								shapes.back().verts.back().y == paths[i].verts[k].y)
-							{
-								continue;
-							}
-							
-							shapes.back().verts.push_back(paths[i].verts[k]);
-						}
-						
-						processShape(shapes.back(), paths[i].fill_styles);
-						
-						shapes.back().fill_style_list = paths[i].fill_style_list;
-						
-						if (paths[i].fill_styles[shapes.back().fill_right] == 0 && paths[i].fill_styles[!shapes.back().fill_right] != 0)
-						{
-							shapes.back().hole = true;
-							shapes.back().outer_fill = paths[i].fill_styles[!shapes.back().fill_right];
-						}
+						continue;
 					}
-				}
-				
-				std::vector<Path> path_stack;
-				std::unordered_map<Node*, bool> blocked;
-				std::unordered_map<Node*, std::vector<Node*>> blocked_map;
-				std::vector<std::vector<Path>> closed_paths;
-				
-				johnson(nodes, path_stack, blocked, blocked_map, closed_paths);
-				
-				size_t shape_cycles_start = shapes.size();
-				
-				for (auto cycle : closed_paths)
-				{
-					shapes.push_back(Shape());
-					shapes.back().closed = true;
-					shapes.back().hole = false;
-					shapes.back().invalid = false;
 					
-					for (size_t j = 0; j < cycle.size(); ++j)
+					Shape& test_shape = shapes[j];
+					
+					if (test_shape.min.x < hole.min.x && test_shape.max.x > hole.max.x &&
+						test_shape.min.y < hole.min.y && test_shape.max.y > hole.max.y)
 					{
-						size_t start = (cycle[j].backward) ? cycle[j].verts.size() - 2 : 1;
-						size_t offset = (cycle[j].backward) ? -1 : 1;
-						
-						for (size_t k = start; k < cycle[j].verts.size(); k += offset)
-						{
-							if (shapes.back().verts.size() > 0 &&
-								shapes.back().verts.back().x == cycle[j].verts[k].x &&
-								shapes.back().verts.back().y == cycle[j].verts[k].y)
-							{
-								continue;
-							}
-							
-							shapes.back().verts.push_back(cycle[j].verts[k]);
-						}
+						outer_candidates.push_back(&test_shape);
 					}
-					
-					processShape(shapes.back(), cycle[0].fill_styles);
-					
-					shapes.back().fill_style_list = cycle[0].fill_style_list;
 				}
 				
-				for (size_t i = 0; i < closed_paths.size(); ++i)
+				std::vector<Shape*> final_outer_candidates;
+				
+				for (Shape* c : outer_candidates)
 				{
-					Shape& shape = shapes[shape_cycles_start + i];
-					std::vector<Path>& cycle = closed_paths[i];
-					
-					u32 last_fill_style = fill_style_count + 1;
+					bool v_in_c = true;
 					
-					for (size_t j = 0; j < cycle.size(); ++j)
+					for (const Vertex& v : hole.verts)
 					{
-						Path& p = cycle[j];
-						if (last_fill_style == fill_style_count + 1)
-						{
-							last_fill_style = p.fill_styles[shape.fill_right];
-							continue;
-						}
-						
-						if (last_fill_style != p.fill_styles[shape.fill_right ^ p.backward])
+						if (!isInShape(v, c))
 						{
-							shape.invalid = true;
+							v_in_c = false;
 							break;
 						}
 					}
 					
-					// TODO: look for holes here too?
-				}
-				
-				for (size_t i = 0; i < shapes.size(); ++i)
-				{
-					if (shapes[i].verts.size() < 3)
+					if (v_in_c)
 					{
-						shapes[i].invalid = true;
+						final_outer_candidates.push_back(c);
 					}
 				}
 				
-				auto compareArea = [](const Shape& a, const Shape& b)
+				if (final_outer_candidates.empty())
 				{
-					u64 width = a.max.x - a.min.x;
-					u64 height = a.max.y - a.min.y;
-					
-					u64 area_a = width*height;
-					
-					width = b.max.x - b.min.x;
-					height = b.max.y - b.min.y;
-					
-					u64 area_b = width*height;
-					
-					return area_a > area_b;
-				};
+					continue;
+				}
 				
-				auto compareAreaPtr = [](const Shape* a, const Shape* b)
-				{
-					u64 width = a->max.x - a->min.x;
-					u64 height = a->max.y - a->min.y;
-					
-					u64 area_a = width*height;
-					
-					width = b->max.x - b->min.x;
-					height = b->max.y - b->min.y;
-					
-					u64 area_b = width*height;
-					
-					return area_a > area_b;
-				};
+				std::sort(final_outer_candidates.begin(), final_outer_candidates.end(), compareAreaPtr);
+				
+				final_outer_candidates.back()->holes.push_back(&hole);
+			}
+		}
+		
+		for (size_t i = 0; i < shapes.size(); ++i)
+		{
+			if (!shapes[i].invalid && shapes[i].closed && shapes[i].inner_fill != 0 && !shapes[i].hole)
+			{
+				std::vector<Tri> tris;
 				
-				// Sort shapes by area of bounding box
-				std::sort(shapes.begin(), shapes.end(), compareArea);
+				fillShape(shapes[i], tris);
 				
-				for (size_t i = 0; i < shapes.size(); ++i)
+				for (const Tri& t : tris)
 				{
-					if (shapes[i].hole)
-					{
-						Shape& hole = shapes[i];
-						
-						std::vector<Shape*> outer_candidates;
-						
-						for (size_t j = 0; j < shapes.size(); ++j)
-						{
-							if (shapes[j].invalid)
-							{
-								continue;
-							}
-							
-							Shape& test_shape = shapes[j];
-							
-							if (test_shape.min.x < hole.min.x && test_shape.max.x > hole.max.x &&
-								test_shape.min.y < hole.min.y && test_shape.max.y > hole.max.y)
-							{
-								outer_candidates.push_back(&test_shape);
-							}
-						}
-						
-						std::vector<Shape*> final_outer_candidates;
-						
-						for (Shape* c : outer_candidates)
-						{
-							bool v_in_c = true;
-							
-							for (const Vertex& v : hole.verts)
-							{
-								if (!isInShape(v, c))
-								{
-									v_in_c = false;
-									break;
-								}
-							}
-							
-							if (v_in_c)
-							{
-								final_outer_candidates.push_back(c);
-							}
-						}
-						
-						std::sort(final_outer_candidates.begin(), final_outer_candidates.end(), compareAreaPtr);
-						
-						final_outer_candidates.back()->holes.push_back(&hole);
-					}
+					mesh.tris.push_back({t, shapes[i].fill_style_list, shapes[i].inner_fill, false});
 				}
+			}
+		}
+		
+		for (size_t i = 0; i < paths.size(); ++i)
+		{
+			u8 line_style_i = paths[i].line_style;
+			
+			if (line_style_i != 0)
+			{
+				const LineStyle& line_style = mesh.line_styles[paths[i].line_style_list][line_style_i - 1];
 				
-				size_t tris_size = 0;
+				std::vector<Tri> tris;
 				
-				for (size_t i = 0; i < shapes.size(); ++i)
-				{
-					if (!shapes[i].invalid && shapes[i].closed && shapes[i].inner_fill != 0 && !shapes[i].hole)
-					{
-						std::vector<Tri> tris;
-						
-						fillShape(shapes[i], tris);
-						
-						tris_size += tris.size();
-						
-						for (Tri t : tris)
-						{
-							for (int j = 0; j < 3; ++j)
-							{
-								float x_f = (float) t.verts[j].x;
-								float y_f = (float) (FRAME_HEIGHT - t.verts[j].y);
-								
-								shape_data << "\t" << "{ "
-										   << std::hex << std::uppercase
-										   << "0x" << VAL(u32, &x_f) << ", "
-										   << "0x" << VAL(u32, &y_f) << ", "
-										   << "0x" << (u32) all_fill_styles[shapes[i].fill_style_list][shapes[i].inner_fill - 1].type << ", "
-										   << "0x" << (u32) all_fill_styles[shapes[i].fill_style_list][shapes[i].inner_fill - 1].index
-										   << " }," << endl;
-							}
-						}
-					}
-				}
+				drawLines(paths[i], line_style.width, tris);
 				
-				for (size_t i = 0; i < paths.size(); ++i)
+				for (const Tri& t : tris)
 				{
-					u8 line_style_i = paths[i].line_style;
-					
-					if (line_style_i != 0)
-					{
-						LineStyle line_style = all_line_styles[paths[i].line_style_list][line_style_i - 1];
-						
-						std::vector<Tri> tris;
-						
-						drawLines(paths[i], line_style.width, tris);
-						
-						tris_size += tris.size();
-						
-						for (Tri t : tris)
-						{
-							for (int j = 0; j < 3; ++j)
-							{
-								float x_f = (float) t.verts[j].x;
-								float y_f = (float) (FRAME_HEIGHT - t.verts[j].y);
-								
-								shape_data << "\t" << "{ "
-										   << std::hex << std::uppercase
-										   << "0x" << VAL(u32, &x_f) << ", "
-										   << "0x" << VAL(u32, &y_f) << ", "
-										   << "0x00, "
-										   << "0x" << (u32) line_style.index
-										   << " }," << endl;
-							}
-						}
-					}
+					mesh.tris.push_back({t, paths[i].line_style_list, line_style_i, true});
 				}
-				
-				context.tag_main << "\t" << "tagDefineShape(" << to_string(shape_id) << ", " << to_string(3*current_tri) << ", " << to_string(3*tris_size) << ");" << endl;
-				
-				current_tri += tris_size;
-				
-				break;
 			}
 		}
 	}
-	
+
 	s32 pointOrientation(const Vertex& v0, const Vertex& v1, const Vertex& point)
 	{
 		return (v1.x - v0.x)*(point.y - v0.y) - (point.x - v0.x)*(v1.y - v0.y);
@@ -1933,18 +1905,14 @@ namespace SWFRecomp
 	
 	bool SWF::isInShape(const Vertex& v, const Shape* shape)
 	{
-		const Vertex* last_outer_v = nullptr;
+		// Outlines don't repeat their first vertex, so start with the
+		// edge that closes them
+		const Vertex* last_outer_v = &shape->verts.back();
 		
 		int windingNumber = 0;
 		
 		for (const Vertex& outer_v : shape->verts)
 		{
-			if (last_outer_v == nullptr)
-			{
-				last_outer_v = &outer_v;
-				continue;
-			}
-			
 			if (last_outer_v->y <= v.y)
 			{
 				if (outer_v.y > v.y && pointOrientation(*last_outer_v, outer_v, v) > 0)
@@ -1967,6 +1935,25 @@ namespace SWFRecomp
 		return windingNumber != 0;
 	}
 	
+	u32 SWF::curveSegments(const Vertex& current, const Vertex& control, const Vertex& anchor)
+	{
+		if (curve_tolerance == 0)
+		{
+			return FIXED_CURVE_SEGMENTS;
+		}
+		
+		// A quadratic curve strays at most |current - 2*control + anchor|/4
+		// from its chord, and n equal steps in t divide that by n^2
+		double dx = (double) current.x - 2.0*control.x + anchor.x;
+		double dy = (double) current.y - 2.0*control.y + anchor.y;
+		
+		double deviation = std::sqrt(dx*dx + dy*dy)/4;
+		
+		double segments = std::ceil(std::sqrt(deviation/curve_tolerance));
+		
+		return (u32) std::clamp(segments, 1.0, (double) MAX_CURVE_SEGMENTS);
+	}
+	
 	void SWF::addCurvedEdge(Path* path, Vertex current, Vertex control, Vertex anchor, u32 passes)
 	{
 		std::vector<Vertex> left_points;
@@ -2008,7 +1995,7 @@ namespace SWFRecomp
 			point.x = shape.verts[k].x;
 			point.y = shape.verts[k].y;
 			
-			signed_area += CROSS(last_point, point);
+			signed_area += (s64) last_point.x*point.y - (s64) point.x*last_point.y;
 			
 			last_point.x = point.x;
 			last_point.y = point.y;
@@ -2037,7 +2024,7 @@ namespace SWFRecomp
 		point.x = shape.verts[0].x;
 		point.y = shape.verts[0].y;
 		
-		signed_area += CROSS(last_point, point);
+		signed_area += (s64) last_point.x*point.y - (s64) point.x*last_point.y;
 		
 		shape.fill_right = signed_area < 0;
 		
@@ -2046,186 +2033,288 @@ namespace SWFRecomp
 		shape.got_min_max = true;
 	}
 	
-	void SWF::constructEdges(std::vector<Path>& paths, std::vector<Node>& nodes)
+	u64 pointKey(const Vertex& v)
+	{
+		return ((u64) (u32) v.x << 32) | (u32) v.y;
+	}
+	
+	// Orders directions counterclockwise, starting from +x
+	bool directionBefore(const Vertex& a, const Vertex& b)
 	{
-		nodes.reserve(2*paths.size());
+		bool a_lower = a.y < 0 || (a.y == 0 && a.x < 0);
+		bool b_lower = b.y < 0 || (b.y == 0 && b.x < 0);
 		
-		for (size_t i = 0; i < nodes.capacity(); ++i)
+		if (a_lower != b_lower)
 		{
-			nodes.push_back(Node());
-			nodes.back().used = false;
+			return b_lower;
 		}
 		
-		for (size_t i = 0; i < paths.size(); ++i)
+		return (s64) a.x*b.y - (s64) a.y*b.x > 0;
+	}
+	
+	void SWF::traceFaces(const std::vector<Path>& paths, std::vector<Shape>& shapes)
+	{
+		// Each fill is resolved on its own. Every segment becomes a
+		// half-edge for the fills on either side of it, pointing so the
+		// fill is on its left. Taking the next half-edge clockwise at each
+		// vertex then walks around one region of a fill: counterclockwise
+		// around its outline, clockwise around its holes.
+		
+		std::vector<Vertex> verts;
+		std::unordered_map<u64, u32> vert_ids;
+		
+		// (fill style list, fill style)
+		std::vector<std::pair<u32, u32>> fills;
+		std::unordered_map<u64, u32> fill_ids;
+		
+		std::vector<HalfEdge> edges;
+		
+		auto vertId = [&](const Vertex& v)
 		{
-			Node* front = &nodes[2*i];
-			Node* back = &nodes[2*i + 1];
+			auto it = vert_ids.emplace(pointKey(v), (u32) verts.size());
 			
-			front->path = &paths[i];
-			back->path = &paths[i];
+			if (it.second)
+			{
+				verts.push_back(v);
+			}
 			
-			paths[i].front = front;
-			paths[i].back = back;
-		}
+			return it.first->second;
+		};
 		
-		for (size_t i = 0; i < paths.size(); ++i)
+		auto fillId = [&](u32 fill_style_list, u32 fill_style)
 		{
-			if (paths[i].fill_styles[0] != 0 || paths[i].fill_styles[1] != 0)
+			auto it = fill_ids.emplace(((u64) fill_style_list << 32) | fill_style, (u32) fills.size());
+			
+			if (it.second)
 			{
-				Vertex path_start;
-				path_start.x = paths[i].verts[0].x;
-				path_start.y = paths[i].verts[0].y;
-				
-				Vertex path_end;
-				path_end.x = paths[i].verts.back().x;
-				path_end.y = paths[i].verts.back().y;
+				fills.push_back({fill_style_list, fill_style});
+			}
+			
+			return it.first->second;
+		};
+		
+		for (const Path& path : paths)
+		{
+			u32 fill_0 = path.fill_styles[0];
+			u32 fill_1 = path.fill_styles[1];
+			
+			// The same fill on both sides, or none
+			if (fill_0 == fill_1)
+			{
+				continue;
+			}
+			
+			u32 last = vertId(path.verts[0]);
+			
+			for (size_t k = 1; k < path.verts.size(); ++k)
+			{
+				u32 current = vertId(path.verts[k]);
 				
-				if (path_start.x == path_end.x &&
-					path_start.y == path_end.y)
+				if (current == last)
 				{
-					paths[i].self_closed = true;
 					continue;
 				}
 				
-				Node* front = paths[i].front;
-				Node* back = paths[i].back;
+				if (fill_0 != 0)
+				{
+					edges.push_back({last, current, fillId(path.fill_style_list, fill_0), false});
+				}
 				
-				for (size_t j = 0; j < paths.size(); ++j)
+				if (fill_1 != 0)
 				{
-					if (i == j)
-					{
-						continue;
-					}
-					
-					Vertex this_path_start;
-					this_path_start.x = paths[j].verts[0].x;
-					this_path_start.y = paths[j].verts[0].y;
-					
-					if (path_end.x == this_path_start.x &&
-						path_end.y == this_path_start.y)
-					{
-						back->neighbors.push_back(paths[j].back);
-					}
-					
-					if (path_start.x == this_path_start.x &&
-						path_start.y == this_path_start.y)
-					{
-						front->neighbors.push_back(paths[j].back);
-					}
-					
-					Vertex this_path_end;
-					this_path_end.x = paths[j].verts.back().x;
-					this_path_end.y = paths[j].verts.back().y;
-					
-					if (path_end.x == this_path_end.x &&
-						path_end.y == this_path_end.y)
-					{
-						back->neighbors.push_back(paths[j].front);
-					}
-					
-					if (path_start.x == this_path_end.x &&
-						path_start.y == this_path_end.y)
-					{
-						front->neighbors.push_back(paths[j].front);
-					}
+					edges.push_back({current, last, fillId(path.fill_style_list, fill_1), false});
 				}
+				
+				last = current;
 			}
 		}
-	}
-	
-	void blockInMap(Node* node, std::unordered_map<Node*, std::vector<Node*>>& blocked_map)
-	{
-		blocked_map[node].clear();
 		
-		for (Node* neighbor : node->neighbors)
+		auto direction = [&](u32 e)
 		{
-			blocked_map[node].push_back(neighbor);
-		}
-	}
-	
-	void unblock(Node* node, std::unordered_map<Node*, bool>& blocked, std::unordered_map<Node*, std::vector<Node*>>& blocked_map)
-	{
-		blocked[node] = false;
+			Vertex d;
+			d.x = verts[edges[e].to].x - verts[edges[e].from].x;
+			d.y = verts[edges[e].to].y - verts[edges[e].from].y;
+			
+			return d;
+		};
+		
+		// All half-edges grouped by fill and start vertex, each group
+		// sorted counterclockwise
+		std::vector<u32> out(edges.size());
 		
-		for (Node* n : blocked_map[node])
+		for (size_t i = 0; i < out.size(); ++i)
 		{
-			if (blocked[n])
-			{
-				unblock(n, blocked, blocked_map);
-			}
+			out[i] = (u32) i;
 		}
 		
-		blocked_map[node].clear();
-	}
-	
-	bool traverseIteration(Node* path, std::vector<Path>& path_stack, std::unordered_map<Node*, bool>& blocked, std::unordered_map<Node*, std::vector<Node*>>& blocked_map, std::vector<std::vector<Path>>& closed_paths);
-	
-	bool detectCycle(Node* node, std::vector<Path>& path_stack, std::unordered_map<Node*, bool>& blocked, std::unordered_map<Node*, std::vector<Node*>>& blocked_map, std::vector<std::vector<Path>>& closed_paths)
-	{
-		if (node == path_stack[0].front || node == path_stack[0].back)
+		std::sort(out.begin(), out.end(), [&](u32 a, u32 b)
 		{
-			std::vector<Path> cycle;
+			if (edges[a].fill != edges[b].fill)
+			{
+				return edges[a].fill < edges[b].fill;
+			}
 			
-			for (size_t i = 0; i < path_stack.size(); ++i)
+			if (edges[a].from != edges[b].from)
 			{
-				cycle.push_back(path_stack[i]);
+				return edges[a].from < edges[b].from;
 			}
 			
-			closed_paths.push_back(cycle);
+			Vertex dir_a = direction(a);
+			Vertex dir_b = direction(b);
 			
-			return true;
-		}
+			if (directionBefore(dir_a, dir_b))
+			{
+				return true;
+			}
+			
+			if (directionBefore(dir_b, dir_a))
+			{
+				return false;
+			}
+			
+			return a < b;
+		});
+		
+		// Where each (fill, vertex) group starts and ends in out
+		std::unordered_map<u64, std::pair<size_t, size_t>> groups;
 		
-		if (blocked[node])
+		for (size_t i = 0; i < out.size(); ++i)
 		{
-			return false;
+			u64 key = ((u64) edges[out[i]].fill << 32) | edges[out[i]].from;
+			
+			auto it = groups.emplace(key, std::make_pair(i, i));
+			it.first->second.second = i + 1;
 		}
 		
-		return traverseIteration(node, path_stack, blocked, blocked_map, closed_paths);
-	}
-	
-	bool traverseIteration(Node* node, std::vector<Path>& path_stack, std::unordered_map<Node*, bool>& blocked, std::unordered_map<Node*, std::vector<Node*>>& blocked_map, std::vector<std::vector<Path>>& closed_paths)
-	{
-		path_stack.push_back(*node->path);
-		
-		path_stack.back().backward = node == node->path->front;
-		
-		blocked[node] = true;
-		
-		bool cycle_found = false;
-		
-		for (Node* neighbor : node->neighbors)
+		// The half-edges that can follow e are the ones leaving its end,
+		// out[begin] to out[end - 1]. out[at] is the first of them that
+		// doesn't come before e's reverse direction.
+		auto following = [&](u32 e, size_t& begin, size_t& at, size_t& end)
 		{
-			if (neighbor->used)
+			auto it = groups.find(((u64) edges[e].fill << 32) | edges[e].to);
+			
+			if (it == groups.end())
 			{
-				continue;
+				begin = at = end = 0;
+				return;
 			}
 			
-			cycle_found |= detectCycle(neighbor, path_stack, blocked, blocked_map, closed_paths);
-		}
-		
-		path_stack.pop_back();
-		
-		if (cycle_found)
+			begin = it->second.first;
+			end = it->second.second;
+			
+			Vertex back = direction(e);
+			back.x = -back.x;
+			back.y = -back.y;
+			
+			at = std::partition_point(out.begin() + begin, out.begin() + end, [&](u32 other)
+			{
+				return directionBefore(direction(other), back);
+			}) - out.begin();
+		};
+		
+		size_t begin;
+		size_t at;
+		size_t end;
+		
+		// A segment drawn twice, with the same fill on the left going each
+		// way, is inside the fill, like the side shared by two squares
+		// drawn separately. Both half-edges are dropped.
+		for (u32 e = 0; e < edges.size(); ++e)
 		{
-			unblock(node, blocked, blocked_map);
-			return true;
+			if (edges[e].used)
+			{
+				continue;
+			}
+			
+			following(e, begin, at, end);
+			
+			Vertex back = direction(e);
+			back.x = -back.x;
+			back.y = -back.y;
+			
+			for (size_t k = at; k < end && !directionBefore(back, direction(out[k])); ++k)
+			{
+				u32 other = out[k];
+				
+				if (!edges[other].used && edges[other].to == edges[e].from)
+				{
+					edges[e].used = true;
+					edges[other].used = true;
+					
+					break;
+				}
+			}
 		}
 		
-		blockInMap(node, blocked_map);
-		
-		return false;
-	}
-	
-	void SWF::johnson(std::vector<Node>& nodes, std::vector<Path>& path_stack, std::unordered_map<Node*, bool>& blocked, std::unordered_map<Node*, std::vector<Node*>>& blocked_map, std::vector<std::vector<Path>>& closed_paths)
-	{
-		for (Node& n : nodes)
+		for (u32 start = 0; start < edges.size(); ++start)
 		{
-			blocked.clear();
-			blocked_map.clear();
+			if (edges[start].used)
+			{
+				continue;
+			}
+			
+			Shape shape = Shape();
+			
+			u32 e = start;
+			bool closed = false;
+			
+			while (!closed)
+			{
+				edges[e].used = true;
+				shape.verts.push_back(verts[edges[e].from]);
+				
+				following(e, begin, at, end);
+				
+				// Clockwise from the reverse direction, so straight back
+				// comes last
+				size_t count = end - begin;
+				size_t before = at - begin;
+				
+				size_t i = 0;
+				u32 next = start;
+				
+				for (; i < count; ++i)
+				{
+					next = out[(i < before) ? at - 1 - i : end - 1 - (i - before)];
+					
+					if (!edges[next].used || next == start)
+					{
+						break;
+					}
+				}
+				
+				// Only malformed shapes have outlines that don't close
+				if (i == count)
+				{
+					break;
+				}
+				
+				closed = next == start;
+				e = next;
+			}
+			
+			if (!closed)
+			{
+				continue;
+			}
+			
+			u32 fill_style = fills[edges[start].fill].second;
+			u32 fill_styles[2] = {fill_style, 0};
+			
+			shape.closed = true;
+			shape.hole = false;
+			shape.invalid = false;
+			shape.fill_style_list = fills[edges[start].fill].first;
+			
+			processShape(shape, fill_styles);
+			
+			if (shape.inner_fill == 0)
+			{
+				shape.hole = true;
+				shape.outer_fill = fill_style;
+			}
 			
-			traverseIteration(&n, path_stack, blocked, blocked_map, closed_paths);
-			n.used = true;
+			shapes.push_back(std::move(shape));
 		}
 	}
 	
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Test Impact Analysis for SWFRecomp
+
+Selects the tests affected by a git diff, so a change to one opcode doesn't
+require running the whole suite.
+
+Changed lines are mapped to opcodes:
+
+- SWFModernRuntime action.c / object.c / variables.c: the functions whose
+  bodies changed, then every action* entry point that (transitively) calls
+  them, matched to opcode names the same way build_opcode_index.py matches
+  action.h functions to action.hpp enums (actionAdd2 <-> SWF_ACTION_ADD2)
+- SWFRecomp action.cpp: the `case SWF_ACTION_*` blocks that changed
+
+A test is affected if it lists one of those opcodes as tested or supporting
+in its test_info.json, or if a file in its own directory changed.
+
+Anything else that feeds the build (headers, other runtime or recompiler
+sources, build scripts, test infrastructure) is shared, and any change to it
+selects the full suite. Documentation changes are ignored.
+
+Usage:
+    ./affected_tests.py                 # Tests affected by uncommitted changes
+    ./affected_tests.py origin/master   # Tests affected since a ref
+"""
+
+import json
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+TESTS_DIR = Path(__file__).resolve().parent
+SWFRECOMP_ROOT = TESTS_DIR.parent
+SWFMODERN_ROOT = SWFRECOMP_ROOT.parent / "SWFModernRuntime"
+
+ACTION_HPP = SWFRECOMP_ROOT / "include/action/action.hpp"
+RECOMPILER_ACTION_CPP = SWFRECOMP_ROOT / "src/action/action.cpp"
+RUNTIME_SOURCES = [
+    SWFMODERN_ROOT / "src/actionmodern/action.c",
+    SWFMODERN_ROOT / "src/actionmodern/object.c",
+    SWFMODERN_ROOT / "src/actionmodern/variables.c",
+]
+
+# Changes under these trees can affect test builds; anything else is ignored
+BUILD_ROOTS = [SWFRECOMP_ROOT, SWFMODERN_ROOT]
+
+# Files that never affect test results
+IGNORED_SUFFIXES = {'.md', '.txt', '.png', '.pdf'}
+
+# Untracked files the test tooling itself generates
+GENERATED_FILES = {'test.swf', 'test_results.json', 'test_results.jsonl', 'test_timings.json'}
+
+FUNCTION_DEF = re.compile(r'^[A-Za-z_][\w\s\*]*?\b(\w+)\s*\([^;]*$')
+CASE_LABEL = re.compile(r'^\s*case\s+SWF_ACTION_(\w+)\s*:')
+CALL = re.compile(r'\b([A-Za-z_]\w*)\s*\(')
+
+
+# ==============================================================================
+# Diff Parsing
+# ==============================================================================
+
+def changed_lines(base: str) -> Optional[Dict[Path, Set[int]]]:
+    """
+    Map each changed file to the changed line numbers in its current version.
+
+    Pure deletions are attributed to the line they occurred at. A deleted
+    file maps to an empty set. Returns None if git fails.
+    """
+    try:
+        root = Path(subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"], cwd=TESTS_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip())
+        diff = subprocess.run(
+            ["git", "diff", "-U0", "--no-color", "--no-ext-diff", base],
+            cwd=root, capture_output=True, text=True, check=True
+        ).stdout
+        untracked = subprocess.run(
+            ["git", "ls-files", "--others", "--exclude-standard"],
+            cwd=root, capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    changes = defaultdict(set)
+    current = None
+
+    for line in diff.splitlines():
+        if line.startswith('+++ '):
+            target = line[4:]
+            current = None if target == '/dev/null' else (root / target[2:]).resolve()
+        elif line.startswith('--- ') and line[4:] != '/dev/null':
+            # Record the file even if it was deleted (no +++ path follows)
+            changes[(root / line[6:]).resolve()]
+        elif line.startswith('@@') and current is not None:
+            match = re.match(r'@@ -\S+ \+(\d+)(?:,(\d+))? @@', line)
+            start, count = int(match.group(1)), int(match.group(2) or 1)
+            if count == 0:
+                changes[current].add(max(start, 1))
+            else:
+                changes[current].update(range(start, start + count))
+
+    for path in untracked.splitlines():
+        if Path(path).name not in GENERATED_FILES:
+            changes[(root / path).resolve()].add(1)
+
+    return dict(changes)
+
+
+# ==============================================================================
+# Source Structure
+# ==============================================================================
+
+def indent_of(line: str) -> int:
+    return len(line.expandtabs(4)) - len(line.expandtabs(4).lstrip())
+
+
+def c_functions(path: Path) -> List[Tuple[str, int, int]]:
+    """
+    Find function definitions in a C file as (name, first_line, last_line).
+
+    Relies on the runtime's style: definitions start at column 0 and their
+    closing brace is a `}` at column 0.
+    """
+    lines = path.read_text(errors='replace').splitlines()
+    functions = []
+    i = 0
+
+    while i < len(lines):
+        match = FUNCTION_DEF.match(lines[i])
+        if match and not lines[i].startswith(('typedef', 'return', 'else')):
+            # The body opens on this line or the next few
+            body = next((j for j in range(i, min(i + 3, len(lines)))
+                         if lines[j].rstrip().endswith('{')), None)
+            if body is not None:
+                end = next((j for j in range(body + 1, len(lines))
+                            if lines[j].startswith('}')), len(lines) - 1)
+                functions.append((match.group(1), i + 1, end + 1))
+                i = end
+        i += 1
+
+    return functions
+
+
+def case_blocks(path: Path) -> List[Tuple[Set[str], int, int]]:
+    """
+    Find `case SWF_ACTION_*` blocks in a recompiler source file.
+
+    Returns (opcode names, first_line, last_line) for each group of
+    fall-through case labels and the statements below them.
+    """
+    lines = path.read_text(errors='replace').splitlines()
+    blocks = []
+    i = 0
+
+    while i < len(lines):
+        match = CASE_LABEL.match(lines[i])
+        if not match:
+            i += 1
+            continue
+
+        start, indent = i, indent_of(lines[i])
+        opcodes = set()
+        while i < len(lines) and CASE_LABEL.match(lines[i]) and indent_of(lines[i]) == indent:
+            opcodes.add(CASE_LABEL.match(lines[i]).group(1))
+            i += 1
+
+        if i < len(lines) and lines[i].strip() == '{' and indent_of(lines[i]) == indent:
+            # Braced block: ends at the matching brace at the label's indent
+            end = next((j for j in range(i + 1, len(lines))
+                        if lines[j].strip() == '}' and indent_of(lines[j]) == indent), i)
+        else:
+            # Unbraced block: ends before the next line at or left of the label
+            end = next((j - 1 for j in range(i, len(lines))
+                        if lines[j].strip() and indent_of(lines[j]) <= indent), len(lines) - 1)
+
+        blocks.append((opcodes, start + 1, end + 1))
+        i = end + 1
+
+    return blocks
+
+
+def opcode_names() -> Dict[str, str]:
+    """Map normalized names (e.g. 'add2') to action.hpp short names ('ADD2')."""
+    content = ACTION_HPP.read_text()
+    enum_match = re.search(r'enum\s+SWFActionType\s*\{([^}]+)\}', content, re.DOTALL)
+    names = {}
+    if enum_match:
+        for match in re.finditer(r'SWF_ACTION_(\w+)\s*=', enum_match.group(1)):
+            names[match.group(1).lower().replace('_', '')] = match.group(1)
+    return names
+
+
+def function_opcode(function_name: str, names: Dict[str, str]) -> Optional[str]:
+    """Return the opcode a runtime action* function implements, if any."""
+    if not function_name.startswith('action'):
+        return None
+    return names.get(function_name[len('action'):].lower())
+
+
+# ==============================================================================
+# Impact Analysis
+# ==============================================================================
+
+def is_shared(path: Path) -> bool:
+    """Whether a changed file can affect test builds at all."""
+    if path.suffix.lower() in IGNORED_SUFFIXES:
+        return False
+    return any(root in path.parents for root in BUILD_ROOTS)
+
+
+def runtime_opcodes(changes: Dict[Path, Set[int]], names: Dict[str, str]) -> Optional[Set[str]]:
+    """
+    Opcodes whose runtime implementation changed, or None if a change falls
+    outside any function or reaches no opcode.
+    """
+    functions = {}
+    for path in RUNTIME_SOURCES:
+        for name, first, last in c_functions(path):
+            functions[(path, name)] = (first, last)
+
+    # Changed functions
+    changed = set()
+    for path in RUNTIME_SOURCES:
+        for line in changes.get(path, ()):
+            owner = next((name for (p, name), (first, last) in functions.items()
+                          if p == path and first <= line <= last), None)
+            if owner is None:
+                return None
+            changed.add(owner)
+
+    # Reverse call graph over all three runtime files
+    callers = defaultdict(set)
+    known = {name for _, name in functions}
+    for path in RUNTIME_SOURCES:
+        lines = path.read_text(errors='replace').splitlines()
+        for (p, name), (first, last) in functions.items():
+            if p != path:
+                continue
+            body = '\n'.join(lines[first:last])
+            for callee in set(CALL.findall(body)) & known:
+                if callee != name:
+                    callers[callee].add(name)
+
+    # Every function reached from the changed ones
+    reached = set(changed)
+    pending = list(changed)
+    while pending:
+        for caller in callers[pending.pop()]:
+            if caller not in reached:
+                reached.add(caller)
+                pending.append(caller)
+
+    opcodes = {op for op in (function_opcode(name, names) for name in reached) if op}
+    return opcodes or None
+
+
+def recompiler_opcodes(lines: Set[int]) -> Optional[Set[str]]:
+    """Opcodes whose case blocks changed, or None if a change is outside them."""
+    blocks = case_blocks(RECOMPILER_ACTION_CPP)
+    opcodes = set()
+    for line in lines:
+        block = next((ops for ops, first, last in blocks if first <= line <= last), None)
+        if block is None:
+            return None
+        opcodes |= block
+    return opcodes
+
+
+def select_affected(test_names: List[str], base: str = "HEAD") -> Tuple[Optional[List[str]], str]:
+    """
+    Select the tests affected by the changes since base.
+
+    Returns (affected test names, reason), with None instead of a list when
+    the full suite must run.
+    """
+    changes = changed_lines(base)
+    if changes is None:
+        return None, "could not read git diff"
+    return affected_by(test_names, changes)
+
+
+def affected_by(test_names: List[str], changes: Dict[Path, Set[int]]) -> Tuple[Optional[List[str]], str]:
+    """
+    Select the tests affected by a set of changed lines.
+
+    changes maps absolute file paths to changed line numbers in their current
+    version, as returned by changed_lines(). Returns the same as
+    select_affected().
+    """
+    names = opcode_names()
+    opcodes = set()
+    touched_tests = set()
+
+    runtime_changes = {p: l for p, l in changes.items() if p in RUNTIME_SOURCES}
+    if runtime_changes:
+        if any(not p.is_file() for p in runtime_changes):
+            return None, "a runtime source was deleted"
+        found = runtime_opcodes(runtime_changes, names)
+        if found is None:
+            return None, "runtime change outside an opcode implementation"
+        opcodes |= found
+
+    for path, lines in changes.items():
+        if path in RUNTIME_SOURCES:
+            continue
+
+        if path == RECOMPILER_ACTION_CPP:
+            found = recompiler_opcodes(lines) if path.is_file() else None
+            if found is None:
+                return None, "recompiler change outside an opcode case"
+            opcodes |= found
+            continue
+
+        if TESTS_DIR in path.parents and path.parent != TESTS_DIR:
+            test_name = path.relative_to(TESTS_DIR).parts[0]
+            if test_name in test_names:
+                touched_tests.add(test_name)
+                continue
+
+        if is_shared(path):
+            return None, f"shared file changed: {path.name}"
+
+    affected = []
+    for name in test_names:
+        try:
+            with open(TESTS_DIR / name / "test_info.json", 'r') as f:
+                info = json.load(f).get("opcodes", {})
+        except (OSError, ValueError):
+            info = {}
+        exercised = set(info.get("tested", [])) | set(info.get("supporting", []))
+        if name in touched_tests or exercised & opcodes:
+            affected.append(name)
+
+    reason = f"opcodes changed: {', '.join(sorted(opcodes))}" if opcodes else "no opcode changes"
+    if touched_tests:
+        reason += f"; test directories changed: {len(touched_tests)}"
+    return affected, reason
+
+
+def main(argv=None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    base = args[0] if args else "HEAD"
+
+    test_names = sorted(
+        entry.name for entry in TESTS_DIR.iterdir()
+        if entry.is_dir() and (entry / "test_info.json").is_file()
+    )
+    affected, reason = select_affected(test_names, base)
+
+    print(f"# {reason}", file=sys.stderr)
+    if affected is None:
+        print("# full suite required", file=sys.stderr)
+        affected = test_names
+    print('\n'.join(affected))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import struct
+
+# Create a SWF4 file recompiled with asset_pack = true (see config.toml),
+# so the draw data goes to RecompiledTags/assets.bin and draws.c embeds
+# it with .incbin instead of defining C arrays.
+#
+# (Shapes need the graphics runtime, which the console tests don't link,
+# so the tables here are the identity transform and empty ones.)
+#
+# Test cases:
+# 1. The program links against the embedded pack and runs -> assets packed
+# 2. assets.bin has the six tables draws.h points into (see validate.py)
+
+# SWF Header
+signature = b'FWS'  # Uncompressed SWF
+version = 4
+
+# Frame size (RECT): 0-8000 twips (0-400 pixels)
+rect_data = bytes([0x78, 0x00, 0x0F, 0xA0, 0x00, 0x00, 0x0F, 0xA0, 0x00])
+
+frame_rate = struct.pack('<H', 24 << 8)  # 24 fps (8.8 fixed point)
+frame_count = struct.pack('<H', 1)  # 1 frame
+
+# trace("assets packed")
+string_data = b'\x00' + b'assets packed' + b'\x00'
+push_action = struct.pack('<BH', 0x96, len(string_data)) + string_data
+trace_action = bytes([0x26])
+
+# End action (0x00)
+action_end = bytes([0x00])
+
+all_actions = push_action + trace_action + action_end
+
+# DoAction tag
+do_action_header = struct.pack('<H', (12 << 6) | 0x3F)  # Tag type 12, long form
+do_action_header += struct.pack('<I', len(all_actions))
+do_action_tag = do_action_header + all_actions
+
+# ShowFrame tag
+show_frame_tag = struct.pack('<H', 1 << 6)  # Tag type 1, short form
+
+# End tag
+end_tag = bytes([0x00, 0x00])
+
+# Build complete SWF
+tags = do_action_tag + show_frame_tag + end_tag
+body = rect_data + frame_rate + frame_count + tags
+
+file_length = 8 + len(body)  # Header is 8 bytes
+
+swf_data = signature + struct.pack('<BI', version, file_length) + body
+
+with open('test.swf', 'wb') as f:
+    f.write(swf_data)
+
+print(f"Created test.swf ({len(swf_data)} bytes)")
+print("Test 1: trace -> assets packed")
+print("Test 2: assets.bin matches draws.h")
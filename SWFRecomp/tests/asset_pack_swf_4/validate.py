@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Validation script for asset_pack_swf_4
+
+Tests the draw data written to an asset pack instead of C arrays:
+1. The program links against the pack embedded by draws.c: assets packed
+2. assets.bin has a valid header, and its table directory matches the
+   offsets and sizes draws.h gives the runtime
+"""
+import sys
+import json
+import os
+import re
+import struct
+
+# Import common utilities
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(script_dir, '..'))
+from test_utils import parse_output, make_result, make_validation_result
+
+TABLES = ["shape_data", "transform_data", "color_data", "uninv_mat_data", "gradient_data", "bitmap_data"]
+
+
+def read_pack(tags_dir):
+    """The table directory of assets.bin, as {name: (offset, size)}"""
+    with open(os.path.join(tags_dir, "assets.bin"), "rb") as f:
+        pack = f.read()
+
+    magic, version, count, file_size = struct.unpack_from("<4sIII", pack, 0)
+
+    if magic != b"SWFA" or version != 1 or file_size != len(pack):
+        return None
+
+    tables = {}
+
+    for i in range(count):
+        name, offset, size = struct.unpack_from("<24sII", pack, 16 + 32*i)
+
+        if offset % 16 != 0 or offset + size > len(pack):
+            return None
+
+        tables[name.rstrip(b"\x00").decode()] = (offset, size)
+
+    return tables
+
+
+def read_header(tags_dir):
+    """The offsets and sizes draws.h defines, as {name: (offset, size)}"""
+    with open(os.path.join(tags_dir, "draws.h")) as f:
+        header = f.read()
+
+    tables = {}
+
+    for name in TABLES:
+        offset = re.search(r"#define %s \(\(.*\) \(asset_pack \+ (\d+)\)\)" % name, header)
+        size = re.search(r"#define %s_SIZE (\d+)" % name.upper(), header)
+
+        if offset and size:
+            tables[name] = (int(offset.group(1)), int(size.group(1)))
+
+    return tables
+
+
+def validate_output(output):
+    """
+    Validate test output.
+
+    Expected:
+    - The trace: assets packed
+    - assets.bin and draws.h agree on all six tables
+    """
+    lines = parse_output(output)
+    results = []
+
+    expected = "assets packed"
+    actual = expected if expected in lines else "(no output)"
+    results.append(make_result("embedded_pack_links", actual == expected, expected, actual))
+
+    tags_dir = os.path.join(script_dir, "RecompiledTags")
+
+    try:
+        pack = read_pack(tags_dir)
+        header = read_header(tags_dir)
+    except OSError as e:
+        pack, header = None, str(e)
+
+    expected = str({name: header.get(name) for name in TABLES}) if isinstance(header, dict) else "draws.h"
+    actual = str({name: pack.get(name) for name in TABLES}) if pack is not None else "(invalid assets.bin)"
+    passed = pack is not None and isinstance(header, dict) and len(header) == len(TABLES) and expected == actual
+    results.append(make_result("pack_matches_header", passed, expected, actual))
+
+    return make_validation_result(results)
+
+
+if __name__ == "__main__":
+    output = sys.stdin.read()
+    result = validate_output(output)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Batch Validation Engine for SWFRecomp Tests
+
+Runs many tests' validate.py scripts inside one long-lived Python process.
+Each validate.py is imported once and its validate_output() function is
+called directly, instead of piping output into a fresh interpreter per test.
+
+Captured output is decoded the way the validators' own stdin handling does:
+UTF-8 with surrogate escapes by default (Python's text-mode stdin), or the
+codec named by "output_encoding" in the test's test_info.json execution
+block for validators that read raw bytes themselves.
+
+Usage:
+    from batch_validate import BatchValidator
+
+    validator = BatchValidator()
+    result = validator.validate("trace_swf_4", b"sup from SWF 4\\n")
+    results = validator.validate_many({"add_swf_4": out1, "trace_swf_4": out2})
+
+Command line (one <test_name>.out capture file per test):
+    ./batch_validate.py captures/
+"""
+
+import contextlib
+import importlib.util
+import io
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Union
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+# Make test_utils importable once for every validate.py loaded in-process
+if str(TESTS_DIR) not in sys.path:
+    sys.path.insert(0, str(TESTS_DIR))
+
+from test_utils import make_result, make_validation_result  # noqa: E402
+
+# Decoding used by a plain sys.stdin.read() in the test suite's environment
+DEFAULT_OUTPUT_ENCODING = "utf-8"
+
+
+def validation_error(message: str) -> Dict:
+    """Build the result reported when a validator cannot produce one."""
+    return make_validation_result([
+        make_result(
+            "validation_error",
+            False,
+            "valid JSON",
+            "validation script failed",
+            message
+        )
+    ])
+
+
+class BatchValidator:
+    """
+    Imports validate.py modules on first use and keeps them loaded.
+
+    A single instance is meant to live for a whole test run.
+    """
+
+    def __init__(self, tests_dir: Path = TESTS_DIR):
+        self.tests_dir = Path(tests_dir)
+        self._validators = {}
+        self._encodings = {}
+
+    def load(self, test_name: str):
+        """Return the validate_output() function for a test, importing it once."""
+        if test_name not in self._validators:
+            script = self.tests_dir / test_name / "validate.py"
+            spec = importlib.util.spec_from_file_location(
+                f"validate_{test_name}", script
+            )
+            module = importlib.util.module_from_spec(spec)
+
+            # validate.py scripts prepend the tests directory to sys.path on
+            # import; restore it so repeated loads don't grow the path
+            saved_path = list(sys.path)
+            try:
+                spec.loader.exec_module(module)
+            finally:
+                sys.path[:] = saved_path
+
+            self._validators[test_name] = module.validate_output
+
+        return self._validators[test_name]
+
+    def output_encoding(self, test_name: str) -> str:
+        """Return the codec a test's validator expects its output in."""
+        if test_name not in self._encodings:
+            try:
+                with open(self.tests_dir / test_name / "test_info.json", 'r') as f:
+                    execution = json.load(f).get("execution", {})
+            except (OSError, ValueError):
+                execution = {}
+            self._encodings[test_name] = execution.get(
+                "output_encoding", DEFAULT_OUTPUT_ENCODING
+            )
+
+        return self._encodings[test_name]
+
+    def validate(self, test_name: str, output: Union[bytes, str]) -> Dict:
+        """
+        Validate one test's captured output.
+
+        Returns the validator's result ({"passed": ..., "sub_tests": [...]}),
+        or a validation_error result if the validator fails to import, raises,
+        or returns something that isn't JSON-serializable.
+        """
+        if isinstance(output, bytes):
+            output = output.decode(self.output_encoding(test_name), errors='surrogateescape')
+
+        try:
+            validate_output = self.load(test_name)
+
+            # Validators occasionally print diagnostics; keep them out of the
+            # runner's own output
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = validate_output(output)
+
+            # Normalize to plain JSON types, as the subprocess protocol did
+            return json.loads(json.dumps(result))
+        except Exception as e:
+            return validation_error(f"validate.py raised {type(e).__name__}: {e}")
+
+    def validate_many(self, outputs: Dict[str, Union[bytes, str]]) -> Dict[str, Dict]:
+        """Validate several captured outputs, returning results keyed by test name."""
+        return {name: self.validate(name, output) for name, output in outputs.items()}
+
+
+def main(argv=None) -> int:
+    """Validate every <test_name>.out file in a directory and print merged JSON."""
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 1:
+        print(f"Usage: {Path(sys.argv[0]).name} <capture_dir>", file=sys.stderr)
+        return 2
+
+    outputs = {
+        capture.stem: capture.read_bytes()
+        for capture in sorted(Path(args[0]).glob("*.out"))
+    }
+    results = BatchValidator().validate_many(outputs)
+
+    print(json.dumps({
+        "passed": all(result.get("passed", False) for result in results.values()),
+        "tests": results
+    }, indent=2))
+
+    return 0 if all(result.get("passed", False) for result in results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+import struct
+
+# Create a SWF7 file with code no path reaches: branches on constant
+# conditions, code after unconditional Jumps and Returns, and a function
+# defined only in skipped code. The recompiler drops it; these cases
+# check the reachable code still runs as before.
+#
+# Test cases:
+# 1. if (0) skip: the skipped-over trace runs -> a
+# 2. if (1) skip: the skipped-over trace is dead -> b
+# 3. Jump over a DefineFunction and a trace -> c
+# 4. if (2 < 1) else-branch, folded to a constant -> d
+# 5. Code after Return in a function -> 5
+
+# SWF Header
+signature = b'FWS'  # Uncompressed SWF
+version = 7  # SWF 7 supports DefineFunction2
+
+# Frame size (RECT): 0-8000 twips (0-400 pixels)
+rect_data = bytes([0x78, 0x00, 0x0F, 0xA0, 0x00, 0x00, 0x0F, 0xA0, 0x00])
+
+frame_rate = struct.pack('<H', 24 << 8)  # 24 fps (8.8 fixed point)
+frame_count = struct.pack('<H', 1)  # 1 frame
+
+JUMP = 0x99
+IF = 0x9D
+LESS = bytes([0x0F])
+RETURN = bytes([0x3E])
+TRACE = bytes([0x26])
+CALL_FUNCTION = bytes([0x3D])
+
+def push_float(value):
+    return struct.pack('<BHB', 0x96, 5, 1) + struct.pack('<f', value)
+
+def push_string(s):
+    data = b'\x00' + s.encode('utf-8') + b'\x00'
+    return struct.pack('<BH', 0x96, len(data)) + data
+
+def trace(s):
+    return push_string(s) + TRACE
+
+def branch(code, offset):
+    # Offset is relative to the end of the branch action
+    return struct.pack('<BHh', code, 2, offset)
+
+def define_function2(name, body):
+    # No parameters, no registers beyond the default, no flags
+    data = name.encode('utf-8') + b'\x00' + struct.pack('<HBH', 0, 1, 0x0000)
+    data += struct.pack('<H', len(body))
+    return struct.pack('<BH', 0x8E, len(data) + len(body)) + data + body
+
+# Test 1: if (0) goto L; trace("a"); L:
+test1 = push_float(0.0) + branch(IF, len(trace("a"))) + trace("a")
+
+# Test 2: if (1) goto L; trace("dead1"); L: trace("b")
+test2 = push_float(1.0) + branch(IF, len(trace("dead1"))) + trace("dead1") + trace("b")
+
+# Test 3: goto L; function unused() { return 7; } trace("dead2"); L: trace("c")
+skipped = define_function2("unused", push_float(7.0) + RETURN) + trace("dead2")
+test3 = branch(JUMP, len(skipped)) + skipped + trace("c")
+
+# Test 4: if (2 < 1) goto E; trace("d"); goto L; E: trace("dead3"); L:
+test4 = (push_float(2.0) + push_float(1.0) + LESS +
+         branch(IF, len(trace("d")) + 5) + trace("d") +
+         branch(JUMP, len(trace("dead3"))) + trace("dead3"))
+
+# Test 5: function f() { return 5; return 99; } trace(f())
+# Function bodies only push numbers: strings pushed in them are declared
+# inside the function by the code generator.
+test5 = (define_function2("f", push_float(5.0) + RETURN + push_float(99.0) + RETURN) +
+         push_float(0.0) + push_string("f") + CALL_FUNCTION + TRACE)
+
+# End action (0x00)
+action_end = bytes([0x00])
+
+all_actions = test1 + test2 + test3 + test4 + test5 + action_end
+
+# DoAction tag
+do_action_header = struct.pack('<H', (12 << 6) | 0x3F)  # Tag type 12, long form
+do_action_header += struct.pack('<I', len(all_actions))
+do_action_tag = do_action_header + all_actions
+
+# ShowFrame tag
+show_frame_tag = struct.pack('<H', 1 << 6)  # Tag type 1, short form
+
+# End tag
+end_tag = bytes([0x00, 0x00])
+
+# Build complete SWF
+tags = do_action_tag + show_frame_tag + end_tag
+body = rect_data + frame_rate + frame_count + tags
+
+file_length = 8 + len(body)  # Header is 8 bytes
+
+swf_data = signature + struct.pack('<BI', version, file_length) + body
+
+with open('test.swf', 'wb') as f:
+    f.write(swf_data)
+
+print(f"Created test.swf ({len(swf_data)} bytes)")
+print("Test 1: if (0) skip -> a")
+print("Test 2: if (1) skip -> b")
+print("Test 3: Jump over dead code -> c")
+print("Test 4: folded constant condition -> d")
+print("Test 5: code after Return -> 5")
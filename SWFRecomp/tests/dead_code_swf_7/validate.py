@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Validation script for dead_code_swf_7
+
+Tests code that no path reaches, which the recompiler removes:
+1. if (0) over a trace: the trace runs -> a
+2. if (1) over a trace: the trace is skipped -> b
+3. Jump over a DefineFunction2 and a trace -> c
+4. if (2 < 1) with an else-branch -> d
+5. Code after Return -> 5
+No "dead" line may appear.
+"""
+import sys
+import json
+import os
+
+# Import common utilities
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(script_dir, '..'))
+from test_utils import parse_output, make_result, make_validation_result
+
+
+def validate_output(output):
+    """
+    Validate test output.
+
+    Expected:
+    - Line 0: a
+    - Line 1: b
+    - Line 2: c
+    - Line 3: d
+    - Line 4: 5
+    """
+    lines = parse_output(output)
+    results = []
+
+    cases = [
+        ("if_false", "a"),
+        ("if_true", "b"),
+        ("after_jump", "c"),
+        ("folded_condition", "d"),
+        ("after_return", "5"),
+    ]
+
+    for i, (name, expected) in enumerate(cases):
+        actual = lines[i] if len(lines) > i else "(no output)"
+        results.append(make_result(name, actual == expected, expected, actual))
+
+    dead = [line for line in lines if line.startswith("dead")]
+    results.append(make_result("no_dead_code_runs", len(dead) == 0, "(none)", ", ".join(dead) or "(none)"))
+
+    return make_validation_result(results)
+
+
+if __name__ == "__main__":
+    output = sys.stdin.read()
+    result = validate_output(output)
+    print(json.dumps(result, indent=2))
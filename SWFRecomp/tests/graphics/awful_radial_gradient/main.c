@@ -18,17 +18,17 @@ int main()
 	app_context.bitmap_highest_h = BITMAP_HIGHEST_H;
 	
 	app_context.shape_data = (char*) shape_data;
-	app_context.shape_data_size = sizeof(shape_data);
+	app_context.shape_data_size = SHAPE_DATA_SIZE;
 	app_context.transform_data = (char*) transform_data;
-	app_context.transform_data_size = sizeof(transform_data);
+	app_context.transform_data_size = TRANSFORM_DATA_SIZE;
 	app_context.color_data = (char*) color_data;
-	app_context.color_data_size = sizeof(color_data);
+	app_context.color_data_size = COLOR_DATA_SIZE;
 	app_context.uninv_mat_data = (char*) uninv_mat_data;
-	app_context.uninv_mat_data_size = sizeof(uninv_mat_data);
+	app_context.uninv_mat_data_size = UNINV_MAT_DATA_SIZE;
 	app_context.gradient_data = (char*) gradient_data;
-	app_context.gradient_data_size = sizeof(gradient_data);
+	app_context.gradient_data_size = GRADIENT_DATA_SIZE;
 	app_context.bitmap_data = (char*) bitmap_data;
-	app_context.bitmap_data_size = sizeof(bitmap_data);
+	app_context.bitmap_data_size = BITMAP_DATA_SIZE;
 	
 	swfStart(&app_context);
 }
\ No newline at end of file
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import struct
+
+# Create a SWF7 file with branches that leave Try and With blocks. Their
+# bodies are emitted inline, so the label each branch targets belongs to
+# the enclosing script.
+#
+# Test cases:
+# 1. Jump from a Try block over a trace after it -> a, b
+# 2. Jump from a With block over a trace after it -> c, d
+# 3. If from a Try block nested in a With block, back over the With -> e, e, f
+# 4. A register typed differently on the path out of a Try block -> s1
+# 5. A throw after the blocks above, outside any Try block -> uncaught
+
+# SWF Header
+signature = b'FWS'  # Uncompressed SWF
+version = 7  # ActionTry requires SWF 7+
+
+# Frame size (RECT): 0-8000 twips (0-400 pixels)
+rect_data = bytes([0x78, 0x00, 0x0F, 0xA0, 0x00, 0x00, 0x0F, 0xA0, 0x00])
+
+frame_rate = struct.pack('<H', 24 << 8)  # 24 fps (8.8 fixed point)
+frame_count = struct.pack('<H', 1)  # 1 frame
+
+JUMP = 0x99
+IF = 0x9D
+TRACE = bytes([0x26])
+GET_VARIABLE = bytes([0x1C])
+SET_VARIABLE = bytes([0x1D])
+INCREMENT = bytes([0x50])
+LESS = bytes([0x0F])
+ADD2 = bytes([0x47])
+POP = bytes([0x17])
+RETURN = bytes([0x3E])
+CALL_FUNCTION = bytes([0x3D])
+THROW = bytes([0x2A])
+
+def push_float(value):
+    return struct.pack('<BHB', 0x96, 5, 1) + struct.pack('<f', value)
+
+def push_string(s):
+    data = b'\x00' + s.encode('utf-8') + b'\x00'
+    return struct.pack('<BH', 0x96, len(data)) + data
+
+def trace(s):
+    return push_string(s) + TRACE
+
+def push_register(reg):
+    return struct.pack('<BHBB', 0x96, 2, 4, reg)
+
+def store_register(reg):
+    return struct.pack('<BHB', 0x87, 1, reg)
+
+def branch(code, offset):
+    # Offset is relative to the end of the branch action
+    return struct.pack('<BHh', code, 2, offset)
+
+def try_block(body):
+    # No catch or finally block
+    data = struct.pack('<BHHH', 0x00, len(body), 0, 0)
+    return struct.pack('<BH', 0x8F, len(data) + len(body)) + data + body
+
+def with_block(body):
+    # The record length covers BlockSize and the block itself
+    return struct.pack('<BHH', 0x94, 2 + len(body), len(body)) + body
+
+def define_function2(name, register_count, body):
+    # No parameters or flags
+    data = name.encode('utf-8') + b'\x00' + struct.pack('<HBH', 0, register_count, 0x0000)
+    data += struct.pack('<H', len(body))
+    return struct.pack('<BH', 0x8E, len(data) + len(body)) + data + body
+
+# Test 1: try { trace("a"); goto L; } trace("dead1"); L: trace("b")
+test1 = try_block(trace("a") + branch(JUMP, len(trace("dead1")))) + trace("dead1") + trace("b")
+
+# Test 2: with (0) { trace("c"); goto L; } trace("dead2"); L: trace("d")
+test2 = (push_float(0.0) +
+         with_block(trace("c") + branch(JUMP, len(trace("dead2")))) +
+         trace("dead2") + trace("d"))
+
+# Test 3: n = 0; L: with (0) { try { trace("e"); n++; if (n < 2) goto L; } }
+#         trace("f")
+# The If is the last action of both blocks, so its offset is relative to
+# the end of the With record.
+count = push_string("n") + push_string("n") + GET_VARIABLE + INCREMENT + SET_VARIABLE
+condition = push_string("n") + GET_VARIABLE + push_float(2.0) + LESS
+
+def loop(offset):
+    inner = try_block(trace("e") + count + condition + branch(IF, offset))
+    return push_float(0.0) + with_block(inner)
+
+test3_size = len(loop(0))
+test3 = push_string("n") + push_float(0.0) + SET_VARIABLE + loop(-test3_size) + trace("f")
+
+# Test 4: function f() { r1 = 0; try { r1 = "s"; goto L; } r1 = 5; L: return r1 + 1; }
+#         trace(f())
+# Only the path out of the Try block reaches L, so r1 isn't a number there.
+assign_number = push_float(5.0) + store_register(1) + POP
+test4 = (define_function2("f", 2,
+             push_float(0.0) + store_register(1) + POP +
+             try_block(push_string("s") + store_register(1) + POP + branch(JUMP, len(assign_number))) +
+             assign_number +
+             push_register(1) + push_float(1.0) + ADD2 + RETURN) +
+         push_float(0.0) + push_string("f") + CALL_FUNCTION + TRACE)
+
+# Test 5: throw "x"; trace("dead3")
+# The branches above ended the blocks they left, so no Try block is open
+# and the exception is uncaught, which stops the script.
+test5 = push_string("x") + THROW + trace("dead3")
+
+# End action (0x00)
+action_end = bytes([0x00])
+
+all_actions = test1 + test2 + test3 + test4 + test5 + action_end
+
+# DoAction tag
+do_action_header = struct.pack('<H', (12 << 6) | 0x3F)  # Tag type 12, long form
+do_action_header += struct.pack('<I', len(all_actions))
+do_action_tag = do_action_header + all_actions
+
+# ShowFrame tag
+show_frame_tag = struct.pack('<H', 1 << 6)  # Tag type 1, short form
+
+# End tag
+end_tag = bytes([0x00, 0x00])
+
+# Build complete SWF
+tags = do_action_tag + show_frame_tag + end_tag
+body = rect_data + frame_rate + frame_count + tags
+
+file_length = 8 + len(body)  # Header is 8 bytes
+
+swf_data = signature + struct.pack('<BI', version, file_length) + body
+
+with open('test.swf', 'wb') as f:
+    f.write(swf_data)
+
+print(f"Created test.swf ({len(swf_data)} bytes)")
+print("Test 1: Jump out of a Try block -> a, b")
+print("Test 2: Jump out of a With block -> c, d")
+print("Test 3: If out of a Try block in a With block -> e, e, f")
+print("Test 4: register type on the path out of a Try block -> s1")
+print("Test 5: throw outside any Try block -> [Uncaught exception: x]")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Validation script for jump_out_of_block_swf_7
+
+Tests branches that leave Try and With blocks for the enclosing script:
+1. Jump out of a Try block over a trace -> a, b
+2. Jump out of a With block over a trace -> c, d
+3. If out of a Try block in a With block, back to before the With -> e, e, f
+4. A register set to a string before a Jump out of a Try block -> s1
+5. A throw after them, outside any Try block -> [Uncaught exception: x]
+No "dead" line may appear.
+"""
+import sys
+import json
+import os
+
+# Import common utilities
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(script_dir, '..'))
+from test_utils import parse_output, make_result, make_validation_result
+
+
+def validate_output(output):
+    """
+    Validate test output.
+
+    Expected:
+    - Lines 0-1: a, b
+    - Lines 2-3: c, d
+    - Lines 4-6: e, e, f
+    - Line 7: s1
+    - Line 8: [Uncaught exception: x]
+    """
+    lines = parse_output(output)
+    results = []
+
+    cases = [
+        ("try_block_runs", "a"),
+        ("jump_out_of_try", "b"),
+        ("with_block_runs", "c"),
+        ("jump_out_of_with", "d"),
+        ("nested_block_runs", "e"),
+        ("if_out_of_nested_block", "e"),
+        ("loop_exits", "f"),
+        ("register_type_out_of_try", "s1"),
+        ("throw_is_uncaught", "[Uncaught exception: x]"),
+    ]
+
+    for i, (name, expected) in enumerate(cases):
+        actual = lines[i] if len(lines) > i else "(no output)"
+        results.append(make_result(name, actual == expected, expected, actual))
+
+    skipped = [line for line in lines if line.startswith("dead")]
+    results.append(make_result("skipped_code_doesnt_run", len(skipped) == 0, "(none)", ", ".join(skipped) or "(none)"))
+
+    return make_validation_result(results)
+
+
+if __name__ == "__main__":
+    output = sys.stdin.read()
+    result = validate_output(output)
+    print(json.dumps(result, indent=2))
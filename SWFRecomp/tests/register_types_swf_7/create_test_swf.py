@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import struct
+
+# Create a SWF7 file with DefineFunction2 loops over local registers.
+# The recompiler infers which registers hold numbers and emits their
+# arithmetic inline; these cases check the results match the runtime's.
+#
+# Test cases:
+# 1. sumSquares(5): i and sum stay F32 -> 0+1+4+...+81 + 5 = 290
+# 2. mixed(): x starts F32 and becomes F64 in the loop -> 1 + 4 = 5
+# 3. bits(): masks and shifts of a counter -> 53
+
+# SWF Header
+signature = b'FWS'  # Uncompressed SWF
+version = 7  # SWF 7 supports DefineFunction2
+
+# Frame size (RECT): 0-8000 twips (0-400 pixels)
+rect_data = bytes([0x78, 0x00, 0x0F, 0xA0, 0x00, 0x00, 0x0F, 0xA0, 0x00])
+
+frame_rate = struct.pack('<H', 24 << 8)  # 24 fps (8.8 fixed point)
+frame_count = struct.pack('<H', 1)  # 1 frame
+
+ADD2 = bytes([0x47])
+MULTIPLY = bytes([0x0C])
+LESS2 = bytes([0x48])
+INCREMENT = bytes([0x50])
+DECREMENT = bytes([0x51])
+BIT_AND = bytes([0x60])
+BIT_LSHIFT = bytes([0x63])
+POP = bytes([0x17])
+RETURN = bytes([0x3E])
+TRACE = bytes([0x26])
+CALL_FUNCTION = bytes([0x3D])
+
+def push_float(value):
+    return struct.pack('<BHB', 0x96, 5, 1) + struct.pack('<f', value)
+
+def push_double(value):
+    # Type 6 = Double, stored as two little-endian words, high word first
+    bits = struct.unpack('<Q', struct.pack('<d', value))[0]
+    return struct.pack('<BHB', 0x96, 9, 6) + struct.pack('<II', bits >> 32, bits & 0xFFFFFFFF)
+
+def push_string(s):
+    data = b'\x00' + s.encode('utf-8') + b'\x00'
+    return struct.pack('<BH', 0x96, len(data)) + data
+
+def push_register(reg):
+    return struct.pack('<BHBB', 0x96, 2, 4, reg)
+
+def store_register(reg):
+    return struct.pack('<BHB', 0x87, 1, reg)
+
+def branch(code, offset):
+    # Offset is relative to the end of the branch action
+    return struct.pack('<BHh', code, 2, offset)
+
+def loop(condition, body):
+    """while (condition) body, as If/Jump actions"""
+    # condition; If -> body; Jump -> end; body; Jump -> condition
+    exit_jump = branch(0x99, len(body) + 5)
+    enter = branch(0x9D, len(exit_jump))
+    back = -(len(condition) + len(enter) + len(exit_jump) + len(body) + 5)
+    return condition + enter + exit_jump + body + branch(0x99, back)
+
+def define_function2(name, params, register_count, body):
+    data = name.encode('utf-8') + b'\x00'
+    data += struct.pack('<HBH', len(params), register_count, 0x0000)
+    for reg, param_name in params:
+        data += struct.pack('B', reg) + param_name.encode('utf-8') + b'\x00'
+    data += struct.pack('<H', len(body))
+    return struct.pack('<BH', 0x8E, len(data) + len(body)) + data + body
+
+def call(name, args):
+    actions = b''
+    for arg in args:
+        actions += push_float(arg)
+    return actions + push_float(float(len(args))) + push_string(name) + CALL_FUNCTION + TRACE
+
+# Test 1: function sumSquares(n) { i = 0; sum = 0; while (i < 10) { sum += i*i; i++; } return sum + n; }
+# n: register 1 (a parameter, so of unknown type), i: register 2, sum: register 3
+sum_squares = define_function2("sumSquares", [(1, "n")], 4,
+    push_float(0.0) + store_register(2) + POP +
+    push_float(0.0) + store_register(3) + POP +
+    loop(
+        push_register(2) + push_float(10.0) + LESS2,
+        push_register(3) + push_register(2) + push_register(2) + MULTIPLY + ADD2 + store_register(3) + POP +
+        push_register(2) + INCREMENT + store_register(2) + POP
+    ) +
+    push_register(3) + push_register(1) + ADD2 + RETURN
+)
+
+# Test 2: function mixed() { x = 0; k = 0; while (k < 4) { x += 0.25 (a double); k++; } return x + k; }
+# x: register 1 changes from F32 to F64 inside the loop, k: register 2
+mixed = define_function2("mixed", [], 3,
+    push_float(0.0) + store_register(1) + POP +
+    push_float(0.0) + store_register(2) + POP +
+    loop(
+        push_register(2) + push_float(4.0) + LESS2,
+        push_register(1) + push_double(0.25) + ADD2 + store_register(1) + POP +
+        push_register(2) + INCREMENT + store_register(2) + POP
+    ) +
+    push_register(1) + push_register(2) + ADD2 + RETURN
+)
+
+# Test 3: function bits() { c = 10; t = 0; while (0 < c) { c--; t += (c & 3) << 1; } return t + c + 27; }
+# (c & 3) << 1 for c = 9..0 sums to 26
+bits = define_function2("bits", [], 3,
+    push_float(10.0) + store_register(1) + POP +
+    push_float(0.0) + store_register(2) + POP +
+    loop(
+        push_float(0.0) + push_register(1) + LESS2,
+        push_register(1) + DECREMENT + store_register(1) + POP +
+        push_register(2) + push_register(1) + push_float(3.0) + BIT_AND + push_float(1.0) + BIT_LSHIFT + ADD2 +
+        store_register(2) + POP
+    ) +
+    push_register(2) + push_register(1) + ADD2 + push_float(27.0) + ADD2 + RETURN
+)
+
+# End action (0x00)
+action_end = bytes([0x00])
+
+all_actions = (
+    sum_squares + mixed + bits +
+    call("sumSquares", [5.0]) +
+    call("mixed", []) +
+    call("bits", []) +
+    action_end
+)
+
+# DoAction tag
+do_action_header = struct.pack('<H', (12 << 6) | 0x3F)  # Tag type 12, long form
+do_action_header += struct.pack('<I', len(all_actions))
+do_action_tag = do_action_header + all_actions
+
+# ShowFrame tag
+show_frame_tag = struct.pack('<H', 1 << 6)  # Tag type 1, short form
+
+# End tag
+end_tag = bytes([0x00, 0x00])
+
+# Build complete SWF
+tags = do_action_tag + show_frame_tag + end_tag
+body = rect_data + frame_rate + frame_count + tags
+
+file_length = 8 + len(body)  # Header is 8 bytes
+
+swf_data = signature + struct.pack('<BI', version, file_length) + body
+
+with open('test.swf', 'wb') as f:
+    f.write(swf_data)
+
+print(f"Created test.swf ({len(swf_data)} bytes)")
+print("Test 1: sumSquares(5) -> 290")
+print("Test 2: mixed() -> 5")
+print("Test 3: bits() -> 53")
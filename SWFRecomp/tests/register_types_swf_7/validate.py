@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Validation script for register_types_swf_7
+
+Tests DefineFunction2 loops whose local registers the recompiler infers
+as numbers, and emits inline arithmetic for:
+1. F32 registers throughout (Less2, Multiply, Add2, Increment): sumSquares(5) = 290
+2. A register that changes from F32 to F64 in the loop: mixed() = 5
+3. Bit operations on a register counter (Decrement, BitAnd, BitLShift): bits() = 53
+"""
+import sys
+import json
+import os
+
+# Import common utilities
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(script_dir, '..'))
+from test_utils import parse_output, make_result, make_validation_result
+
+
+def validate_output(output):
+    """
+    Validate test output.
+
+    Expected:
+    - Line 0: 290 (sumSquares(5))
+    - Line 1: 5 (mixed())
+    - Line 2: 53 (bits())
+    """
+    lines = parse_output(output)
+    results = []
+
+    cases = [
+        ("sum_squares_f32", "290"),
+        ("mixed_f32_f64", "5"),
+        ("bit_ops", "53"),
+    ]
+
+    for i, (name, expected) in enumerate(cases):
+        actual = lines[i] if len(lines) > i else "(no output)"
+        results.append(make_result(name, actual == expected, expected, actual))
+
+    return make_validation_result(results)
+
+
+if __name__ == "__main__":
+    output = sys.stdin.read()
+    result = validate_output(output)
+    print(json.dumps(result, indent=2))
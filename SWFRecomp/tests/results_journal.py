@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Streaming Test Result Journal
+
+Test results are appended to a JSONL journal (test_results.jsonl) as each
+test finishes, instead of rewriting the whole test_results.json after every
+test. When the run ends, compaction merges the journal into test_results.json
+(the file build_opcode_index.py reads) and computes the summary once.
+
+The first journal line records the run's planned tests, so a run that was
+interrupted can be resumed: tests already in the journal are skipped and the
+remaining ones are appended to the same journal.
+
+Journal lines:
+    {"event": "start", "timestamp": "...", "tests": ["add_swf_4", ...]}
+    {"event": "result", "result": {"name": "add_swf_4", "passed": true, ...}}
+
+Usage:
+    ./results_journal.py --compact     # Compact a journal left by an interrupted run
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+TESTS_DIR = Path(__file__).resolve().parent
+RESULTS_FILE = TESTS_DIR / "test_results.json"
+JOURNAL_FILE = TESTS_DIR / "test_results.jsonl"
+
+
+def utc_timestamp() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def load_results(results_file: Path = RESULTS_FILE) -> Dict:
+    """Load a test_results.json, or an empty result set."""
+    try:
+        with open(results_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"tests": []}
+
+
+def compute_summary(tests: List[Dict]) -> Dict:
+    """Calculate the summary block over all tests in the results file."""
+    sub_tests = [sub for test in tests for sub in test.get("sub_tests", [])]
+    passed_sub_tests = sum(1 for sub in sub_tests if sub.get("passed", False))
+
+    return {
+        "total_tests": len(tests),
+        "passed": sum(1 for t in tests if t.get("passed", False)),
+        "failed": sum(1 for t in tests if not t.get("passed", True)),
+        "skipped": 0,  # We don't preserve skipped status
+        "total_sub_tests": len(sub_tests),
+        "passed_sub_tests": passed_sub_tests,
+        "failed_sub_tests": len(sub_tests) - passed_sub_tests
+    }
+
+
+class ResultJournal:
+    """Append-only JSONL log of the results of one test run."""
+
+    def __init__(self, path: Path = JOURNAL_FILE):
+        self.path = Path(path)
+        self._file = None
+
+    def exists(self) -> bool:
+        return self.path.is_file()
+
+    def start(self, test_names: List[str]):
+        """Begin a new run, discarding any previous journal."""
+        self.close()
+        self._file = open(self.path, 'w')
+        self._write({"event": "start", "timestamp": utc_timestamp(), "tests": test_names})
+
+    def resume(self):
+        """Continue appending to an existing journal."""
+        self.close()
+        self._file = open(self.path, 'a')
+
+    def append(self, result: Dict):
+        """Record one finished test."""
+        self._write({"event": "result", "result": result})
+
+    def _write(self, record: Dict):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def load(self) -> Tuple[Optional[List[str]], List[Dict]]:
+        """
+        Read the journal back.
+
+        Returns (planned test names or None if there is no start record,
+        recorded results). A partially written last line, left by a run that
+        was killed mid-write, is ignored. If a test was recorded more than
+        once, its last result wins.
+        """
+        planned = None
+        results = {}
+
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("event") == "start":
+                        planned = record.get("tests", [])
+                    elif record.get("event") == "result":
+                        result = record["result"]
+                        results[result["name"]] = result
+        except OSError:
+            pass
+
+        return planned, list(results.values())
+
+    def compact(self, results_file: Path = RESULTS_FILE) -> Dict:
+        """
+        Merge the journal into test_results.json and remove the journal.
+
+        Results of tests not recorded in the journal are preserved from the
+        previous test_results.json. Returns the written data.
+        """
+        self.close()
+        planned, results = self.load()
+
+        if planned is not None:
+            order = {name: i for i, name in enumerate(planned)}
+            results.sort(key=lambda test: order.get(test["name"], len(order)))
+
+        run_names = {test["name"] for test in results}
+        preserved = [
+            test for test in load_results(results_file).get("tests", [])
+            if test.get("name") not in run_names
+        ]
+        tests = preserved + results
+
+        data = {
+            "timestamp": utc_timestamp(),
+            "summary": compute_summary(tests),
+            "tests": tests
+        }
+
+        # Write atomically so an interruption here can't corrupt the results
+        tmp_file = Path(f"{results_file}.tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, results_file)
+
+        self.path.unlink(missing_ok=True)
+        return data
+
+
+def main(argv=None) -> int:
+    args = sys.argv[1:] if argv is None else argv
+    if args != ["--compact"]:
+        print(f"Usage: {Path(sys.argv[0]).name} --compact", file=sys.stderr)
+        return 2
+
+    journal = ResultJournal()
+    if not journal.exists():
+        print(f"No journal to compact: {journal.path}")
+        return 0
+
+    data = journal.compact()
+    print(f"Compacted {journal.path.name} into {RESULTS_FILE.name} "
+          f"({data['summary']['total_tests']} tests)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
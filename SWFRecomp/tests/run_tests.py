@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+SWFRecomp Parallel Test Runner
+
+Python replacement for the serial loop in all_tests.sh. Tests are discovered
+from their test_info.json files, then built, recompiled and executed on a
+process pool, and validated in-process by batch_validate.py. Results are
+printed and appended to a JSONL journal as each test finishes; at the end
+the journal is compacted into test_results.json, using the same schema as
+all_tests.sh. An interrupted run can be continued with --resume.
+
+Build and run times are kept in test_timings.json and used to start the
+longest tests first and to split the suite into balanced shards.
+
+With --affected, only the tests exercising opcodes touched by the current
+git diff are run (see affected_tests.py).
+
+Usage:
+    ./run_tests.py                      # Run all tests
+    ./run_tests.py trace_swf_4 add_swf_4
+    ./run_tests.py --jobs 8 --timeout 120
+    ./run_tests.py --retest             # Only previously failed tests
+    ./run_tests.py --resume             # Continue an interrupted run
+    ./run_tests.py --shard 2/4          # Run the second of four balanced slices
+    ./run_tests.py --affected           # Only tests affected by uncommitted changes
+    ./run_tests.py --affected master    # Only tests affected since master
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from affected_tests import select_affected
+from batch_validate import BatchValidator
+from results_journal import RESULTS_FILE, ResultJournal, load_results
+from test_timings import TIMINGS_FILE, TimingHistory, parse_shard
+
+# Directory layout
+TESTS_DIR = Path(__file__).resolve().parent
+SWFRECOMP_ROOT = TESTS_DIR.parent
+SWFRECOMP_BUILD = SWFRECOMP_ROOT / "build"
+SWFRECOMP_EXE = SWFRECOMP_BUILD / "SWFRecomp"
+BUILD_SCRIPT = SWFRECOMP_ROOT / "scripts/build_test.sh"
+
+# Default per-test timeout (seconds), applied separately to build and run
+DEFAULT_TIMEOUT = 300
+
+# Runtime messages stripped from test output before validation
+# (mirrors filter_output() in all_tests.sh)
+RUNTIME_NOISE = (
+    b"SWF Runtime Loaded",
+    b"=== SWF",
+    b"[Frame",
+    b"[Tag]",
+    b"[DEBUG",
+    b"[HEAP",
+)
+
+# Colors for output (if terminal supports it)
+if sys.stdout.isatty():
+    GREEN = '\033[0;32m'
+    RED = '\033[0;31m'
+    YELLOW = '\033[0;33m'
+    BLUE = '\033[0;34m'
+    NC = '\033[0m'
+else:
+    GREEN = RED = YELLOW = BLUE = NC = ''
+
+
+# ==============================================================================
+# Logging
+# ==============================================================================
+
+def log_info(message):
+    print(f"{BLUE}[INFO]{NC} {message}", flush=True)
+
+
+def log_success(message):
+    print(f"{GREEN}[PASS]{NC} {message}", flush=True)
+
+
+def log_error(message):
+    print(f"{RED}[FAIL]{NC} {message}", flush=True)
+
+
+def log_warning(message):
+    print(f"{YELLOW}[SKIP]{NC} {message}", flush=True)
+
+
+# ==============================================================================
+# Test Discovery
+# ==============================================================================
+
+def load_test_info(test_name: str) -> Dict:
+    """Load a test's test_info.json, returning an empty dict if unreadable."""
+    try:
+        with open(TESTS_DIR / test_name / "test_info.json", 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_failed_tests_from_previous_run() -> List[str]:
+    """Return the names of tests that failed in the previous run."""
+    return [
+        test["name"]
+        for test in load_results().get("tests", [])
+        if not test.get("passed", False)
+    ]
+
+
+def discover_tests(specified_tests: List[str], retest: bool) -> List[str]:
+    """
+    Determine which tests to run.
+
+    Previously failed tests with --retest, the explicitly named tests if any,
+    otherwise every directory containing a test_info.json.
+    """
+    if retest:
+        return get_failed_tests_from_previous_run()
+
+    if specified_tests:
+        return list(specified_tests)
+
+    return sorted(
+        entry.name
+        for entry in TESTS_DIR.iterdir()
+        if entry.is_dir()
+        and entry.name not in ("templates", "build")
+        and (entry / "test_info.json").is_file()
+    )
+
+
+def check_test_setup(test_name: str) -> Optional[str]:
+    """Return a skip reason if the test cannot run, otherwise None."""
+    test_dir = TESTS_DIR / test_name
+
+    if not (test_dir / "test_info.json").is_file():
+        return "missing test_info.json"
+
+    validate_script = test_dir / "validate.py"
+    if not validate_script.is_file():
+        return "missing validate.py"
+
+    if not os.access(validate_script, os.X_OK):
+        try:
+            validate_script.chmod(validate_script.stat().st_mode | 0o111)
+        except OSError:
+            pass
+
+    return None
+
+
+# ==============================================================================
+# SWFRecomp Build
+# ==============================================================================
+
+def ensure_swfrecomp_built(clean: bool) -> bool:
+    """
+    Configure and build SWFRecomp.
+
+    Without clean this is idempotent and does nothing if the executable
+    already exists; with clean the build tree is cleaned and rebuilt.
+    """
+    if not clean and SWFRECOMP_EXE.is_file():
+        log_info("✅ SWFRecomp already built")
+        return True
+
+    SWFRECOMP_BUILD.mkdir(parents=True, exist_ok=True)
+
+    if not (SWFRECOMP_BUILD / "CMakeCache.txt").is_file():
+        log_info("Running CMake configuration...")
+        if subprocess.run(["cmake", ".."], cwd=SWFRECOMP_BUILD,
+                          capture_output=True).returncode != 0:
+            log_error("CMake configuration failed")
+            return False
+    elif clean:
+        subprocess.run(["make", "clean"], cwd=SWFRECOMP_BUILD, capture_output=True)
+
+    log_info("Compiling SWFRecomp...")
+    if subprocess.run(["make", "-j"], cwd=SWFRECOMP_BUILD,
+                      capture_output=True).returncode != 0:
+        log_error("Failed to build SWFRecomp")
+        return False
+
+    log_info("✅ SWFRecomp built successfully")
+    return True
+
+
+# ==============================================================================
+# Per-Test Build and Execution (runs in worker processes)
+# ==============================================================================
+
+def filter_output(raw_output: bytes, preserve_empty: bool) -> bytes:
+    """
+    Strip runtime messages (and empty lines unless preserved) from output.
+
+    Output is kept as raw bytes, since some tests deliberately print bytes
+    that are not valid UTF-8 and their validators decode stdin themselves.
+    """
+    lines = [
+        line for line in raw_output.split(b'\n')
+        if not any(noise in line for noise in RUNTIME_NOISE)
+    ]
+    if not preserve_empty:
+        lines = [line for line in lines if line]
+    return b'\n'.join(lines).rstrip(b'\n') + b'\n'
+
+
+def failure_result(name: str, expected: str, actual: str, message: str) -> Dict:
+    """Build a validation result holding a single failed sub-test."""
+    return {
+        "passed": False,
+        "sub_tests": [{
+            "name": name,
+            "passed": False,
+            "expected": expected,
+            "actual": actual,
+            "message": message
+        }]
+    }
+
+
+def build_test(test_name: str, clean: bool, timeout: int):
+    """
+    Build a test with build_test.sh (recompiles the SWF if needed).
+
+    Returns (succeeded, build_time_ms, error_message).
+    """
+    cmd = [str(BUILD_SCRIPT), test_name, "native"]
+    if clean:
+        cmd.append("--clean")
+
+    start = time.monotonic()
+    try:
+        result = subprocess.run(cmd, cwd=SWFRECOMP_ROOT, capture_output=True,
+                                timeout=timeout)
+        error = None if result.returncode == 0 else "Build failed"
+    except subprocess.TimeoutExpired:
+        error = f"Build timed out after {timeout}s"
+    build_time = int((time.monotonic() - start) * 1000)
+
+    return error is None, build_time, error
+
+
+def execute_test(test_name: str, preserve_empty: bool, timeout: int):
+    """
+    Run a built test executable and capture its filtered output.
+
+    Returns (output, run_time_ms, error_message).
+    """
+    executable = TESTS_DIR / test_name / "build/native" / test_name
+    if not executable.is_file():
+        return None, 0, "Executable not found"
+
+    start = time.monotonic()
+    try:
+        result = subprocess.run([str(executable)], stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, timeout=timeout)
+        raw_output = result.stdout
+        error = None
+    except subprocess.TimeoutExpired as e:
+        raw_output = e.stdout or b''
+        error = f"Execution timed out after {timeout}s"
+    run_time = int((time.monotonic() - start) * 1000)
+
+    return filter_output(raw_output, preserve_empty), run_time, error
+
+
+def run_single_test(test_name: str, clean: bool, timeout: int):
+    """
+    Build and execute one test.
+
+    Returns (test_data, output): a test_results.json entry without validation
+    results, and the captured output to validate, or None if the test failed
+    before producing output (test_data then already holds the failure).
+    """
+    test_info = load_test_info(test_name)
+    execution = test_info.get("execution", {})
+    opcodes_tested = test_info.get("opcodes", {}).get("tested", [])
+
+    test_data = {
+        "name": test_name,
+        "passed": False,
+        "build_time_ms": 0,
+        "execution_time_ms": 0,
+        "opcodes_tested": opcodes_tested
+    }
+
+    built, build_time, error = build_test(test_name, clean, timeout)
+    test_data["build_time_ms"] = build_time
+    if not built:
+        test_data["opcodes_tested"] = []
+        test_data.update(failure_result(
+            "build", "successful build", "build failed", error
+        ))
+        return test_data, None
+
+    output, run_time, error = execute_test(
+        test_name, execution.get("preserve_empty_lines", False), timeout
+    )
+    test_data["execution_time_ms"] = run_time
+    if output is None or error is not None:
+        test_data.update(failure_result(
+            "execution", "test completes", error.lower(), error
+        ))
+        return test_data, None
+
+    return test_data, output
+
+
+# ==============================================================================
+# Results
+# ==============================================================================
+
+def first_failure_message(test_data: Dict) -> str:
+    """Describe the first failing sub-test of a test result."""
+    failed = [t for t in test_data.get("sub_tests", []) if not t.get("passed", False)]
+    if not failed:
+        return "unknown error"
+    return failed[0].get(
+        "message",
+        f"expected '{failed[0].get('expected', '')}' but got '{failed[0].get('actual', '')}'"
+    )
+
+
+def print_summary(results: List[Dict], skipped: int, total_time_ms: int):
+    """Print the end-of-run summary for the tests run this time."""
+    failed = [t for t in results if not t.get("passed", False)]
+    passed = len(results) - len(failed)
+    sub_tests = [sub for test in results for sub in test.get("sub_tests", [])]
+    passed_sub_tests = sum(1 for sub in sub_tests if sub.get("passed", False))
+    failed_sub_tests = len(sub_tests) - passed_sub_tests
+    build_time = sum(t.get("build_time_ms", 0) for t in results)
+    run_time = sum(t.get("execution_time_ms", 0) for t in results)
+
+    print()
+    print("========================================")
+    print("  SWFRecomp Test Suite Results")
+    print("========================================")
+    print(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print()
+
+    if not failed:
+        print(f"Tests:     {GREEN}{passed} / {len(results)} passed{NC}")
+    else:
+        print(f"Tests:     {RED}{passed} / {len(results)} passed{NC} ({len(failed)} failed)")
+
+    if skipped > 0:
+        print(f"           {YELLOW}{skipped} skipped{NC}")
+
+    if failed_sub_tests == 0:
+        print(f"Sub-tests: {GREEN}{passed_sub_tests} / {len(sub_tests)} passed{NC}")
+    else:
+        print(f"Sub-tests: {RED}{passed_sub_tests} / {len(sub_tests)} passed{NC} "
+              f"({failed_sub_tests} failed)")
+
+    print()
+    print(f"Time:      {total_time_ms / 1000:.1f}s wall clock "
+          f"(build: {build_time / 1000:.1f}s, run: {run_time / 1000:.1f}s summed)")
+
+    if failed:
+        print()
+        print("FAILED TESTS:")
+        for i, test in enumerate(failed, 1):
+            print(f"  {RED}[{i}]{NC} {test['name']}")
+            print(f"      {first_failure_message(test)}")
+
+    print()
+    print(f"Results saved to: {RESULTS_FILE.name}")
+    print("========================================")
+    print()
+
+
+# ==============================================================================
+# Main Test Loop
+# ==============================================================================
+
+def run_tests(test_names: List[str], jobs: int, clean: bool, timeout: int,
+              journal: ResultJournal, history: TimingHistory) -> List[Dict]:
+    """
+    Run tests on a process pool, longest expected duration first, reporting
+    and journaling each result as it completes.
+
+    Workers build and execute tests; their captured output is validated here,
+    in this one process, by a BatchValidator that imports each validate.py
+    once. Returns the results in the order the tests were given.
+    """
+    results = {}
+    validator = BatchValidator()
+
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        futures = {
+            executor.submit(run_single_test, name, clean, timeout): name
+            for name in history.lpt_order(test_names)
+        }
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                test_data, output = future.result()
+                if output is not None:
+                    validation = validator.validate(name, output)
+                    test_data["passed"] = bool(validation.get("passed", False))
+                    test_data.update(validation)
+            except Exception as e:
+                test_data = {
+                    "name": name,
+                    "passed": False,
+                    "build_time_ms": 0,
+                    "execution_time_ms": 0,
+                    "opcodes_tested": []
+                }
+                test_data.update(failure_result(
+                    "runner", "test runs", "runner error", str(e)
+                ))
+
+            results[name] = test_data
+            journal.append(test_data)
+            if test_data["passed"]:
+                log_success(name)
+            else:
+                log_error(f"{name} ({first_failure_message(test_data)})")
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+    return [results[name] for name in test_names]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build, run and validate SWFRecomp tests in parallel"
+    )
+    parser.add_argument(
+        'tests',
+        nargs='*',
+        help='Names of tests to run (default: all tests with test_info.json)'
+    )
+    parser.add_argument(
+        '--build',
+        action='store_true',
+        help='Build SWFRecomp if not already built (idempotent)'
+    )
+    parser.add_argument(
+        '--clean',
+        action='store_true',
+        help='Clean and rebuild SWFRecomp and regenerate all test files'
+    )
+    parser.add_argument(
+        '--retest',
+        action='store_true',
+        help='Only run tests that failed in the previous run'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue an interrupted run, skipping tests already in the journal'
+    )
+    parser.add_argument(
+        '--affected',
+        nargs='?',
+        const='HEAD',
+        metavar='BASE',
+        help='Only run tests affected by changes since BASE (default: HEAD, '
+             'i.e. uncommitted changes)'
+    )
+    parser.add_argument(
+        '--max-tests',
+        type=int,
+        metavar='N',
+        help='Run only the first N tests'
+    )
+    parser.add_argument(
+        '--shard',
+        type=parse_shard,
+        metavar='i/N',
+        help='Run only slice i of N duration-balanced slices of the suite'
+    )
+    parser.add_argument(
+        '--timings',
+        type=Path,
+        default=TIMINGS_FILE,
+        metavar='FILE',
+        help='Timing history used for scheduling and sharding (default: test_timings.json)'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        metavar='N',
+        help='Number of tests to run concurrently (default: CPU count)'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=int,
+        default=DEFAULT_TIMEOUT,
+        metavar='SEC',
+        help=f'Per-test timeout for each of build and run (default: {DEFAULT_TIMEOUT})'
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    start_time = time.monotonic()
+
+    print()
+    print("========================================")
+    print("  SWFRecomp Test Suite")
+    print("========================================")
+    print()
+
+    journal = ResultJournal()
+    planned, completed = journal.load() if args.resume else (None, [])
+
+    if planned is not None:
+        done = {test["name"] for test in completed}
+        test_names = [name for name in planned if name not in done]
+        log_info(f"Resuming interrupted run: {len(completed)} test(s) already done, "
+                 f"{len(test_names)} remaining")
+    else:
+        if args.resume:
+            log_info("No interrupted run to resume, starting a new run")
+        completed = []
+        test_names = discover_tests(args.tests, args.retest)
+
+        if not test_names:
+            if args.retest:
+                log_info("No failed tests found in previous run")
+            else:
+                log_warning("No tests found with test_info.json")
+            return 0
+
+        if args.retest:
+            log_info(f"Retest mode: Running {len(test_names)} previously failed test(s)")
+        elif args.tests:
+            log_info(f"Running {len(test_names)} specified test(s)")
+        else:
+            log_info(f"Discovered {len(test_names)} tests")
+
+        if args.affected:
+            affected, reason = select_affected(test_names, args.affected)
+            if affected is None:
+                log_info(f"Affected mode: running all tests ({reason})")
+            else:
+                log_info(f"Affected mode: {len(affected)} test(s) selected ({reason})")
+                test_names = affected
+                if not test_names:
+                    return 0
+
+    if args.build or args.clean:
+        if args.clean:
+            log_info("Clean mode enabled - will regenerate all files from SWF sources")
+        if not ensure_swfrecomp_built(args.clean):
+            return 1
+
+    runnable = []
+    skipped = 0
+    for name in test_names:
+        reason = check_test_setup(name)
+        if reason:
+            log_warning(f"{name} ({reason})")
+            skipped += 1
+        else:
+            runnable.append(name)
+
+    history = TimingHistory(args.timings)
+
+    if args.shard and planned is None:
+        index, count = args.shard
+        runnable = sorted(history.shard(runnable, index, count))
+        log_info(f"Shard {index}/{count}: {len(runnable)} test(s)")
+
+    if args.max_tests is not None and len(runnable) > args.max_tests:
+        log_info(f"Limiting run to the first {args.max_tests} tests")
+        runnable = runnable[:args.max_tests]
+
+    if planned is None:
+        journal.start(runnable)
+    else:
+        journal.resume()
+
+    jobs = max(1, args.jobs)
+    log_info(f"Running {len(runnable)} test(s) with {jobs} job(s)")
+    print()
+
+    try:
+        results = run_tests(runnable, jobs, args.clean, args.timeout, journal, history)
+    except KeyboardInterrupt:
+        journal.close()
+        print()
+        log_info(f"Interrupted - finished results are kept in {journal.path.name}")
+        log_info("Rerun with --resume to continue, or compact them with "
+                 "./results_journal.py --compact")
+        return 130
+
+    journal.compact()
+    history.record(results)
+    history.save()
+
+    results = completed + results
+    print_summary(results, skipped, int((time.monotonic() - start_time) * 1000))
+
+    return 1 if any(not t.get("passed", False) for t in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+import struct
+
+# Create a SWF7 file recompiled with max_file_size = 1 (see config.toml),
+# so the script is split into a new function wherever no branch crosses,
+# and every function, string and data table goes to its own file.
+#
+# Test cases:
+# 1. Values pushed before a split and used after it: 5 + 7 -> 12
+# 2. A loop at the top level, which can't be split inside -> 3
+# 3. A DefineFunction2 in its own file: sum(4) = 0+1+2+3 -> 6
+# 4. Strings declared across the parts -> done
+# 5. A Jump out of a Try block, which can't be split across -> try, after try
+
+# SWF Header
+signature = b'FWS'  # Uncompressed SWF
+version = 7  # SWF 7 supports DefineFunction2
+
+# Frame size (RECT): 0-8000 twips (0-400 pixels)
+rect_data = bytes([0x78, 0x00, 0x0F, 0xA0, 0x00, 0x00, 0x0F, 0xA0, 0x00])
+
+frame_rate = struct.pack('<H', 24 << 8)  # 24 fps (8.8 fixed point)
+frame_count = struct.pack('<H', 1)  # 1 frame
+
+ADD2 = bytes([0x47])
+LESS2 = bytes([0x48])
+INCREMENT = bytes([0x50])
+POP = bytes([0x17])
+RETURN = bytes([0x3E])
+TRACE = bytes([0x26])
+CALL_FUNCTION = bytes([0x3D])
+GET_VARIABLE = bytes([0x1C])
+SET_VARIABLE = bytes([0x1D])
+
+def push_float(value):
+    return struct.pack('<BHB', 0x96, 5, 1) + struct.pack('<f', value)
+
+def push_string(s):
+    data = b'\x00' + s.encode('utf-8') + b'\x00'
+    return struct.pack('<BH', 0x96, len(data)) + data
+
+def push_register(reg):
+    return struct.pack('<BHBB', 0x96, 2, 4, reg)
+
+def store_register(reg):
+    return struct.pack('<BHB', 0x87, 1, reg)
+
+def branch(code, offset):
+    # Offset is relative to the end of the branch action
+    return struct.pack('<BHh', code, 2, offset)
+
+def loop(condition, body):
+    """while (condition) body, as If/Jump actions"""
+    # condition; If -> body; Jump -> end; body; Jump -> condition
+    exit_jump = branch(0x99, len(body) + 5)
+    enter = branch(0x9D, len(exit_jump))
+    back = -(len(condition) + len(enter) + len(exit_jump) + len(body) + 5)
+    return condition + enter + exit_jump + body + branch(0x99, back)
+
+def try_block(body):
+    # No catch or finally block
+    data = struct.pack('<BHHH', 0x00, len(body), 0, 0)
+    return struct.pack('<BH', 0x8F, len(data) + len(body)) + data + body
+
+def define_function2(name, params, register_count, body):
+    data = name.encode('utf-8') + b'\x00'
+    data += struct.pack('<HBH', len(params), register_count, 0x0000)
+    for reg, param_name in params:
+        data += struct.pack('B', reg) + param_name.encode('utf-8') + b'\x00'
+    data += struct.pack('<H', len(body))
+    return struct.pack('<BH', 0x8E, len(data) + len(body)) + data + body
+
+# Test 1: trace(5 + 7), with a trace between the pushes and the Add2
+test1 = push_float(5.0) + push_float(7.0) + push_string("start") + TRACE + ADD2 + TRACE
+
+# Test 2: i = 0; while (i < 3) i++; trace(i)
+test2 = (push_string("i") + push_float(0.0) + SET_VARIABLE +
+         loop(
+             push_string("i") + GET_VARIABLE + push_float(3.0) + LESS2,
+             push_string("i") + push_string("i") + GET_VARIABLE + INCREMENT + SET_VARIABLE
+         ) +
+         push_string("i") + GET_VARIABLE + TRACE)
+
+# Test 3: function sum(n) { s = 0; k = 0; while (k < n) { s += k; k++; } return s; } trace(sum(4))
+sum_function = define_function2("sum", [(1, "n")], 4,
+    push_float(0.0) + store_register(2) + POP +
+    push_float(0.0) + store_register(3) + POP +
+    loop(
+        push_register(3) + push_register(1) + LESS2,
+        push_register(2) + push_register(3) + ADD2 + store_register(2) + POP +
+        push_register(3) + INCREMENT + store_register(3) + POP
+    ) +
+    push_register(2) + RETURN
+)
+test3 = sum_function + push_float(4.0) + push_float(1.0) + push_string("sum") + CALL_FUNCTION + TRACE
+
+# Test 4
+test4 = push_string("done") + TRACE
+
+# Test 5: try { trace("try"); goto L; } trace("skipped"); trace("skipped"); L: trace("after try")
+skipped = (push_string("skipped") + TRACE)*2
+test5 = (try_block(push_string("try") + TRACE + branch(0x99, len(skipped))) + skipped +
+         push_string("after try") + TRACE)
+
+# End action (0x00)
+action_end = bytes([0x00])
+
+all_actions = test1 + test2 + test3 + test4 + test5 + action_end
+
+# DoAction tag
+do_action_header = struct.pack('<H', (12 << 6) | 0x3F)  # Tag type 12, long form
+do_action_header += struct.pack('<I', len(all_actions))
+do_action_tag = do_action_header + all_actions
+
+# ShowFrame tag
+show_frame_tag = struct.pack('<H', 1 << 6)  # Tag type 1, short form
+
+# End tag
+end_tag = bytes([0x00, 0x00])
+
+# Build complete SWF
+tags = do_action_tag + show_frame_tag + end_tag
+body = rect_data + frame_rate + frame_count + tags
+
+file_length = 8 + len(body)  # Header is 8 bytes
+
+swf_data = signature + struct.pack('<BI', version, file_length) + body
+
+with open('test.swf', 'wb') as f:
+    f.write(swf_data)
+
+print(f"Created test.swf ({len(swf_data)} bytes)")
+print("Test 1: values across a split -> start, 12")
+print("Test 2: top-level loop -> 3")
+print("Test 3: sum(4) -> 6")
+print("Test 4: -> done")
+print("Test 5: Jump out of a Try block -> try, after try")
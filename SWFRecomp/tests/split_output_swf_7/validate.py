@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Validation script for split_output_swf_7
+
+Tests a program recompiled into as many C files as possible:
+1. Values pushed before a split and added after it: start, 12
+2. A top-level loop, kept in one part: 3
+3. A DefineFunction2 in its own file: sum(4) = 6
+4. A string declared in a later part: done
+5. A Jump out of a Try block, kept in one part: try, after try
+"""
+import sys
+import json
+import os
+
+# Import common utilities
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(script_dir, '..'))
+from test_utils import parse_output, make_result, make_validation_result
+
+
+def validate_output(output):
+    """
+    Validate test output.
+
+    Expected:
+    - Line 0: start
+    - Line 1: 12 (5 + 7)
+    - Line 2: 3 (loop)
+    - Line 3: 6 (sum(4))
+    - Line 4: done
+    - Lines 5-6: try, after try
+    """
+    lines = parse_output(output)
+    results = []
+
+    cases = [
+        ("trace_before_split", "start"),
+        ("values_across_split", "12"),
+        ("top_level_loop", "3"),
+        ("function_in_own_file", "6"),
+        ("string_in_later_part", "done"),
+        ("try_block_runs", "try"),
+        ("jump_out_of_try", "after try"),
+    ]
+
+    for i, (name, expected) in enumerate(cases):
+        actual = lines[i] if len(lines) > i else "(no output)"
+        results.append(make_result(name, actual == expected, expected, actual))
+
+    skipped = [line for line in lines if line == "skipped"]
+    results.append(make_result("skipped_code_doesnt_run", len(skipped) == 0, "(none)", ", ".join(skipped) or "(none)"))
+
+    return make_validation_result(results)
+
+
+if __name__ == "__main__":
+    output = sys.stdin.read()
+    result = validate_output(output)
+    print(json.dumps(result, indent=2))
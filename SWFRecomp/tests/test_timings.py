@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Per-Test Timing History and Duration-Aware Scheduling
+
+Keeps the build and run times of recent test runs in test_timings.json and
+uses them to:
+
+- schedule the longest tests first (LPT), so a slow build such as
+  speed_test_swf_4 doesn't start last and bound the wall-clock time
+- split the suite into N shards of balanced total duration (--shard i/N),
+  so several machines or containers can each run one slice
+
+Shard assignment is deterministic for a given timing history, so every
+machine running a slice of the same suite must use the same history file
+(e.g. a committed copy passed with --timings).
+
+Usage:
+    ./test_timings.py                   # Print the recorded estimates
+    ./test_timings.py --shards 4        # Show how the suite splits into 4 shards
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+TESTS_DIR = Path(__file__).resolve().parent
+TIMINGS_FILE = TESTS_DIR / "test_timings.json"
+
+# Number of recent samples kept per test
+HISTORY_LENGTH = 5
+
+# Estimate used when no test has any history yet
+DEFAULT_ESTIMATE_MS = 1000
+
+
+def parse_shard(value: str):
+    """Parse an 'i/N' shard specification (1-based) into (i, N)."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got '{value}'")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 1..N, got '{value}'")
+    return index, count
+
+
+class TimingHistory:
+    """Recent per-test durations, loaded from and saved to a JSON file."""
+
+    def __init__(self, path: Path = TIMINGS_FILE):
+        self.path = Path(path)
+        try:
+            with open(self.path, 'r') as f:
+                self.tests = json.load(f).get("tests", {})
+        except (OSError, ValueError):
+            self.tests = {}
+
+    def record(self, results: List[Dict]):
+        """Add the build and run times of finished tests to the history."""
+        for test in results:
+            entry = self.tests.setdefault(test["name"], {
+                "build_time_ms": [],
+                "execution_time_ms": []
+            })
+            for key in ("build_time_ms", "execution_time_ms"):
+                entry[key] = (entry[key] + [test.get(key, 0)])[-HISTORY_LENGTH:]
+
+    def save(self):
+        tmp_file = Path(f"{self.path}.tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump({"tests": self.tests}, f, indent=2, sort_keys=True)
+        os.replace(tmp_file, self.path)
+
+    def estimate(self, test_name: str) -> float:
+        """
+        Expected duration of a test in milliseconds.
+
+        The median of its recent build + run times, or for a test with no
+        history the median estimate over all known tests.
+        """
+        entry = self.tests.get(test_name)
+        if entry and entry["build_time_ms"]:
+            return (statistics.median(entry["build_time_ms"])
+                    + statistics.median(entry["execution_time_ms"] or [0]))
+
+        known = [self.estimate(name) for name in self.tests if self.tests[name]["build_time_ms"]]
+        return statistics.median(known) if known else DEFAULT_ESTIMATE_MS
+
+    def lpt_order(self, test_names: List[str]) -> List[str]:
+        """Order tests longest first (ties broken by name, for determinism)."""
+        return sorted(test_names, key=lambda name: (-self.estimate(name), name))
+
+    def shards(self, test_names: List[str], count: int) -> List[List[str]]:
+        """
+        Split tests into count shards of balanced estimated duration.
+
+        Greedy LPT: each test, longest first, goes to the shard with the
+        smallest total so far. Each shard is returned in LPT order.
+        """
+        shards = [[] for _ in range(count)]
+        totals = [0.0] * count
+
+        for name in self.lpt_order(test_names):
+            target = min(range(count), key=lambda i: (totals[i], i))
+            shards[target].append(name)
+            totals[target] += self.estimate(name)
+
+        return shards
+
+    def shard(self, test_names: List[str], index: int, count: int) -> List[str]:
+        """Return the tests in shard index (1-based) of count."""
+        return self.shards(test_names, count)[index - 1]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Show test timing history and shard balance")
+    parser.add_argument('--timings', type=Path, default=TIMINGS_FILE, metavar='FILE',
+                        help='Timing history file (default: test_timings.json)')
+    parser.add_argument('--shards', type=int, metavar='N',
+                        help='Show how the recorded tests split into N shards')
+    args = parser.parse_args(argv)
+
+    history = TimingHistory(args.timings)
+    if not history.tests:
+        print(f"No timing history in {args.timings}")
+        return 0
+
+    if args.shards:
+        for i, shard in enumerate(history.shards(list(history.tests), args.shards), 1):
+            total = sum(history.estimate(name) for name in shard)
+            print(f"Shard {i}/{args.shards}: {len(shard)} tests, ~{total / 1000:.1f}s")
+        return 0
+
+    for name in history.lpt_order(list(history.tests)):
+        print(f"{history.estimate(name):10.0f} ms  {name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
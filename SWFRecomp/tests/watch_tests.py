@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+SWFRecomp Test Watch Mode
+
+Watches the runtime, recompiler and test sources and reruns the affected
+tests whenever a file is saved:
+
+- changed lines are mapped to tests the same way --affected does it
+  (see affected_tests.py), but against the previous saved version of each
+  file instead of a git ref
+- recompiler changes trigger an incremental `make` of SWFRecomp first
+- a changed create_test_swf.py regenerates that test's test.swf
+- build_test.sh recompiles only the runtime objects whose inputs changed
+  (build/runtime_cache/objects/), and recompilation output is reused from
+  build/recomp_cache/ unless test.swf, config.toml or SWFRecomp changed
+
+Results are journaled and compacted into test_results.json like a normal
+run, and timings feed the same test_timings.json.
+
+Files are polled for changes, so no extra packages are needed.
+
+Usage:
+    ./watch_tests.py                    # Watch everything
+    ./watch_tests.py add2_swf_5 trace_swf_4
+    ./watch_tests.py --initial          # Run the tests once before watching
+"""
+
+import argparse
+import difflib
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from affected_tests import (GENERATED_FILES, RECOMPILER_ACTION_CPP, RUNTIME_SOURCES,
+                            SWFMODERN_ROOT, affected_by)
+from results_journal import ResultJournal
+from run_tests import (DEFAULT_TIMEOUT, SWFRECOMP_BUILD, SWFRECOMP_ROOT, TESTS_DIR,
+                       check_test_setup, discover_tests, ensure_swfrecomp_built,
+                       log_error, log_info, log_warning, run_tests)
+from test_timings import TIMINGS_FILE, TimingHistory
+
+# Seconds between polls, and to wait for a burst of saves to settle
+POLL_INTERVAL = 0.5
+SETTLE_TIME = 0.2
+
+# Directories polled for changes (recursively)
+WATCHED_DIRS = [
+    SWFMODERN_ROOT / "src",
+    SWFMODERN_ROOT / "include",
+    SWFMODERN_ROOT / "lib/c-hashmap",
+    SWFMODERN_ROOT / "lib/o1heap",
+    SWFRECOMP_ROOT / "src",
+    SWFRECOMP_ROOT / "include",
+    SWFRECOMP_ROOT / "wasm_wrappers",
+]
+
+WATCHED_FILES = [
+    SWFRECOMP_ROOT / "CMakeLists.txt",
+    SWFRECOMP_ROOT / "scripts/build_test.sh",
+]
+
+# Changes under these require rebuilding SWFRecomp before testing
+RECOMPILER_INPUTS = [
+    SWFRECOMP_ROOT / "src",
+    SWFRECOMP_ROOT / "include",
+    SWFRECOMP_ROOT / "CMakeLists.txt",
+]
+
+# Files kept in memory so changes can be narrowed to individual lines
+LINE_TRACKED = set(RUNTIME_SOURCES) | {RECOMPILER_ACTION_CPP}
+
+SKIPPED_DIRS = {"build", "RecompiledScripts", "RecompiledTags", "__pycache__"}
+
+
+# ==============================================================================
+# Change Detection
+# ==============================================================================
+
+def watched_paths() -> List[Path]:
+    """List every file currently being watched."""
+    paths = [path for path in WATCHED_FILES if path.is_file()]
+
+    for root in WATCHED_DIRS:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in SKIPPED_DIRS]
+            paths.extend(Path(dirpath) / name for name in filenames)
+
+    # Test infrastructure and each test's own files (not generated output)
+    for entry in TESTS_DIR.iterdir():
+        if entry.is_file() and entry.suffix == '.py':
+            paths.append(entry)
+        elif entry.is_dir() and entry.name not in SKIPPED_DIRS:
+            paths.extend(
+                path for path in entry.iterdir()
+                if path.is_file() and path.name not in GENERATED_FILES
+            )
+
+    return [path.resolve() for path in paths]
+
+
+def snapshot() -> Dict[Path, Tuple[float, int]]:
+    """Map each watched file to its (mtime, size)."""
+    stats = {}
+    for path in watched_paths():
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        stats[path] = (stat.st_mtime, stat.st_size)
+    return stats
+
+
+def read_lines(path: Path) -> List[str]:
+    try:
+        return path.read_text(errors='replace').splitlines()
+    except OSError:
+        return []
+
+
+def diff_lines(old: List[str], new: List[str]) -> Set[int]:
+    """Line numbers in new that differ from old (deletions map to their position)."""
+    changed = set()
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, _, _, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        if j1 == j2:
+            changed.add(max(j1, 1))
+        else:
+            changed.update(range(j1 + 1, j2 + 1))
+    return changed
+
+
+class SourceWatcher:
+    """Polls the watched files and reports what changed since the last poll."""
+
+    def __init__(self):
+        self.stats = snapshot()
+        self.contents = {path: read_lines(path) for path in LINE_TRACKED}
+
+    def poll(self) -> Dict[Path, Set[int]]:
+        """
+        Return changed files mapped to their changed line numbers.
+
+        Only the line-tracked files get exact line numbers; any other
+        changed file maps to {1}, and a deleted file to an empty set.
+        """
+        stats = snapshot()
+        if stats == self.stats:
+            return {}
+
+        # Let editors finish writing (save-via-rename, formatters, ...)
+        time.sleep(SETTLE_TIME)
+        stats = snapshot()
+
+        changes = {}
+        for path in set(stats) | set(self.stats):
+            if stats.get(path) == self.stats.get(path):
+                continue
+            if path not in stats:
+                changes[path] = set()
+            elif path in LINE_TRACKED:
+                lines = read_lines(path)
+                changed = diff_lines(self.contents.get(path, []), lines)
+                self.contents[path] = lines
+                if changed:
+                    changes[path] = changed
+            else:
+                changes[path] = {1}
+
+        self.stats = stats
+        return changes
+
+
+# ==============================================================================
+# Rebuild and Rerun
+# ==============================================================================
+
+def rebuild_swfrecomp() -> bool:
+    """Incrementally rebuild SWFRecomp, printing the errors if it fails."""
+    log_info("Rebuilding SWFRecomp...")
+    result = subprocess.run(["make", "-j"], cwd=SWFRECOMP_BUILD,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        log_error("Failed to build SWFRecomp")
+        print('\n'.join((result.stdout + result.stderr).splitlines()[-20:]))
+        return False
+    return True
+
+
+def is_recompiler_input(path: Path) -> bool:
+    return any(path == root or root in path.parents for root in RECOMPILER_INPUTS)
+
+
+def rerun(test_names: List[str], args, history: TimingHistory):
+    """Run tests, journal and record them, and print a one-line summary."""
+    runnable = [name for name in test_names if not check_test_setup(name)]
+    if not runnable:
+        return
+
+    start = time.monotonic()
+    journal = ResultJournal()
+    journal.start(runnable)
+    try:
+        results = run_tests(runnable, max(1, args.jobs), False, args.timeout,
+                            journal, history)
+    finally:
+        journal.close()
+
+    journal.compact()
+    history.record(results)
+    history.save()
+
+    failed = [t["name"] for t in results if not t.get("passed", False)]
+    elapsed = time.monotonic() - start
+    if failed:
+        log_error(f"{len(failed)} of {len(results)} test(s) failed in {elapsed:.1f}s")
+    else:
+        log_info(f"{len(results)} test(s) passed in {elapsed:.1f}s")
+
+
+def handle_changes(changes: Dict[Path, Set[int]], candidates: List[str], args,
+                   history: TimingHistory):
+    """Rebuild what the changes require and rerun the affected tests."""
+    print()
+    for path in sorted(changes):
+        log_info(f"Changed: {os.path.relpath(path, SWFRECOMP_ROOT.parent)}")
+
+    if any(is_recompiler_input(path) for path in changes) and not rebuild_swfrecomp():
+        return
+
+    # Regenerate test.swf for tests whose generator changed
+    for path in changes:
+        if path.name == "create_test_swf.py" and path.parent.parent == TESTS_DIR:
+            (path.parent / "test.swf").unlink(missing_ok=True)
+
+    affected, reason = affected_by(candidates, changes)
+    if affected is None:
+        log_info(f"Running all {len(candidates)} test(s) ({reason})")
+        affected = candidates
+    else:
+        affected = [name for name in candidates if name in affected]
+        log_info(f"{len(affected)} affected test(s) ({reason})")
+
+    rerun(affected, args, history)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rerun affected SWFRecomp tests whenever sources change"
+    )
+    parser.add_argument(
+        'tests',
+        nargs='*',
+        help='Only consider these tests (default: all tests with test_info.json)'
+    )
+    parser.add_argument(
+        '--initial',
+        action='store_true',
+        help='Run the tests once at startup, warming the build caches'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        metavar='N',
+        help='Number of tests to run concurrently (default: CPU count)'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=int,
+        default=DEFAULT_TIMEOUT,
+        metavar='SEC',
+        help=f'Per-test timeout for each of build and run (default: {DEFAULT_TIMEOUT})'
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if not ensure_swfrecomp_built(False):
+        return 1
+
+    candidates = discover_tests(args.tests, False)
+    if not candidates:
+        log_warning("No tests found with test_info.json")
+        return 0
+
+    history = TimingHistory(TIMINGS_FILE)
+    watcher = SourceWatcher()
+
+    try:
+        if args.initial:
+            rerun(candidates, args, history)
+
+        log_info(f"Watching {len(watcher.stats)} files for {len(candidates)} test(s). "
+                 f"Press Ctrl-C to stop.")
+        while True:
+            time.sleep(POLL_INTERVAL)
+            changes = watcher.poll()
+            if changes:
+                handle_changes(changes, candidates, args, history)
+                log_info("Watching for changes...")
+    except KeyboardInterrupt:
+        print()
+        log_info("Stopped watching")
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 #include <recomp.h>
 #include <swf.h>
 #include <out.h>  // For FRAME_COUNT
+#include "constants.h"  // For SWF_FRAME_COUNT
 
 // Create SWFAppContext
 // In NO_GRAPHICS mode, only frame_funcs is needed
@@ -47,6 +48,10 @@ int main() {
     app_context.frame_funcs = frame_funcs;
     app_context.frame_count = FRAME_COUNT;
 
+    // The runtime may be precompiled without this movie's constants.h,
+    // so set _root's frame count from the SWF header here
+    root_movieclip.totalframes = SWF_FRAME_COUNT;
+
 #ifndef __EMSCRIPTEN__
     // Native mode - run immediately
     printf("SWF Runtime Loaded (Native Build)\n\n");
@@ -61,12 +61,35 @@ def main():
         action='store_true',
         help='Only run tests that failed in the previous run'
     )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue an interrupted test run instead of starting over'
+    )
     parser.add_argument(
         '--max-tests',
         type=int,
         metavar='N',
         help='Run only the first N tests (useful for CI/testing)'
     )
+    parser.add_argument(
+        '--shard',
+        metavar='i/N',
+        help='Run only slice i of N duration-balanced slices of the suite'
+    )
+    parser.add_argument(
+        '--affected',
+        nargs='?',
+        const='HEAD',
+        metavar='BASE',
+        help='Only run tests affected by changes since BASE (default: HEAD)'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        metavar='N',
+        help='Number of tests to run concurrently (default: CPU count)'
+    )
     args = parser.parse_args()
 
     print("=" * 80)
@@ -76,22 +99,30 @@ def main():
 
     # Step 1: Run all tests
     tests_dir = BASE_DIR / "SWFRecomp/tests"
-    all_tests_script = tests_dir / "all_tests.sh"
+    run_tests_script = tests_dir / "run_tests.py"
 
-    if not all_tests_script.exists():
-        print(f"✗ ERROR: Test script not found: {all_tests_script}")
+    if not run_tests_script.exists():
+        print(f"✗ ERROR: Test script not found: {run_tests_script}")
         sys.exit(1)
 
-    # Build command with optional --build, --clean, --retest, and --max-tests flags
-    test_cmd = [str(all_tests_script)]
+    # Build command with optional --build, --clean, --retest, --resume, --max-tests, --jobs, --shard and --affected flags
+    test_cmd = [sys.executable, str(run_tests_script)]
     if args.build:
         test_cmd.append('--build')
     if args.clean:
         test_cmd.append('--clean')
     if args.retest:
         test_cmd.append('--retest')
+    if args.resume:
+        test_cmd.append('--resume')
     if args.max_tests:
         test_cmd.append(f'--max-tests={args.max_tests}')
+    if args.jobs:
+        test_cmd.append(f'--jobs={args.jobs}')
+    if args.shard:
+        test_cmd.append(f'--shard={args.shard}')
+    if args.affected:
+        test_cmd.append(f'--affected={args.affected}')
 
     success = run_command(
         test_cmd,